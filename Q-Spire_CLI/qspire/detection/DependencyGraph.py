@@ -0,0 +1,280 @@
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import sysconfig
+import tempfile
+import threading
+
+"""
+Dependency graph of the local modules of an analyzed project.
+
+Dynamic detection executes the analyzed file and, with it, the local modules it imports
+(the folder of the file is put on sys.path). The results of a file therefore depend on the
+content of every local module it reaches through its imports. The graph records, for each
+file, its content hash and its local imports, and is persisted between runs: files whose
+size and mtime did not change are neither read nor parsed again.
+"""
+
+# Standard library and common packages that are never resolved to local files
+SKIP_MODULES = {
+    'qiskit', 'numpy', 'scipy', 'matplotlib', 'pandas', 'os', 'sys',
+    'json', 'csv', 'math', 'random', 'datetime', 're', 'collections',
+    'itertools', 'functools', 'operator', 'pathlib', 'typing',
+    'gettext', 'locale', 'threading', 'queue', 'urllib', 'http',
+    'socket', 'ssl', 'email', 'html', 'xml', 'logging', 'unittest',
+    'importlib', 'pkgutil', 'warnings', 'weakref', 'gc', 'copy',
+    'pickle', 'struct', 'zlib', 'gzip', 'bz2', 'lzma', 'tarfile',
+    'zipfile', 'hashlib', 'hmac', 'secrets', 'uuid', 'time',
+    'calendar', 'argparse', 'shlex', 'glob', 'fnmatch', 'linecache',
+    'shutil', 'stat', 'filecmp', 'tempfile', 'contextlib', 'abc',
+    'numbers', 'cmath', 'decimal', 'fractions', 'statistics',
+    'array', 'bisect', 'heapq', 'copy', 'pprint', 'reprlib',
+    'enum', 'graphlib', 'string', 'textwrap', 'unicodedata',
+    'stringprep', 'readline', 'rlcompleter', 'io', 'codecs'
+}
+
+# Bump when the layout of the persisted graph changes
+GRAPH_FORMAT_VERSION = 1
+
+
+def resolve_local_module(module_name, base_dir):
+    """
+    Resolve an imported module to a local project file.
+
+    Args:
+        module_name: Dotted name of the imported module
+        base_dir: Folder of the importing file
+
+    Returns:
+        Path of the local file implementing the module, or None for standard library,
+        third-party and unresolvable modules
+    """
+    if not module_name:
+        return None
+
+    root_module = module_name.split('.')[0]
+    if root_module in SKIP_MODULES:
+        return None
+
+    # Skip if it's in the Python standard library path or in site-packages
+    try:
+        spec = importlib.util.find_spec(module_name)
+        if spec and spec.origin:
+            stdlib_path = sysconfig.get_path('stdlib')
+            if spec.origin.startswith(stdlib_path):
+                return None
+            if 'site-packages' in spec.origin:
+                return None
+    except (ImportError, ModuleNotFoundError, ValueError):
+        pass
+
+    # Only local project files
+    try:
+        relative_path = os.path.join(base_dir, module_name.replace('.', os.sep) + '.py')
+        if os.path.exists(relative_path):
+            return relative_path
+
+        # Package-style imports in the same directory
+        package_path = os.path.join(base_dir, module_name.replace('.', os.sep), '__init__.py')
+        if os.path.exists(package_path):
+            return package_path
+    except Exception:
+        pass
+
+    return None
+
+
+def imported_module_names(tree):
+    """
+    Names of the modules imported by a parsed file.
+
+    Relative imports are resolved against the folder of the file, so `from . import helper`
+    yields `helper` and `from .utils import x` yields `utils`.
+    """
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names.append(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module:
+                names.append(node.module)
+            elif node.level:
+                names.extend(alias.name for alias in node.names)
+    return names
+
+
+def get_local_imports(path, tree=None):
+    """
+    Local project files imported by a Python file.
+
+    Args:
+        path: Path to the Python file
+        tree: Already parsed AST of the file (optional)
+
+    Returns:
+        Sorted list of the absolute paths of the imported local files
+    """
+    if tree is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+
+    base_dir = os.path.dirname(path)
+    local_imports = set()
+    for module_name in imported_module_names(tree):
+        resolved = resolve_local_module(module_name, base_dir)
+        if resolved:
+            local_imports.add(os.path.normpath(os.path.abspath(resolved)))
+    local_imports.discard(os.path.normpath(os.path.abspath(path)))
+    return sorted(local_imports)
+
+
+class DependencyGraph:
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: JSON file where the graph is persisted between runs (optional)
+        """
+        self.path = os.path.abspath(path) if path else None
+        self.nodes = {}  # file -> {"mtime_ns", "size", "hash", "imports"}
+        self._refreshed = set()  # files validated against the file system in this run
+        self._lock = threading.RLock()
+        self._load()
+
+    @staticmethod
+    def _key(file: str) -> str:
+        return os.path.normpath(os.path.abspath(file))
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("format") == GRAPH_FORMAT_VERSION:
+                self.nodes = data.get("nodes", {})
+        except Exception as e:
+            print(f"Could not load the dependency graph {self.path}: {e}")
+
+    def refresh(self):
+        """Validate every file against the file system again, e.g. before a new analysis in a long-lived process."""
+        with self._lock:
+            self._refreshed.clear()
+
+    def save(self):
+        """Persist the graph, dropping the files that no longer exist."""
+        if not self.path:
+            return
+        with self._lock:
+            nodes = {file: node for file, node in self.nodes.items() if os.path.exists(file)}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"format": GRAPH_FORMAT_VERSION, "nodes": nodes}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Could not save the dependency graph {self.path}: {e}")
+
+    def _refresh(self, file: str):
+        """Bring the node of a file up to date, reading the file only if it changed."""
+        key = self._key(file)
+        with self._lock:
+            if key in self._refreshed:
+                return self.nodes.get(key)
+            self._refreshed.add(key)
+
+            try:
+                stat = os.stat(key)
+            except OSError:
+                self.nodes.pop(key, None)
+                return None
+
+            node = self.nodes.get(key)
+            if node and node["mtime_ns"] == stat.st_mtime_ns and node["size"] == stat.st_size:
+                return node
+
+            with open(key, 'rb') as f:
+                content = f.read()
+            try:
+                imports = get_local_imports(key, ast.parse(content))
+            except (SyntaxError, ValueError):
+                imports = []
+
+            node = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "hash": hashlib.sha256(content).hexdigest(),
+                "imports": imports,
+            }
+            self.nodes[key] = node
+            return node
+
+    def dependencies(self, file: str):
+        """
+        Local files reached by a file through its imports, transitively.
+
+        Args:
+            file: Path to the Python file
+
+        Returns:
+            Sorted list of the absolute paths of the dependencies (the file excluded)
+        """
+        root = self._key(file)
+        seen = {root}
+        stack = [root]
+        while stack:
+            node = self._refresh(stack.pop())
+            if node is None:
+                continue
+            for imported in node["imports"]:
+                if imported not in seen:
+                    seen.add(imported)
+                    stack.append(imported)
+        seen.discard(root)
+        return sorted(seen)
+
+    def dependency_hash(self, file: str):
+        """
+        Hash of the content of a file and of every local module it imports, transitively.
+
+        Args:
+            file: Path to the Python file
+
+        Returns:
+            Hex digest that changes whenever the file or one of its local dependencies changes
+        """
+        root = self._key(file)
+        node = self._refresh(root)
+        if node is None:
+            raise FileNotFoundError(file)
+
+        digest = hashlib.sha256(node["hash"].encode("utf-8"))
+        for dependency in self.dependencies(root):
+            dependency_node = self._refresh(dependency)
+            if dependency_node is not None:
+                digest.update(f"\0{dependency}\0{dependency_node['hash']}".encode("utf-8"))
+        return digest.hexdigest()
+
+
+    def dependents(self, changed_files, files):
+        """
+        Files affected by a change: the changed files themselves and the files importing them, transitively.
+
+        Args:
+            changed_files: Paths of the files that changed
+            files: Paths of the candidate files (e.g. all the files of the analyzed folder)
+
+        Returns:
+            List of the candidate files affected by the change, in the order of `files`
+        """
+        changed = {self._key(file) for file in changed_files}
+        affected = []
+        for file in files:
+            key = self._key(file)
+            if key in changed or changed.intersection(self.dependencies(key)):
+                affected.append(file)
+        return affected
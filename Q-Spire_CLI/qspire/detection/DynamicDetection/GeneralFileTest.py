@@ -16,9 +16,15 @@ from smells.LC.LCDetector import LCDetector
 from smells.LPQ.LPQDetector import LPQDetector
 from smells.NC.NCDetector import NCDetector
 from smells.ROC.ROCDetector import ROCDetector
+from smells.utils.AnalysisSession import AnalysisSession
+from smells.utils.PatternIndex import detect_with_patterns, split_patterns
+from detection.ParallelDetection import iter_detect_in_parallel
+from detection.ResultCache import PATTERNS_SUFFIX
+from detection.DependencyGraph import resolve_local_module
 
 import importlib
 import traceback
+import functools
 import os
 import ast
 import threading
@@ -113,63 +119,10 @@ def contains_exec_comprehensive(file_path):
     
     def check_import_for_exec(module_name, base_dir):
         """Check if an imported module contains exec."""
-        if not module_name:
-            return False
-        
-        # Skip standard library and common packages that we know don't use exec
-        skip_modules = {
-            'qiskit', 'numpy', 'scipy', 'matplotlib', 'pandas', 'os', 'sys', 
-            'json', 'csv', 'math', 'random', 'datetime', 're', 'collections',
-            'itertools', 'functools', 'operator', 'pathlib', 'typing',
-            'gettext', 'locale', 'threading', 'queue', 'urllib', 'http',
-            'socket', 'ssl', 'email', 'html', 'xml', 'logging', 'unittest',
-            'importlib', 'pkgutil', 'warnings', 'weakref', 'gc', 'copy',
-            'pickle', 'struct', 'zlib', 'gzip', 'bz2', 'lzma', 'tarfile',
-            'zipfile', 'hashlib', 'hmac', 'secrets', 'uuid', 'time',
-            'calendar', 'argparse', 'shlex', 'glob', 'fnmatch', 'linecache',
-            'shutil', 'stat', 'filecmp', 'tempfile', 'contextlib', 'abc',
-            'numbers', 'cmath', 'decimal', 'fractions', 'statistics',
-            'array', 'bisect', 'heapq', 'copy', 'pprint', 'reprlib',
-            'enum', 'graphlib', 'string', 'textwrap', 'unicodedata',
-            'stringprep', 'readline', 'rlcompleter', 'io', 'codecs'
-        }
-        
-        root_module = module_name.split('.')[0]
-        if root_module in skip_modules:
-            return False
-        
-        # Skip if it's in the Python standard library path
-        try:
-            spec = importlib.util.find_spec(module_name)
-            if spec and spec.origin:
-                # Check if it's in the standard library
-                import sysconfig
-                stdlib_path = sysconfig.get_path('stdlib')
-                if spec.origin.startswith(stdlib_path):
-                    return False
-                
-                # Check if it's in site-packages (third-party)
-                if 'site-packages' in spec.origin:
-                    # Only check local modules in our project directory
-                    return False
-        except (ImportError, ModuleNotFoundError, ValueError):
-            pass
-        
-        # Only check local project files
-        try:
-            # First, try relative import (local project files)
-            relative_path = os.path.join(base_dir, module_name.replace('.', os.sep) + '.py')
-            if os.path.exists(relative_path):
-                return check_file_for_exec(relative_path)
-            
-            # Check for package-style imports in the same directory
-            package_path = os.path.join(base_dir, module_name.replace('.', os.sep), '__init__.py')
-            if os.path.exists(package_path):
-                return check_file_for_exec(package_path)
-                
-        except Exception:
-            pass
-        
+        # Only local project files are checked
+        local_path = resolve_local_module(module_name, base_dir)
+        if local_path:
+            return check_file_for_exec(local_path)
         return False
     
     return check_file_for_exec(file_path)
@@ -405,14 +358,18 @@ def detect_smells_from_file(file: str, max_exec_depth: int = MAX_EXEC_DEPTH):
                     thread_local.suppress_prints = False
 
             try:
-                threads = []
-                for detector in detector_objects:
-                    thread = threading.Thread(target=run_detection, args=(detector,))
-                    thread.start()
-                    threads.append(thread)
+                # Execute the file once: every detector reads the same recorded trace
+                with AnalysisSession(file) as session:
+                    session.run()
 
-                for thread in threads:
-                    thread.join()
+                    threads = []
+                    for detector in detector_objects:
+                        thread = threading.Thread(target=run_detection, args=(detector,))
+                        thread.start()
+                        threads.append(thread)
+
+                    for thread in threads:
+                        thread.join()
 
                 # Check if exec was detected during the analysis
                 if exec_detected.is_set():
@@ -475,22 +432,95 @@ def get_all_python_files(folder_path):
     return python_files
 
 
-def dynamic_file_detect(file: str, max_exec_depth: int = MAX_EXEC_DEPTH ):
+def dynamic_file_detect(file: str, max_exec_depth: int = MAX_EXEC_DEPTH, cache=None ):
     """
     Detect smells from a file with exec depth tracking.
     
     Args:
         file: Path to the Python file to analyze
         max_exec_depth: Maximum allowed depth of exec calls (default: MAX_EXEC_DEPTH)
+        cache: ResultCache storing the results across runs (optional)
     """
-    return detect_smells_from_file(file, max_exec_depth = max_exec_depth)
+    if cache is not None:
+        smells = cache.get(file, "dynamic")
+        if smells is not None:
+            return smells
+
+    smells = detect_smells_from_file(file, max_exec_depth = max_exec_depth)
+
+    if cache is not None:
+        cache.put(file, "dynamic", smells)
+    return smells
     
 
-def dynamic_folder_detect(folder: str, max_exec_depth: int = MAX_EXEC_DEPTH):
+def iter_dynamic_folder_detect(folder: str, max_exec_depth: int = MAX_EXEC_DEPTH, jobs: int = 1, cache=None,
+                               pattern_index=None):
+    """
+    Detect smells in all the Python files of a folder, yielding the results file by file.
+
+    Only the files being analyzed are held in memory, so that the results of large folders
+    can be written out as soon as every file completes.
+
+    Args:
+        folder: Path to the folder to analyze
+        max_exec_depth: Maximum allowed depth of exec calls (default: MAX_EXEC_DEPTH)
+        jobs: Number of worker processes analyzing files in parallel (1 analyzes them serially)
+        cache: ResultCache storing the results across runs (optional)
+        pattern_index: PatternIndex receiving the circuit patterns of every file (optional)
+
+    Yields:
+        Tuples of (file, smells): cached files first, then the analyzed ones in completion order
+    """
+    pyFiles = get_all_python_files(folder)
+    pending = pyFiles
+    if cache is not None:
+        pending = []
+        yield from cache.iter_lookup(pyFiles, "dynamic", pending, pattern_index)
+
+    detect_function = functools.partial(detect_smells_from_file, max_exec_depth=max_exec_depth)
+    if pattern_index is not None:
+        detect_function = functools.partial(detect_with_patterns, detect_function)
+
+    if jobs > 1:
+        results = iter_detect_in_parallel(detect_function, pending, jobs)
+    else:
+        results = ((file, detect_function(file)) for file in pending)
+
+    for file, smells in results:
+        if pattern_index is not None:
+            smells, patterns = split_patterns(smells)
+            if patterns is not None:
+                pattern_index.add_file(file, patterns)
+                if cache is not None: cache.put(file, "dynamic" + PATTERNS_SUFFIX, patterns)
+        if cache is not None: cache.put(file, "dynamic", smells)
+        yield file, smells
+
+
+def dynamic_folder_detect(folder: str, max_exec_depth: int = MAX_EXEC_DEPTH, jobs: int = 1, cache=None,
+                          pattern_index=None):
+    """
+    Detect smells in all the Python files of a folder.
+
+    With more than one job every file is executed in a worker process, each with its
+    own builtins, so the exec/print hooks and whatever the analyzed code patches
+    do not interfere across files.
+
+    Args:
+        folder: Path to the folder to analyze
+        max_exec_depth: Maximum allowed depth of exec calls (default: MAX_EXEC_DEPTH)
+        jobs: Number of worker processes analyzing files in parallel (1 analyzes them serially)
+        cache: ResultCache storing the results across runs (optional)
+        pattern_index: PatternIndex receiving the circuit patterns of every file (optional)
+
+    Returns:
+        Dictionary mapping each file to its smells
+    """
     smells={}
     try:
-        pyFiles = get_all_python_files(folder)
-        for file in pyFiles:
-            smells[file]=detect_smells_from_file(file)
+        for file, file_smells in iter_dynamic_folder_detect(folder, max_exec_depth, jobs, cache, pattern_index):
+            smells[file]=file_smells
+
+        # Keep the files in folder order, whether they came from the cache or not
+        smells = {file: smells[file] for file in get_all_python_files(folder) if file in smells}
     except: pass
-    return smells
\ No newline at end of file
+    return smells
@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+"""
+Process-pool execution engine for folder analysis.
+
+Every file is analyzed inside a worker process of its own (max_tasks_per_child=1), so the
+builtins.exec / builtins.print hooks installed by the detection pipelines (and anything the
+analyzed code patches) stay local to that file and never leak into the files analyzed next.
+The workers are forked from a fork server that imported the detection modules once, so a fresh
+worker per file still starts warm; where there is no fork server (Windows) they are spawned.
+"""
+
+
+# Files submitted to the pool ahead of the completed ones, per worker process
+PENDING_FILES_PER_WORKER = 2
+
+
+def default_jobs():
+    """Number of worker processes to use when the user asks for all the cores."""
+    return os.cpu_count() or 1
+
+
+def create_executor(workers: int, preload_modules=()):
+    """
+    Process pool analyzing every file in a fresh worker process.
+
+    Args:
+        workers: Number of worker processes
+        preload_modules: Modules imported once by the fork server the workers are forked from
+
+    Returns:
+        ProcessPoolExecutor whose workers exit after one file
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # Only taken into account when the fork server of this process starts
+        context.set_forkserver_preload(list(preload_modules))
+    else:
+        context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context, max_tasks_per_child=1)
+
+
+def kill_workers(executor):
+    """
+    Kill the worker processes of a pool right away, abandoning the files they analyze.
+
+    The pool is shut down: the futures in flight fail with BrokenProcessPool, and no file can be
+    submitted anymore (ProcessPoolExecutor.kill_workers, where available).
+
+    Args:
+        executor: ProcessPoolExecutor created by create_executor
+    """
+    if hasattr(executor, "kill_workers"):
+        executor.kill_workers()
+        return
+    # Taken before the shutdown, which forgets them: a file submitted before it already has its worker
+    processes = executor._processes or {}
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in list(processes.values()):
+        try:
+            process.kill()
+        except (OSError, ValueError):
+            pass
+
+
+def _function_module(function):
+    """Module defining a function, looking through functools.partial."""
+    while hasattr(function, "func"):
+        function = function.func
+    return getattr(function, "__module__", None)
+
+
+def _detect_in_worker(detect_function, file):
+    """Run a detection function on a file inside a worker process."""
+    try:
+        result = detect_function(file)
+        return result if result is not None else []
+    except (Exception, SystemExit) as e:
+        # sys.exit() in the analyzed code or in the auto-fix must not kill the worker
+        print(f"Error analyzing {file}: {e}")
+        return []
+
+
+def iter_detect_in_parallel(detect_function, files, jobs):
+    """
+    Analyze files in worker processes and yield the results as soon as they complete.
+
+    Args:
+        detect_function: Module-level function taking a file path and returning a list of smells
+        files: Paths of the Python files to analyze
+        jobs: Number of worker processes
+
+    Yields:
+        Tuples of (file, smells), in completion order
+    """
+    files = list(files)
+    if not files:
+        return
+
+    workers = max(1, min(jobs, len(files)))
+    with create_executor(workers, [_function_module(detect_function) or __name__]) as executor:
+        yield from iter_detect_with_executor(executor, detect_function, files)
+
+
+def iter_detect_with_executor(executor, detect_function, files, max_pending: int = None):
+    """
+    Analyze files on an existing process pool and yield the results as soon as they complete.
+
+    Long-lived callers (e.g. the analysis server) keep the pool (see create_executor) across runs.
+    At most max_pending files are submitted ahead of the results consumed, and a result is only
+    referenced until it is yielded, so memory is bounded by the files in flight, not by the folder.
+
+    Args:
+        executor: ProcessPoolExecutor running the analyses (see create_executor)
+        detect_function: Module-level function taking a file path and returning a list of smells
+        files: Paths of the Python files to analyze
+        max_pending: Most files submitted at the same time (default: PENDING_FILES_PER_WORKER per worker)
+
+    Yields:
+        Tuples of (file, smells), in completion order
+    """
+    if max_pending is None:
+        max_pending = PENDING_FILES_PER_WORKER * getattr(executor, "_max_workers", default_jobs())
+    max_pending = max(1, max_pending)
+
+    files = iter(files)
+    futures = {}  # future -> file, for the files in flight only
+    while True:
+        for file in files:
+            futures[executor.submit(_detect_in_worker, detect_function, file)] = file
+            if len(futures) >= max_pending:
+                break
+        if not futures:
+            return
+
+        completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+        while completed:
+            future = completed.pop()
+            file = futures.pop(future)
+            try:
+                smells = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. the analyzed code crashed the interpreter)
+                print(f"Error analyzing {file}: {e}")
+                smells = []
+            future = None  # Only the consumer keeps the smells once they are yielded
+            yield file, smells
+
+
+def detect_in_parallel(detect_function, files, jobs):
+    """
+    Analyze files in worker processes.
+
+    Args:
+        detect_function: Module-level function taking a file path and returning a list of smells
+        files: Paths of the Python files to analyze
+        jobs: Number of worker processes
+
+    Returns:
+        Dictionary mapping each file to its smells, in the order of the given files
+    """
+    files = list(files)
+    completed = dict(iter_detect_in_parallel(detect_function, files, jobs))
+    return {file: completed.get(file, []) for file in files}
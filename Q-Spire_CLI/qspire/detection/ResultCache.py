@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+from smells.utils.config_loader import get_config, get_operation_extraction
+from detection.DependencyGraph import DependencyGraph
+
+"""
+Persistent content-addressed cache of analysis results.
+
+Each entry stores the serialized QuantumSmell list of one analyzed file. The key hashes:
+- the content of the analyzed file and of the local modules it imports, transitively
+  (they are executed with it), as recorded by the persisted DependencyGraph
+- the analysis method (static or dynamic)
+- the detector options of config.json, and its operation extraction (regex or runtime)
+- the source code of the detectors and of the detection pipelines (their "version")
+- the installed Qiskit version
+
+so any change in one of them makes the stored results unreachable. Entries are evicted in
+least recently used order (a hit refreshes the entry mtime) when the cache exceeds its size.
+"""
+
+DEFAULT_CACHE_DIRECTORY = ".qspire_cache"
+DEFAULT_MAX_CACHE_SIZE = 256 * 1024 * 1024  # bytes
+DEPENDENCY_GRAPH_FILE = "dependency_graph.json"
+ENTRY_EXTENSION = ".pkl"
+# Suffix of the method of the entries holding the circuit patterns of a file (see PatternIndex)
+PATTERNS_SUFFIX = ":patterns"
+
+# Bump when the layout of the cache entries changes
+CACHE_FORMAT_VERSION = 1
+
+QSPIRE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Folders whose source code determines the analysis results
+ANALYSIS_SOURCE_FOLDERS = ["smells", "detection"]
+
+_analysis_sources = None
+_analysis_sources_lock = threading.Lock()
+
+
+def _qiskit_version():
+    try:
+        from importlib.metadata import version
+        return version("qiskit")
+    except Exception:
+        return "unknown"
+
+
+def _detector_options(detector_overrides=None):
+    """Detector options of every smell in config.json (names, descriptions and API keys excluded)."""
+    smells = get_config().get("Smells", {})
+    options = {smell: smells[smell].get("Detector", {}) for smell in sorted(smells)}
+    if detector_overrides:
+        options = {"config": options, "overrides": detector_overrides}
+    return options
+
+
+def _analysis_sources_digest():
+    """Digest of the detectors and detection pipelines source code."""
+    digest = hashlib.sha256()
+    for folder in ANALYSIS_SOURCE_FOLDERS:
+        for root, dirs, files in os.walk(os.path.join(QSPIRE_ROOT, folder)):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for file in sorted(files):
+                if not file.endswith(".py"):
+                    continue
+                path = os.path.join(root, file)
+                digest.update(os.path.relpath(path, QSPIRE_ROOT).replace(os.sep, "/").encode("utf-8"))
+                with open(path, "rb") as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def analysis_fingerprint(detector_overrides=None):
+    """
+    Fingerprint of everything, apart from the analyzed file, that affects the results.
+
+    Args:
+        detector_overrides: Detector options overriding config.json (optional)
+
+    Returns:
+        Hex digest of cache format, detector options, operation extraction, detector sources and Qiskit version
+    """
+    global _analysis_sources
+    with _analysis_sources_lock:
+        # The sources and the installed packages do not change while the process runs
+        if _analysis_sources is None:
+            _analysis_sources = (_analysis_sources_digest(), _qiskit_version())
+    detectors, qiskit_version = _analysis_sources
+
+    payload = json.dumps({
+        "format": CACHE_FORMAT_VERSION,
+        "detector_options": _detector_options(detector_overrides),
+        # The operations the detectors read depend on how they are extracted
+        "operation_extraction": get_operation_extraction(),
+        "detectors": detectors,
+        "qiskit": qiskit_version,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_content_hash(file):
+    with open(file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIRECTORY, max_size: int = DEFAULT_MAX_CACHE_SIZE,
+                 track_dependencies: bool = True, detector_overrides: dict = None, dependency_graph=None):
+        """
+        Args:
+            directory: Folder of the cache
+            max_size: Maximum size of the cached results, in bytes
+            track_dependencies: Invalidate the results of a file when a local module it imports changes
+            detector_overrides: Detector options overriding config.json in the analyses (optional)
+            dependency_graph: DependencyGraph shared with other caches of the same directory (optional)
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.fingerprint = analysis_fingerprint(detector_overrides)
+        self.dependency_graph = dependency_graph
+        if track_dependencies and dependency_graph is None:
+            self.dependency_graph = DependencyGraph(os.path.join(self.directory, DEPENDENCY_GRAPH_FILE))
+
+    def key(self, file: str, method: str, content_hash: str = None):
+        """
+        Cache key of a file analyzed with a method.
+
+        Args:
+            file: Path to the analyzed Python file
+            method: Analysis method ("static" or "dynamic")
+            content_hash: Precomputed hash identifying the file content (optional)
+
+        Returns:
+            Hex digest identifying the results
+        """
+        if content_hash is None:
+            if self.dependency_graph is not None:
+                content_hash = self.dependency_graph.dependency_hash(file)
+            else:
+                content_hash = file_content_hash(file)
+        payload = f"{method}\0{content_hash}\0{self.fingerprint}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str):
+        return os.path.join(self.directory, key[:2], f"{key}{ENTRY_EXTENSION}")
+
+    def get(self, file: str, method: str, content_hash: str = None):
+        """
+        Return the cached smells of a file, or None when they are not cached.
+        """
+        try:
+            path = self._entry_path(self.key(file, method, content_hash))
+            with open(path, "rb") as f:
+                smells = pickle.load(f)
+            # Refresh the entry for the LRU eviction
+            os.utime(path, None)
+        except Exception:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return smells
+
+    def put(self, file: str, method: str, smells, content_hash: str = None):
+        """
+        Store the smells of a file. Results that cannot be serialized are not cached.
+        """
+        try:
+            path = self._entry_path(self.key(file, method, content_hash))
+            data = pickle.dumps(list(smells), protocol=pickle.HIGHEST_PROTOCOL)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so that concurrent runs never read a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Could not cache the results of {file}: {e}")
+
+    def lookup(self, files, method: str):
+        """
+        Split files into cached results and files still to analyze.
+
+        Args:
+            files: Paths of the Python files to analyze
+            method: Analysis method ("static" or "dynamic")
+
+        Returns:
+            Tuple of (dictionary mapping cached files to their smells, list of files to analyze)
+        """
+        pending = []
+        cached = dict(self.iter_lookup(files, method, pending))
+        return cached, pending
+
+    def iter_lookup(self, files, method: str, pending: list, pattern_index=None):
+        """
+        Yield the cached results one file at a time, without holding them all in memory.
+
+        Args:
+            files: Paths of the Python files to analyze
+            method: Analysis method ("static" or "dynamic")
+            pending: List receiving the files still to analyze
+            pattern_index: PatternIndex receiving the cached circuit patterns of the files (optional);
+                the files whose patterns are not cached are analyzed again
+
+        Yields:
+            Tuples of (file, smells) of the cached files
+        """
+        reused = 0
+        for file in files:
+            smells = self.get(file, method)
+            if smells is not None and pattern_index is not None:
+                patterns = self.get(file, method + PATTERNS_SUFFIX)
+                if patterns is None:
+                    smells = None
+                else:
+                    pattern_index.add_file(file, patterns)
+            if smells is None:
+                pending.append(file)
+            else:
+                reused += 1
+                yield file, smells
+        if reused:
+            print(f"Reusing the cached results of {reused} unchanged files, analyzing {len(pending)} files")
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its maximum size."""
+        entries = []
+        total_size = 0
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                if not file.endswith(ENTRY_EXTENSION):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        if total_size <= self.max_size:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                total_size -= size
+            except OSError:
+                pass
+
+    def flush(self):
+        """Persist the dependency graph and evict the entries exceeding the cache size."""
+        if self.dependency_graph is not None:
+            self.dependency_graph.save()
+        self.evict()
+
+    def clear(self):
+        """Remove every entry of the cache."""
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -3,6 +3,9 @@ import difflib
 from typing import List, Dict, Tuple, Optional, Any
 import re
 
+from smells.utils.ParsedModule import ParsedModule
+from smells.utils.SourceCleaner import clean_source
+
 def map_lines_of_code(original_file: str, original_function: str, generated_file: str, similarity_threshold: float = 0.6) -> Dict[str, Any]:
     """
     Map lines of code from an original function to the generated main function.
@@ -17,16 +20,11 @@ def map_lines_of_code(original_file: str, original_function: str, generated_file
         Dictionary containing the best mapping found with metadata
     """
     try:
-        # Read both files
-        with open(original_file, 'r', encoding='utf-8') as f:
-            original_code = f.read()
-        
-        with open(generated_file, 'r', encoding='utf-8') as f:
-            generated_code = f.read()
-        
-        # Parse AST for both files
-        original_ast = ast.parse(original_code)
-        generated_ast = ast.parse(generated_code)
+        # Read and parse both files (shared with the other passes over them)
+        original = ParsedModule.for_file(original_file)
+        generated = ParsedModule.for_file(generated_file)
+        original_code, original_ast = original.source, original.tree
+        generated_code, generated_ast = generated.source, generated.tree
         
         # Find all functions with the target name in original file
         original_functions = _find_functions_by_name(original_ast, original_function, original_code)
@@ -328,86 +326,9 @@ def _get_all_comment_and_docstring_lines(source_code: str) -> set:
     """
     Get all line numbers that contain comments or docstrings using tokenization.
     This properly handles multiline comments, docstrings, and inline comments.
+    The lines come from the shared SourceCleaner pass over the file.
     """
-    import tokenize
-    import io
-    
-    comment_lines = set()
-    
-    try:
-        # Use tokenize to properly identify all comments and strings
-        tokens = tokenize.generate_tokens(io.StringIO(source_code).readline)
-        
-        for token in tokens:
-            if token.type == tokenize.COMMENT:
-                # Add all lines covered by this comment
-                start_line, end_line = token.start[0], token.end[0]
-                for line_num in range(start_line, end_line + 1):
-                    comment_lines.add(line_num)
-            
-            elif token.type == tokenize.STRING:
-                # Check if this string is likely a docstring
-                if _is_likely_docstring(token, source_code):
-                    # Add all lines covered by this docstring
-                    start_line, end_line = token.start[0], token.end[0]
-                    for line_num in range(start_line, end_line + 1):
-                        comment_lines.add(line_num)
-    
-    except tokenize.TokenError:
-        # Fallback to simple line-by-line analysis if tokenization fails
-        lines = source_code.split('\n')
-        in_multiline_string = False
-        multiline_delimiter = None
-        
-        for i, line in enumerate(lines, 1):
-            stripped = line.strip()
-            
-            # Handle multiline strings
-            if in_multiline_string:
-                comment_lines.add(i)
-                if multiline_delimiter in line:
-                    in_multiline_string = False
-                    multiline_delimiter = None
-            elif stripped.startswith('"""') or stripped.startswith("'''"):
-                comment_lines.add(i)
-                delimiter = '"""' if stripped.startswith('"""') else "'''"
-                # Check if it's a single-line docstring
-                if stripped.count(delimiter) < 2:
-                    in_multiline_string = True
-                    multiline_delimiter = delimiter
-            elif stripped.startswith('#'):
-                comment_lines.add(i)
-    
-    return comment_lines
-
-
-def _is_likely_docstring(token, source_code: str) -> bool:
-    """
-    Determine if a string token is likely a docstring.
-    This is a heuristic based on position and content.
-    """
-    # Get the line content
-    lines = source_code.split('\n')
-    token_line = token.start[0]
-    
-    if token_line <= len(lines):
-        line_content = lines[token_line - 1].strip()
-        
-        # If the string starts at the beginning of a line (after whitespace)
-        # and uses triple quotes, it's likely a docstring
-        if (line_content.startswith('"""') or line_content.startswith("'''") or
-            line_content.startswith('r"""') or line_content.startswith("r'''")):
-            return True
-        
-        # Also check if it's the first statement after a function/class definition
-        if token_line > 1:
-            prev_line = lines[token_line - 2].strip()
-            if (prev_line.endswith(':') and 
-                (prev_line.startswith('def ') or prev_line.startswith('class ') or
-                 'def ' in prev_line or 'class ' in prev_line)):
-                return True
-    
-    return False
+    return set(clean_source(source_code).comment_lines)
 
 
 def _is_comment_only_line(line: str) -> bool:
@@ -1,5 +1,7 @@
 from typing import Any, Optional
 
+from detection.StaticDetection.Mapping import _get_all_comment_and_docstring_lines
+
 
 def map_lines_simple(original_file: str, generated_file: str, similarity_threshold: float = 0.6) -> dict[str, Any]:
     """
@@ -122,88 +124,10 @@ def _find_main_block_start(lines: list) -> Optional[int]:
 
 def _get_comment_lines(source_code: str) -> set:
     """
-    Get all line numbers that contain comments or docstrings using tokenization.
-    This properly handles multiline comments, docstrings, and inline comments.
-    """
-    import tokenize
-    import io
-    
-    comment_lines = set()
-    
-    try:
-        # Use tokenize to properly identify all comments and strings
-        tokens = tokenize.generate_tokens(io.StringIO(source_code).readline)
-        
-        for token in tokens:
-            if token.type == tokenize.COMMENT:
-                # Add all lines covered by this comment
-                start_line, end_line = token.start[0], token.end[0]
-                for line_num in range(start_line, end_line + 1):
-                    comment_lines.add(line_num)
-            
-            elif token.type == tokenize.STRING:
-                # Check if this string is likely a docstring
-                if _is_likely_docstring(token, source_code):
-                    # Add all lines covered by this docstring
-                    start_line, end_line = token.start[0], token.end[0]
-                    for line_num in range(start_line, end_line + 1):
-                        comment_lines.add(line_num)
-    
-    except tokenize.TokenError:
-        # Fallback to simple line-by-line analysis if tokenization fails
-        lines = source_code.split('\n')
-        in_multiline_string = False
-        multiline_delimiter = None
-        
-        for i, line in enumerate(lines, 1):
-            stripped = line.strip()
-            
-            # Handle multiline strings
-            if in_multiline_string:
-                comment_lines.add(i)
-                if multiline_delimiter in line:
-                    in_multiline_string = False
-                    multiline_delimiter = None
-            elif stripped.startswith('"""') or stripped.startswith("'''"):
-                comment_lines.add(i)
-                delimiter = '"""' if stripped.startswith('"""') else "'''"
-                # Check if it's a single-line docstring
-                if stripped.count(delimiter) < 2:
-                    in_multiline_string = True
-                    multiline_delimiter = delimiter
-            elif stripped.startswith('#'):
-                comment_lines.add(i)
-    
-    return comment_lines
-
-
-def _is_likely_docstring(token, source_code: str) -> bool:
-    """
-    Determine if a string token is likely a docstring.
-    This is a heuristic based on position and content.
+    Get all line numbers that contain comments or docstrings (same rules as the Mapping helpers,
+    from the shared SourceCleaner pass over the file).
     """
-    # Get the line content
-    lines = source_code.split('\n')
-    token_line = token.start[0]
-    
-    if token_line <= len(lines):
-        line_content = lines[token_line - 1].strip()
-        
-        # If the string starts at the beginning of a line (after whitespace)
-        # and uses triple quotes, it's likely a docstring
-        if (line_content.startswith('"""') or line_content.startswith("'''") or
-            line_content.startswith('r"""') or line_content.startswith("r'''")):
-            return True
-        
-        # Also check if it's the first statement after a function/class definition
-        if token_line > 1:
-            prev_line = lines[token_line - 2].strip()
-            if (prev_line.endswith(':') and 
-                (prev_line.startswith('def ') or prev_line.startswith('class ') or
-                 'def ' in prev_line or 'class ' in prev_line)):
-                return True
-    
-    return False
+    return _get_all_comment_and_docstring_lines(source_code)
 
 
 def _calculate_line_similarity(line1: str, line2: str) -> float:
@@ -7,6 +7,8 @@ from typing import List, Dict, Any, Optional, Tuple, Set
 from dataclasses import dataclass
 import re
 
+from smells.utils.ParsedModule import ParsedModule
+
 
 @dataclass
 class CircuitInfo:
@@ -40,6 +42,23 @@ class FunctionExecutionGenerator:
         self.module_functions: Dict[str, str] = {}  # Store module-level functions
         self.class_constructors: Dict[str, List[str]] = {}  # Store constructor signatures
     
+    def _parse(self, code: str, source_name: str = None) -> ast.AST:
+        """
+        AST of the code, shared with the other passes when it is the content of the analyzed file.
+        
+        Args:
+            code: Python code to parse
+            source_name: Path of the file the code was read from (optional)
+            
+        Returns:
+            The AST of the code; it must not be modified
+        """
+        if source_name and os.path.isfile(source_name):
+            parsed = ParsedModule.for_file(source_name)
+            if parsed.source == code:
+                return parsed.tree
+        return ast.parse(code)
+    
     def analyze_and_generate_executable(self, file_path: str, function_name: str) -> str:
         """
         Analyze a file and generate executable code for a specific function.
@@ -51,8 +70,7 @@ class FunctionExecutionGenerator:
         Returns:
             Executable Python code as string
         """
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
+        content = ParsedModule.for_file(file_path).source
         
         return self.generate_executable_from_code(content, function_name, file_path)
     
@@ -67,14 +85,13 @@ class FunctionExecutionGenerator:
         Returns:
             Dictionary mapping function names to their executable code
         """
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
+        content = ParsedModule.for_file(file_path).source
         
         # Find all functions with QuantumCircuits
         functions_with_circuits = self.find_all_functions_with_circuits(content, file_path)
         
         # Filter out functions with empty bodies (like @property getters)
-        functions_with_body = self._filter_functions_with_body(content, functions_with_circuits)
+        functions_with_body = self._filter_functions_with_body(content, functions_with_circuits, file_path)
         
         # Generate executable code for each function with a body
         executables = {}
@@ -95,21 +112,20 @@ class FunctionExecutionGenerator:
         return executables
 
 
-    def _filter_functions_with_body(self, content: str, function_names: List[str]) -> List[str]:
+    def _filter_functions_with_body(self, content: str, function_names: List[str], file_path: str = None) -> List[str]:
         """
         Filter function names to only include those that have actual implementation (non-empty body).
         
         Args:
             content: The source code content
             function_names: List of function names to filter
+            file_path: Path of the file the content was read from (optional)
             
         Returns:
             List of function names that have non-empty bodies
         """
-        import ast
-        
         try:
-            tree = ast.parse(content)
+            tree = self._parse(content, file_path)
             functions_with_body = []
             
             for func_name in function_names:
@@ -294,7 +310,7 @@ class FunctionExecutionGenerator:
         """
 
         try:
-            tree = ast.parse(code)
+            tree = self._parse(code, source_name)
         except SyntaxError as e:
             print(f"Syntax error in {source_name}: {e}")
             return []
@@ -340,7 +356,7 @@ class FunctionExecutionGenerator:
             Executable Python code as string
         """
         try:
-            tree = ast.parse(code)
+            tree = self._parse(code, source_name)
         except SyntaxError as e:
             return f"# Syntax error in {source_name}: {e}"
         
@@ -874,7 +890,8 @@ except ImportError:
         
         # Add path setup
         if source_name != "<string>" and os.path.isfile(source_name):
-            source_dir = os.path.dirname(os.path.abspath(source_name))
+            # The local modules resolve from the folder of the document a buffer copy stands in for
+            source_dir = os.path.dirname(os.path.abspath(ParsedModule.original_path(source_name)))
             parent_dir = os.path.dirname(source_dir)
             grandparent_dir = os.path.dirname(parent_dir)
             
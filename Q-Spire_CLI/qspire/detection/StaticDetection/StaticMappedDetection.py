@@ -5,6 +5,7 @@ import shutil
 import threading
 import os
 from detection.StaticDetection.StaticCircuit import FunctionExecutionGenerator
+from detection.WarmWorkerPool import run_python_file
 #from test.GeneralFolderTest import save_output
 
 
@@ -4614,7 +4615,8 @@ def auto_fix_with_mapping(target_path: Path, debug: bool = False) -> Tuple[bool,
         
         # If no syntax errors, try to execute the file
         if debug: print("🏃 Executing file to check for runtime errors...")
-        proc = subprocess.run([sys.executable, str(target_path)], capture_output=True, text=True)
+        # Forked from a process with qiskit already imported, instead of a new interpreter
+        proc = run_python_file(target_path)
 
         if proc.returncode == 0:
             print(f"Fixing completed on {target_path.name}: runs without errors after {iteration} iterations")
@@ -4860,6 +4862,8 @@ from smells.LC.LCDetector import LCDetector
 from smells.LPQ.LPQDetector import LPQDetector
 from smells.NC.NCDetector import NCDetector
 from smells.ROC.ROCDetector import ROCDetector
+from smells.utils.AnalysisSession import AnalysisSession
+from smells.utils.ParsedModule import ParsedModule
 
 import importlib
 import traceback
@@ -5253,14 +5257,18 @@ def detect_smells_from_file(file: str, max_exec_depth: int = MAX_EXEC_DEPTH):
                     thread_local.suppress_prints = False
 
             try:
-                threads = []
-                for detector in detector_objects:
-                    thread = threading.Thread(target=run_detection, args=(detector,))
-                    thread.start()
-                    threads.append(thread)
+                # Execute the file once: every detector reads the same recorded trace
+                with AnalysisSession(file) as session:
+                    session.run()
 
-                for thread in threads:
-                    thread.join()
+                    threads = []
+                    for detector in detector_objects:
+                        thread = threading.Thread(target=run_detection, args=(detector,))
+                        thread.start()
+                        threads.append(thread)
+
+                    for thread in threads:
+                        thread.join()
 
                 # Check if exec was detected during the analysis
                 if exec_detected.is_set():
@@ -5756,7 +5764,14 @@ def wrapper(target_fn, output_dict, key, *args, **kwargs):
     output_dict[key] = target_fn(*args, **kwargs)
 
 
-def autofix_map_detect( file_path:str ):
+def autofix_map_detect( file_path:str, output_directory:str = "generated_executables" ):
+
+    # The original file is read and parsed once for the generator, the mappings and the CG/LPQ detectors
+    with ParsedModule.retained(os.path.abspath(file_path)):
+        return _autofix_map_detect(file_path, output_directory)
+
+
+def _autofix_map_detect( file_path:str, output_directory:str ):
 
     global results
 
@@ -5768,8 +5783,8 @@ def autofix_map_detect( file_path:str ):
 
     generator = FunctionExecutionGenerator()
 
-
-    output_directory = "generated_executables"
+    # Each worker process of a parallel folder run passes its own directory,
+    # since the executables folder is cleared at the end of the analysis
     executables = generator.analyze_and_generate_all_executables(file, output_directory)
 
     #return 
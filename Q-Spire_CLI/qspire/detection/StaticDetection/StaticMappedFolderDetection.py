@@ -1,14 +1,29 @@
 import csv
+import functools
 from pathlib import Path
 import shutil
 import sys
+import tempfile
 import threading
-from detection.StaticDetection.StaticCircuit import FunctionExecutionGenerator
-from detection.StaticDetection.AutoFix import auto_fix
 import os
-from detection.DynamicDetection.GeneralFileTest import detect_smells_from_file
 
 from detection.StaticDetection.StaticMappedDetection import autofix_map_detect
+from detection.ParallelDetection import iter_detect_in_parallel
+from detection.ResultCache import PATTERNS_SUFFIX
+from smells.utils.PatternIndex import detect_with_patterns, split_patterns
+
+# Prefix of the temporary folder holding the executables of a run (see create_run_output_directory)
+RUN_OUTPUT_PREFIX = "qspire_executables_"
+
+
+def create_run_output_directory():
+    """
+    Private folder of the executables generated by one run, removed by the run when it ends.
+
+    Every run (CLI, server job, watch mode) gets its own, so that a run ending never removes
+    the executables of another run still working.
+    """
+    return tempfile.mkdtemp(prefix=RUN_OUTPUT_PREFIX)
 
 
 def get_all_python_files(folder_path):
@@ -70,19 +85,93 @@ def detect_smells_from_folder(folder):
 
 
 
-def static_file_detect(file:str):
+def static_file_detect(file:str, cache=None):
+    if cache is not None:
+        smells = cache.get(file, "static")
+        if smells is not None:
+            return smells
+
     smells=autofix_map_detect(file)
-    return smells
 
-def static_folder_detect(folder:str):
-    smells={}
+    if cache is not None:
+        cache.put(file, "static", smells)
+    return smells
 
+def static_worker_detect(file:str, output_root:str):
+    """
+    Static detection of a file inside a worker process of a parallel folder run.
+
+    Every worker generates its executables in its own folder inside the folder of the run
+    (see create_run_output_directory), so that clearing it at the end of the analysis does not
+    remove the executables of the other workers.
+    """
+    output_directory = os.path.join(output_root, f"worker_{os.getpid()}")
+    return autofix_map_detect(file, output_directory)
+
+def iter_static_folder_detect(folder:str, jobs:int = 1, cache=None, pattern_index=None):
+    """
+    Detect smells in all the Python files of a folder, yielding the results file by file.
+
+    Only the files being analyzed are held in memory, so that the results of large folders
+    can be written out as soon as every file completes.
+
+    Args:
+        folder: Path to the folder to analyze
+        jobs: Number of worker processes analyzing files in parallel (1 analyzes them serially)
+        cache: ResultCache storing the results across runs (optional)
+        pattern_index: PatternIndex receiving the circuit patterns of every file (optional)
+
+    Yields:
+        Tuples of (file, smells): cached files first, then the analyzed ones in completion order
+    """
     pyFiles = get_all_python_files(folder)
-    for file in pyFiles:
-        
-        smells[file]=autofix_map_detect(file)
+    pending = pyFiles
+    if cache is not None:
+        pending = []
+        yield from cache.iter_lookup(pyFiles, "static", pending, pattern_index)
+
+    output_root = create_run_output_directory()
+    if jobs > 1:
+        detect_function = functools.partial(static_worker_detect, output_root=output_root)
+    else:
+        detect_function = functools.partial(autofix_map_detect, output_directory=output_root)
+    if pattern_index is not None:
+        detect_function = functools.partial(detect_with_patterns, detect_function)
 
-    return smells
+    try:
+        if jobs > 1:
+            results = iter_detect_in_parallel(detect_function, pending, jobs)
+        else:
+            results = ((file, detect_function(file)) for file in pending)
+
+        for file, smells in results:
+            if pattern_index is not None:
+                smells, patterns = split_patterns(smells)
+                if patterns is not None:
+                    pattern_index.add_file(file, patterns)
+                    if cache is not None: cache.put(file, "static" + PATTERNS_SUFFIX, patterns)
+            if cache is not None: cache.put(file, "static", smells)
+            yield file, smells
+    finally:
+        shutil.rmtree(output_root, ignore_errors=True)
+
+def static_folder_detect(folder:str, jobs:int = 1, cache=None, pattern_index=None):
+    """
+    Detect smells in all the Python files of a folder.
+
+    Args:
+        folder: Path to the folder to analyze
+        jobs: Number of worker processes analyzing files in parallel (1 analyzes them serially)
+        cache: ResultCache storing the results across runs (optional)
+        pattern_index: PatternIndex receiving the circuit patterns of every file (optional)
+
+    Returns:
+        Dictionary mapping each file to its smells
+    """
+    smells=dict(iter_static_folder_detect(folder, jobs, cache, pattern_index))
+
+    # Keep the files in folder order, whether they came from the cache or not
+    return {file: smells[file] for file in get_all_python_files(folder) if file in smells}
 
 """
 if __name__ == "__main__":
@@ -0,0 +1,437 @@
+import atexit
+import importlib
+import itertools
+import json
+import os
+import runpy
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+from contextlib import contextmanager
+
+"""
+Pre-forked, warm execution of Python scripts.
+
+The auto-fix loop of the static detection runs every generated executable, possibly many
+times, and each run used to start a new interpreter that imports qiskit, qiskit_aer and
+qiskit_ibm_runtime again: seconds per run. Here a fork server imports those modules once;
+every script then runs in a child forked from it, so it starts with the modules imported.
+
+The fork server is a separate interpreter (this file run as a script), so nothing of the
+calling process leaks into the scripts: neither its patched builtins nor its __main__.
+Where os.fork is not available (Windows) scripts run in a new interpreter as before.
+
+Runs started inside a CancellationScope (see cancellable) are killed when the scope is
+cancelled, and the runs started afterwards raise Cancelled right away. Other work can be
+attached to a scope too (see CancellationScope.on_cancel): the language server kills the
+worker analyzing a buffer as soon as a newer version of it arrives.
+"""
+
+# Heavy third-party modules imported by the analyzed code
+PRELOAD_MODULES = ["qiskit", "qiskit_aer", "qiskit_ibm_runtime"]
+
+# Seconds to wait for the fork server to report the exit of a child killed at its timeout
+KILL_TIMEOUT = 5
+
+
+class Cancelled(Exception):
+    """Raised by run_python_file for the runs of a cancelled CancellationScope."""
+
+
+class CancellationScope:
+    """Set of script runs killed together when the scope is cancelled."""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._kills = {}  # run key -> function killing the run
+        self._keys = itertools.count()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """Kill the runs in progress; the next runs of the scope raise Cancelled."""
+        with self._lock:
+            self.cancelled.set()
+            kills = list(self._kills.values())
+        for kill in kills:
+            try:
+                kill()
+            except Exception:
+                pass
+
+    @contextmanager
+    def on_cancel(self, kill):
+        """Call `kill` if the scope is cancelled during the with block (right away if it already is)."""
+        key = self._register(kill)
+        try:
+            yield self
+        finally:
+            if key is not None:
+                self._unregister(key)
+
+    def _register(self, kill):
+        with self._lock:
+            if not self.cancelled.is_set():
+                key = next(self._keys)
+                self._kills[key] = kill
+                return key
+        kill()  # Cancelled while the run was starting
+        return None
+
+    def _unregister(self, key):
+        with self._lock:
+            self._kills.pop(key, None)
+
+
+# Scope of the runs started by this process, whatever their thread (the static pipeline runs the
+# executables of a file in threads of their own); one analysis is cancellable at a time
+_current_scope = None
+
+
+@contextmanager
+def cancellable(scope: CancellationScope):
+    """Attach the script runs started during a with block to a CancellationScope."""
+    global _current_scope
+    previous, _current_scope = _current_scope, scope
+    try:
+        yield scope
+    finally:
+        _current_scope = previous
+
+
+def _run_script(request):
+    """
+    Execute a Python script as `python <path>` would, in a child of the fork server.
+
+    Returns:
+        The exit code of the script: 0 on success, the code given to sys.exit(),
+        or 1 with the traceback on stderr for an uncaught exception
+    """
+    path = request["path"]
+
+    devnull_fd = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull_fd, 0)
+    os.close(devnull_fd)
+    for fd, output_path in ((1, request["stdout"]), (2, request["stderr"])):
+        output_fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        os.dup2(output_fd, fd)
+        os.close(output_fd)
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", closefd=False)
+
+    os.chdir(request["cwd"])
+    sys.argv = [path]
+    # The folder of the script comes first on sys.path, as for `python <path>`
+    sys.path[0] = os.path.dirname(os.path.abspath(path))
+
+    exit_code = 0
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        exc_type, exc_value, tb = sys.exc_info()
+        # Drop the runpy frames, so the traceback looks like the one of the interpreter
+        script_tb = tb
+        while script_tb is not None and script_tb.tb_frame.f_code.co_filename != path:
+            script_tb = script_tb.tb_next
+        traceback.print_exception(exc_type, exc_value, script_tb or tb)
+        exit_code = 1
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        pass
+    return exit_code
+
+
+def serve():
+    """
+    Fork server loop: preload the heavy modules, then fork a child for every request.
+
+    Requests are JSON lines on stdin; for each finished child a line "<id> <exit code>"
+    is written on stdout. The server exits when stdin is closed: the children still running
+    are killed then, since nobody is left to wait for them.
+    """
+    # Replies go through a private copy of stdout: whatever the preloaded modules print
+    # must not end up in the replies
+    replies_out = os.fdopen(os.dup(1), "wb")
+    devnull_fd = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull_fd, 1)
+    os.close(devnull_fd)
+
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            pass
+
+    requests_in = sys.stdin.buffer
+
+    # Wake up the select loop when a child terminates
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    children = {}  # pid -> request id
+    pending = b""
+    stdin_open = True
+
+    while stdin_open or children:
+        watched = [requests_in, wakeup_r] if stdin_open else [wakeup_r]
+        try:
+            readable, _, _ = select.select(watched, [], [], 1.0)
+        except InterruptedError:
+            readable = []
+
+        if requests_in in readable:
+            chunk = os.read(requests_in.fileno(), 65536)
+            if not chunk:
+                stdin_open = False
+                # The caller is gone (closed, or killed with the analysis that started the runs)
+                for pid in children:
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+            pending += chunk
+            while b"\n" in pending:
+                line, pending = pending.split(b"\n", 1)
+                request = json.loads(line)
+                if "cancel" in request:
+                    # The child is reaped, and its exit reported, as any other
+                    for pid, request_id in children.items():
+                        if request_id == request["cancel"]:
+                            try:
+                                os.kill(pid, signal.SIGKILL)
+                            except ProcessLookupError:
+                                pass
+                    continue
+                pid = os.fork()
+                if pid == 0:
+                    # Child: back to the default signal handling, then run the script
+                    signal.set_wakeup_fd(-1)
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    os.close(wakeup_r)
+                    os.close(wakeup_w)
+                    replies_out.close()
+                    code = 1
+                    try:
+                        code = _run_script(request)
+                    finally:
+                        os._exit(code & 0xFF if code >= 0 else 1)
+                children[pid] = request["id"]
+
+        if wakeup_r in readable:
+            try:
+                os.read(wakeup_r, 4096)
+            except BlockingIOError:
+                pass
+
+        # Reap every terminated child, whatever woke the loop up
+        while children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                children.clear()
+                break
+            if pid == 0:
+                break
+            request_id = children.pop(pid, None)
+            if request_id is not None:
+                replies_out.write(f"{request_id} {os.waitstatus_to_exitcode(status)}\n".encode())
+                replies_out.flush()
+
+
+class ForkServer:
+
+    def __init__(self):
+        self._process = None
+        self._ids = itertools.count()
+        self._waiting = {}  # request id -> [threading.Event, exit code, server process]
+        self._lock = threading.Lock()
+
+    def _ensure_running(self):
+        if self._process is not None and self._process.poll() is None:
+            return
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        reader = threading.Thread(target=self._read_replies, args=(self._process,), daemon=True)
+        reader.start()
+
+    def _read_replies(self, process):
+        for line in process.stdout:
+            try:
+                request_id, exit_code = (int(value) for value in line.split())
+            except ValueError:
+                continue
+            with self._lock:
+                waiting = self._waiting.get(request_id)
+            if waiting is not None:
+                waiting[1] = exit_code
+                waiting[0].set()
+
+        # The server died: release whoever is still waiting on it
+        with self._lock:
+            for request_id, waiting in list(self._waiting.items()):
+                if waiting[2] is process:
+                    waiting[0].set()
+
+    def run(self, path, cwd, stdout_path, stderr_path, timeout=None, scope: CancellationScope = None):
+        """
+        Run a script in a forked child.
+
+        Args:
+            scope: CancellationScope killing the child when cancelled (optional)
+
+        Returns:
+            The exit code of the script, or None if it did not finish within the timeout
+            (the child is then killed, as subprocess.run does)
+
+        Raises:
+            OSError: If the fork server cannot be started or terminated unexpectedly
+        """
+        with self._lock:
+            self._ensure_running()
+            process = self._process
+            request_id = next(self._ids)
+            waiting = [threading.Event(), None, process]
+            self._waiting[request_id] = waiting
+            request = {"id": request_id, "path": path, "cwd": cwd, "stdout": stdout_path, "stderr": stderr_path}
+            process.stdin.write((json.dumps(request) + "\n").encode())
+            process.stdin.flush()
+
+        scope_key = scope._register(lambda: self.cancel(request_id)) if scope is not None else None
+        try:
+            if not waiting[0].wait(timeout):
+                # Kill the script and wait for its exit, so that it no longer writes its outputs
+                self.cancel(request_id)
+                waiting[0].wait(KILL_TIMEOUT)
+                return None
+            if waiting[1] is None:
+                raise OSError("The fork server terminated unexpectedly")
+            return waiting[1]
+        finally:
+            if scope_key is not None:
+                scope._unregister(scope_key)
+            with self._lock:
+                self._waiting.pop(request_id, None)
+
+    def cancel(self, request_id):
+        """Kill the child running a request; its run returns the exit code of the kill."""
+        with self._lock:
+            if request_id in self._waiting and self._process is not None and self._process.poll() is None:
+                self._process.stdin.write((json.dumps({"cancel": request_id}) + "\n").encode())
+                self._process.stdin.flush()
+
+    def close(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                try:
+                    self._process.stdin.close()
+                    self._process.wait(timeout=5)
+                except Exception:
+                    self._process.kill()
+            self._process = None
+
+
+_fork_server = None
+_fork_server_lock = threading.Lock()
+
+
+def _get_fork_server():
+    global _fork_server
+    with _fork_server_lock:
+        if _fork_server is None:
+            _fork_server = ForkServer()
+            atexit.register(_fork_server.close)
+        return _fork_server
+
+
+def _read_output(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _run_subprocess(args, timeout, scope):
+    """subprocess.run(args, capture_output=True, text=True, timeout=timeout), killed with its scope."""
+    if scope is None:
+        return subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+    with subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as process:
+        scope_key = scope._register(process.kill)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+            raise subprocess.TimeoutExpired(args, timeout, stdout, stderr)
+        finally:
+            if scope_key is not None:
+                scope._unregister(scope_key)
+    if scope.cancelled.is_set():
+        raise Cancelled(args[-1])
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+
+def run_python_file(path, timeout=None):
+    """
+    Run a Python script in a child of the warm fork server and capture its output.
+
+    Drop-in replacement for subprocess.run([sys.executable, path], capture_output=True, text=True).
+
+    Args:
+        path: Path to the Python script
+        timeout: Seconds after which the script is killed (optional)
+
+    Returns:
+        subprocess.CompletedProcess with returncode, stdout and stderr
+
+    Raises:
+        subprocess.TimeoutExpired: When the script did not finish within the timeout
+        Cancelled: When the CancellationScope of the run (see cancellable) is cancelled
+    """
+    path = str(path)
+    args = [sys.executable, path]
+    scope = _current_scope
+    if scope is not None and scope.cancelled.is_set():
+        raise Cancelled(path)
+
+    if not hasattr(os, "fork"):
+        return _run_subprocess(args, timeout, scope)
+
+    with tempfile.TemporaryDirectory(prefix="qspire_run_") as output_folder:
+        stdout_path = os.path.join(output_folder, "stdout")
+        stderr_path = os.path.join(output_folder, "stderr")
+        try:
+            exit_code = _get_fork_server().run(path, os.getcwd(), stdout_path, stderr_path, timeout, scope)
+        except OSError:
+            # The fork server could not be reached: run the script the regular way
+            return _run_subprocess(args, timeout, scope)
+
+        if scope is not None and scope.cancelled.is_set():
+            raise Cancelled(path)
+        if exit_code is None:
+            raise subprocess.TimeoutExpired(args, timeout, _read_output(stdout_path), _read_output(stderr_path))
+
+        return subprocess.CompletedProcess(args, exit_code, _read_output(stdout_path), _read_output(stderr_path))
+
+
+if __name__ == "__main__" and sys.argv[1:] == ["--serve"]:
+    serve()
@@ -2,6 +2,7 @@ import ast
 from smells.Detector import Detector
 from smells.CG.CG import CG
 from smells.utils.config_loader import get_detector_option
+from smells.utils.ParsedModule import ParsedModule
 
 def resolve_matrix(node: ast.AST, variables: dict) -> any:
 
@@ -49,8 +50,7 @@ class CGDetector(Detector, ast.NodeVisitor):
 
     def detect(self, file: str) -> list[CG]:
 
-        with open(file, "r", encoding="utf-8") as file:
-            code = file.read()    
+        parsed = ParsedModule.for_file(file)
 
         smells = []
 
@@ -240,7 +240,7 @@ class CGDetector(Detector, ast.NodeVisitor):
                 self.generic_visit(node)
 
         # Parse and visit
-        tree = ast.parse(code)
+        tree = parsed.tree
         visitor = UnitaryCallVisitor()
         visitor.visit(tree)
 
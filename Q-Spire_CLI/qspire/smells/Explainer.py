@@ -1,14 +1,16 @@
 from smells.utils.config_loader import get_api_key
 from smells.utils.config_loader import get_llm_model
-from openai import OpenAI
 
-API_KEY=get_api_key()
-LLM_MODEL=get_llm_model()
+# openai and the API key are only loaded when an explanation is requested
 
 # Base explainer class with factory pattern
 class Explainer:
 
     _explainers = {}
+
+    # Explanations already generated, by (explainer class, method, reuse key): identical blocks
+    # copy-pasted across circuits and files are explained once
+    _explanations = {}
     
     @classmethod
     def register(cls, smell_class):
@@ -27,14 +29,39 @@ class Explainer:
     def get_prompt(self, code, smell_instance, method):
         """This should be implemented by each specific explainer"""
         raise NotImplementedError("Subclasses must implement get_prompt method")
+
+    def reuse_key(self, code, smell_instance, method):
+        """
+        Hashable key of the smells sharing the same explanation, e.g. copies of the same block with the
+        same source lines. Explainers returning None (the default) explain every smell.
+        """
+        return None
     
     @classmethod
     def explain(cls, code, smell, method):
         """Class method that gets explainer and calls explain in one step"""
         explainer = cls.get_explainer(code, smell, method)
         if explainer:
+            key = explainer.reuse_key(code, smell, method)
+            if key is not None:
+                return explainer._explain_once((explainer.__class__, method, key), code, smell, method)
             return explainer._explain(code, smell, method)  # Call the instance method
         return None
+
+    def _explain_once(self, key, code, smell_instance, method):
+        """Yield the explanation already generated for the key, or explain the smell and store it."""
+        explanation = Explainer._explanations.get(key)
+        if explanation is not None:
+            smell_instance.explanation = explanation
+            yield explanation
+            return
+
+        chunks = []
+        for chunk in self._explain(code, smell_instance, method):
+            chunks.append(chunk)
+            yield chunk
+        # Only complete explanations are reused
+        Explainer._explanations[key] = "".join(chunks)
     
     def _explain(self, code, smell_instance, method):
         prompt = self.get_prompt(code, smell_instance, method)
@@ -42,13 +69,15 @@ class Explainer:
         #print(prompt)
         #return
 
+        from openai import OpenAI
+
         client = OpenAI(
             base_url="https://openrouter.ai/api/v1",
-            api_key=API_KEY,
+            api_key=get_api_key(),
         )
 
         completion = client.chat.completions.create(
-            model=LLM_MODEL,
+            model=get_llm_model(),
             messages=[
                 {
                     "role": "user",
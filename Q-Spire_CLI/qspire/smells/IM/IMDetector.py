@@ -1,6 +1,6 @@
 from smells.Detector import Detector
 from smells.IM.IM import IM
-from smells.utils.OperationCircuitTracker import analyze_quantum_file
+from smells.utils.AnalysisSession import get_analysis_session
 from smells.utils.config_loader import get_detector_option
 
 
@@ -16,37 +16,25 @@ class IMDetector(Detector):
     def detect(self, file):
         smells = []
 
-        circuits = analyze_quantum_file(file)
+        session = get_analysis_session(file)
+        circuits = session.operations
         """for circuit in circuits:
             import pprint
             pprint.pp(circuits[circuit])"""
 
         for circuit_name, operations in circuits.items():
-            # Dictionary mapping qubit index to list of (index in operations list, operation dict)
-            qubit_ops = {}
-
-            for idx, op in enumerate(operations):
-                for q in op['qubits_affected']:
-                    if q not in qubit_ops:
-                        qubit_ops[q] = []
-                    qubit_ops[q].append((idx, op))
-
-            # Now check each qubit for non-terminal measurements
-            for qubit, op_list in qubit_ops.items():
-                for i, (op_idx, op) in enumerate(op_list):
-                    if op['operation_name'] == 'measure':
-                        # If this is not the last operation on this qubit → it's a smell
-                        if i < len(op_list) - 1:
-                            smell = IM(
-                                circuit_name=circuit_name,
-                                qubit=qubit,
-                                row=op.get('row'),
-                                column_start=op.get('column_start')+1,
-                                column_end=op.get('column_end')+1,
-                                explanation="",
-                                suggestion=""
-                            )
-                            smells.append(smell)
+            # Measurements that are not the last operation on their qubit → it's a smell
+            for qubit, op_idx in session.qubit_timeline(circuit_name).non_terminal_measures():
+                smell = IM(
+                    circuit_name=circuit_name,
+                    qubit=qubit,
+                    row=operations.rows[op_idx],
+                    column_start=operations.column_starts[op_idx]+1,
+                    column_end=operations.column_ends[op_idx]+1,
+                    explanation="",
+                    suggestion=""
+                )
+                smells.append(smell)
 
         min_num_smells = get_detector_option("IM", "min_num_smells", fallback=1)
         if len(smells)>=min_num_smells: return smells
@@ -4,7 +4,7 @@ class LC(QuantumSmell):
     def __init__(self, likelihood: float, error: dict, lenght_op: float, parallel_op: float, 
                  backend: str = None, circuit_name: str = None, 
                  explanation: str = None, suggestion: str = None,
-                 circuit:dict = None):
+                 circuit:dict = None, layer: int = None):
         super().__init__(
             type_="LC",
             explanation=explanation,
@@ -17,6 +17,7 @@ class LC(QuantumSmell):
         self.lenght_op = lenght_op
         self.parallel_op = parallel_op
         self.backend = backend
+        self.layer = layer  # Layer after which the success estimate is below the threshold
 
     def update_likelihood(self, likelihood: float):
         self.likelihood = likelihood
@@ -35,6 +36,9 @@ class LC(QuantumSmell):
     def update_backend(self, backend: str):
         self.backend = backend
 
+    def update_layer(self, layer: int):
+        self.layer = layer
+
     def as_dict(self):
         base = super().as_dict()
         base.update({
@@ -42,6 +46,7 @@ class LC(QuantumSmell):
             'error': self.error,
             'lenght_op': self.lenght_op,
             'parallel_op': self.parallel_op,
-            'backend': self.backend
+            'backend': self.backend,
+            'layer': self.layer
         })
         return base
\ No newline at end of file
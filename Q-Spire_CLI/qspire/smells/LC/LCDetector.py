@@ -12,6 +12,9 @@ from smells.Detector import Detector
 from smells.LC.LC import LC
 from smells.utils.OperationCircuitTracker import analyze_quantum_file
 from smells.utils.BackendAnalyzer import analyze_circuits_backends_runs
+from smells.utils.AnalysisSession import get_analysis_session
+from smells.utils.FidelityEstimator import ErrorTable, estimate_fidelity, layer_operations
+from smells.utils.BackendErrorCache import get_backend_error_cache
 from smells.utils.config_loader import get_detector_option
 
 from smells.utils.CircuitTaker import analyze_quantum_file_circuits
@@ -88,6 +91,27 @@ def get_max_gate_error(backend_properties) -> dict:
     
     return {max_gate[0]: max_gate[1]}
 
+def get_backend_max_gate_error(backend) -> dict:
+    """
+    Returns the gate having the maximum error rate on a backend, as get_max_gate_error does for its properties.
+    Backends able to compute it directly (MyFakeBackend.max_gate_error) do not build their properties.
+    Format: {'gate_name': max_error}
+    """
+    if hasattr(backend, "max_gate_error"):
+        return backend.max_gate_error()
+    return get_max_gate_error(backend.properties())
+
+def reduce_backend_errors(backend) -> tuple:
+    """
+    Error rates of a backend read by LC, cached by BackendErrorCache across circuits and files.
+
+    Returns:
+        Tuple of (gate having the maximum error rate as get_backend_max_gate_error gives it,
+        ErrorTable of the backend or None when it has no gate errors)
+    """
+    max_gate_error = get_backend_max_gate_error(backend)
+    return max_gate_error, ErrorTable.from_backend(backend) if max_gate_error else None
+
 def map_circuits_to_backends(circuits: Dict[str, Any], backends: Dict[str, Dict], runs: List[Dict]) -> List[Tuple]:
     """
     Map circuits to backends based on run executions, similar to your original run_log format.
@@ -127,13 +151,8 @@ def detect_with_new_analyzer(self, file):
 
         print(circuit)
         try:
-            # Get backend properties
-            backend_properties = backend.properties()
-            if backend_properties is None:
-                continue
-                
             # Get max gate error
-            max_gate_error = get_max_gate_error(backend_properties)
+            max_gate_error = get_backend_max_gate_error(backend)
             if not max_gate_error:
                 continue
                 
@@ -188,13 +207,8 @@ def detect_alternative_approach(self, file):
         backend_instance = backends[backend_var]['instance']
         
         try:
-            # Get backend properties
-            backend_properties = backend_instance.properties()
-            if backend_properties is None:
-                continue
-                
             # Get max gate error
-            max_gate_error = get_max_gate_error(backend_properties)
+            max_gate_error = get_backend_max_gate_error(backend_instance)
             if not max_gate_error:
                 continue
                 
@@ -279,38 +293,52 @@ class LCDetector(Detector):
 
             # print("Fallback error gate value")
 
-            circuits, backends, runs = analyze_circuits_backends_runs(file, debug=False)
+            session = get_analysis_session(file)
+            circuits, backends, runs = session.backend_analysis
             mappings = map_circuits_to_backends(circuits, backends, runs)
+            backend_errors = {}  # id(backend) -> (max gate error, ErrorTable)
 
             for circuit, backend, circuit_name in mappings:
                 
-                # Test your functions
                 try:
-                    props = backend.properties()
-                    if props:
+                    # Reduced once per backend name, version and last update across the circuits and files of the run
+                    if id(backend) not in backend_errors:
+                        backend_errors[id(backend)] = get_backend_error_cache().get(backend, reduce_backend_errors)
+                    max_gate_error, error_table = backend_errors[id(backend)]
+                    if max_gate_error:
 
-                        gate_name, max_error = list(get_max_gate_error(props).items())[0]
-                        l = max_operations_per_qubit(circuit)
-                        c = max_parallelism(circuit)
-
-                        likelihood=math.pow(1-max_error,l*c)
+                        # Success estimate from the error of every gate on its qubits
+                        timeline = session.qubit_timeline(circuit_name)
+                        estimate = estimate_fidelity(timeline, error_table)
+                        likelihood = estimate.success
 
                         # Heuristic thresholds — adjust as needed
                         if likelihood<threshold:
-                            
+
+                            lenght_op, parallel_op = analyze_batches(session.circuit_batches(circuit_name))
                             backend_class_name = backend.__class__.__name__ 
 
                             smell = LC(
                                 likelihood=likelihood,
-                                error={gate_name:max_error},
-                                l=l,
-                                c=c,
+                                error=dict(max_gate_error),
+                                lenght_op=lenght_op,
+                                parallel_op=parallel_op,
                                 backend=backend_class_name,
                                 circuit_name=circuit_name,  # Use the captured name
                                 explanation="",
-                                suggestion=""
+                                suggestion="",
+                                circuit=circuit_name,
+                                layer=estimate.crossing_layer(threshold)
                             )
 
+                            # Point at the first operation of the layer where the threshold is crossed
+                            crossing_operations = layer_operations(timeline, smell.layer)
+                            if crossing_operations:
+                                operations = timeline.operations
+                                smell.set_row(operations.row(crossing_operations[0]))
+                                smell.set_column_start(operations.column_starts[crossing_operations[0]])
+                                smell.set_column_end(operations.column_ends[crossing_operations[0]])
+
                             smells.append(smell)
 
 
@@ -362,17 +390,16 @@ class LCDetector(Detector):
 
                     smells.append(smell)
             """
-            
-            circuits, backends, runs = analyze_circuits_backends_runs(file, debug=False)
 
             # circuits = analyze_quantum_file_circuits(file, debug=True)
-            circuits = analyze_quantum_file(file, debug=False)
+            session = get_analysis_session(file)
+            circuits = session.operations
 
             #print(f"\n\n    error gate: {error_threshold}\n    threshold: {threshold}\n      Circuiti: {circuits}\n      file:{file}\n")
 
             for circuit in circuits:
 
-                batches=create_circuit_batches(circuits[circuit])
+                batches=session.circuit_batches(circuit)
 
 
                 gate_name = "CustomGate"
@@ -420,82 +447,6 @@ class LCDetector(Detector):
 
 
 
-def create_circuit_batches(operations):
-    """
-    Convert a sequential list of quantum operations into parallel execution batches.
-    
-    Each batch contains operations that can be executed in parallel (don't conflict on qubits).
-    The batches represent the actual execution order in the quantum circuit.
-    
-    Args:
-        operations: List of operation dictionaries with 'qubits_affected' field
-        
-    Returns:
-        dict: Dictionary where keys are batch numbers and values are lists of operations
-    """
-    
-    if not operations:
-        return {}
-    
-    batches = {}
-    batch_number = 1
-    
-    # Keep track of the last batch where each qubit was used
-    qubit_last_batch = {}
-    
-    # Process each operation in order
-    for operation in operations:
-        operation_qubits = operation['qubits_affected']
-        
-        # Find the minimum batch this operation can be placed in
-        # It must be after the last batch that used any of its qubits
-        min_batch = 1
-        for qubit in operation_qubits:
-            if qubit in qubit_last_batch:
-                min_batch = max(min_batch, qubit_last_batch[qubit] + 1)
-        
-        # Try to place the operation in the earliest possible batch
-        # where it doesn't conflict with other operations in that batch
-        placed = False
-        current_batch_num = min_batch
-        
-        while not placed:
-            # Check if this batch exists and if there's a conflict
-            if current_batch_num not in batches:
-                batches[current_batch_num] = []
-            
-            # Check for conflicts with existing operations in this batch
-            conflict = False
-            for existing_op in batches[current_batch_num]:
-                existing_qubits = set(existing_op['qubits_affected'])
-                if set(operation_qubits).intersection(existing_qubits):
-                    conflict = True
-                    break
-            
-            if not conflict:
-                # Place the operation in this batch
-                batches[current_batch_num].append(operation)
-                
-                # Update the last batch for all affected qubits
-                for qubit in operation_qubits:
-                    qubit_last_batch[qubit] = current_batch_num
-                
-                placed = True
-            else:
-                # Try the next batch
-                current_batch_num += 1
-    
-    # Clean up empty batches and renumber
-    final_batches = {}
-    batch_counter = 1
-    for batch_num in sorted(batches.keys()):
-        if batches[batch_num]:  # Only include non-empty batches
-            final_batches[batch_counter] = batches[batch_num]
-            batch_counter += 1
-    
-    return final_batches
-
-
 def analyze_batches(batches: Dict[int, List[Dict]], debug: bool = False) -> tuple[int, int]:
     """
     Analyze quantum circuit batches to find:
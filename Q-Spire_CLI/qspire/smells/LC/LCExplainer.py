@@ -26,6 +26,20 @@ class LCExplainer(Explainer):
     
     def get_prompt(self, code, smell, method):
 
+        threshold = get_detector_option("LC", "threshold", fallback=0.5)
+
+        # The criterion of the smell depends on how its likelihood was estimated
+        if smell.layer is not None:
+            criterion_prompt=f"""- gate with the maximum error of the used backend, which in this case is: {smell.error}
+The error rate of every gate of the circuit on its qubits was read from the backend, and the likelihood is the estimated probability that none of the gates fails: the product of (1-error) over all the operations, which here is {smell.likelihood}.
+We have this smell if this likelihood is less than a certain threshold, which is {threshold}.
+It falls below the threshold after the layer {smell.layer} of the circuit (its operations are executed in parallel layers), at row {smell.row} of the code.
+"""
+        else:
+            criterion_prompt=f"""- maximum error in the gates of the used backed, which in this case is: {list(smell.error.values())[0]}
+We have this smell if (1-error)^(parallel_op*lenght_op) is less than a certain threshold, which is {threshold}
+"""
+
         introduction_specific_prompt=f"""
 
 The circuit analyzed for this smell is composed of these operations:
@@ -34,9 +48,7 @@ The circuit analyzed for this smell is composed of these operations:
 The information needed to understand this smell are: 
 - maximum number of parallel operations in the circuit, which in this specific circuit is: {smell.parallel_op};
 - maximum number of operations on any single qubit in the circuit, which in this specific circuit is: {smell.lenght_op};
-- maximum error in the gates of the used backed, which in this case is: {list(smell.error.values())[0]}
-We have this smell if (1-error)^(parallel_op*lenght_op) is less than a certain threshold, which is {get_detector_option("LC", "threshold", fallback=0.5)}
-"""
+""" + criterion_prompt
 
         code_prompt=""
 
@@ -1,7 +1,6 @@
 import builtins
 import types
 import inspect
-from qiskit import QuantumCircuit
 
 # === Internal storages ===
 _run_log = []  # List of (QuantumCircuit, backend_instance, circuit_name)
@@ -55,6 +54,8 @@ def _patch_run_method(obj):
             # Go up the call stack to find the frame where .run() was called
             caller_frame = frame.f_back
             
+            from qiskit import QuantumCircuit
+
             # Track circuits
             if isinstance(circuits, QuantumCircuit):
                 circuits_list = [circuits]
@@ -98,7 +99,18 @@ def _custom_build_class(func, name, *bases, **kwargs):
         cls.__init__ = custom_init
     return cls
 
-builtins.__build_class__ = _custom_build_class
+def install():
+    """
+    Patch builtins.__build_class__ so that the backends defined from now on are monitored.
+
+    Nothing is patched at import: importing this module has no side effects.
+    """
+    builtins.__build_class__ = _custom_build_class
+
+def uninstall():
+    """Restore the original builtins.__build_class__."""
+    if builtins.__build_class__ is _custom_build_class:
+        builtins.__build_class__ = _original_init
 
 def get_run_log():
     """Get the current run log."""
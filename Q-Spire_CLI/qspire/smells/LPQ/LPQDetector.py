@@ -2,6 +2,7 @@ import ast
 from smells.Detector import Detector
 from smells.LPQ.LPQ import LPQ
 from smells.utils.config_loader import get_detector_option
+from smells.utils.ParsedModule import ParsedModule
 
 @Detector.register(LPQ)
 class LPQDetector(Detector, ast.NodeVisitor):
@@ -15,11 +16,8 @@ class LPQDetector(Detector, ast.NodeVisitor):
 
     def detect(self, file: str) -> list[LPQ]:
 
-        with open(file, "r", encoding="utf-8") as file:
-            code = file.read()    
-
         # Parse and visit AST
-        tree = ast.parse(code)
+        tree = ParsedModule.for_file(file).tree
         self.visit(tree)
 
         smells = []
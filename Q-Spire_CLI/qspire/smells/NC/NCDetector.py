@@ -2,6 +2,7 @@ import traceback
 from smells.Detector import Detector
 from smells.NC.NC import NC
 from smells.utils.RunExecuteParametersCalls import count_functions
+from smells.utils.AnalysisSession import get_analysis_session
 from smells.utils.config_loader import get_detector_option
 from smells.utils.OperationCircuitTracker import analyze_quantum_file
 
@@ -61,7 +62,7 @@ class NCDetector(Detector):
         #print("Detect NC chiamato")
 
 
-        run_calls, execute_calls, bind_calls, assign_calls = count_functions(file, debug=False)
+        run_calls, execute_calls, bind_calls, assign_calls = get_analysis_session(file).calls
         grouped_circuits = group_calls_by_circuit(run_calls, execute_calls, bind_calls, assign_calls)
 
 
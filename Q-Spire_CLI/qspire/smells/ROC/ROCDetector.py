@@ -1,164 +1,127 @@
-from smells.utils.OperationCircuitTracker import analyze_quantum_file
+import hashlib
+import threading
+from collections import OrderedDict
+
+from smells.utils.AnalysisSession import get_analysis_session
 from smells.Detector import Detector
 from smells.ROC.ROC import ROC
 from smells.utils.config_loader import get_detector_option
+from smells.utils.CircuitBatches import batch_signature
+from smells.utils.PatternIndex import signature_digest
+from smells.utils.TandemRepeats import fingerprints, shortest_squares
+
+# Circuits whose grouped matches are kept (see GroupedMatchesCache)
+GROUPED_MATCHES_CACHE_SIZE = 32
+
 
-def create_circuit_batches(operations):
+class GroupedMatchesCache:
     """
-    Convert a sequential list of quantum operations into parallel execution batches.
-    
-    Each batch contains operations that can be executed in parallel (don't conflict on qubits).
-    The batches represent the actual execution order in the quantum circuit.
-    
-    Args:
-        operations: List of operation dictionaries with 'qubits_affected' field
-        
-    Returns:
-        dict: Dictionary where keys are batch numbers and values are lists of operations
+    Grouped matches of the last circuits analyzed, keyed by a digest of their batch numbers and of the
+    digests of their batch signatures (see PatternIndex.signature_digest), so that an entry holds
+    16 bytes of key rather than the signatures of a whole circuit.
     """
-    
-    if not operations:
-        return {}
-    
-    batches = {}
-    batch_number = 1
-    
-    # Keep track of the last batch where each qubit was used
-    qubit_last_batch = {}
-    
-    # Process each operation in order
-    for operation in operations:
-        operation_qubits = operation['qubits_affected']
-        
-        # Find the minimum batch this operation can be placed in
-        # It must be after the last batch that used any of its qubits
-        min_batch = 1
-        for qubit in operation_qubits:
-            if qubit in qubit_last_batch:
-                min_batch = max(min_batch, qubit_last_batch[qubit] + 1)
-        
-        # Try to place the operation in the earliest possible batch
-        # where it doesn't conflict with other operations in that batch
-        placed = False
-        current_batch_num = min_batch
-        
-        while not placed:
-            # Check if this batch exists and if there's a conflict
-            if current_batch_num not in batches:
-                batches[current_batch_num] = []
-            
-            # Check for conflicts with existing operations in this batch
-            conflict = False
-            for existing_op in batches[current_batch_num]:
-                existing_qubits = set(existing_op['qubits_affected'])
-                if set(operation_qubits).intersection(existing_qubits):
-                    conflict = True
-                    break
-            
-            if not conflict:
-                # Place the operation in this batch
-                batches[current_batch_num].append(operation)
-                
-                # Update the last batch for all affected qubits
-                for qubit in operation_qubits:
-                    qubit_last_batch[qubit] = current_batch_num
-                
-                placed = True
+
+    def __init__(self, maxsize: int = GROUPED_MATCHES_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> grouped matches, least recently used first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(batch_indices, signatures, min_sub_len) -> bytes:
+        """Digest identifying the batch numbers and signatures of a circuit, with the minimum slice length."""
+        digests = tuple(signature_digest(signature) for signature in signatures)
+        payload = repr((min_sub_len, batch_indices, digests)).encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            matches = self._entries.get(key)
+            if matches is None:
+                self.misses += 1
             else:
-                # Try the next batch
-                current_batch_num += 1
-    
-    # Clean up empty batches and renumber
-    final_batches = {}
-    batch_counter = 1
-    for batch_num in sorted(batches.keys()):
-        if batches[batch_num]:  # Only include non-empty batches
-            final_batches[batch_counter] = batches[batch_num]
-            batch_counter += 1
-    
-    return final_batches
-
-def print_circuit_batches(batches):
-    """Helper function to print the batches in a readable format"""
-    for batch_num, operations in batches.items():
-        print(f"\nBatch {batch_num}:")
-        for op in operations:
-            qubits_str = ', '.join(map(str, op['qubits_affected']))
-            print(f"  - {op['operation_name']} on qubit(s) [{qubits_str}] (row {op['row']})")
-
-def batch_signature(batch):
-    """Canonical, hashable signature for a batch."""
-    return tuple(
-        (op["operation_name"],
-         tuple(op.get("qubits_affected", [])),
-         tuple(op.get("clbits_affected", [])))
-        for op in batch
-    )
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return matches
+
+    def put(self, key, matches):
+        with self._lock:
+            self._entries[key] = matches
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
 
 
+_grouped_matches_cache = GroupedMatchesCache()
+
 def roc_smell_present_subsequence(circuit_batches, min_sub_len=1, return_matches=False):
     """
     Detect repeated *consecutive* subsequences of batches and group repeated occurrences.
     Returns grouped matches:
     (start_batch_index, slice_size, repetition_count, last_batch_index)
+
+    From each batch, the shortest slice immediately repeated is taken with all its consecutive
+    repetitions, then the search resumes after them. The shortest repeated slice at every batch
+    comes from the runs of the batch fingerprints (see TandemRepeats), instead of comparing the
+    slices of every size. Circuits with the same batches (e.g. copy-pasted across the files of a
+    folder analyzed by the same worker) reuse the matches of the first one.
     """
-    batch_indices = sorted(circuit_batches.keys())
-    batch_signatures = [batch_signature(circuit_batches[i]) for i in batch_indices]
-    num_batches = len(batch_signatures)
+    batch_indices = tuple(sorted(circuit_batches.keys()))
+    signatures = [batch_signature(circuit_batches[i]) for i in batch_indices]
+
+    key = GroupedMatchesCache.key(batch_indices, signatures, min_sub_len)
+    grouped_matches = _grouped_matches_cache.get(key)
+    if grouped_matches is None:
+        grouped_matches = _grouped_matches(batch_indices, signatures, min_sub_len)
+        _grouped_matches_cache.put(key, grouped_matches)
+    grouped_matches = list(grouped_matches)
+
+    has_smell = len(grouped_matches) > 0
+    if return_matches:
+        return has_smell, grouped_matches
+    return has_smell
+
+
+
+
+
+def _grouped_matches(batch_indices, signatures, min_sub_len):
+    """Grouped matches of roc_smell_present_subsequence, for the batch numbers and signatures of a circuit."""
+    num_batches = len(signatures)
+
+    # ops_before[k] = number of operations in the first k batches
+    ops_before = [0]
+    for signature in signatures:
+        ops_before.append(ops_before[-1] + len(signature))
+
+    slice_sizes, run_ends = shortest_squares(fingerprints(signatures))
 
     grouped_matches = []
     i = 0
 
     while i < num_batches:
-        max_possible_slice = (num_batches - i) // 2
-        best_slice_size = 0
-        repetition_count = 0
-
-        # Try each slice size starting from 1
-        for slice_size in range(1, max_possible_slice + 1):
-            slice1 = batch_signatures[i : i + slice_size]
-            slice2 = batch_signatures[i + slice_size : i + 2 * slice_size]
-
-            if slice1 != slice2:
-                continue
-
-            # Found a repeating slice — now count how many consecutive repetitions
-            count = 1
-            next_start = i + slice_size * 2
-
-            while next_start + slice_size <= num_batches:
-                next_slice = batch_signatures[next_start : next_start + slice_size]
-                if next_slice != slice1:
-                    break
-                count += 1
-                next_start += slice_size
-
-            # Update best if longer sequence found
-            if count > 0:
-                best_slice_size = slice_size
-                repetition_count = count
-                break   # keep original algorithm: stop at the first valid slice size
+        best_slice_size = slice_sizes[i]
 
         if best_slice_size > 0:
+            # The slice repeats up to the end of its run
+            repetitions = (run_ends[i] - i) // best_slice_size
+
             # Skip too short subsequences (not enough operations)
-            total_ops_first = sum(len(circuit_batches[batch_indices[i + k]])
-                                  for k in range(best_slice_size))
+            total_ops_first = ops_before[i + best_slice_size] - ops_before[i]
             if total_ops_first >= min_sub_len:
                 first_batch = batch_indices[i]
-                last_batch = batch_indices[i + best_slice_size * (repetition_count + 1) - 1]
+                last_batch = batch_indices[i + best_slice_size * repetitions - 1]
                 grouped_matches.append(
-                    (first_batch, best_slice_size, repetition_count + 1, last_batch)
+                    (first_batch, best_slice_size, repetitions, last_batch)
                 )
 
             # skip entire repeated region
-            i += best_slice_size * (repetition_count + 1)
+            i += best_slice_size * repetitions
         else:
             i += 1
 
-    has_smell = len(grouped_matches) > 0
-    if return_matches:
-        return has_smell, grouped_matches
-    return has_smell
+    return tuple(grouped_matches)
 
 
 
@@ -180,12 +143,13 @@ class ROCDetector(Detector):
         debug=False
     
         smells = []
-        circuits = analyze_quantum_file(file)
+        session = get_analysis_session(file)
+        circuits = session.operations
 
         min_subcircuit_lenght = get_detector_option("ROC", "min_subcircuit_lenght", fallback=1)
 
         for circuit in circuits:
-            circuit_batches = create_circuit_batches(circuits[circuit])
+            circuit_batches = session.circuit_batches(circuit)
 
             if debug:
                 import pprint
@@ -2,6 +2,7 @@ from smells.Explainer import Explainer
 from smells.ROC.ROC import ROC
 from smells.utils.config_loader import get_smell_name, get_smell_description
 from smells.utils.read_code import get_specific_line, get_adjacent_lines, get_operations
+from smells.utils.CircuitBatches import batch_signature
 
 
 
@@ -63,6 +64,19 @@ def extract_lines(text, line_numbers, context=5):
 
 @Explainer.register(ROC)
 class ROCExplainer(Explainer):
+
+    def reuse_key(self, code, smell, method):
+        """Copies of the same repeated block, on the same source lines, share their explanation."""
+        rows = sorted(
+            {num for item in smell.rows for num in (item if isinstance(item, (list, tuple, set)) else [item])
+             if num is not None}
+        )
+        operations = smell.operations
+        if all(isinstance(op, dict) for op in operations):
+            block = batch_signature(operations)
+        else:
+            block = repr(operations)
+        return block, smell.repetitions, extract_lines(code, rows)
     
     def get_prompt(self, code, smell, method):
 
@@ -0,0 +1,193 @@
+import os
+import threading
+from typing import Dict, List, Tuple, Any
+
+from smells.utils.RunExecuteParametersCalls import RunExecuteParametersCalls
+from smells.utils.OperationCircuitTracker import QuantumCircuitAnalyzer
+from smells.utils.BackendAnalyzer import BackendAnalyzer
+from smells.utils.CircuitBatches import create_circuit_batches
+from smells.utils.OperationTable import OperationTable
+from smells.utils.ParsedModule import ParsedModule
+from smells.utils.PatternIndex import record_session_patterns
+from smells.utils.QubitTimeline import QubitTimeline
+from smells.utils.config_loader import get_operation_extraction
+
+"""
+Analysis session shared by the dynamic detectors.
+
+The file under analysis is executed a single time (instrumented, with .run() mocked)
+and every detector reads the recorded trace: circuits, operations, backends and
+run/execute/bind/assign calls. While the session is open, the source, AST and tokens of the file
+are shared by all the passes over it (see ParsedModule).
+
+The operations are extracted from the source lines after the execution (QuantumCircuitAnalyzer),
+or recorded during it by a RuntimeOperationTracer when config.json sets
+"Operation_extraction": "runtime".
+"""
+
+# Sessions currently opened by detect_smells_from_file, keyed by normalized path
+_active_sessions = {}
+_active_sessions_lock = threading.Lock()
+
+
+class AnalysisSession:
+
+    def __init__(self, file: str, debug: bool = False, operation_extraction: str = None):
+        """
+        Args:
+            file: Path to the Python file to analyze
+            debug: If True, print debugging information
+            operation_extraction: "regex" or "runtime" (default: the value of config.json)
+        """
+        self.file = file
+        self.debug = debug
+        self.operation_extraction = operation_extraction or get_operation_extraction()
+        self.namespace = None  # Globals of the executed file
+        self.execution_error = None  # Exception raised while executing the file, if any
+        self._calls = None
+        self._tracer = None  # RuntimeOperationTracer of the execution, in "runtime" extraction
+        self._operations = None
+        self._backend_analysis = None
+        self._circuit_batches = {}  # circuit name -> batches
+        self._qubit_timelines = {}  # circuit name -> QubitTimeline
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(file: str) -> str:
+        return os.path.normpath(os.path.abspath(file))
+
+    @classmethod
+    def for_file(cls, file: str) -> "AnalysisSession":
+        """
+        Return the session opened for this file, or a new private one.
+
+        Detectors call this so that, when they run inside detect_smells_from_file,
+        they all share the same execution of the file.
+        """
+        with _active_sessions_lock:
+            session = _active_sessions.get(cls._key(file))
+        if session is None:
+            session = cls(file)
+        return session
+
+    def __enter__(self):
+        with _active_sessions_lock:
+            _active_sessions[self._key(self.file)] = self
+        # Every pass over the file during the session shares one read, parse and tokenization
+        ParsedModule.retain(self.file)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        # Folder runs indexing the circuit patterns collect the circuits analyzed by the session
+        if exc_type is None and self._operations is not None:
+            record_session_patterns(self)
+        ParsedModule.release(self.file)
+        with _active_sessions_lock:
+            if _active_sessions.get(self._key(self.file)) is self:
+                del _active_sessions[self._key(self.file)]
+        return False
+
+    def run(self):
+        """Execute the file once, recording calls and the resulting globals."""
+        with self._lock:
+            if self._calls is not None:
+                return
+            tracker = RunExecuteParametersCalls()
+            if self.operation_extraction == "runtime":
+                from smells.utils.RuntimeOperationTracer import RuntimeOperationTracer
+                with RuntimeOperationTracer(self.file) as self._tracer:
+                    self._calls = tracker.analyze_file(self.file, self.debug)
+            else:
+                self._calls = tracker.analyze_file(self.file, self.debug)
+            self.namespace = tracker.namespace
+            self.execution_error = tracker.execution_error
+
+    @property
+    def calls(self) -> Tuple[List[Dict], List[Dict], List[Dict], List[Dict]]:
+        """Tuple of (run_calls, execute_calls, assign_parameters_calls, bind_parameters_calls)."""
+        self.run()
+        return self._calls
+
+    @property
+    def operations(self) -> Dict[str, OperationTable]:
+        """
+        Dictionary mapping circuit names to the OperationTable of their operations.
+
+        Indexing or iterating a table gives operation dictionaries; detectors must not modify the tables.
+        """
+        with self._lock:
+            if self._operations is None:
+                self.run()
+                if self.execution_error is not None:
+                    # Same outcome as a failed execution inside the QuantumCircuitAnalyzer
+                    self._operations = {}
+                elif self._tracer is not None:
+                    self._operations = self._tracer.circuit_operations(self.namespace)
+                else:
+                    analyzer = QuantumCircuitAnalyzer()
+                    self._operations = analyzer.analyze_file(self.file, self.debug, namespace=self.namespace)
+            return self._operations
+
+    @property
+    def backend_analysis(self) -> Tuple[Dict[str, Any], Dict[str, Dict], List[Dict]]:
+        """Tuple of (circuit_instances, backend_instances, run_executions)."""
+        with self._lock:
+            if self._backend_analysis is None:
+                operations = self.operations
+                analyzer = BackendAnalyzer()
+                self._backend_analysis = analyzer.analyze_file(
+                    self.file, self.debug,
+                    namespace=self.namespace,
+                    circuit_operations=operations
+                )
+            return self._backend_analysis
+
+
+    def circuit_batches(self, circuit_name: str) -> Dict[int, List[Dict]]:
+        """
+        Parallel execution batches of a circuit, computed once and shared by the detectors.
+
+        Args:
+            circuit_name: Name of a circuit of `operations`
+
+        Returns:
+            Dictionary mapping batch numbers (from 1) to lists of operations; detectors must not modify it
+        """
+        with self._lock:
+            batches = self._circuit_batches.get(circuit_name)
+            if batches is None:
+                batches = create_circuit_batches(self.operations.get(circuit_name, []))
+                self._circuit_batches[circuit_name] = batches
+            return batches
+
+
+    def qubit_timeline(self, circuit_name: str) -> QubitTimeline:
+        """
+        Per-qubit timelines of a circuit, built once and shared by the IdQ, IQ, IM and LC detectors.
+
+        Args:
+            circuit_name: Name of a circuit of `operations`
+
+        Returns:
+            QubitTimeline of the operations of the circuit; detectors must not modify it
+        """
+        with self._lock:
+            timeline = self._qubit_timelines.get(circuit_name)
+            if timeline is None:
+                operations = self.operations.get(circuit_name)
+                timeline = QubitTimeline(operations if operations is not None else OperationTable())
+                self._qubit_timelines[circuit_name] = timeline
+            return timeline
+
+
+def get_analysis_session(file: str) -> AnalysisSession:
+    """
+    Get the analysis session of a file.
+
+    Args:
+        file: Path to the Python file to analyze
+
+    Returns:
+        The session opened for the file, or a new one if none is active
+    """
+    return AnalysisSession.for_file(file)
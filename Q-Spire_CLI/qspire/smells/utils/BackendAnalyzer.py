@@ -6,6 +6,8 @@ from collections import defaultdict
 import importlib.util
 import copy
 from smells.utils.OperationCircuitTracker import analyze_quantum_file
+from smells.utils.SourceCleaner import clean_source
+from smells.utils.ParsedModule import ParsedModule
 
 """
 Backend and Run Execution Analyzer for Qiskit code
@@ -20,26 +22,30 @@ class BackendAnalyzer:
         self.backend_variables = []  # Track backend variables
         self.circuit_instances = {}  # Store actual QuantumCircuit instances
         
-    def analyze_file(self, filepath: str, debug: bool = False) -> Tuple[Dict[str, Any], Dict[str, Dict], List[Dict]]:
+    def analyze_file(self, filepath: str, debug: bool = False, namespace: Dict[str, Any] = None,
+                     circuit_operations: Dict[str, List[Dict]] = None) -> Tuple[Dict[str, Any], Dict[str, Dict], List[Dict]]:
         """
         Analyze a Python file to extract circuit instances, backend instances and run executions.
         
         Args:
             filepath: Path to the Python file to analyze
             debug: If True, print debugging information
+            namespace: Globals of an execution of the file that already took place.
+                       When given, the file is not executed again.
+            circuit_operations: Operations already extracted by the QuantumCircuitAnalyzer
             
         Returns:
             Tuple of (circuit_instances, backend_instances, run_executions)
         """
-        # Read the source code
-        with open(filepath, 'r', encoding="utf-8") as f:
-            source_code = f.read()
+        # Read the source code (shared with the other passes over the file)
+        parsed = ParsedModule.for_file(filepath)
+        source_code = parsed.source
         
         if debug:
             print(f"Analyzing file: {filepath}")
         
         # Parse the AST
-        tree = ast.parse(source_code)
+        tree = parsed.tree
         
         # Find backend and circuit variables
         self._find_backend_variables(tree, source_code, debug)
@@ -53,14 +59,20 @@ class BackendAnalyzer:
             print("\n\n")
         
         # Execute the file to get actual backend instances and circuits
-        self._execute_and_extract_backends_and_circuits(filepath, debug)
+        if namespace is not None:
+            self._extract_backends_and_circuits(namespace, debug)
+        else:
+            self._execute_and_extract_backends_and_circuits(filepath, debug)
         
         # Analyze run executions in the source code
         self._analyze_run_executions(source_code, debug)
         
         #print(f"Found circuit instance: {self.circuit_instances}")
 
-        self.circuit_instances = analyze_quantum_file(filepath)
+        if circuit_operations is not None:
+            self.circuit_instances = circuit_operations
+        else:
+            self.circuit_instances = analyze_quantum_file(filepath)
 
         return self.circuit_instances, self.backend_instances, self.run_executions
         #return self.circuit_variables, self.backend_instances, self.run_executions
@@ -155,69 +167,71 @@ class BackendAnalyzer:
             # Execute the module
             spec.loader.exec_module(module)
             
-            # Extract circuit instances from the executed module
-            #print(f"self.circuit_variables: {self.circuit_variables}")
-            for circuit_var in self.circuit_variables:
-                #print(f"Type of circuit_var: {type(circuit_var)}")
-                #print(f"circuit_var: {circuit_var}")
-                #print("Attributes and methods of circuit_var:", dir(circuit_var))
+            self._extract_backends_and_circuits(vars(module), debug)
+            
+        except Exception as e:
+            if debug:
+                print(f"Error executing module: {e}")
+    
+    def _extract_backends_and_circuits(self, namespace: Dict[str, Any], debug: bool = False):
+        """Extract backend instances and circuit instances from the globals of an executed file."""
+        # Extract circuit instances from the executed module
+        #print(f"self.circuit_variables: {self.circuit_variables}")
+        for circuit_var in self.circuit_variables:
+            #print(f"Type of circuit_var: {type(circuit_var)}")
+            #print(f"circuit_var: {circuit_var}")
+            #print("Attributes and methods of circuit_var:", dir(circuit_var))
 
-                #print("Attributes and methods of module:", dir(module))
 
+            """FIX HERE !!!"""
+            if circuit_var in namespace:
+                circuit_instance = namespace[circuit_var]
 
-                """FIX HERE !!!"""
-                if hasattr(module, circuit_var):
-                    circuit_instance = getattr(module, circuit_var)
+                #print(f"circuit_instance found here:\n {circuit_instance}")
 
-                    #print(f"circuit_instance found here:\n {circuit_instance}")
+                self.circuit_instances[circuit_var] = circuit_instance
 
+                """# Check if it's actually a QuantumCircuit instance
+                if hasattr(circuit_instance, 'data') and (hasattr(circuit_instance, 'qubits') or hasattr(circuit_instance, 'num_qubits')):
                     self.circuit_instances[circuit_var] = circuit_instance
-                    
-                    """# Check if it's actually a QuantumCircuit instance
-                    if hasattr(circuit_instance, 'data') and (hasattr(circuit_instance, 'qubits') or hasattr(circuit_instance, 'num_qubits')):
-                        self.circuit_instances[circuit_var] = circuit_instance
-                        
-                        if debug:
-                            print(f"Extracted circuit {circuit_var}: {circuit_instance.num_qubits} qubits, {len(circuit_instance.data)} operations")"""
-            
-            # Extract backend instances from the executed module
-            for backend_var in self.backend_variables:
-                if hasattr(module, backend_var):
-                    backend_instance = getattr(module, backend_var)
-                    
-                    # Update backend info with actual instance details
-                    if backend_var in self.backend_instances:
-                        self.backend_instances[backend_var].update({
-                            'instance': backend_instance,
-                            'instance_type': type(backend_instance).__name__,
-                            'module': type(backend_instance).__module__,
-                            'has_run_method': hasattr(backend_instance, 'run')
-                        })
-                        
-                        # Try to get backend-specific properties
-                        if hasattr(backend_instance, 'name'):
-                            try:
-                                self.backend_instances[backend_var]['name'] = backend_instance.name()
-                            except:
-                                self.backend_instances[backend_var]['name'] = str(backend_instance)
-                        
-                        if hasattr(backend_instance, 'configuration'):
-                            try:
-                                config = backend_instance.configuration()
-                                self.backend_instances[backend_var]['configuration'] = {
-                                    'n_qubits': getattr(config, 'n_qubits', None),
-                                    'simulator': getattr(config, 'simulator', None),
-                                    'local': getattr(config, 'local', None)
-                                }
-                            except:
-                                pass
-                        
-                        if debug:
-                            print(f"Updated backend {backend_var} with instance info")
-                            
-        except Exception as e:
-            if debug:
-                print(f"Error executing module: {e}")
+
+                    if debug:
+                        print(f"Extracted circuit {circuit_var}: {circuit_instance.num_qubits} qubits, {len(circuit_instance.data)} operations")"""
+
+        # Extract backend instances from the executed module
+        for backend_var in self.backend_variables:
+            if backend_var in namespace:
+                backend_instance = namespace[backend_var]
+
+                # Update backend info with actual instance details
+                if backend_var in self.backend_instances:
+                    self.backend_instances[backend_var].update({
+                        'instance': backend_instance,
+                        'instance_type': type(backend_instance).__name__,
+                        'module': type(backend_instance).__module__,
+                        'has_run_method': hasattr(backend_instance, 'run')
+                    })
+
+                    # Try to get backend-specific properties
+                    if hasattr(backend_instance, 'name'):
+                        try:
+                            self.backend_instances[backend_var]['name'] = backend_instance.name()
+                        except:
+                            self.backend_instances[backend_var]['name'] = str(backend_instance)
+
+                    if hasattr(backend_instance, 'configuration'):
+                        try:
+                            config = backend_instance.configuration()
+                            self.backend_instances[backend_var]['configuration'] = {
+                                'n_qubits': getattr(config, 'n_qubits', None),
+                                'simulator': getattr(config, 'simulator', None),
+                                'local': getattr(config, 'local', None)
+                            }
+                        except:
+                            pass
+
+                    if debug:
+                        print(f"Updated backend {backend_var} with instance info")
     
     def _analyze_run_executions(self, source_code: str, debug: bool = False):
         """Analyze the source code to find run method executions."""
@@ -412,71 +426,8 @@ class BackendAnalyzer:
         return expanded_line
     
     def _remove_comments_and_strings(self, source_code: str) -> str:
-        """Remove comments and string literals from source code."""
-        lines = source_code.split('\n')
-        cleaned_lines = []
-        
-        in_triple_quote_single = False
-        in_triple_quote_double = False
-        
-        for line in lines:
-            cleaned_line = ""
-            j = 0
-            
-            while j < len(line):
-                # Check for triple quotes
-                if j <= len(line) - 3:
-                    three_chars = line[j:j+3]
-                    
-                    if three_chars == '"""':
-                        if in_triple_quote_double:
-                            in_triple_quote_double = False
-                            j += 3
-                            continue
-                        elif not in_triple_quote_single:
-                            in_triple_quote_double = True
-                            j += 3
-                            continue
-                    
-                    elif three_chars == "'''":
-                        if in_triple_quote_single:
-                            in_triple_quote_single = False
-                            j += 3
-                            continue
-                        elif not in_triple_quote_double:
-                            in_triple_quote_single = True
-                            j += 3
-                            continue
-                
-                # Skip if inside multi-line string
-                if in_triple_quote_single or in_triple_quote_double:
-                    j += 1
-                    continue
-                
-                # Handle single-line comments
-                if line[j] == '#':
-                    # Check if we're inside a string
-                    in_string = False
-                    quote_char = None
-                    for k in range(j):
-                        char = line[k]
-                        if char in ['"', "'"] and (k == 0 or line[k-1] != '\\'):
-                            if not in_string:
-                                in_string = True
-                                quote_char = char
-                            elif char == quote_char:
-                                in_string = False
-                                quote_char = None
-                    
-                    if not in_string:
-                        break  # Rest of line is a comment
-                
-                cleaned_line += line[j]
-                j += 1
-            
-            cleaned_lines.append(cleaned_line)
-        
-        return '\n'.join(cleaned_lines)
+        """Remove hash comments and triple-quoted strings from source code (see SourceCleaner)."""
+        return clean_source(source_code).text
 
 
 def get_circuits_from_file(filepath: str, debug: bool = False) -> Dict[str, Any]:
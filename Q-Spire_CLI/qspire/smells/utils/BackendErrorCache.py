@@ -0,0 +1,181 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+"""
+Process-wide cache of the error tables of the backends used in the analyzed files.
+
+The detectors reading the gate errors of a backend (LC) reduce its properties to a small table,
+which used to be rebuilt for every circuit and file: every file creates its own backend instance,
+and the fake backends of qiskit_ibm_runtime.fake_provider reload their JSON snapshot for each one.
+The reduced tables are kept by backend identity instead, the same for all the instances of a
+backend and across all the circuits and files of a run:
+
+    (backend name, backend version, last update)
+
+The last update is read without building the properties when the backend allows it:
+- backends giving their own key (error_cache_key, e.g. MyFakeBackend from its noise settings)
+- fake_provider backends: the modification time and size of their properties snapshot file
+- other backends: last_update_date of their properties
+Backends without a key are not cached.
+
+With a snapshot directory (set_snapshot_directory, e.g. inside the ResultCache folder), the tables
+are also pickled on disk, so that the worker processes of a folder run and the next runs parse
+each backend once.
+"""
+
+# Environment variable holding the snapshot directory, inherited by the worker processes
+SNAPSHOT_DIRECTORY_VARIABLE = "QSPIRE_BACKEND_SNAPSHOTS"
+# Folder of the snapshots inside the result cache directory
+SNAPSHOT_FOLDER = "backends"
+SNAPSHOT_EXTENSION = ".pkl"
+
+# Bump when the layout of the reduced tables changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def backend_key(backend) -> Optional[Tuple[str, str, str]]:
+    """
+    Identity of the error rates of a backend.
+
+    Args:
+        backend: Backend instance
+
+    Returns:
+        Tuple of (name, version, last update), or None when the backend cannot be identified
+    """
+    try:
+        if hasattr(backend, "error_cache_key"):
+            return backend.error_cache_key()
+
+        name = backend.name() if callable(backend.name) else backend.name
+        props_filename = getattr(backend, "props_filename", None)
+        dirname = getattr(backend, "dirname", None)
+        if props_filename and dirname:
+            stat = os.stat(os.path.join(dirname, props_filename))
+            return (str(name), str(getattr(backend, "backend_version", "")),
+                    f"{props_filename}:{stat.st_mtime_ns}:{stat.st_size}")
+
+        properties = backend.properties()
+        if properties is None or properties.last_update_date is None:
+            return None
+        return (str(name), str(properties.backend_version), properties.last_update_date.isoformat())
+    except Exception:
+        return None
+
+
+class BackendErrorCache:
+    """Reduced error tables of backends, by backend key, optionally snapshotted on disk."""
+
+    def __init__(self, snapshot_directory: str = None):
+        """
+        Args:
+            snapshot_directory: Folder of the snapshots on disk (optional, by default only in memory)
+        """
+        self.snapshot_directory = snapshot_directory
+        self.hits = 0
+        self.misses = 0
+        self._tables = {}  # (reduction, backend key) -> reduced table
+        self._lock = threading.Lock()
+
+    def get(self, backend, reduce: Callable[[Any], Any]):
+        """
+        Reduced error table of a backend, computed once per backend key.
+
+        Args:
+            backend: Backend instance
+            reduce: Function computing the table of a backend; its result must be picklable
+                    to be snapshotted on disk
+
+        Returns:
+            reduce(backend), or the table cached for a backend with the same key
+        """
+        key = backend_key(backend)
+        if key is None:
+            self.misses += 1
+            return reduce(backend)
+        key = (f"{reduce.__module__}.{reduce.__qualname__}",) + tuple(key)
+
+        with self._lock:
+            if key in self._tables:
+                self.hits += 1
+                return self._tables[key]
+
+        table = self._load(key)
+        if table is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            table = reduce(backend)
+            self._store(key, table)
+        with self._lock:
+            return self._tables.setdefault(key, table)
+
+    def _snapshot_path(self, key) -> str:
+        payload = "\0".join(map(str, (SNAPSHOT_FORMAT_VERSION,) + key))
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return os.path.join(self.snapshot_directory, f"{digest}{SNAPSHOT_EXTENSION}")
+
+    def _load(self, key):
+        if not self.snapshot_directory:
+            return None
+        try:
+            path = self._snapshot_path(key)
+            with open(path, "rb") as f:
+                table = pickle.load(f)
+            # Refresh the snapshot for the LRU eviction of the result cache
+            os.utime(path, None)
+            return table
+        except Exception:
+            return None
+
+    def _store(self, key, table):
+        if not self.snapshot_directory:
+            return
+        try:
+            path = self._snapshot_path(key)
+            data = pickle.dumps(table, protocol=pickle.HIGHEST_PROTOCOL)
+            os.makedirs(self.snapshot_directory, exist_ok=True)
+            # Write then rename, so that concurrent workers never read a partial snapshot
+            fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Could not snapshot the errors of backend {key[1]}: {e}")
+
+    def clear(self):
+        """Forget the tables kept in memory (the snapshots on disk are kept)."""
+        with self._lock:
+            self._tables.clear()
+
+
+_backend_error_cache = None
+_backend_error_cache_lock = threading.Lock()
+
+
+def get_backend_error_cache() -> BackendErrorCache:
+    """BackendErrorCache of the process, snapshotting in the directory set by set_snapshot_directory."""
+    global _backend_error_cache
+    with _backend_error_cache_lock:
+        if _backend_error_cache is None:
+            _backend_error_cache = BackendErrorCache(os.environ.get(SNAPSHOT_DIRECTORY_VARIABLE) or None)
+        return _backend_error_cache
+
+
+def set_snapshot_directory(directory: Optional[str]):
+    """
+    Snapshot the backend error tables in a directory, for this process and the worker processes it starts.
+
+    Args:
+        directory: Folder of the snapshots, or None to keep the tables in memory only
+    """
+    if directory:
+        directory = os.path.abspath(directory)
+        os.environ[SNAPSHOT_DIRECTORY_VARIABLE] = directory
+    else:
+        os.environ.pop(SNAPSHOT_DIRECTORY_VARIABLE, None)
+    get_backend_error_cache().snapshot_directory = directory
@@ -0,0 +1,67 @@
+from typing import Dict, List
+
+"""
+ASAP layering of circuit operations, shared by the IQ, IdQ, ROC and LC detectors, and the batch
+signatures compared by ROC and the PatternIndex.
+
+An operation runs in the batch right after the last batch using one of its qubits. Once an
+operation is placed, no later batch holds its qubits yet, so that batch never conflicts: a single
+pass keeping the last batch of every qubit (the frontier) builds the batches in O(operations x qubits).
+"""
+
+
+def create_circuit_batches(operations: List[Dict]) -> Dict[int, List[Dict]]:
+    """
+    Convert a sequential list of quantum operations into parallel execution batches.
+
+    Each batch contains operations that can be executed in parallel (don't conflict on qubits).
+    The batches represent the actual execution order in the quantum circuit.
+
+    Args:
+        operations: List of operation dictionaries with 'qubits_affected' field
+
+    Returns:
+        dict: Dictionary where keys are batch numbers (from 1) and values are lists of operations
+    """
+    batches = []
+
+    # Number of the last batch where each qubit was used (0: not used yet)
+    qubit_last_batch = {}
+
+    for operation in operations:
+        operation_qubits = operation['qubits_affected']
+
+        # The earliest batch after the last one that used any of its qubits
+        batch_index = 0
+        for qubit in operation_qubits:
+            last_batch = qubit_last_batch.get(qubit, 0)
+            if last_batch > batch_index:
+                batch_index = last_batch
+
+        if batch_index == len(batches):
+            batches.append([])
+        batches[batch_index].append(operation)
+
+        for qubit in operation_qubits:
+            qubit_last_batch[qubit] = batch_index + 1
+
+    return {batch_number: batch for batch_number, batch in enumerate(batches, 1)}
+
+
+def batch_signature(batch: List[Dict]) -> tuple:
+    """Canonical, hashable signature for a batch."""
+    return tuple([
+        (op["operation_name"],
+         tuple(op.get("qubits_affected", ())),
+         tuple(op.get("clbits_affected", ())))
+        for op in batch
+    ])
+
+
+def print_circuit_batches(batches):
+    """Helper function to print the batches in a readable format"""
+    for batch_num, operations in batches.items():
+        print(f"\nBatch {batch_num}:")
+        for op in operations:
+            qubits_str = ', '.join(map(str, op['qubits_affected']))
+            print(f"  - {op['operation_name']} on qubit(s) [{qubits_str}] (row {op['row']})")
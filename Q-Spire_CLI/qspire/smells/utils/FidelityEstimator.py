@@ -0,0 +1,218 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from smells.utils.QubitTimeline import QubitTimeline
+
+"""
+Success estimate of a circuit on a backend, from the error rate of every gate it applies.
+
+LC used to estimate the probability of a correct run as (1 - e)^(l * c), e being the largest gate
+error of the backend, l the most operations on a qubit and c the most operations in a layer. The
+estimate multiplies instead the success probabilities of the gates actually applied, each with the
+error of its instruction on its qubits in the backend Target:
+
+    log(success) = sum over the operations of log(1 - error(gate, qubits))
+
+ErrorTable reduces a Target (or BackendProperties) to a sorted array of integer keys (gate name and
+qubits) with their errors, so that the errors of all the operations of a circuit come from a single
+np.searchsorted, or from indexing a dense array of the errors by key when the key space is small
+enough (DENSE_MAX_KEYS). The log-sum is then one np.bincount over the ASAP layers of the operations
+(QubitTimeline), giving the cumulative error after every layer, and the layer where the success
+estimate falls below a threshold.
+
+The qubits of the circuit are taken as the physical qubits of the backend (no layout). An operation
+without an error for its qubits gets the largest error of its gate on the backend, or else the
+largest error of the gates acting on as many qubits (of all the gates, for an operation on more
+qubits than any gate of the backend). Operations recorded without qubits, such as the broadcast
+qc.measure([0, 1, 2], [0, 1, 2]), get the largest error of their gate. Only NOISELESS_OPERATIONS
+never fail.
+"""
+
+# Directives, without an error of their own
+NOISELESS_OPERATIONS = ("barrier", "delay")
+
+# Largest key space (gate names x qubit tuples) looked up in a dense array rather than with np.searchsorted
+DENSE_MAX_KEYS = 1 << 20
+
+
+class FidelityEstimate(NamedTuple):
+    """Success estimate of a circuit, with its cumulative error after every layer."""
+    success: float  # Probability that none of the gates fails
+    layer_errors: np.ndarray  # layer_errors[k]: probability that a gate of the layers 1..k+1 fails
+    unknown_operations: int  # Operations without an error for their gate and qubits in the table
+
+    def crossing_layer(self, threshold: float) -> Optional[int]:
+        """First layer (from 1) after which the success estimate is below threshold, or None."""
+        crossed = np.flatnonzero(1 - self.layer_errors < threshold)
+        return int(crossed[0]) + 1 if len(crossed) else None
+
+
+class ErrorTable:
+    """Error rates of the instructions of a backend, by gate name and qubits."""
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[Tuple[int, ...]], Optional[float]]],
+                 num_qubits: int = None):
+        """
+        Args:
+            entries: (gate name, qubits, error) of the instructions of the backend; the entries
+                     without qubits or without an error are ignored
+            num_qubits: Number of qubits of the backend (by default, up to the highest qubit of the entries)
+        """
+        self.names: Dict[str, int] = {}  # gate name -> name index
+        entries = [(self.names.setdefault(name, len(self.names)), tuple(qubits), float(error))
+                   for name, qubits, error in entries
+                   if qubits is not None and len(qubits) > 0 and error is not None]
+        self.num_qubits = max([num_qubits or 0] + [max(qubits) + 1 for _, qubits, _ in entries])
+
+        self.max_arity = max((len(qubits) for _, qubits, _ in entries), default=0)
+        self._base = self.num_qubits + 1  # A qubit q is stored as q + 1, 0 padding the shorter qubit tuples
+        if len(self.names) * self._base ** self.max_arity >= 2 ** 63:
+            raise ValueError(f"Too many qubits to index gates on {self.max_arity} qubits")
+
+        keys = np.array([self._key(name_index, qubits) for name_index, qubits, _ in entries], dtype=np.int64)
+        errors = np.array([error for _, _, error in entries], dtype=np.float64)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.errors = errors[order]
+
+        # Small key spaces (e.g. up to 5 gate names on pairs of 450 qubits): errors indexed by key, NaN when missing
+        self._dense = None
+        key_space = len(self.names) * self._base ** self.max_arity
+        if 0 < key_space <= DENSE_MAX_KEYS:
+            self._dense = np.full(key_space, np.nan)
+            self._dense[self.keys] = self.errors
+
+        # Fallbacks: largest error of every gate name, and of the gates acting on k qubits
+        self.name_errors = np.zeros(len(self.names), dtype=np.float64)
+        self.arity_errors = np.zeros(self.max_arity + 1, dtype=np.float64)
+        for name_index, qubits, error in entries:
+            self.name_errors[name_index] = max(self.name_errors[name_index], error)
+            self.arity_errors[len(qubits)] = max(self.arity_errors[len(qubits)], error)
+
+    @classmethod
+    def from_target(cls, target) -> "ErrorTable":
+        """ErrorTable of the instruction properties of a Target."""
+        entries = []
+        for name in target.operation_names:
+            for qubits, properties in (target[name] or {}).items():
+                entries.append((name, qubits, properties.error if properties is not None else None))
+        return cls(entries, target.num_qubits)
+
+    @classmethod
+    def from_properties(cls, properties) -> "ErrorTable":
+        """ErrorTable of the gate errors of BackendProperties, measurements having the readout error of their qubit."""
+        entries = []
+        for gate in properties.gates:
+            errors = [param.value for param in gate.parameters if param.name == 'gate_error']
+            entries.append((gate.gate, gate.qubits, errors[0] if errors else None))
+        for qubit, qubit_properties in enumerate(properties.qubits):
+            errors = [prop.value for prop in qubit_properties if prop.name == 'readout_error']
+            entries.append(('measure', (qubit,), errors[0] if errors else None))
+        return cls(entries, len(properties.qubits))
+
+    @classmethod
+    def from_backend(cls, backend) -> "ErrorTable":
+        """
+        ErrorTable of a backend: from its Target, or from its properties for the backends without one.
+
+        Raises:
+            ValueError: When the backend gives neither a Target nor properties
+        """
+        target = getattr(backend, "target", None)
+        if target is not None:
+            return cls.from_target(target)
+        properties = backend.properties() if hasattr(backend, "properties") else None
+        if properties is None:
+            raise ValueError(f"No gate errors for backend {backend}")
+        return cls.from_properties(properties)
+
+    def _key(self, name_index: int, qubits: Tuple[int, ...]) -> int:
+        key = name_index
+        for position in range(self.max_arity):
+            key = key * self._base + (qubits[position] + 1 if position < len(qubits) else 0)
+        return key
+
+    def operation_errors(self, operations) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Errors of all the operations of a circuit.
+
+        Args:
+            operations: OperationTable of the circuit
+
+        Returns:
+            Tuple of (error of every operation, whether it was found for its gate and qubits)
+        """
+        num_operations = len(operations)
+        name_ids = np.frombuffer(operations.name_ids, dtype=np.intc)
+        offsets = np.frombuffer(operations.qubit_offsets, dtype=np.intc)
+        indices = np.frombuffer(operations.qubit_indices, dtype=np.intc)
+        arities = np.diff(offsets)
+
+        # Name index in the table and noiseless flag of every gate name of the circuit
+        name_map = np.array([self.names.get(name, -1) for name in operations.names] or [-1], dtype=np.int64)
+        noiseless_map = np.array([name in NOISELESS_OPERATIONS for name in operations.names] or [False])
+        name_indices = name_map[name_ids]
+        noiseless = noiseless_map[name_ids]
+
+        # Key of every (gate, qubits), in the same mixed radix as the table
+        keys = np.maximum(name_indices, 0)
+        valid = (name_indices >= 0) & (arities <= self.max_arity)
+        starts = offsets[:-1]
+        last_index = max(len(indices) - 1, 0)
+        for position in range(self.max_arity):
+            qubit_positions = np.minimum(starts + position, last_index)
+            qubits = np.where(arities > position, indices[qubit_positions] + 1 if len(indices) else 0, 0)
+            valid &= qubits <= self.num_qubits
+            keys = keys * self._base + qubits
+        keys = np.where(valid, keys, 0)
+
+        found = np.zeros(num_operations, dtype=bool)
+        errors = np.zeros(num_operations, dtype=np.float64)
+        if self._dense is not None:
+            errors = self._dense[keys]
+            found = valid & ~np.isnan(errors)
+            errors[~found] = 0.0
+        elif len(self.keys):
+            positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            found = valid & (self.keys[positions] == keys)
+            errors = np.where(found, self.errors[positions], 0.0)
+
+        missing = ~found & ~noiseless
+        known_name = missing & (name_indices >= 0)
+        errors[known_name] = self.name_errors[name_indices[known_name]]
+        unknown_name = missing & (name_indices < 0)
+        by_arity = unknown_name & (arities <= self.max_arity)
+        errors[by_arity] = self.arity_errors[arities[by_arity]]
+        errors[unknown_name & (arities > self.max_arity)] = self.arity_errors.max()
+        errors[noiseless] = 0.0
+        return errors, found | noiseless
+
+
+def estimate_fidelity(timeline: QubitTimeline, error_table: ErrorTable) -> FidelityEstimate:
+    """
+    Success estimate of a circuit on a backend.
+
+    Args:
+        timeline: QubitTimeline of the circuit (see AnalysisSession.qubit_timeline)
+        error_table: ErrorTable of the backend
+
+    Returns:
+        FidelityEstimate with the success probability and the cumulative error after every layer
+    """
+    errors, found = error_table.operation_errors(timeline.operations)
+    layers = np.frombuffer(timeline.operation_layers, dtype=np.intc)
+    if not len(layers):
+        return FidelityEstimate(1.0, np.zeros(0), 0)
+
+    with np.errstate(divide='ignore'):
+        log_success = np.log1p(-np.minimum(errors, 1.0))
+    layer_log_success = np.cumsum(np.bincount(layers - 1, weights=log_success))
+    layer_errors = -np.expm1(layer_log_success)
+    return FidelityEstimate(float(np.exp(layer_log_success[-1])), layer_errors, int(np.count_nonzero(~found)))
+
+
+def layer_operations(timeline: QubitTimeline, layer: int) -> List[int]:
+    """Indices of the operations of a layer (from 1), in execution order."""
+    layers = np.frombuffer(timeline.operation_layers, dtype=np.intc)
+    return np.flatnonzero(layers == layer).tolist()
@@ -1,4 +1,7 @@
 import datetime
+import functools
+import hashlib
+from itertools import combinations, permutations
 from qiskit.providers.fake_provider.generic_backend_v2 import GenericBackendV2
 from qiskit.transpiler.coupling import CouplingMap
 from qiskit.transpiler import CouplingMap, Target
@@ -16,9 +19,83 @@ from qiskit_ibm_runtime.models import (
     #PulseBackendConfiguration,
     Nduv
 )
+from qiskit_ibm_runtime.models.backend_properties import GateProperties
 
 from datetime import datetime
 
+# Gates of the noise settings reported by the backend properties, by number of qubits
+SINGLE_QUBIT_GATES = ("x", "y", "z", "h", "s", "sdg", "t", "tdg", "sx", "sxdg", "id", "i",
+                      "rz", "rx", "ry", "p", "u", "u1", "u2", "u3")
+TWO_QUBIT_GATES = ("cx", "cnot", "cy", "cz", "ch", "crx", "cry", "crz", "cp", "cu", "cu1", "cu3",
+                   "swap", "iswap", "dcx", "ecr", "rxx", "ryy", "rzz", "rzx")
+THREE_QUBIT_GATES = ("ccx", "toffoli", "ccz", "cswap", "fredkin")
+SPECIAL_OPERATIONS = ("measure", "reset", "barrier")  # Reported once, without qubits
+
+GATE_ARITIES = {
+    **{name: 1 for name in SINGLE_QUBIT_GATES},
+    **{name: 2 for name in TWO_QUBIT_GATES},
+    **{name: 3 for name in THREE_QUBIT_GATES},
+    **{name: 0 for name in SPECIAL_OPERATIONS},
+}
+
+
+class _GateTable(dict):
+    """Formatted properties of the gates (gate name -> qubits -> properties), built per gate on first access."""
+
+    def __init__(self, build_gate):
+        super().__init__()
+        self._build_gate = build_gate
+
+    def __missing__(self, gate_name):
+        table = self._build_gate(gate_name)  # KeyError for the gates without properties
+        self[gate_name] = table
+        return table
+
+
+class LazyBackendProperties(BackendProperties):
+    """
+    BackendProperties of MyFakeBackend, building the entries of a gate only when they are first read.
+
+    gate_property, gate_error and gate_length only build the entries of the requested gate;
+    reading gates (or to_dict) builds the entries of every gate.
+    """
+
+    def __init__(self, backend_name, backend_version, last_update_date, qubits, gate_entries, general):
+        """
+        Args:
+            gate_entries: Dictionary mapping every gate name, in order, to a function returning
+                          the list of its GateProperties
+        """
+        self._gate_entries = gate_entries
+        self._gate_properties = {}  # gate name -> list of GateProperties, once built
+        super().__init__(backend_name, backend_version, last_update_date, qubits, [], general)
+        self._gates = _GateTable(self._format_gate)
+
+    @property
+    def gates(self):
+        """GateProperties of every gate, in the order of the noise settings."""
+        return [entry for gate_name in self._gate_entries for entry in self._entries(gate_name)]
+
+    @gates.setter
+    def gates(self, gates):
+        # BackendProperties.__init__ assigns the gates given to it: none, they are all built lazily
+        if gates:
+            raise ValueError("The gates of LazyBackendProperties are given as gate_entries")
+
+    def _entries(self, gate_name):
+        if gate_name not in self._gate_properties:
+            self._gate_properties[gate_name] = self._gate_entries[gate_name]()
+        return self._gate_properties[gate_name]
+
+    def _format_gate(self, gate_name):
+        entries = self._entries(gate_name)
+        if not entries:
+            raise KeyError(gate_name)
+        # The entries of a gate share their parameters: format them once
+        formatted = {param.name: (self._apply_prefix(param.value, param.unit), param.date)
+                     for param in entries[0].parameters}
+        return {tuple(entry.qubits): formatted for entry in entries}
+
 class MyFakeBackend(GenericBackendV2):
     """
     Class that simulates a generic Backend
@@ -68,25 +145,66 @@ class MyFakeBackend(GenericBackendV2):
         self._t1_values = t1_values or [100e-6] * num_qubits  # Default 100μs
         self._t2_values = t2_values or [150e-6] * num_qubits  # Default 150μs
         self._frequency_values = frequency_values or [5.0e9] * num_qubits  # Default 5GHz
-        self._target = self._build_target(num_qubits, noise_settings)
+        self._coupled_qubits = {}  # arity -> qubit tuples of the coupling map (see _qubit_tuples)
+        self._target = None  # Will be lazy-loaded
         self._properties = None  # Will be lazy-loaded
 
+    @property
+    def target(self) -> Target:
+        """Target with the durations and errors of the noise settings, built on first access."""
+        if self._target is None:
+            self._target = self._build_target(self._num_qubits, self._noise_settings)
+        return self._target
+
+    def _qubit_tuples(self, arity: int) -> List[tuple]:
+        """
+        Qubits a gate acting on arity qubits can be applied to, following the coupling map.
+
+        Args:
+            arity: Number of qubits of the gate (1, 2 or 3)
+
+        Returns:
+            Sorted list of qubit tuples: every qubit, the edges of the coupling map, or the orderings of the
+            triples of qubits connected through the coupling map (a qubit coupled with the two others).
+            The three qubits always differ: the eager construction also listed orderings like (q1, q2, q1).
+        """
+        if arity not in self._coupled_qubits:
+            if arity == 1:
+                tuples = [(q,) for q in range(self._num_qubits)]
+            elif arity == 2:
+                tuples = sorted(tuple(edge) for edge in self._coupling_map.get_edges())
+            else:
+                triples = set()
+                for middle, neighbours in enumerate(self._coupling_neighbours()):
+                    for first, last in combinations(sorted(neighbours), 2):
+                        triples.add(tuple(sorted((first, middle, last))))
+                tuples = [ordering for triple in sorted(triples) for ordering in permutations(triple)]
+            self._coupled_qubits[arity] = tuples
+        return self._coupled_qubits[arity]
+
+    def _coupling_neighbours(self) -> List[set]:
+        """Qubits coupled with every qubit, in either direction."""
+        neighbours = [set() for _ in range(self._num_qubits)]
+        for q1, q2 in self._coupling_map.get_edges():
+            if q1 != q2:
+                neighbours[q1].add(q2)
+                neighbours[q2].add(q1)
+        return neighbours
+
+    def _has_qubit_tuples(self, arity: int) -> bool:
+        """Whether _qubit_tuples(arity) is not empty, without listing the tuples."""
+        if arity in self._coupled_qubits or arity < 3:
+            return len(self._qubit_tuples(arity)) > 0
+        return any(len(neighbours) > 1 for neighbours in self._coupling_neighbours())
+
     def _build_target(self, num_qubits: int, noise_settings: dict) -> Target:
         """Build a Target object with instruction properties including errors."""
         target = Target()
 
-        # Helper to create instruction properties
-        def make_props(single=True, error=0.0, duration=0.0):
-            if single:
-                return {(i,): InstructionProperties(error=error, duration=duration) 
-                       for i in range(num_qubits)}
-            else:
-                return {
-                    (i, j): InstructionProperties(error=error, duration=duration)
-                    for i in range(num_qubits)
-                    for j in range(num_qubits)
-                    if i != j
-                }
+        # Helper to create instruction properties, on the qubits allowed by the coupling map
+        def make_props(arity=1, error=0.0, duration=0.0):
+            return {qubits: InstructionProperties(error=error, duration=duration)
+                    for qubits in self._qubit_tuples(arity)}
 
         # Map of gate name to class and qubit arity
         gate_map = {
@@ -156,7 +274,7 @@ class MyFakeBackend(GenericBackendV2):
             error = params[2] if len(params) > 2 else 0.0
             
             props = make_props(
-                single=(arity == 1),
+                arity=arity,
                 error=error,
                 duration=duration
             )
@@ -176,96 +294,84 @@ class MyFakeBackend(GenericBackendV2):
 
 
     def _build_backend_properties(self) -> BackendProperties:
-        """Construct BackendProperties object with gate errors and qubit properties."""
+        """
+        Construct BackendProperties object with gate errors and qubit properties.
+
+        The gate entries follow the coupling map, and are only built when a gate is first read
+        (see LazyBackendProperties).
+        """
         now = datetime.now().isoformat()
         
         # Build qubit properties
         qubits = []
         for q in range(self._num_qubits):
             qubit_properties = [
-                {"name": "T1", "date": now, "unit": "µs", "value": self._t1_values[q]},
-                {"name": "T2", "date": now, "unit": "µs", "value": self._t2_values[q]},
-                {"name": "frequency", "date": now, "unit": "GHz", "value": self._frequency_values[q]},
-                {"name": "readout_error", "date": now, "unit": "", "value": self._get_readout_error(q)},
+                Nduv(now, "T1", "µs", self._t1_values[q]),
+                Nduv(now, "T2", "µs", self._t2_values[q]),
+                Nduv(now, "frequency", "GHz", self._frequency_values[q]),
+                Nduv(now, "readout_error", "", self._get_readout_error(q)),
             ]
             qubits.append(qubit_properties)
         
-        # Build gate properties
-        gates = []
-        for gate_name, params in self._noise_settings.items():
-            if len(params) < 3 or params[2] is None:
-                continue
-                
-            error = params[2]
-            
-            # Single-qubit gates
-            if gate_name in ["x","y","z","h","s","sdg","t","tdg","sx","sxdg","id","i","rz","rx","ry","p","u","u1","u2","u3"]:
-                for q in range(self._num_qubits):
-                    gates.append({
-                        "gate": gate_name,
-                        "name": gate_name,
-                        "qubits": [q],
-                        "parameters": [
-                            {"name": "gate_error", "date": now, "unit": "", "value": error},
-                            {"name": "gate_length", "date": now, "unit": "ns", "value": params[0]}
-                        ]
-                    })
-            
-            # Two-qubit gates
-            elif gate_name in ["cx","cnot","cy","cz","ch","crx","cry","crz","cp","cu","cu1","cu3","swap","iswap","dcx","ecr","rxx","ryy","rzz","rzx"]:
-                for q1 in range(self._num_qubits):
-                    for q2 in range(self._num_qubits):
-                        if q1 != q2:
-                            gates.append({
-                                "gate": gate_name,
-                                "name": gate_name,
-                                "qubits": [q1, q2],
-                                "parameters": [
-                                    {"name": "gate_error", "date": now, "unit": "", "value": error},
-                                    {"name": "gate_length", "date": now, "unit": "ns", "value": params[0]}
-                                ]
-                            })
-
-            #Three-qubit gates
-            elif gate_name in ["ccx","toffoli","ccz","cswap","fredkin"]:
-                for q1 in range(self._num_qubits):
-                    for q2 in range(self._num_qubits):
-                        for q3 in range(self._num_qubits):
-                            if q1 != q2 and q2!=q3:
-                                gates.append({
-                                    "gate": gate_name,
-                                    "name": gate_name,
-                                    "qubits": [q1, q2, q3],
-                                    "parameters": [
-                                        {"name": "gate_error", "date": now, "unit": "", "value": error},
-                                        {"name": "gate_length", "date": now, "unit": "ns", "value": params[0]}
-                                    ]
-                                })
-            
-            #Special operations
-            elif gate_name in ["measure","reset","barrier"]:
-                gates.append({
-                    "gate": gate_name,
-                    "name": gate_name,
-                    "qubits": [],
-                    "parameters": [
-                        {"name": "gate_error", "date": now, "unit": "", "value": error},
-                        {"name": "gate_length", "date": now, "unit": "ns", "value": params[0]}
-                    ]
-                })
-        
-        # Build the properties dictionary
-        properties_dict = {
-            "backend_name": "fake_backend",
-            "backend_version": "1.0.0",
-            "last_update_date": now,
-            "gates": gates,
-            "qubits": qubits,
-            "general": []
-        }
-        
-        return BackendProperties.from_dict(properties_dict)
-        
+        # Functions building the entries of every gate
+        gate_entries = {}
+        for gate_name in self._reported_gates():
+            params = self._noise_settings[gate_name]
+            parameters = [
+                Nduv(now, "gate_error", "", params[2]),
+                Nduv(now, "gate_length", "ns", params[0]),
+            ]
+            gate_entries[gate_name] = functools.partial(self._gate_entries, gate_name, parameters)
+
+        return LazyBackendProperties("fake_backend", "1.0.0", now, qubits, gate_entries, [])
+
+    def _reported_gates(self) -> List[str]:
+        """Gates of the noise settings with an error rate, in order."""
+        return [gate_name for gate_name, params in self._noise_settings.items()
+                if gate_name in GATE_ARITIES and len(params) >= 3 and params[2] is not None]
+
+    def _gate_entries(self, gate_name: str, parameters: List[Nduv]) -> List[GateProperties]:
+        """GateProperties of a gate on every qubit tuple of the coupling map, sharing the same parameters."""
+        arity = GATE_ARITIES[gate_name]
+        if arity == 0:
+            return [GateProperties([], gate_name, parameters, name=gate_name)]
+        return [GateProperties(list(qubits), gate_name, parameters, name=gate_name)
+                for qubits in self._qubit_tuples(arity)]
+
+    def max_gate_error(self) -> Dict[str, float]:
+        """
+        Gate with the maximum error rate, computed from the noise settings without building the
+        backend properties.
+
+        Returns:
+            Dictionary {gate_name: max_error} as get_max_gate_error gives it for properties(),
+            empty when no gate has an error rate
+        """
+        max_gate = {}
+        for gate_name in self._reported_gates():
+            arity = GATE_ARITIES[gate_name]
+            if arity > 0 and not self._has_qubit_tuples(arity):
+                continue  # No entries in the properties
+            error = self._noise_settings[gate_name][2]
+            if not max_gate or error > next(iter(max_gate.values())):
+                max_gate = {gate_name: error}
+        return max_gate
+
+    def error_cache_key(self) -> tuple:
+        """
+        Identity of the error rates of the backend, for BackendErrorCache.
+
+        The properties are dated when they are built, so the key digests what the errors depend on
+        instead: the number of qubits, the coupling map and the noise settings.
+
+        Returns:
+            Tuple of (name, version, digest of the noise model)
+        """
+        edges = sorted(tuple(edge) for edge in self._coupling_map.get_edges())
+        noise = sorted((name, tuple(params)) for name, params in self._noise_settings.items())
+        payload = repr((self._num_qubits, edges, noise))
+        return ("fake_backend", "1.0.0", hashlib.sha256(payload.encode("utf-8")).hexdigest())
+
     def _get_readout_error(self, qubit: int) -> float:
         """Get readout error for specified qubit."""
         if 'measure' in self._noise_settings:
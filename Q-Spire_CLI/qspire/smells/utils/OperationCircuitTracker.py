@@ -1,10 +1,14 @@
 import ast
 import re
 import sys
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterator, List, Tuple, Any
 from collections import defaultdict
 import importlib.util
 import copy
+from smells.utils.OperationTable import OperationTable, ComposedOperationTable
+from smells.utils.SourceCleaner import clean_source
+from smells.utils.ParsedModule import ParsedModule
+from smells.utils.OperationMatcher import OperationMatcher
 
 """
 Fixed QuantumCircuitAnalyzer that properly handles measurements in nested loops
@@ -18,27 +22,30 @@ class QuantumCircuitAnalyzer:
         self.subcircuit_states = {}  # Track subcircuit states during execution
         self.circuit_sizes = {}  # Track the number of qubits in each circuit
         self.register_info = {}  # Track quantum and classical register information
-        
-    def analyze_file(self, filepath: str, debug: bool = False) -> Dict[str, List[Dict]]:
+        self._operation_matcher = None  # OperationMatcher of the circuit variables being parsed
+
+    def analyze_file(self, filepath: str, debug: bool = False, namespace: Dict[str, Any] = None) -> Dict[str, OperationTable]:
         """
         Analyze a Python file containing quantum circuits and extract operation details.
         
         Args:
             filepath: Path to the Python file to analyze
             debug: If True, print debugging information
+            namespace: Globals of an execution of the file that already took place.
+                       When given, the file is not executed again.
             
         Returns:
-            Dictionary mapping circuit names to lists of operation details
+            Dictionary mapping circuit names to the OperationTable of their operations
         """
-        # Read the source code
-        with open(filepath, 'r', encoding="utf-8") as f:
-            source_code = f.read()
+        # Read the source code (shared with the other passes over the file)
+        parsed = ParsedModule.for_file(filepath)
+        source_code = parsed.source
         
         """if debug:
             print(f"Analyzing file: {filepath}")"""
         #debug=True
         # Parse the AST to find circuit-related operations
-        tree = ast.parse(source_code)
+        tree = parsed.tree
         
         # Find all QuantumCircuit variables and their sizes, plus register info
         circuit_vars = self._find_circuit_variables(tree, source_code)
@@ -51,7 +58,7 @@ class QuantumCircuitAnalyzer:
         
         debug=False
         # Simulate execution step by step to track dynamic subcircuit construction
-        results = self._simulate_execution_with_tracking(filepath, source_code, circuit_vars, debug)
+        results = self._simulate_execution_with_tracking(filepath, source_code, circuit_vars, debug, namespace)
             
         return results
     
@@ -125,7 +132,7 @@ class QuantumCircuitAnalyzer:
 
 
     
-    def _simulate_execution_with_tracking(self, filepath: str, source_code: str, circuit_vars: List[str], debug: bool = False) -> Dict[str, List[Dict]]:
+    def _simulate_execution_with_tracking(self, filepath: str, source_code: str, circuit_vars: List[str], debug: bool = False, namespace: Dict[str, Any] = None) -> Dict[str, OperationTable]:
         """Simulate execution step by step to track dynamic subcircuit construction."""
 
         def _has_main_block( self, source_code: str) -> bool:
@@ -143,27 +150,31 @@ class QuantumCircuitAnalyzer:
             return any(pattern in cleaned_code for pattern in patterns)
         
         # Remove comments and string literals from source code
-        cleaned_source_code = self._remove_comments_and_strings(source_code)
+        parsed = ParsedModule.for_file(filepath)
+        cleaned_source_code = parsed.cleaned.text
         
-        # Parse the source code into an AST
-        tree = ast.parse(source_code)
-        lines = source_code.split('\n')  # Use original source code to preserve spacing
+        lines = list(parsed.lines)  # Use original source code to preserve spacing
         
         # Initialize tracking structures
-        results = {var: [] for var in circuit_vars}
-        subcircuit_snapshots = {}  # Store snapshots of subcircuits at different points
+        # The own operations of each circuit (results[name].own) are its snapshot when it is appended
+        # to another circuit: appends only reference them, and are expanded when the results are read
+        results = {var: ComposedOperationTable(lines) for var in circuit_vars}
         
 
         # Read and execute the file with __name__ set to "__main__"
-        with open(filepath, 'r', encoding="utf-8") as f:
-            code = f.read()
+        code = source_code
 
         main_block=False
         if _has_main_block(self, code): main_block=True
+
+        if namespace is not None:
+            # The file was already executed (see AnalysisSession): read the circuits from its globals
+            main_block=True
         
         if main_block:
-            namespace = {'__name__': '__main__', '__file__': filepath}
-            exec(code, namespace)
+            if namespace is None:
+                namespace = {'__name__': '__main__', '__file__': filepath}
+                exec(code, namespace)
 
             found_vars={}
             for var_name in circuit_vars:
@@ -256,10 +267,6 @@ class QuantumCircuitAnalyzer:
 
         if debug: print(f"Final circuits: {final_circuits} ")
         
-        # Initialize subcircuit states - start empty, will be built dynamically
-        for var_name in circuit_vars:
-            subcircuit_snapshots[var_name] = []
-        
         # Now simulate the execution step by step
         operation_lines = self._extract_operation_sequence(cleaned_source_code, circuit_vars)
 
@@ -268,12 +275,7 @@ class QuantumCircuitAnalyzer:
             print(f"Found {len(operation_lines)} operation lines")
             for i, (line_num, line, op_type, details) in enumerate(operation_lines):
                 print(f"  {i}: Line {line_num + 1}: {line.strip()} -> {op_type} -> {details}")
-            
-            print(f"\nSubcircuit snapshots:")
-            for name, ops in subcircuit_snapshots.items():
-                print(f"  {name}: {len(ops)} operations")
-                for op in ops:
-                    print(f"    - {op}")
+
         
         # Process each operation in sequence
         for line_num, line, op_type, details in operation_lines:
@@ -281,7 +283,8 @@ class QuantumCircuitAnalyzer:
                 print(f"Processing: Line {line_num + 1}: {line.strip()} -> {op_type}")
                 if op_type == 'append':
                     subcircuit_name = details['subcircuit']
-                    print(f"  Subcircuit '{subcircuit_name}' has {len(subcircuit_snapshots.get(subcircuit_name, []))} operations")
+                    if subcircuit_name in results:
+                        print(f"  Subcircuit '{subcircuit_name}' has {len(results[subcircuit_name].own)} operations")
             
             if op_type == 'append':
                 # Handle append operations
@@ -290,44 +293,18 @@ class QuantumCircuitAnalyzer:
                 qubits = details.get('qubits', [])
                 clbits = details.get('clbits', [])
                 
-                # Get current state of the subcircuit
-                current_subcircuit_ops = subcircuit_snapshots.get(subcircuit_name, [])
-                
-                if debug:
-                    print(f"Appending {subcircuit_name} (with {len(current_subcircuit_ops)} ops) to {main_circuit} on qubits {qubits}, clbits {clbits}")
-                    for op in current_subcircuit_ops:
-                        print(f"    - {op}")
-
-                # Add operations from the current state of the subcircuit
-                for sub_op in current_subcircuit_ops:
-                    # Map subcircuit qubits to main circuit qubits
-                    mapped_qubits = self._map_qubits(sub_op['qubits_affected'], qubits)
-                    
-                    # Map subcircuit clbits to main circuit clbits (if any)
-                    mapped_clbits = self._map_clbits(sub_op.get('clbits_affected', []), clbits)
+                # Reference the current state of the subcircuit (its own operations so far)
+                if subcircuit_name in results:
+                    if debug:
+                        print(f"Appending {subcircuit_name} (with {len(results[subcircuit_name].own)} ops) to {main_circuit} on qubits {qubits}, clbits {clbits}")
                     
                     # Get proper column positions from the actual source line
                     actual_line = lines[line_num] if line_num < len(lines) else ''
                     column_start, column_end = self._get_actual_column_positions(actual_line, details.get('operation_pattern', ''))
                     
-                    operation_info = {
-                        'operation_name': sub_op['operation_name'],
-                        'qubits_affected': mapped_qubits,
-                        'clbits_affected': mapped_clbits,
-                        'row': line_num + 1,
-                        'column_start': column_start,
-                        'column_end': column_end,
-                        'source_line': actual_line.strip()
-                    }
-                    
-                    # Only include params if they are actual qiskit Parameters, not circuit names
-                    # Also exclude params for operations that don't use qiskit Parameters
-                    if 'params' in sub_op and sub_op['params'] and not self._is_operation_without_params(sub_op['operation_name']):
-                        filtered_params = self._filter_actual_parameters(sub_op['params'], circuit_vars)
-                        if filtered_params:
-                            operation_info['params'] = filtered_params
-                    
-                    results[main_circuit].append(operation_info)
+                    # The params of the subcircuit operations were filtered when they were added to it
+                    results[main_circuit].append_table(results[subcircuit_name].own, qubits, clbits,
+                                                       line_num + 1, column_start, column_end)
                 
             elif op_type == 'direct_operation':
                 # Handle direct operations on circuits
@@ -346,46 +323,16 @@ class QuantumCircuitAnalyzer:
                 actual_line = lines[line_num] if line_num < len(lines) else ''
                 column_start, column_end = self._get_actual_column_positions(actual_line, details.get('operation_pattern', ''))
                 
-                operation_info = {
-                    'operation_name': operation_name,
-                    'qubits_affected': qubits,
-                    'clbits_affected': clbits,
-                    'row': line_num + 1,
-                    'column_start': column_start,
-                    'column_end': column_end,
-                    'source_line': actual_line.strip()
-                }
-                
                 # Only include params if they are actual qiskit Parameters, not circuit names
                 # Also exclude params for operations that don't use qiskit Parameters
+                filtered_params = None
                 if params and not self._is_operation_without_params(operation_name):
                     filtered_params = self._filter_actual_parameters(params, circuit_vars)
-                    if filtered_params:
-                        operation_info['params'] = filtered_params
-                
-                # DYNAMIC TRACKING: If this operation is on a subcircuit, add it to the subcircuit's state
-                if circuit_name in subcircuit_snapshots:
-                    subcircuit_op_info = {
-                        'operation_name': operation_name,
-                        'qubits_affected': qubits,
-                        'clbits_affected': clbits
-                    }
-                    
-                    # Add params to subcircuit operation info too
-                    if params and not self._is_operation_without_params(operation_name):
-                        filtered_params = self._filter_actual_parameters(params, circuit_vars)
-                        if filtered_params:
-                            subcircuit_op_info['params'] = filtered_params
-                    
-                    subcircuit_snapshots[circuit_name].append(subcircuit_op_info)
-                    
-                    if debug:
-                        print(f"  Added operation to subcircuit '{circuit_name}': {subcircuit_op_info}")
-                        print(f"  Subcircuit '{circuit_name}' now has {len(subcircuit_snapshots[circuit_name])} operations")
                 
                 # Add to the appropriate circuit - but only if it's the main circuit or if we're tracking all operations
                 if circuit_name in results:
-                    results[circuit_name].append(operation_info)
+                    results[circuit_name].append(operation_name, qubits, clbits, line_num + 1,
+                                                 column_start, column_end, filtered_params)
         
         return results
     
@@ -429,10 +376,6 @@ class QuantumCircuitAnalyzer:
     def _extract_operation_sequence(self, source_code: str, circuit_vars: List[str]) -> List[Tuple[int, str, str, Dict]]:
         """Extract the sequence of operations from source code in execution order."""
         lines = source_code.split('\n')
-        operations = []
-        
-        # Parse the AST to handle loops and control structures
-        tree = ast.parse(source_code)
         
         # For now, we'll use a simplified approach that processes lines sequentially
         # and expands loops based on their range
@@ -443,71 +386,71 @@ class QuantumCircuitAnalyzer:
     def _process_lines_with_loops(self, lines: List[str], circuit_vars: List[str]) -> List[Tuple[int, str, str, Dict]]:
         """Process lines and expand loops to track execution sequence, handling nested loops."""
         operations = []
-        expanded_lines = self._expand_nested_loops(lines, {})
+        # Every line is parsed once into a template (see _parse_operation_template): the iterations
+        # only evaluate the arguments using their loop variables
+        templates = {}
         
-        for line_info in expanded_lines:
-            line_num, expanded_line, variable_context = line_info
-            op_info = self._parse_operation_line(expanded_line, line_num, circuit_vars)
-            if op_info:
-                operations.append(op_info)
+        for line_num, line, loop_vars in self._expand_nested_loops(lines, {}):
+            if line_num not in templates:
+                templates[line_num] = self._parse_operation_template(line, line_num, circuit_vars, loop_vars)
+            template = templates[line_num]
+            if template:
+                operations.append(self._instantiate_operation(template, loop_vars))
         
         return operations
     
-    def _expand_nested_loops(self, lines: List[str], outer_vars: Dict[str, int]) -> List[Tuple[int, str, Dict]]:
-        """Recursively expand nested loops and return list of (line_num, expanded_line, variable_context)."""
-        expanded_lines = []
+    def _parse_loop_structure(self, lines: List[str], first_line_num: int = 0) -> List[Tuple]:
+        """
+        Parse the loops of the lines once, for all their iterations.
+        
+        Returns:
+            List of ('line', line_num, line) and ('loop', loop_var, loop_count, body) nodes, where
+            body is the list of nodes of the loop body
+        """
+        nodes = []
         i = 0
         
         while i < len(lines):
-            line = lines[i]
-            stripped_line = line.strip()
+            stripped_line = lines[i].strip()
             
             if not stripped_line or stripped_line.startswith('#'):
                 i += 1
                 continue
             
-            # Check for for loops - FIXED: Better regex pattern
             for_match = re.match(r'for\s+(\w+)\s+in\s+range\s*\(\s*(\d+)\s*\)\s*:', stripped_line)
             if for_match:
-                loop_var = for_match.group(1)
-                loop_count = int(for_match.group(2))
-                
-                # Find the loop body
-                loop_body_start = i + 1
-                loop_body_end = self._find_loop_end(lines, i)
-                loop_body = lines[loop_body_start:loop_body_end]
-                
-                # Expand the loop for each iteration
-                for loop_iteration in range(loop_count):
-                    # Create new variable context including this loop variable
-                    current_vars = outer_vars.copy()
-                    current_vars[loop_var] = loop_iteration
-                    
-                    # Recursively process the loop body (handles nested loops)
-                    nested_expanded = self._expand_nested_loops(loop_body, current_vars)
-                    
-                    # Add all expanded lines from this iteration
-                    for nested_line_offset, nested_expanded_line, nested_context in nested_expanded:
-                        actual_line_num = loop_body_start + nested_line_offset
-                        expanded_lines.append((actual_line_num, nested_expanded_line, current_vars))
-                
-                i = loop_body_end
+                loop_end = self._find_loop_end(lines, i)
+                body = self._parse_loop_structure(lines[i + 1:loop_end], first_line_num + i + 1)
+                nodes.append(('loop', for_match.group(1), int(for_match.group(2)), body))
+                i = loop_end
                 continue
             
-            # Process regular lines (not loop headers)
-            if outer_vars:
-                # Apply variable substitutions from all outer loops
-                expanded_line = line
-                for var_name, var_value in outer_vars.items():
-                    expanded_line = self._expand_loop_variables(expanded_line, var_name, var_value)
-                expanded_lines.append((i, expanded_line, outer_vars))
-            else:
-                # No loop variables to substitute
-                expanded_lines.append((i, line, {}))
-            
+            nodes.append(('line', first_line_num + i, lines[i]))
             i += 1
         
-        return expanded_lines
+        return nodes
+    
+    def _expand_nested_loops(self, lines: List[str], outer_vars: Dict[str, int]) -> Iterator[Tuple[int, str, Dict]]:
+        """
+        Lazily expand nested loops, yielding (line_num, line, loop_vars) in execution order.
+        
+        The loops are parsed once. line is the source line, loop_vars the values of the variables of
+        the loops around it at this iteration (see _instantiate_operation for their substitution).
+        """
+        yield from self._iter_loop_nodes(self._parse_loop_structure(lines), dict(outer_vars))
+    
+    def _iter_loop_nodes(self, nodes: List[Tuple], loop_vars: Dict[str, int]) -> Iterator[Tuple[int, str, Dict]]:
+        for node in nodes:
+            if node[0] == 'loop':
+                _, loop_var, loop_count, body = node
+                for loop_iteration in range(loop_count):
+                    current_vars = loop_vars.copy()
+                    current_vars[loop_var] = loop_iteration
+                    yield from self._iter_loop_nodes(body, current_vars)
+                continue
+            
+            _, line_num, line = node
+            yield line_num, line, loop_vars
     
     def _find_loop_end(self, lines: List[str], loop_start: int) -> int:
         """Find the end of a loop body based on indentation."""
@@ -528,242 +471,210 @@ class QuantumCircuitAnalyzer:
         return len(lines)
     
     def _parse_operation_line(self, line: str, line_num: int, circuit_vars: List[str]) -> Tuple[int, str, str, Dict]:
-        """Parse a single line to extract operation information."""
+        """Parse a single line, with no loop variable left in it, to extract operation information."""
+        template = self._parse_operation_template(line, line_num, circuit_vars, {})
+        return self._instantiate_operation(template, {}) if template else None
+    
+    def _parse_operation_template(self, line: str, line_num: int, circuit_vars: List[str],
+                                  loop_vars: Dict[str, int]) -> Tuple:
+        """
+        Parse a line once into the template of its operation, for all the iterations of its loops.
+        
+        Args:
+            line: Source line
+            line_num: Index of the line in the source
+            circuit_vars: Names of the circuit variables
+            loop_vars: Variables of the loops around the line (only their names are used)
+        
+        Returns:
+            (line_num, line, op_type, details, arguments), where details holds the parts of the operation
+            that are the same at every iteration and arguments is the list of
+            (kind, argument, variables, parsed) of its qubit, clbit and parameter expressions:
+            variables are the loop variables used by the argument, and parsed its
+            (qubits, clbits, params) when it uses none. None when the line has no operation.
+        """
         line_stripped = line.strip()
         
         # Skip empty lines and comments
         if not line_stripped or line_stripped.startswith('#'):
             return None
         
-        for circuit_name in circuit_vars:
-            if circuit_name in line_stripped:
-                # Check for append operations - IMPROVED REGEX to handle various append formats
-                # This handles: circuit.append(subcircuit, [qubits]) and circuit.append(subcircuit, [qubits], [clbits])
-                append_pattern = rf'{re.escape(circuit_name)}\.append\s*\(\s*(\w+)\s*,\s*\[([^\]]*)\](?:\s*,\s*\[([^\]]*)\])?\s*\)'
-                append_match = re.search(append_pattern, line_stripped)
-                if append_match:
-                    subcircuit_name = append_match.group(1)
-                    qubits_str = append_match.group(2)
-                    clbits_str = append_match.group(3) if append_match.group(3) is not None else ""
-                    
-                    # Parse qubits - handle both numbers and variables (which should already be expanded)
-                    qubits = []
-                    if qubits_str.strip():
-                        for q in qubits_str.split(','):
-                            q = q.strip()
-                            if q.isdigit():
-                                qubits.append(int(q))
-                            else:
-                                # Try to evaluate as a simple expression or number
-                                try:
-                                    result = int(eval(q, {"__builtins__": {}}, {}))
-                                    qubits.append(result)
-                                except:
-                                    print(f"Warning: Could not parse qubit '{q}' in line: {line_stripped}")
-                                    qubits.append(0)  # Default fallback
-                    
-                    # Parse clbits - handle both numbers and variables (which should already be expanded)
-                    clbits = []
-                    if clbits_str.strip():
-                        for c in clbits_str.split(','):
-                            c = c.strip()
-                            if c.isdigit():
-                                clbits.append(int(c))
-                            else:
-                                # Try to evaluate as a simple expression or number
-                                try:
-                                    result = int(eval(c, {"__builtins__": {}}, {}))
-                                    clbits.append(result)
-                                except:
-                                    print(f"Warning: Could not parse clbit '{c}' in line: {line_stripped}")
-                                    clbits.append(0)  # Default fallback
-                    
-                    return (line_num, line, 'append', {
-                        'main_circuit': circuit_name,
-                        'subcircuit': subcircuit_name,
-                        'qubits': qubits,
-                        'clbits': clbits,
-                        'operation_pattern': append_match.group(0)
-                    })
-                
-                # Check for direct operations
-                op_match = re.search(rf'{re.escape(circuit_name)}\.(\w+)\s*\(([^)]*)\)', line_stripped)
-                if op_match:
-                    operation_name = op_match.group(1)
-                    params_str = op_match.group(2)
-                    
-                    # Parse parameters and qubits
-                    qubits, clbits, params = self._parse_operation_params(params_str, operation_name)
-                    
-                    return (line_num, line, 'direct_operation', {
-                        'circuit': circuit_name,
-                        'operation': operation_name,
-                        'qubits': qubits,
-                        'clbits': clbits,
-                        'params': params,
-                        'operation_pattern': op_match.group(0)
-                    })
-        
-        return None
+        # One matcher per file for all the circuit variables (see OperationMatcher)
+        if self._operation_matcher is None or self._operation_matcher.circuit_vars is not circuit_vars:
+            self._operation_matcher = OperationMatcher(circuit_vars)
+        match = self._operation_matcher.search(line_stripped)
+        if match is None:
+            return None
+        circuit_name, append_match, op_match = match
+        
+        # Check for append operations - IMPROVED REGEX to handle various append formats
+        # This handles: circuit.append(subcircuit, [qubits]) and circuit.append(subcircuit, [qubits], [clbits])
+        if append_match:
+            qubits_str = append_match.group(2)
+            clbits_str = append_match.group(3) if append_match.group(3) is not None else ""
+            
+            arguments = []
+            if qubits_str.strip():
+                arguments.extend(('append_qubit', q.strip()) for q in qubits_str.split(','))
+            if clbits_str.strip():
+                arguments.extend(('append_clbit', c.strip()) for c in clbits_str.split(','))
+            
+            op_type = 'append'
+            details = {
+                'main_circuit': circuit_name,
+                'subcircuit': append_match.group(1),
+                'operation_pattern': append_match.group(0)
+            }
+        else:
+            # Direct operation
+            operation_name = op_match.group(1)
+            arguments = self._split_operation_arguments(op_match.group(2), operation_name)
+            
+            op_type = 'direct_operation'
+            details = {
+                'circuit': circuit_name,
+                'operation': operation_name,
+                'operation_pattern': op_match.group(0)
+            }
+        
+        template_arguments = []
+        for kind, argument in arguments:
+            # Word boundaries: the loop variable i is not used by qc or circuit
+            variables = tuple(var_name for var_name in loop_vars
+                              if re.search(rf'\b{re.escape(var_name)}\b', argument))
+            parsed = None if variables else self._parse_argument(kind, argument, line)
+            template_arguments.append((kind, argument, variables, parsed))
+        
+        return line_num, line, op_type, details, template_arguments
     
-    def _parse_operation_params(self, params_str: str, operation_name: str = None) -> Tuple[List[int], List[int], List]:
-        """Parse operation parameters to extract qubits, clbits, and other parameters."""
-        if not params_str.strip():
-            return [], [], []
+    def _instantiate_operation(self, template: Tuple, loop_vars: Dict[str, int]) -> Tuple[int, str, str, Dict]:
+        """Operation information of a template (see _parse_operation_template) at an iteration of its loops."""
+        line_num, line, op_type, details, arguments = template
         
         qubits = []
         clbits = []
         params = []
+        for kind, argument, variables, parsed in arguments:
+            if parsed is None:
+                for var_name in variables:
+                    argument = self._expand_loop_variables(argument, var_name, loop_vars[var_name])
+                parsed = self._parse_argument(kind, argument, line)
+            qubits.extend(parsed[0])
+            clbits.extend(parsed[1])
+            params.extend(parsed[2])
+        
+        # Every iteration gets its own lists
+        details = dict(details, qubits=qubits, clbits=clbits)
+        if op_type == 'direct_operation':
+            details['params'] = params
+        return line_num, line, op_type, details
+    
+    def _split_operation_arguments(self, params_str: str, operation_name: str = None) -> List[Tuple[str, str]]:
+        """Split the arguments of a direct operation into (kind, argument), kind telling how _parse_argument reads it."""
+        if not params_str.strip():
+            return []
+        
+        # Split parameters
+        parts = [p.strip() for p in params_str.split(',')]
         
         # For operations that affect all qubits, don't treat numeric parameters as qubits
         if operation_name and self._is_all_qubit_operation(operation_name):
             # For all-qubit operations, all parameters are just parameters, not qubits
-            parts = [p.strip() for p in params_str.split(',')]
-            for part in parts:
-                if part and not part.isspace():
-                    params.append(part)
-            return [], [], params
+            return [('param', part) for part in parts if part and not part.isspace()]
         
-        # Special handling for measure operation - FIXED
+        # Special handling for measure operation: (qubit, cbit, parameters...) - FIXED
         if operation_name and operation_name.lower() == 'measure':
-            return self._parse_measure_params(params_str)
+            if len(parts) == 1:
+                # Only one parameter - treat as qubit
+                return [('measure_qubit', parts[0])]
+            return [('measure_qubit', parts[0]), ('measure_clbit', parts[1])] + \
+                   [('param', part) for part in parts[2:] if part and not part.isspace()]
         
-        # Split parameters
-        parts = [p.strip() for p in params_str.split(',')]
+        return [('operand', part) for part in parts]
+    
+    def _parse_argument(self, kind: str, part: str, line: str) -> Tuple[List[int], List[int], List]:
+        """
+        Qubits, clbits and parameters given by an argument of an operation.
         
-        for part in parts:
-            # Check if this is a quantum register (affects all qubits in the register)
-            if part in self.register_info and self.register_info[part]['type'] == 'quantum':
-                register_size = self.register_info[part]['size']
-                qubits.extend(list(range(register_size)))
-            # Check if this is a classical register (affects all clbits in the register)
-            elif part in self.register_info and self.register_info[part]['type'] == 'classical':
-                register_size = self.register_info[part]['size']
-                clbits.extend(list(range(register_size)))
-            # Check for qubit specifications with brackets
+        Args:
+            kind: How the argument is read (see _split_operation_arguments and _parse_operation_template)
+            part: Argument, with the loop variables already expanded
+            line: Source line of the operation, for the warnings
+        
+        Returns:
+            Tuple of (qubits, clbits, params)
+        """
+        if kind == 'param':
+            return [], [], [part]
+        
+        if kind in ('append_qubit', 'append_clbit'):
+            # Handle both numbers and variables (which should already be expanded)
+            if part.isdigit():
+                bit = int(part)
+            else:
+                # Try to evaluate as a simple expression or number
+                try:
+                    bit = int(eval(part, {"__builtins__": {}}, {}))
+                except:
+                    bit_type = 'qubit' if kind == 'append_qubit' else 'clbit'
+                    print(f"Warning: Could not parse {bit_type} '{part}' in line: {line.strip()}")
+                    bit = 0  # Default fallback
+            return ([bit], [], []) if kind == 'append_qubit' else ([], [bit], [])
+        
+        if kind in ('measure_qubit', 'measure_clbit'):
+            register_type = 'quantum' if kind == 'measure_qubit' else 'classical'
+            bits = []
+            if part.isdigit():
+                bits.append(int(part))
             elif '[' in part and ']' in part:
-                # Extract numbers from brackets
+                # Extract the index from register[index] pattern
                 bracket_content = re.search(r'\[([^\]]+)\]', part)
                 if bracket_content:
-                    nums = [int(q.strip()) for q in bracket_content.group(1).split(',') if q.strip().isdigit()]
-                    # Determine if this is a register access or just a list
-                    register_name = part.split('[')[0].strip()
-                    if register_name in self.register_info:
-                        if self.register_info[register_name]['type'] == 'quantum':
-                            qubits.extend(nums)
-                        elif self.register_info[register_name]['type'] == 'classical':
-                            clbits.extend(nums)
-                    else:
+                    bits.extend(int(b.strip()) for b in bracket_content.group(1).split(',') if b.strip().isdigit())
+            elif part in self.register_info and self.register_info[part]['type'] == register_type:
+                # Handle register
+                register_size = self.register_info[part]['size']
+                bits.extend(range(register_size))
+            return (bits, [], []) if kind == 'measure_qubit' else ([], bits, [])
+        
+        qubits = []
+        clbits = []
+        params = []
+        # Check if this is a quantum register (affects all qubits in the register)
+        if part in self.register_info and self.register_info[part]['type'] == 'quantum':
+            register_size = self.register_info[part]['size']
+            qubits.extend(list(range(register_size)))
+        # Check if this is a classical register (affects all clbits in the register)
+        elif part in self.register_info and self.register_info[part]['type'] == 'classical':
+            register_size = self.register_info[part]['size']
+            clbits.extend(list(range(register_size)))
+        # Check for qubit specifications with brackets
+        elif '[' in part and ']' in part:
+            # Extract numbers from brackets
+            bracket_content = re.search(r'\[([^\]]+)\]', part)
+            if bracket_content:
+                nums = [int(q.strip()) for q in bracket_content.group(1).split(',') if q.strip().isdigit()]
+                # Determine if this is a register access or just a list
+                register_name = part.split('[')[0].strip()
+                if register_name in self.register_info:
+                    if self.register_info[register_name]['type'] == 'quantum':
                         qubits.extend(nums)
-            elif part.isdigit():
-                qubits.append(int(part))
-            else:
-                # This might be a parameter (like phi) - only add if it's not a register name
-                if part and not part.isspace() and part not in self.register_info:
-                    params.append(part)
+                    elif self.register_info[register_name]['type'] == 'classical':
+                        clbits.extend(nums)
+                else:
+                    qubits.extend(nums)
+        elif part.isdigit():
+            qubits.append(int(part))
+        else:
+            # This might be a parameter (like phi) - only add if it's not a register name
+            if part and not part.isspace() and part not in self.register_info:
+                params.append(part)
         
         return qubits, clbits, params
     
     def _remove_comments_and_strings(self, source_code: str) -> str:
-        """Remove multi-line comments (triple-quoted strings) and hash comments from source code."""
-        lines = source_code.split('\n')
-        cleaned_lines = []
-        
-        in_triple_quote_single = False
-        in_triple_quote_double = False
-        
-        for line_num, line in enumerate(lines):
-            cleaned_line = ""
-            j = 0
-            
-            while j < len(line):
-                # Check for triple quotes first (they take precedence)
-                if j <= len(line) - 3:
-                    three_chars = line[j:j+3]
-                    
-                    if three_chars == '"""':
-                        if in_triple_quote_double:
-                            # End of triple double quote block
-                            in_triple_quote_double = False
-                            j += 3
-                            continue
-                        elif not in_triple_quote_single:
-                            # Start of triple double quote block
-                            in_triple_quote_double = True
-                            j += 3
-                            continue
-                    
-                    elif three_chars == "'''":
-                        if in_triple_quote_single:
-                            # End of triple single quote block
-                            in_triple_quote_single = False
-                            j += 3
-                            continue
-                        elif not in_triple_quote_double:
-                            # Start of triple single quote block
-                            in_triple_quote_single = True
-                            j += 3
-                            continue
-                
-                # If we're inside a multi-line string (comment), skip everything
-                if in_triple_quote_single or in_triple_quote_double:
-                    j += 1
-                    continue
-                
-                # Handle single-line comments (only if not in any string)
-                if line[j] == '#':
-                    # Check if we're inside a regular string first
-                    in_string = False
-                    quote_char = None
-                    for k in range(j):
-                        char = line[k]
-                        if char in ['"', "'"] and (k == 0 or line[k-1] != '\\'):
-                            if not in_string:
-                                in_string = True
-                                quote_char = char
-                            elif char == quote_char:
-                                in_string = False
-                                quote_char = None
-                    
-                    # Only treat as comment if not inside a string
-                    if not in_string:
-                        break  # Rest of line is a comment, skip it
-                
-                # Regular character - add to cleaned line
-                cleaned_line += line[j]
-                j += 1
-            
-            # If the entire line was inside a multi-line comment, make it empty
-            if in_triple_quote_single or in_triple_quote_double:
-                cleaned_lines.append("")
-            else:
-                cleaned_lines.append(cleaned_line)
-        
-        return '\n'.join(cleaned_lines)
-    
-    def _map_qubits(self, subcircuit_qubits: List[int], target_qubits: List[int]) -> List[int]:
-        """Map subcircuit qubit indices to main circuit qubit indices."""
-        if not subcircuit_qubits:
-            return target_qubits
-        
-        mapped = []
-        for sub_qubit in subcircuit_qubits:
-            if sub_qubit < len(target_qubits):
-                mapped.append(target_qubits[sub_qubit])
-        
-        return mapped if mapped else target_qubits
-    
-    def _map_clbits(self, subcircuit_clbits: List[int], target_clbits: List[int]) -> List[int]:
-        """Map subcircuit clbit indices to main circuit clbit indices."""
-        if not subcircuit_clbits:
-            return target_clbits
-        
-        mapped = []
-        for sub_clbit in subcircuit_clbits:
-            if sub_clbit < len(target_clbits):
-                mapped.append(target_clbits[sub_clbit])
-        
-        return mapped if mapped else target_clbits
+        """Remove hash comments and triple-quoted strings from source code (see SourceCleaner)."""
+        return clean_source(source_code).text
     
     def _filter_actual_parameters(self, params: List[str], circuit_vars: List[str]) -> List[str]:
         """Filter out circuit names and register names, keep only actual qiskit Parameters."""
@@ -817,71 +728,6 @@ class QuantumCircuitAnalyzer:
         expanded_line = re.sub(standalone_pattern, str(loop_iteration), expanded_line)
         
         return expanded_line
-    
-    def _parse_measure_params(self, params_str: str) -> Tuple[List[int], List[int], List]:
-        """Special parsing for measure operation parameters (qubit, cbit). FIXED VERSION."""
-        if not params_str.strip():
-            return [], [], []
-        
-        qubits = []
-        clbits = []
-        params = []
-        
-        # Split parameters
-        parts = [p.strip() for p in params_str.split(',')]
-        
-        if len(parts) >= 2:
-            # First parameter is qubit
-            qubit_part = parts[0]
-            if qubit_part.isdigit():
-                qubits.append(int(qubit_part))
-            elif '[' in qubit_part and ']' in qubit_part:
-                bracket_content = re.search(r'\[([^\]]+)\]', qubit_part)
-                if bracket_content:
-                    qubit_nums = [int(q.strip()) for q in bracket_content.group(1).split(',') if q.strip().isdigit()]
-                    qubits.extend(qubit_nums)
-            elif qubit_part in self.register_info and self.register_info[qubit_part]['type'] == 'quantum':
-                # Handle quantum register
-                register_size = self.register_info[qubit_part]['size']
-                qubits.extend(list(range(register_size)))
-            
-            # Second parameter is classical bit
-            clbit_part = parts[1]
-            if clbit_part.isdigit():
-                clbits.append(int(clbit_part))
-            elif '[' in clbit_part and ']' in clbit_part:
-                # Extract the index from creg[index] pattern
-                bracket_content = re.search(r'\[([^\]]+)\]', clbit_part)
-                if bracket_content:
-                    clbit_nums = [int(c.strip()) for c in bracket_content.group(1).split(',') if c.strip().isdigit()]
-                    clbits.extend(clbit_nums)
-            elif clbit_part in self.register_info and self.register_info[clbit_part]['type'] == 'classical':
-                # Handle classical register
-                register_size = self.register_info[clbit_part]['size']
-                clbits.extend(list(range(register_size)))
-            
-            # Any additional parameters are actual parameters
-            if len(parts) > 2:
-                for part in parts[2:]:
-                    if part and not part.isspace():
-                        params.append(part)
-        
-        elif len(parts) == 1:
-            # Only one parameter - treat as qubit
-            qubit_part = parts[0]
-            if qubit_part.isdigit():
-                qubits.append(int(qubit_part))
-            elif '[' in qubit_part and ']' in qubit_part:
-                bracket_content = re.search(r'\[([^\]]+)\]', qubit_part)
-                if bracket_content:
-                    qubit_nums = [int(q.strip()) for q in bracket_content.group(1).split(',') if q.strip().isdigit()]
-                    qubits.extend(qubit_nums)
-            elif qubit_part in self.register_info and self.register_info[qubit_part]['type'] == 'quantum':
-                # Handle quantum register
-                register_size = self.register_info[qubit_part]['size']
-                qubits.extend(list(range(register_size)))
-        
-        return qubits, clbits, params
 
 
 def analyze_quantum_file(input_file: str, output_file: str = None, debug: bool = False):
@@ -892,6 +738,9 @@ def analyze_quantum_file(input_file: str, output_file: str = None, debug: bool =
         input_file: Path to Python file containing quantum circuits
         output_file: Optional path to save analysis results
         debug: If True, print debugging information
+    
+    Returns:
+        Dictionary mapping circuit names to the OperationTable of their operations
     """
     analyzer = QuantumCircuitAnalyzer()
     results = analyzer.analyze_file(input_file, debug)
@@ -900,7 +749,7 @@ def analyze_quantum_file(input_file: str, output_file: str = None, debug: bool =
     if output_file:
         import json
         with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2)
+            json.dump({name: table.as_dicts() for name, table in results.items()}, f, indent=2)
         print(f"Results saved to {output_file}")
 
     return results
\ No newline at end of file
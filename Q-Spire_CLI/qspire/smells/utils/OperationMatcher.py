@@ -0,0 +1,75 @@
+import re
+from typing import Iterable, List, Match, Optional, Tuple
+
+"""
+Matching of the circuit operations in source lines, compiled once per analyzed file.
+
+QuantumCircuitAnalyzer used to try every circuit variable on every line, building the append and
+operation regexes of the variable each time. Both patterns start with `<circuit>.`, so a line can
+only match the circuits whose name ends right before one of its dots:
+
+- one alternation regex over all the names (`(?:qc|sub|...)\\.`) rejects in a single pass the lines
+  that mention no circuit;
+- for the other lines, the text before each dot gives the candidate circuits (the names that are a
+  suffix of it), and only their precompiled patterns are tried, in the order of the circuit
+  variables, so the first circuit matching wins as before.
+"""
+
+class OperationMatcher:
+    """Append and direct operation patterns of all the circuit variables of a file."""
+
+    def __init__(self, circuit_vars: Iterable[str]):
+        """
+        Args:
+            circuit_vars: Names of the circuit variables, in the order they are tried
+        """
+        self.circuit_vars = circuit_vars
+        self._order = {}  # name -> position of its first occurrence in circuit_vars
+        for name in circuit_vars:
+            self._order.setdefault(name, len(self._order))
+        self._names = list(self._order)
+        self._lengths = sorted({len(name) for name in self._names})
+        self._patterns = [
+            (re.compile(rf'{re.escape(name)}\.append\s*\(\s*(\w+)\s*,\s*\[([^\]]*)\](?:\s*,\s*\[([^\]]*)\])?\s*\)'),
+             re.compile(rf'{re.escape(name)}\.(\w+)\s*\(([^)]*)\)'))
+            for name in self._names
+        ]
+        # Longest names first, for the one-pass rejection only (the candidates are found below)
+        alternation = '|'.join(re.escape(name) for name in sorted(self._names, key=len, reverse=True))
+        self._prefilter = re.compile(rf'(?:{alternation})\.') if self._names else None
+
+    def candidates(self, line: str) -> List[int]:
+        """Positions of the circuits whose name is followed by a dot in the line, in order."""
+        if self._prefilter is None or self._prefilter.search(line) is None:
+            return []
+        # A name followed by a dot is a suffix of the text before that dot
+        order = self._order
+        found = set()
+        for before_dot in line.split('.')[:-1]:
+            for length in self._lengths:
+                position = order.get(before_dot[-length:])
+                if position is not None:
+                    found.add(position)
+        return sorted(found)
+
+    def search(self, line: str) -> Optional[Tuple[str, Optional[Match], Optional[Match]]]:
+        """
+        Find the operation of a line.
+
+        Args:
+            line: Stripped source line
+
+        Returns:
+            (circuit name, append match, None) or (circuit name, None, operation match) for the first
+            circuit variable with an append or direct operation in the line, None when there is none
+        """
+        has_append = '.append' in line
+        for position in self.candidates(line):
+            append_pattern, operation_pattern = self._patterns[position]
+            append_match = append_pattern.search(line) if has_append else None
+            if append_match:
+                return self._names[position], append_match, None
+            operation_match = operation_pattern.search(line)
+            if operation_match:
+                return self._names[position], None, operation_match
+        return None
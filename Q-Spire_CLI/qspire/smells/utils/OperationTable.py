@@ -0,0 +1,280 @@
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+"""
+Columnar storage of the operations extracted from a circuit.
+
+An operation used to be a dictionary (operation_name, qubits_affected, clbits_affected, row,
+column_start, column_end, source_line and optional params), a few hundred bytes per gate. The
+table keeps one array per field instead: gate names are interned and stored as ids, the qubits
+and clbits of all the operations share one index array (CSR layout: operation i uses
+qubit_indices[qubit_offsets[i]:qubit_offsets[i + 1]]) and source lines are read from the lines
+of the file by row.
+
+Indexing or iterating a table builds the usual operation dictionaries on demand, so detectors
+written for lists of dictionaries keep working; the column accessors (name, qubits, clbits, row...)
+avoid building them.
+
+A ComposedOperationTable stores the subcircuits appended to a circuit as references (the operations
+of the subcircuit at that time and the bits they are mapped to), and only expands them when the
+table is read.
+"""
+
+# Columns of an OperationTable, built on the first read in a ComposedOperationTable
+COLUMNS = ('names', '_name_ids', 'name_ids', 'qubit_offsets', 'qubit_indices', 'clbit_offsets',
+           'clbit_indices', 'rows', 'column_starts', 'column_ends', 'params')
+
+
+def map_bits(subcircuit_bits: List[int], target_bits: List[int]) -> List[int]:
+    """
+    Map subcircuit bit indices to the bits of the circuit it is appended to.
+    
+    Without subcircuit bits, or when none of them exists in the target, the operation gets all
+    the target bits.
+    """
+    if not subcircuit_bits:
+        return list(target_bits)
+    mapped = [target_bits[bit] for bit in subcircuit_bits if bit < len(target_bits)]
+    return mapped if mapped else list(target_bits)
+
+
+class OperationTable:
+    """Operations of one circuit, in execution order."""
+
+    def __init__(self, lines: List[str] = None):
+        """
+        Args:
+            lines: Lines of the analyzed file (source_line of an operation is its row in these lines)
+        """
+        self.lines = lines if lines is not None else []
+        self.names = []  # gate names, indexed by name id
+        self._name_ids = {}
+        self.name_ids = array('i')
+        self.qubit_offsets = array('i', [0])
+        self.qubit_indices = array('i')
+        self.clbit_offsets = array('i', [0])
+        self.clbit_indices = array('i')
+        self.rows = array('i')
+        self.column_starts = array('i')
+        self.column_ends = array('i')
+        self.params = {}  # operation index -> params, only for the operations having some
+
+    @classmethod
+    def from_operations(cls, operations: Iterable[Dict], lines: List[str] = None) -> "OperationTable":
+        """Table of operation dictionaries."""
+        table = cls(lines)
+        for operation in operations:
+            table.append_operation(operation)
+        return table
+
+    def _name_id(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return name_id
+
+    def append(self, name: str, qubits: Iterable[int], clbits: Iterable[int],
+               row: int, column_start: int, column_end: int, params: List = None) -> None:
+        """Add an operation at the end of the table."""
+        if params:
+            self.params[len(self.rows)] = list(params)
+        self.name_ids.append(self._name_id(name))
+        self.qubit_indices.extend(qubits)
+        self.qubit_offsets.append(len(self.qubit_indices))
+        self.clbit_indices.extend(clbits)
+        self.clbit_offsets.append(len(self.clbit_indices))
+        self.rows.append(row)
+        self.column_starts.append(column_start)
+        self.column_ends.append(column_end)
+
+    def append_operation(self, operation: Dict) -> None:
+        """Add an operation dictionary at the end of the table."""
+        self.append(operation['operation_name'], operation['qubits_affected'], operation['clbits_affected'],
+                    operation['row'], operation['column_start'], operation['column_end'], operation.get('params'))
+
+    def extend(self, other: "OperationTable", location: Tuple[int, int, int] = None) -> None:
+        """
+        Add the operations of another table (of the same file) at the end of this one.
+        
+        Args:
+            other: Table whose operations are added
+            location: (row, column_start, column_end) given to all the added operations (optional,
+                      they keep their own otherwise)
+        """
+        start = len(self.rows)
+        name_ids = [self._name_id(name) for name in other.names]
+        self.name_ids.extend(name_ids[name_id] for name_id in other.name_ids)
+        qubit_shift = len(self.qubit_indices)
+        self.qubit_indices.extend(other.qubit_indices)
+        self.qubit_offsets.extend(offset + qubit_shift for offset in other.qubit_offsets[1:])
+        clbit_shift = len(self.clbit_indices)
+        self.clbit_indices.extend(other.clbit_indices)
+        self.clbit_offsets.extend(offset + clbit_shift for offset in other.clbit_offsets[1:])
+        if location is None:
+            self.rows.extend(other.rows)
+            self.column_starts.extend(other.column_starts)
+            self.column_ends.extend(other.column_ends)
+        else:
+            count = len(other.rows)
+            row, column_start, column_end = location
+            self.rows.extend(array('i', [row]) * count)
+            self.column_starts.extend(array('i', [column_start]) * count)
+            self.column_ends.extend(array('i', [column_end]) * count)
+        for index, params in other.params.items():
+            self.params[start + index] = list(params)
+
+    def copy(self) -> "OperationTable":
+        table = OperationTable(self.lines)
+        table.extend(self)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def name(self, index: int) -> str:
+        return self.names[self.name_ids[index]]
+
+    def name_id(self, name: str) -> Optional[int]:
+        """Id of a gate name in name_ids, None if no operation of the table has it."""
+        return self._name_ids.get(name)
+
+    def qubits(self, index: int) -> List[int]:
+        return self.qubit_indices[self.qubit_offsets[index]:self.qubit_offsets[index + 1]].tolist()
+
+    def clbits(self, index: int) -> List[int]:
+        return self.clbit_indices[self.clbit_offsets[index]:self.clbit_offsets[index + 1]].tolist()
+
+    def row(self, index: int) -> int:
+        return self.rows[index]
+
+    def source_line(self, index: int) -> str:
+        row = self.rows[index]
+        return self.lines[row - 1].strip() if 0 < row <= len(self.lines) else ''
+
+    def operation(self, index: int) -> Dict:
+        """Dictionary of an operation, with the keys of the QuantumCircuitAnalyzer."""
+        if index < 0:
+            index += len(self.rows)
+        if not 0 <= index < len(self.rows):
+            raise IndexError("operation index out of range")
+        operation = {
+            'operation_name': self.name(index),
+            'qubits_affected': self.qubits(index),
+            'clbits_affected': self.clbits(index),
+            'row': self.rows[index],
+            'column_start': self.column_starts[index],
+            'column_end': self.column_ends[index],
+            'source_line': self.source_line(index),
+        }
+        params = self.params.get(index)
+        if params:
+            operation['params'] = list(params)
+        return operation
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.operation(i) for i in range(*index.indices(len(self.rows)))]
+        return self.operation(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(len(self.rows)):
+            yield self.operation(index)
+
+    def __eq__(self, other):
+        if isinstance(other, (OperationTable, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"OperationTable({self.as_dicts()!r})"
+
+    def as_dicts(self) -> List[Dict]:
+        """List of the operation dictionaries (e.g. to serialize them)."""
+        return list(self)
+
+
+class ComposedOperationTable(OperationTable):
+    """
+    OperationTable of a circuit with subcircuits appended to it, expanded when first read.
+
+    The operations added with append are the circuit's own operations (kept in `own`, which is what
+    gets appended when this circuit is itself used as a subcircuit); append_table records a
+    reference instead of copying the operations of the subcircuit. The mapped operations of a
+    subcircuit on some bits are computed once and reused by every append on the same bits.
+    """
+
+    def __init__(self, lines: List[str] = None):
+        self.lines = lines if lines is not None else []
+        self.own = OperationTable(self.lines)
+        # ('own', start, end) ranges of own operations and ('table', subcircuit, count, qubits, clbits, location) references
+        self._segments = []
+
+    def __getattr__(self, name):
+        # Only called for missing attributes: the columns, before the expansion
+        if name in COLUMNS and '_segments' in self.__dict__:
+            self._expand()
+            return getattr(self, name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def append(self, name: str, qubits: Iterable[int], clbits: Iterable[int],
+               row: int, column_start: int, column_end: int, params: List = None) -> None:
+        if '_segments' not in self.__dict__:
+            return super().append(name, qubits, clbits, row, column_start, column_end, params)
+        index = len(self.own)
+        self.own.append(name, qubits, clbits, row, column_start, column_end, params)
+        if self._segments and self._segments[-1][0] == 'own' and self._segments[-1][2] == index:
+            self._segments[-1] = ('own', self._segments[-1][1], index + 1)
+        else:
+            self._segments.append(('own', index, index + 1))
+
+    def append_table(self, subcircuit: OperationTable, qubits: List[int], clbits: List[int],
+                     row: int, column_start: int, column_end: int) -> None:
+        """
+        Append the operations a subcircuit has now, mapped on some bits of this circuit (see map_bits)
+        and located at the append call.
+
+        Args:
+            subcircuit: Own operations of the appended circuit (its `own` table, for a composed one)
+            qubits: Qubits of this circuit receiving the subcircuit qubits
+            clbits: Clbits of this circuit receiving the subcircuit clbits
+            row: Row of the append call
+            column_start: Column where the append call starts
+            column_end: Column where the append call ends
+        """
+        reference = ('table', subcircuit, len(subcircuit), tuple(qubits), tuple(clbits), (row, column_start, column_end))
+        if '_segments' not in self.__dict__:
+            self._extend_reference(reference)
+        elif reference[2]:
+            self._segments.append(reference)
+
+    def _extend_reference(self, reference) -> None:
+        _, subcircuit, count, qubits, clbits, location = reference
+        views = subcircuit.__dict__.setdefault('_mapped_views', {})
+        key = (count, qubits, clbits)
+        view = views.get(key)
+        if view is None:
+            view = OperationTable(self.lines)
+            for index in range(count):
+                view.append(subcircuit.name(index), map_bits(subcircuit.qubits(index), qubits),
+                            map_bits(subcircuit.clbits(index), clbits), 0, 0, 0, subcircuit.params.get(index))
+            views[key] = view
+        OperationTable.extend(self, view, location)
+
+    def _expand(self) -> None:
+        segments = self.__dict__.pop('_segments')
+        own = self.__dict__.pop('own')
+        OperationTable.__init__(self, self.lines)
+        for segment in segments:
+            if segment[0] == 'own':
+                _, start, end = segment
+                if start == 0 and end == len(own):
+                    OperationTable.extend(self, own)
+                else:
+                    for index in range(start, end):
+                        OperationTable.append(self, own.name(index), own.qubits(index), own.clbits(index),
+                                              own.rows[index], own.column_starts[index], own.column_ends[index],
+                                              own.params.get(index))
+            else:
+                self._extend_reference(segment)
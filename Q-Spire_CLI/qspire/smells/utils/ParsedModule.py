@@ -0,0 +1,160 @@
+import ast
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Set, Tuple
+
+from smells.utils.SourceCleaner import CleanedSource, clean_source
+
+"""
+Source, lines, AST and tokens of an analyzed file, shared by the passes that read it.
+
+The detectors, QuantumCircuitAnalyzer, BackendAnalyzer, RunExecuteParametersCalls and the static
+helpers all start from the same file. While the file is retained (AnalysisSession retains it for
+the duration of its analysis), ParsedModule.for_file gives every pass the same ParsedModule: the
+file is read once, parsed once and tokenized once. The cached module is rebuilt when the
+modification time or the size of the file changes, and dropped when the last retain is released.
+
+Outside of a retained analysis, for_file still works but builds a private ParsedModule.
+
+A file may also stand in for another one (see stand_in): the language server analyzes a copy of
+an unsaved buffer, written in a private folder, as the document it comes from, so that the local
+modules it imports resolve from the folder of the document.
+"""
+
+# Files retained by an analysis, keyed by normalized path: [retain count, ParsedModule or None]
+_retained_modules: Dict[str, List] = {}
+_retained_modules_lock = threading.Lock()
+
+# Copies analyzed in place of other files, keyed by normalized path: path of the original file
+_stand_ins: Dict[str, str] = {}
+
+
+def _normalize(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ParsedModule:
+    """A file read, parsed and tokenized once; passes must not modify its AST (see parse)."""
+
+    def __init__(self, path: str, source: str = None, stamp: Tuple[int, int] = None):
+        """
+        Args:
+            path: Path to the Python file
+            source: Source code of the file (default: read from the file)
+            stamp: (modification time in ns, size) of the file when it was read
+        """
+        self.path = path
+        self.stamp = stamp if stamp is not None else _stamp(path)
+        if source is None:
+            with open(path, 'r', encoding="utf-8") as f:
+                source = f.read()
+        self.source = source
+        self.lines = tuple(source.split('\n'))
+        self._tree = None
+        self._cleaned = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_file(cls, path: str) -> "ParsedModule":
+        """
+        Return the ParsedModule of a file, shared while the file is retained.
+
+        Args:
+            path: Path to the Python file
+
+        Returns:
+            The cached ParsedModule when the file is retained and unchanged, otherwise a new one
+        """
+        key = _normalize(path)
+        stamp = _stamp(path)
+        with _retained_modules_lock:
+            entry = _retained_modules.get(key)
+            if entry is None:
+                return cls(path, stamp=stamp)
+            module = entry[1]
+            if module is None or module.stamp != stamp:
+                module = entry[1] = cls(path, stamp=stamp)
+            return module
+
+    @staticmethod
+    def retain(path: str) -> None:
+        """Cache the ParsedModule of a file until the matching release."""
+        key = _normalize(path)
+        with _retained_modules_lock:
+            _retained_modules.setdefault(key, [0, None])[0] += 1
+
+    @staticmethod
+    def release(path: str) -> None:
+        """Undo a retain; the cached ParsedModule is dropped with the last one."""
+        key = _normalize(path)
+        with _retained_modules_lock:
+            entry = _retained_modules.get(key)
+            if entry is not None:
+                entry[0] -= 1
+                if entry[0] <= 0:
+                    del _retained_modules[key]
+
+    @staticmethod
+    @contextmanager
+    def retained(path: str):
+        """Retain a file for the duration of a with block."""
+        ParsedModule.retain(path)
+        try:
+            yield
+        finally:
+            ParsedModule.release(path)
+
+    @staticmethod
+    @contextmanager
+    def stand_in(copy_path: str, original_path: str):
+        """Analyze copy_path as original_path (see original_path) for the duration of a with block."""
+        key = _normalize(copy_path)
+        with _retained_modules_lock:
+            _stand_ins[key] = os.path.abspath(original_path)
+        try:
+            yield
+        finally:
+            with _retained_modules_lock:
+                _stand_ins.pop(key, None)
+
+    @staticmethod
+    def original_path(path: str) -> str:
+        """Path of the file a copy stands in for (see stand_in), or the path itself."""
+        with _retained_modules_lock:
+            return _stand_ins.get(_normalize(path), path)
+
+    @property
+    def tree(self) -> ast.Module:
+        """AST of the file, shared by the passes: read it, do not transform it."""
+        with self._lock:
+            if self._tree is None:
+                self._tree = ast.parse(self.source)
+            return self._tree
+
+    def parse(self) -> ast.Module:
+        """A new AST of the file, for a pass that transforms it (e.g. to instrument the code)."""
+        return ast.parse(self.source)
+
+    @property
+    def cleaned(self) -> CleanedSource:
+        """The source without comments and triple-quoted strings (see SourceCleaner)."""
+        with self._lock:
+            if self._cleaned is None:
+                self._cleaned = clean_source(self.source)
+            return self._cleaned
+
+    @property
+    def tokens(self) -> list:
+        """Token stream of the file (empty if it cannot be tokenized)."""
+        return self.cleaned.tokens
+
+    @property
+    def comment_lines(self) -> Set[int]:
+        """Rows (1-based) holding a comment or a docstring."""
+        return self.cleaned.comment_lines
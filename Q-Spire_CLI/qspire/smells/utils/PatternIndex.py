@@ -0,0 +1,303 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from smells.utils.CircuitBatches import batch_signature
+
+"""
+Project-wide index of the circuits of a folder run, finding the blocks copy-pasted across
+circuits and files.
+
+Every circuit is reduced to the sequence of the digests of its batch signatures (signature_digest:
+a 64-bit BLAKE2 hash, the same in every process and run, unlike hash() of strings). The index keeps:
+
+- the n-grams of NGRAM consecutive batches of every circuit, with their occurrences: the n-grams
+  found in several circuits are merged into maximal repeated blocks (repeated_blocks);
+- a MinHash of the n-gram set of every circuit, bucketed by LSH bands, to find the circuits sharing
+  most of their blocks without comparing every pair of circuits (similar_circuits).
+
+Circuits shorter than NGRAM batches are not indexed.
+
+The circuits of a file are recorded from the AnalysisSessions closed while recording_patterns() is
+active, so that the worker processes of a folder run send them back with the smells of the file
+(see detect_with_patterns).
+"""
+
+NGRAM = 4  # Batches per n-gram: the shortest block reported
+NUM_PERMUTATIONS = 64  # Hash functions of a MinHash
+BANDS = 16  # LSH bands of NUM_PERMUTATIONS // BANDS hash values: pairs above ~50% similarity collide
+
+_PRIME = (1 << 31) - 1  # Modulus of the MinHash hash functions
+_SEED = 20240611  # Fixed, so that the MinHashes of every run are comparable
+_CHUNK = 8192  # n-grams hashed at once by a MinHash
+
+
+class CircuitPattern(NamedTuple):
+    """Batch digests of a circuit, with the first source row of every batch."""
+    circuit_name: str
+    digests: Tuple[int, ...]
+    rows: Tuple[Optional[int], ...]
+
+
+class BlockOccurrence(NamedTuple):
+    """Position of a repeated block: batches (from 1) and source rows of a circuit of a file."""
+    file: str
+    circuit_name: str
+    first_batch: int
+    last_batch: int
+    first_row: Optional[int]
+    last_row: Optional[int]
+
+
+class RepeatedBlock(NamedTuple):
+    """Block of consecutive batches found in more than one circuit."""
+    batches: int
+    occurrences: List[BlockOccurrence]
+
+
+class SimilarCircuits(NamedTuple):
+    """Two circuits sharing most of their n-grams, with the estimated Jaccard similarity of their sets."""
+    first: Tuple[str, str]  # (file, circuit name)
+    second: Tuple[str, str]
+    similarity: float
+
+
+def signature_digest(signature: tuple) -> int:
+    """Stable 64-bit digest of a batch signature (see batch_signature)."""
+    return int.from_bytes(hashlib.blake2b(repr(signature).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def circuit_pattern(circuit_name: str, circuit_batches: Dict[int, List[Dict]]) -> CircuitPattern:
+    """
+    Pattern of a circuit.
+
+    Args:
+        circuit_name: Name of the circuit
+        circuit_batches: Batches of the circuit (see create_circuit_batches)
+
+    Returns:
+        CircuitPattern with the digests and first rows of the batches, in batch order
+    """
+    digests = []
+    rows = []
+    for number in sorted(circuit_batches):
+        batch = circuit_batches[number]
+        digests.append(signature_digest(batch_signature(batch)))
+        batch_rows = [op['row'] for op in batch if op.get('row') is not None]
+        rows.append(min(batch_rows) if batch_rows else None)
+    return CircuitPattern(circuit_name, tuple(digests), tuple(rows))
+
+
+# Lists receiving the patterns of the sessions closed while recording_patterns() is active
+_recorders = []
+_recorders_lock = threading.Lock()
+
+
+@contextmanager
+def recording_patterns():
+    """
+    Record the circuit patterns of the analysis sessions closed inside the block.
+
+    Yields:
+        List receiving a CircuitPattern for every circuit analyzed, without duplicates
+    """
+    patterns = []
+    with _recorders_lock:
+        _recorders.append(patterns)
+    try:
+        yield patterns
+    finally:
+        with _recorders_lock:
+            for i, recorder in enumerate(_recorders):
+                if recorder is patterns:
+                    del _recorders[i]
+                    break
+
+
+def record_session_patterns(session):
+    """Record the patterns of the circuits of an AnalysisSession, when recording_patterns() is active."""
+    with _recorders_lock:
+        recorders = list(_recorders)
+    if not recorders:
+        return
+    patterns = [circuit_pattern(name, session.circuit_batches(name)) for name in session.operations]
+    with _recorders_lock:
+        for recorder in recorders:
+            # The static analysis runs several executables of the same file, often with the same circuits
+            recorder.extend(pattern for pattern in patterns if pattern not in recorder)
+
+
+def detect_with_patterns(detect_function, file):
+    """
+    Run a detection function on a file, recording the patterns of its circuits.
+
+    Args:
+        detect_function: Function taking a file path and returning a list of smells
+        file: Path to the Python file to analyze
+
+    Returns:
+        Tuple of (smells, list of CircuitPattern)
+    """
+    with recording_patterns() as patterns:
+        smells = detect_function(file)
+    return smells, patterns
+
+
+def split_patterns(result):
+    """
+    Smells and patterns of a result of detect_with_patterns.
+
+    Returns:
+        Tuple of (smells, list of CircuitPattern), the patterns being None when the analysis did not
+        complete (e.g. the worker process failed and gave an empty list of smells)
+    """
+    if isinstance(result, tuple):
+        return result
+    return result, None
+
+
+class PatternIndex:
+    """Exact n-gram occurrences and MinHash LSH buckets of the circuits of a folder."""
+
+    def __init__(self, ngram: int = NGRAM, num_permutations: int = NUM_PERMUTATIONS, bands: int = BANDS):
+        """
+        Args:
+            ngram: Batches per n-gram, i.e. length of the shortest block reported
+            num_permutations: Hash functions of the MinHash of a circuit
+            bands: LSH bands, each of num_permutations // bands hash values
+        """
+        self.ngram = ngram
+        self.bands = bands
+        self.band_size = num_permutations // bands
+        rng = np.random.default_rng(_SEED)
+        self._multipliers = rng.integers(1, _PRIME, size=(num_permutations, 1), dtype=np.int64)
+        self._increments = rng.integers(0, _PRIME, size=(num_permutations, 1), dtype=np.int64)
+
+        self.circuits: List[Tuple[str, CircuitPattern]] = []  # (file, pattern) of the indexed circuits
+        self._ngrams = {}  # n-gram (tuple of digests) -> list of (circuit position, batch offset)
+        self._minhashes = []  # circuit position -> MinHash of its n-grams
+        self._buckets = {}  # (band, band values) -> list of circuit positions
+
+    def add_file(self, file: str, patterns: List[CircuitPattern]):
+        """
+        Index the circuits of a file.
+
+        Args:
+            file: Path of the analyzed file
+            patterns: Patterns of its circuits (see recording_patterns)
+        """
+        for pattern in patterns:
+            self.add_circuit(file, pattern)
+
+    def add_circuit(self, file: str, pattern: CircuitPattern):
+        """Index a circuit of a file."""
+        digests = pattern.digests
+        if len(digests) < self.ngram:
+            return
+        position = len(self.circuits)
+        self.circuits.append((file, pattern))
+
+        shingles = set()
+        for offset in range(len(digests) - self.ngram + 1):
+            gram = digests[offset:offset + self.ngram]
+            self._ngrams.setdefault(gram, []).append((position, offset))
+            shingles.add(hash(gram) % _PRIME)
+
+        minhash = self._minhash(np.fromiter(shingles, dtype=np.int64, count=len(shingles)))
+        self._minhashes.append(minhash)
+        for band in range(self.bands):
+            values = minhash[band * self.band_size:(band + 1) * self.band_size].tobytes()
+            self._buckets.setdefault((band, values), []).append(position)
+
+    def _minhash(self, shingles: np.ndarray) -> np.ndarray:
+        minhash = np.full(len(self._multipliers), _PRIME, dtype=np.int64)
+        for start in range(0, len(shingles), _CHUNK):
+            chunk = shingles[start:start + _CHUNK]
+            hashes = (self._multipliers * chunk + self._increments) % _PRIME
+            np.minimum(minhash, hashes.min(axis=1), out=minhash)
+        return minhash
+
+    def repeated_blocks(self, min_circuits: int = 2) -> List[RepeatedBlock]:
+        """
+        Maximal blocks of consecutive batches found in several circuits.
+
+        The shared n-grams are chained while the next n-gram has the same occurrences, each one batch
+        further, so that a block copy-pasted with its k batches is reported once, not as k - NGRAM + 1
+        n-grams.
+
+        Args:
+            min_circuits: Minimum number of distinct circuits holding the block
+
+        Returns:
+            List of RepeatedBlock, the most repeated and longest first
+        """
+        shared = {gram: occurrences for gram, occurrences in self._ngrams.items()
+                  if len({position for position, _ in occurrences}) >= min_circuits}
+
+        blocks = []
+        covered = set()  # (circuit position, offset) of the n-grams already in a block
+        for position, (_, pattern) in enumerate(self.circuits):
+            digests = pattern.digests
+            last_offset = len(digests) - self.ngram
+            for offset in range(last_offset + 1):
+                if (position, offset) in covered:
+                    continue
+                occurrences = shared.get(digests[offset:offset + self.ngram])
+                if occurrences is None:
+                    continue
+
+                length = 1  # n-grams in the block
+                current = set(occurrences)
+                while offset + length <= last_offset:
+                    following = shared.get(digests[offset + length:offset + length + self.ngram])
+                    shifted = {(circuit, start + 1) for circuit, start in current}
+                    if following is None or len(following) != len(shifted) or set(following) != shifted:
+                        break
+                    current = shifted
+                    length += 1
+
+                for circuit, start in occurrences:
+                    covered.update((circuit, start + k) for k in range(length))
+                blocks.append(self._block(occurrences, length + self.ngram - 1))
+
+        blocks.sort(key=lambda block: (-len(block.occurrences), -block.batches))
+        return blocks
+
+    def _block(self, occurrences, batches):
+        located = []
+        for position, offset in sorted(occurrences):
+            file, pattern = self.circuits[position]
+            rows = [row for row in pattern.rows[offset:offset + batches] if row is not None]
+            located.append(BlockOccurrence(file, pattern.circuit_name, offset + 1, offset + batches,
+                                           min(rows) if rows else None, max(rows) if rows else None))
+        return RepeatedBlock(batches, located)
+
+    def similar_circuits(self, threshold: float = 0.5) -> List[SimilarCircuits]:
+        """
+        Pairs of circuits whose n-gram sets are similar, found through the LSH buckets.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity of the n-gram sets
+
+        Returns:
+            List of SimilarCircuits, the most similar first
+        """
+        candidates = set()
+        for positions in self._buckets.values():
+            for i, first in enumerate(positions):
+                for second in positions[i + 1:]:
+                    candidates.add((first, second))
+
+        pairs = []
+        for first, second in sorted(candidates):
+            similarity = float(np.mean(self._minhashes[first] == self._minhashes[second]))
+            if similarity >= threshold:
+                first_file, first_pattern = self.circuits[first]
+                second_file, second_pattern = self.circuits[second]
+                pairs.append(SimilarCircuits((first_file, first_pattern.circuit_name),
+                                             (second_file, second_pattern.circuit_name), similarity))
+        pairs.sort(key=lambda pair: -pair.similarity)
+        return pairs
@@ -0,0 +1,158 @@
+from array import array
+from typing import List, Tuple
+
+import numpy as np
+
+from smells.utils.OperationTable import OperationTable
+
+"""
+Per-qubit timelines of a circuit, shared by the IdQ, IQ and IM detectors and the LC fidelity estimate.
+
+One pass over the operations of the circuit places every operation in its ASAP layer (the same
+layering as create_circuit_batches, batch number = layer) and appends (layer, operation index,
+gate id) to the timeline of each of its qubits. The three rules are then read from the timelines:
+
+- idle_gaps (IdQ): layers between two consecutive operations of a qubit;
+- first_gaps (IQ): layers between the first and the second operation of a qubit;
+- non_terminal_measures (IM): measurements followed by another operation on the same qubit.
+
+The layer of every operation is kept as well (operation_layers), for the per-layer error curves of
+the FidelityEstimator.
+
+The idle gaps of large timelines (at least VECTORIZE_MIN_ENTRIES qubit operations) are computed
+with NumPy: the layer arrays of all the qubits are concatenated and the gaps come from one np.diff,
+the pairs straddling two qubits being masked out. Small circuits keep the plain Python loop, which
+is faster than converting the arrays.
+"""
+
+# Number of (qubit, operation) entries from which idle_gaps switches to the NumPy kernel
+VECTORIZE_MIN_ENTRIES = 2048
+
+
+class QubitTimeline:
+    """Layer, operation index and gate id of the operations of every qubit, in execution order."""
+
+    def __init__(self, operations: OperationTable):
+        """
+        Args:
+            operations: Operations of the circuit (an OperationTable, see AnalysisSession.operations)
+        """
+        self.operations = operations
+        self.layers = {}  # qubit -> array of the layers (batch numbers, from 1) of its operations
+        self.op_indices = {}  # qubit -> array of the indices of its operations in the table
+        self.gate_ids = {}  # qubit -> array of the name ids of its operations in the table
+        self.operation_layers = array('i')  # operation index -> its layer
+        # First-seen order of the qubits walking the batches (layer, then operation index)
+        self._first_seen = {}
+        self.num_entries = len(operations.qubit_indices)  # Total length of the per-qubit arrays
+
+        name_ids = operations.name_ids
+        offsets = operations.qubit_offsets
+        indices = operations.qubit_indices
+        qubit_last_layer = {}
+        for index in range(len(operations)):
+            qubits = indices[offsets[index]:offsets[index + 1]]
+
+            layer = 0
+            for qubit in qubits:
+                last_layer = qubit_last_layer.get(qubit, 0)
+                if last_layer > layer:
+                    layer = last_layer
+            layer += 1
+            self.operation_layers.append(layer)
+
+            for position, qubit in enumerate(qubits):
+                qubit_last_layer[qubit] = layer
+                if qubit not in self.layers:
+                    self.layers[qubit] = array('i')
+                    self.op_indices[qubit] = array('i')
+                    self.gate_ids[qubit] = array('i')
+                    self._first_seen[qubit] = (layer, index, position)
+                self.layers[qubit].append(layer)
+                self.op_indices[qubit].append(index)
+                self.gate_ids[qubit].append(name_ids[index])
+
+    def qubits(self) -> List[int]:
+        """Qubits in the order of their first operation."""
+        return list(self.layers)
+
+    def qubits_by_layer(self) -> List[int]:
+        """Qubits in the order they are first met walking the batches."""
+        return sorted(self._first_seen, key=self._first_seen.__getitem__)
+
+    def idle_gaps(self, max_distance: int) -> List[Tuple[int, int, int]]:
+        """
+        Consecutive operations of a qubit separated by more than max_distance layers (IdQ).
+
+        Returns:
+            List of (qubit, index of the later operation, number of layers in between)
+        """
+        if self.num_entries >= VECTORIZE_MIN_ENTRIES:
+            return self._idle_gaps_vectorized(max_distance)
+        gaps = []
+        for qubit in self.qubits_by_layer():
+            layers = self.layers[qubit]
+            op_indices = self.op_indices[qubit]
+            for i in range(1, len(layers)):
+                distance = layers[i] - layers[i - 1] - 1
+                if distance > max_distance:
+                    gaps.append((qubit, op_indices[i], distance))
+        return gaps
+
+    def _idle_gaps_vectorized(self, max_distance: int) -> List[Tuple[int, int, int]]:
+        """idle_gaps computed on the concatenated timelines of all the qubits, in the same order."""
+        qubits = self.qubits_by_layer()
+        if not qubits:
+            return []
+        lengths = np.fromiter((len(self.layers[qubit]) for qubit in qubits), dtype=np.intp, count=len(qubits))
+        layers = np.concatenate([np.frombuffer(self.layers[qubit], dtype=np.intc) for qubit in qubits])
+        op_indices = np.concatenate([np.frombuffer(self.op_indices[qubit], dtype=np.intc) for qubit in qubits])
+
+        # distances[i] is the gap between the entries i and i + 1
+        distances = np.diff(layers) - 1
+        is_gap = distances > max_distance
+        # The last entry of a qubit and the first of the next one are not consecutive operations
+        is_gap[np.cumsum(lengths)[:-1] - 1] = False
+        hits = np.flatnonzero(is_gap)
+        if not len(hits):
+            return []
+
+        qubit_positions = np.repeat(np.arange(len(qubits)), lengths)[hits + 1]
+        return [(qubits[position], op_index, distance) for position, op_index, distance in zip(
+            qubit_positions.tolist(), op_indices[hits + 1].tolist(), distances[hits].tolist())]
+
+    def first_gaps(self, max_distance: int) -> List[Tuple[int, int, int]]:
+        """
+        First and second operations of a qubit separated by more than max_distance layers (IQ).
+
+        Returns:
+            List of (qubit, index of the second operation, number of layers in between)
+        """
+        gaps = []
+        for qubit in self.qubits_by_layer():
+            layers = self.layers[qubit]
+            if len(layers) < 2:
+                continue
+            distance = layers[1] - layers[0] - 1
+            if distance > max_distance:
+                gaps.append((qubit, self.op_indices[qubit][1], distance))
+        return gaps
+
+    def non_terminal_measures(self, gate_name: str = 'measure') -> List[Tuple[int, int]]:
+        """
+        Measurements of a qubit followed by another operation on the same qubit (IM).
+
+        Returns:
+            List of (qubit, index of the measurement)
+        """
+        measure_id = self.operations.name_id(gate_name)
+        if measure_id is None:
+            return []
+        measures = []
+        for qubit, gate_ids in self.gate_ids.items():
+            op_indices = self.op_indices[qubit]
+            for i in range(len(gate_ids) - 1):
+                if gate_ids[i] == measure_id:
+                    measures.append((qubit, op_indices[i]))
+        return measures
+
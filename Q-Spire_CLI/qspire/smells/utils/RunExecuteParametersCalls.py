@@ -6,6 +6,8 @@ import os
 from typing import Dict, List, Any, Tuple
 from collections import defaultdict
 
+from smells.utils.ParsedModule import ParsedModule
+
 class RunExecuteParametersCalls:
     """
     Dynamically tracks function calls by executing the code with instrumentation.
@@ -16,6 +18,8 @@ class RunExecuteParametersCalls:
         self.target_functions = {'run', 'execute', 'assign_parameters', 'bind_parameters'}
         self.call_info = defaultdict(list)
         self.debug = False
+        self.namespace = {}  # Globals of the executed file, kept for reuse by other analyzers
+        self.execution_error = None  # Exception raised by the analyzed code, if any
     
     def analyze_file(self, filepath: str, debug: bool = False) -> Tuple[List[Dict], List[Dict], List[Dict], List[Dict]]:
         """
@@ -36,16 +40,17 @@ class RunExecuteParametersCalls:
         # Reset state
         self.call_info = defaultdict(list)
         self.debug = debug
+        self.namespace = {}
+        self.execution_error = None
         
-        # Read source code
-        with open(filepath, 'r', encoding="utf-8") as f:
-            source_code = f.read()
+        # Read source code (shared with the other passes over the file)
+        parsed = ParsedModule.for_file(filepath)
         
         if debug:
             print(f"Dynamically analyzing file: {filepath}")
         
-        # Parse and instrument the code
-        tree = ast.parse(source_code)
+        # Parse and instrument the code (a tree of our own: the instrumentor transforms it)
+        tree = parsed.parse()
         instrumentor = FunctionCallInstrumentor(self)
         instrumented_tree = instrumentor.visit(tree)
         ast.fix_missing_locations(instrumented_tree)
@@ -63,6 +68,7 @@ class RunExecuteParametersCalls:
                 '_track_function_call': self._track_function_call,
                 '_mock_run': self._mock_run,
             }
+            self.namespace = exec_globals
             
             # Try to import common quantum libraries to avoid import errors
             try:
@@ -92,6 +98,7 @@ class RunExecuteParametersCalls:
                 # Continue normally - we've already collected the function calls
             except Exception as e:
                 # Catch any other exceptions from the analyzed code
+                self.execution_error = e
                 if debug:
                     print(f"Exception during code execution: {e}")
                     import traceback
@@ -103,6 +110,7 @@ class RunExecuteParametersCalls:
                 
         except Exception as e:
             # This catches compilation errors or other critical issues
+            self.execution_error = e
             if debug:
                 print(f"Error during code compilation or setup: {e}")
                 import traceback
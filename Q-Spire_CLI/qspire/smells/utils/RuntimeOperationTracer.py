@@ -0,0 +1,318 @@
+import os
+import sys
+import sysconfig
+import threading
+from typing import Dict, List, Tuple, Any
+
+from qiskit import QuantumCircuit
+from qiskit.circuit import ParameterExpression
+
+from smells.utils.OperationTable import OperationTable
+from smells.utils.ParsedModule import ParsedModule
+
+"""
+Runtime extraction of the circuit operations (config.json: "Operation_extraction": "runtime").
+
+Instead of parsing the source lines again after the execution (see QuantumCircuitAnalyzer), the
+tracer intercepts QuantumCircuit._append, append, compose and copy while the file is executed,
+and records every instruction with the line and columns of the call in the analyzed file that
+added it. Loops, functions and computed qubit indices need no textual expansion: the operations
+are exactly the ones executed. Every circuit gets an OperationTable, like with QuantumCircuitAnalyzer.
+"""
+
+# Instructions whose params are never qiskit Parameters (same list as QuantumCircuitAnalyzer)
+OPERATIONS_WITHOUT_PARAMS = {
+    'repeat', 'barrier', 'measure', 'reset', 'measure_all',
+    'remove_final_measurements', 'reverse_bits', 'clear'
+}
+
+_QISKIT_DIRECTORY = os.path.dirname(os.path.abspath(sys.modules["qiskit"].__file__)) + os.sep
+# Frames of these folders belong to the QuantumCircuit methods called by the analyzed code
+_CIRCUIT_DIRECTORY = os.path.join(_QISKIT_DIRECTORY, "circuit") + os.sep
+# Frames of these folders build circuits of their own (transpiler, libraries...), never recorded
+_LIBRARY_DIRECTORIES = tuple({
+    _QISKIT_DIRECTORY,
+    *(os.path.abspath(path) + os.sep for key in ("purelib", "platlib", "stdlib", "platstdlib")
+      if (path := sysconfig.get_paths().get(key)))
+})
+
+# Tracers currently recording, keyed by the normalized path of their file
+_active_tracers = {}
+_active_tracers_lock = threading.Lock()
+_original_methods = {}
+_state = threading.local()
+
+
+def _normalize(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _frame_kind(filename: str, cache: Dict[str, Any] = {}):
+    """The tracer of an analyzed file, "circuit", "library" or None (other user code)."""
+    known = cache.get(filename)
+    if known is None:
+        normalized = _normalize(filename)
+        if normalized.startswith(_CIRCUIT_DIRECTORY):
+            kind = "circuit"
+        elif normalized.startswith(_LIBRARY_DIRECTORIES):
+            kind = "library"
+        else:
+            kind = None
+        known = cache[filename] = (normalized, kind)
+    normalized, kind = known
+    return _active_tracers.get(normalized, kind)
+
+
+def _caller(frame):
+    """
+    Find the analyzed file behind a QuantumCircuit call.
+
+    Returns:
+        Tuple of (tracer, frame of the analyzed file, frame calling into qiskit), or None when the
+        call comes from library code (e.g. the transpiler building its own circuits)
+    """
+    user_frame = None
+    while frame is not None:
+        kind = _frame_kind(frame.f_code.co_filename)
+        if isinstance(kind, RuntimeOperationTracer):
+            return kind, frame, user_frame or frame
+        if kind == "library":
+            return None
+        if kind is None and user_frame is None:
+            # Helper code of the project (another module): its calls are reported where the
+            # analyzed file called it
+            user_frame = frame
+        frame = frame.f_back
+    return None
+
+
+def _bit_indices(circuit, bits) -> List[int]:
+    return [circuit.find_bit(bit).index for bit in bits]
+
+
+def _traced_append_(self, instruction, qargs=(), cargs=(), **kwargs):
+    if getattr(_state, "busy", False):
+        return _original_methods["_append"](self, instruction, qargs, cargs, **kwargs)
+    caller = _caller(sys._getframe(1))
+    if caller is None:
+        return _original_methods["_append"](self, instruction, qargs, cargs, **kwargs)
+
+    _state.busy = True
+    try:
+        result = _original_methods["_append"](self, instruction, qargs, cargs, **kwargs)
+    finally:
+        _state.busy = False
+
+    tracer, frame, local_frame = caller
+    if hasattr(instruction, "operation"):
+        operation, qubits, clbits = instruction.operation, instruction.qubits, instruction.clbits
+    else:
+        operation, qubits, clbits = instruction, qargs, cargs
+    location = tracer.location(frame)
+    target, operand = getattr(_state, "operand", (None, None))
+    if target is self:
+        # circuit.append(subcircuit, ...): the operations of the subcircuit, on the target bits
+        tracer.record_circuit(self, operand, _bit_indices(self, qubits), _bit_indices(self, clbits),
+                              location, local_frame)
+    else:
+        tracer.record(self, operation, _bit_indices(self, qubits), _bit_indices(self, clbits),
+                      location, local_frame)
+    return result
+
+
+def _traced_append(self, instruction, *args, **kwargs):
+    if getattr(_state, "busy", False) or not isinstance(instruction, QuantumCircuit):
+        return _original_methods["append"](self, instruction, *args, **kwargs)
+    previous = getattr(_state, "operand", (None, None))
+    _state.operand = (self, instruction)
+    try:
+        return _original_methods["append"](self, instruction, *args, **kwargs)
+    finally:
+        _state.operand = previous
+
+
+def _traced_compose(self, other, qubits=None, clbits=None, front=False, inplace=False, *args, **kwargs):
+    if getattr(_state, "busy", False) or not isinstance(other, QuantumCircuit):
+        return _original_methods["compose"](self, other, qubits, clbits, front, inplace, *args, **kwargs)
+    caller = _caller(sys._getframe(1))
+    if caller is None:
+        return _original_methods["compose"](self, other, qubits, clbits, front, inplace, *args, **kwargs)
+
+    _state.busy = True
+    try:
+        result = _original_methods["compose"](self, other, qubits, clbits, front, inplace, *args, **kwargs)
+    finally:
+        _state.busy = False
+
+    tracer, frame, local_frame = caller
+    target = self if result is None else result
+    if target is not self:
+        tracer.copy_circuit(self, target)
+
+    qubit_indices = (list(range(other.num_qubits)) if qubits is None
+                     else _bit_indices(target, target._qbit_argument_conversion(qubits)))
+    clbit_indices = (list(range(other.num_clbits)) if clbits is None
+                     else _bit_indices(target, target._cbit_argument_conversion(clbits)))
+    tracer.record_circuit(target, other, qubit_indices, clbit_indices, tracer.location(frame),
+                          local_frame, front=front)
+    return result
+
+
+def _traced_copy(self, *args, **kwargs):
+    result = _original_methods["copy"](self, *args, **kwargs)
+    if not getattr(_state, "busy", False) and isinstance(result, QuantumCircuit):
+        caller = _caller(sys._getframe(1))
+        if caller is not None:
+            caller[0].copy_circuit(self, result)
+    return result
+
+
+_TRACED_METHODS = {
+    "_append": _traced_append_,
+    "append": _traced_append,
+    "compose": _traced_compose,
+    "copy": _traced_copy,
+}
+
+
+class RuntimeOperationTracer:
+    """
+    Record the operations added to the circuits while a file is executed.
+
+    Usage:
+        with RuntimeOperationTracer(filepath) as tracer:
+            exec(compile(source, filepath, "exec"), namespace)
+        operations = tracer.circuit_operations(namespace)
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.lines = []
+        self._circuits = {}  # id -> (circuit, OperationTable); the circuit is kept so its id is not reused
+        self._local_names = {}  # id -> name of the variable holding the circuit where it was first used
+        self._positions = {}  # code object -> positions of its instructions
+
+    def __enter__(self):
+        self.lines = list(ParsedModule.for_file(self.filepath).lines)
+        with _active_tracers_lock:
+            if not _active_tracers:
+                for name, method in _TRACED_METHODS.items():
+                    _original_methods[name] = getattr(QuantumCircuit, name)
+                    setattr(QuantumCircuit, name, method)
+            _active_tracers[_normalize(self.filepath)] = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        with _active_tracers_lock:
+            _active_tracers.pop(_normalize(self.filepath), None)
+            if not _active_tracers:
+                for name in _TRACED_METHODS:
+                    setattr(QuantumCircuit, name, _original_methods.pop(name))
+        return False
+
+    def location(self, frame) -> Tuple[int, int, int]:
+        """Row and columns of the call being executed by a frame of the analyzed file."""
+        row = frame.f_lineno
+        line = self.lines[row - 1] if 0 < row <= len(self.lines) else ''
+        column_start = len(line) - len(line.lstrip())
+        column_end = len(line.rstrip())
+
+        code = frame.f_code
+        positions = self._positions.get(code)
+        if positions is None and hasattr(code, "co_positions"):
+            positions = self._positions[code] = list(code.co_positions())
+        if positions and 0 <= frame.f_lasti // 2 < len(positions):
+            start_row, end_row, start_column, end_column = positions[frame.f_lasti // 2]
+            if start_row == row and start_column is not None:
+                column_start = start_column
+                if end_row == row and end_column is not None:
+                    column_end = end_column
+
+        return row, column_start, column_end
+
+    @staticmethod
+    def parameters(operation) -> List[str]:
+        """The qiskit Parameters of an instruction, like the textual extraction."""
+        if operation.name.lower() in OPERATIONS_WITHOUT_PARAMS:
+            return []
+        return [str(param) for param in getattr(operation, 'params', []) if isinstance(param, ParameterExpression)]
+
+    def _table(self, circuit, local_frame=None) -> OperationTable:
+        entry = self._circuits.get(id(circuit))
+        if entry is None:
+            entry = self._circuits[id(circuit)] = (circuit, OperationTable(self.lines))
+        if local_frame is not None and id(circuit) not in self._local_names:
+            for name, value in local_frame.f_locals.items():
+                if value is circuit:
+                    self._local_names[id(circuit)] = name
+                    break
+        return entry[1]
+
+    def record(self, circuit, operation, qubits: List[int], clbits: List[int],
+               location: Tuple[int, int, int], local_frame=None) -> None:
+        self._table(circuit, local_frame).append(operation.name, qubits, clbits, *location,
+                                                 self.parameters(operation))
+
+    def record_circuit(self, circuit, subcircuit, qubits: List[int], clbits: List[int],
+                       location: Tuple[int, int, int], local_frame=None, front: bool = False) -> None:
+        """
+        Record the operations of a subcircuit appended (or composed) on some bits of a circuit,
+        located at the call adding it.
+        """
+        entry = self._circuits.get(id(subcircuit))
+        if entry is not None:
+            sub_table = entry[1]
+            sub_operations = ((sub_table.name(i), sub_table.qubits(i), sub_table.clbits(i), sub_table.params.get(i))
+                              for i in range(len(sub_table)))
+        else:
+            # Not built by the analyzed code: its instructions as they are now
+            sub_operations = ((instruction.operation.name, _bit_indices(subcircuit, instruction.qubits),
+                               _bit_indices(subcircuit, instruction.clbits), self.parameters(instruction.operation))
+                              for instruction in subcircuit.data)
+
+        added = OperationTable(self.lines)
+        for name, sub_qubits, sub_clbits, params in sub_operations:
+            added.append(name,
+                         [qubits[q] for q in sub_qubits if q < len(qubits)],
+                         [clbits[c] for c in sub_clbits if c < len(clbits)],
+                         *location, params)
+
+        table = self._table(circuit, local_frame)
+        if front:
+            added.extend(table)
+            self._circuits[id(circuit)] = (circuit, added)
+        else:
+            table.extend(added)
+
+    def copy_circuit(self, circuit, copy) -> None:
+        """The copy of a recorded circuit starts with its operations."""
+        entry = self._circuits.get(id(circuit))
+        if entry is not None:
+            self._circuits[id(copy)] = (copy, entry[1].copy())
+
+    def circuit_operations(self, namespace: Dict[str, Any] = None) -> Dict[str, OperationTable]:
+        """
+        Operations of the circuits of the executed file.
+
+        Args:
+            namespace: Globals of the execution; circuits are named after the global variables
+                       holding them, otherwise after the local variable where they were first used
+
+        Returns:
+            Dictionary mapping circuit names to the OperationTable of their operations, in execution order
+        """
+        global_names = {}
+        results = {}
+        for name, value in (namespace or {}).items():
+            if isinstance(value, QuantumCircuit) and not name.startswith('__'):
+                global_names.setdefault(id(value), name)
+                if not value.data:
+                    results.setdefault(name, OperationTable(self.lines))
+
+        for circuit_id, (circuit, table) in self._circuits.items():
+            name = global_names.get(circuit_id) or self._local_names.get(circuit_id)
+            if name is None:
+                continue
+            # Circuits sharing a local name (e.g. built by a function called twice) are merged
+            results.setdefault(name, OperationTable(self.lines)).extend(table)
+        return results
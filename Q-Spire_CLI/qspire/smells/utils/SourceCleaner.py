@@ -0,0 +1,255 @@
+import io
+import threading
+import tokenize
+import weakref
+from bisect import bisect_right
+from typing import List, Set, Tuple
+
+"""
+Comment and multi-line string removal shared by the analyzers (QuantumCircuitAnalyzer,
+BackendAnalyzer and the static Mapping helpers).
+
+The source is tokenized once: COMMENT tokens and triple-quoted strings (docstrings and other
+multi-line strings) are blanked, everything else is kept as is, including ordinary strings.
+Lines are never merged or split, so a row of the cleaned source is the same row of the file, and
+the offset map of each row gives the column of the file for a column of the cleaned line.
+
+clean_source is memoized on the source text while its CleanedSource is in use (e.g. held by the
+ParsedModule of the file being analyzed): every analyzer of a run gets the same CleanedSource for
+the same file. Sources that cannot be tokenized (e.g. an unterminated string) are cleaned line
+by line with the previous scanner rules.
+"""
+
+_FSTRING_START = getattr(tokenize, "FSTRING_START", None)  # Python 3.12+: f-strings are split in tokens
+_FSTRING_END = getattr(tokenize, "FSTRING_END", None)
+
+
+def _is_triple_quoted(token_string: str) -> bool:
+    quotes = token_string.lstrip("rRbBuUfF")
+    return quotes[:3] in ('"""', "'''")
+
+
+def _is_likely_docstring(token, lines: Tuple[str, ...]) -> bool:
+    """
+    Determine if a string token is likely a docstring.
+    This is a heuristic based on position and content.
+    """
+    token_line = token.start[0]
+    if token_line <= len(lines):
+        line_content = lines[token_line - 1].strip()
+
+        # If the string starts at the beginning of a line (after whitespace)
+        # and uses triple quotes, it's likely a docstring
+        if (line_content.startswith('"""') or line_content.startswith("'''") or
+            line_content.startswith('r"""') or line_content.startswith("r'''")):
+            return True
+
+        # Also check if it's the first statement after a function/class definition
+        if token_line > 1:
+            prev_line = lines[token_line - 2].strip()
+            if (prev_line.endswith(':') and
+                (prev_line.startswith('def ') or prev_line.startswith('class ') or
+                 'def ' in prev_line or 'class ' in prev_line)):
+                return True
+
+    return False
+
+
+class CleanedSource:
+    """Source without comments and triple-quoted strings, with the columns of the original lines."""
+
+    def __init__(self, source: str):
+        """
+        Args:
+            source: Source code of the file
+        """
+        self.source = source
+        self.original_lines = tuple(source.split('\n'))
+        self.tokens = []  # token stream (empty when the source cannot be tokenized)
+        self.comments = []  # COMMENT tokens
+        self.strings = []  # STRING tokens
+        self.tokenized = True
+        self._comment_lines = None
+
+        removed = {}  # row (1-based) -> [(column_start, column_end)] removed from the line
+        try:
+            self._scan_tokens(removed)
+        except (tokenize.TokenError, SyntaxError):
+            self.tokenized = False
+            self.tokens, self.comments, self.strings = [], [], []
+            removed = self._scan_lines()
+
+        lines = []
+        self._offsets = []  # per line: (cleaned columns, original columns) where kept segments start
+        for row, line in enumerate(self.original_lines, 1):
+            spans = removed.get(row)
+            if not spans:
+                lines.append(line)
+                self._offsets.append(((0,), (0,)))
+                continue
+            parts, cleaned_starts, original_starts = [], [], []
+            position = length = 0
+            for start, end in sorted(spans):
+                if start > position:
+                    cleaned_starts.append(length)
+                    original_starts.append(position)
+                    parts.append(line[position:start])
+                    length += start - position
+                position = max(position, end)
+            if position < len(line):
+                cleaned_starts.append(length)
+                original_starts.append(position)
+                parts.append(line[position:])
+            lines.append(''.join(parts))
+            self._offsets.append((tuple(cleaned_starts) or (0,), tuple(original_starts) or (len(line),)))
+
+        self.lines = tuple(lines)
+        self.text = '\n'.join(lines)
+
+    def _scan_tokens(self, removed) -> None:
+        lines = self.original_lines
+
+        def remove(start, end):
+            (start_row, start_column), (end_row, end_column) = start, end
+            for row in range(start_row, end_row + 1):
+                line_length = len(lines[row - 1]) if row <= len(lines) else 0
+                removed.setdefault(row, []).append((
+                    start_column if row == start_row else 0,
+                    end_column if row == end_row else line_length))
+
+        fstring_start = None  # start of an enclosing triple-quoted f-string (Python 3.12+)
+        fstring_depth = 0
+        for token in tokenize.generate_tokens(io.StringIO(self.source).readline):
+            self.tokens.append(token)
+            if fstring_depth:
+                if token.type == _FSTRING_START:
+                    fstring_depth += 1
+                elif token.type == _FSTRING_END:
+                    fstring_depth -= 1
+                    if not fstring_depth:
+                        remove(fstring_start, token.end)
+            elif token.type == tokenize.COMMENT:
+                self.comments.append(token)
+                row = token.start[0]
+                remove(token.start, (row, len(lines[row - 1])))
+            elif token.type == tokenize.STRING:
+                self.strings.append(token)
+                if _is_triple_quoted(token.string):
+                    remove(token.start, token.end)
+            elif token.type == _FSTRING_START and _is_triple_quoted(token.string):
+                fstring_start, fstring_depth = token.start, 1
+
+    def _scan_lines(self):
+        """Removed spans of a source that cannot be tokenized: triple quotes and # outside quotes."""
+        removed = {}
+        in_triple = None  # '"""' or "'''" while inside a triple-quoted string
+        for row, line in enumerate(self.original_lines, 1):
+            spans = []
+            triple_start = 0 if in_triple else None
+            quote = None  # quote of the single-line string being read
+            j = 0
+            while j < len(line):
+                three_chars = line[j:j + 3]
+                if in_triple:
+                    if three_chars == in_triple:
+                        spans.append((triple_start, j + 3))
+                        in_triple, triple_start = None, None
+                        j += 3
+                    else:
+                        j += 1
+                    continue
+                if three_chars in ('"""', "'''"):
+                    in_triple, triple_start = three_chars, j
+                    j += 3
+                    continue
+                char = line[j]
+                if char == '#' and quote is None:
+                    spans.append((j, len(line)))
+                    break
+                if char in ('"', "'") and (j == 0 or line[j - 1] != '\\'):
+                    if quote is None:
+                        quote = char
+                    elif char == quote:
+                        quote = None
+                j += 1
+            if in_triple:
+                spans.append((triple_start, len(line)))
+            if spans:
+                removed[row] = spans
+        return removed
+
+    @property
+    def comment_lines(self) -> Set[int]:
+        """
+        Rows (1-based) holding a comment or a docstring, the lines the Mapping helpers skip.
+
+        Without tokens, the rows starting with # or inside a block starting with triple quotes.
+        """
+        if self._comment_lines is None:
+            comment_lines = set()
+            if self.tokenized:
+                for token in self.comments:
+                    comment_lines.update(range(token.start[0], token.end[0] + 1))
+                for token in self.strings:
+                    if _is_likely_docstring(token, self.original_lines):
+                        comment_lines.update(range(token.start[0], token.end[0] + 1))
+            else:
+                multiline_delimiter = None
+                for row, line in enumerate(self.original_lines, 1):
+                    stripped = line.strip()
+                    if multiline_delimiter:
+                        comment_lines.add(row)
+                        if multiline_delimiter in line:
+                            multiline_delimiter = None
+                    elif stripped.startswith('"""') or stripped.startswith("'''"):
+                        comment_lines.add(row)
+                        delimiter = stripped[:3]
+                        # Check if it's a single-line docstring
+                        if stripped.count(delimiter) < 2:
+                            multiline_delimiter = delimiter
+                    elif stripped.startswith('#'):
+                        comment_lines.add(row)
+            self._comment_lines = frozenset(comment_lines)
+        return self._comment_lines
+
+    def original_column(self, row: int, column: int) -> int:
+        """
+        Column of the original line for a column of a cleaned line.
+
+        Args:
+            row: Row of the line (1-based)
+            column: Column in the cleaned line
+
+        Returns:
+            The column of the same character in the original line
+        """
+        cleaned_starts, original_starts = self._offsets[row - 1]
+        segment = max(bisect_right(cleaned_starts, column) - 1, 0)
+        return original_starts[segment] + column - cleaned_starts[segment]
+
+    def offset_map(self) -> List[Tuple[Tuple[int, ...], Tuple[int, ...]]]:
+        """Per line, the cleaned and original columns where the kept segments start."""
+        return list(self._offsets)
+
+
+_cleaned_sources = weakref.WeakValueDictionary()  # source text -> CleanedSource still in use
+_cleaned_sources_lock = threading.Lock()
+
+
+def clean_source(source: str) -> CleanedSource:
+    """
+    Remove the comments and triple-quoted strings of a source, keeping its lines and columns mappable.
+
+    Args:
+        source: Source code of the file
+
+    Returns:
+        The CleanedSource of this source (the same object for the same text, while it is in use)
+    """
+    with _cleaned_sources_lock:
+        cleaned = _cleaned_sources.get(source)
+    if cleaned is None:
+        cleaned = CleanedSource(source)
+        with _cleaned_sources_lock:
+            cleaned = _cleaned_sources.setdefault(source, cleaned)
+    return cleaned
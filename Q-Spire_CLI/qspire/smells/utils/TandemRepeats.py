@@ -0,0 +1,251 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+"""
+Repeated consecutive blocks (tandem repeats) of a sequence of integer fingerprints, used by ROC.
+
+ROC looks, at every position of the batch sequence, for the shortest block immediately repeated
+(a square uu starting there). The shortest square starting at a position has a primitive root, so
+it lies in a run: a maximal interval [start, end) with smallest period p and length >= 2p. A square
+of half-length p starts at i exactly when a run of period p has start <= i <= end - 2p, and then
+the block is repeated (end - i) // p times in a row.
+
+The runs are found as in the proof of the Runs Theorem (Bannai et al., 2017): for each of the two
+opposite orderings of the alphabet, every run has a Lyndon root that is the longest Lyndon word
+starting at its position, i.e. [i, next smaller suffix of i). Extending each of these candidate
+roots to the left and to the right with longest-common-extension queries gives all the runs.
+
+- suffix ranks: prefix doubling with np.argsort (O(n log^2 n) in NumPy);
+- longest Lyndon words: next smaller rank, with a stack;
+- common extensions: vectorized galloping search on polynomial prefix hashes (two 31-bit moduli),
+  only for the last root of each run.
+
+There are less than n runs, so the whole sequence is processed in O(n log^2 n), instead of the
+O(n^2) slice comparisons of trying every block size at every position. Sequences shorter than
+SMALL_SEQUENCE still use the slice comparisons, which are faster there.
+"""
+
+# (modulus, base) of the two prefix hashes comparing blocks of the sequence
+_HASHES = ((2147483647, 911382323), (1000000007, 972663749))
+
+# Below this length, shortest_squares compares the blocks directly: the NumPy setup would dominate
+SMALL_SEQUENCE = 256
+
+
+def fingerprints(items: Sequence) -> np.ndarray:
+    """
+    Integer fingerprints (from 1, in order of first appearance) of a sequence of hashable items.
+
+    Args:
+        items: Sequence of hashable items, e.g. batch signatures
+
+    Returns:
+        np.ndarray of int64, equal items getting equal fingerprints
+    """
+    ids = {}
+    return np.fromiter((ids.setdefault(item, len(ids) + 1) for item in items), dtype=np.int64, count=len(items))
+
+
+def _dense_ranks(keys: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Rank (from 1) of every key among the distinct keys, and the number of distinct keys."""
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    is_new = np.empty(len(keys), dtype=np.int64)
+    is_new[:1] = 1
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=is_new[1:])
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = np.cumsum(is_new)
+    return ranks, int(ranks[order[-1]]) if len(keys) else 0
+
+
+def suffix_ranks(symbols: np.ndarray) -> np.ndarray:
+    """
+    Rank (from 1) of every suffix of the sequence, a suffix being smaller than its extensions.
+
+    Args:
+        symbols: Positive integer symbols
+
+    Returns:
+        np.ndarray of int64 ranks
+    """
+    n = len(symbols)
+    rank, distinct = _dense_ranks(symbols)
+    step = 1
+    while distinct < n:
+        following = np.zeros(n, dtype=np.int64)
+        following[:n - step] = rank[step:]
+        rank, distinct = _dense_ranks(rank * (n + 1) + following)
+        step *= 2
+    return rank
+
+
+def lyndon_ends(rank: np.ndarray) -> List[int]:
+    """End (exclusive) of the longest Lyndon word starting at every position: its next smaller suffix."""
+    ranks = rank.tolist()
+    n = len(ranks)
+    ends = [n] * n
+    stack = []
+    for i in range(n - 1, -1, -1):
+        current = ranks[i]
+        while stack and ranks[stack[-1]] > current:
+            stack.pop()
+        if stack:
+            ends[i] = stack[-1]
+        stack.append(i)
+    return ends
+
+
+class _BlockHashes:
+    """Prefix hashes of a sequence, comparing blocks of it in bulk."""
+
+    def __init__(self, symbols: np.ndarray):
+        n = len(symbols)
+        self._tables = []
+        for modulus, base in _HASHES:
+            powers = np.ones(n + 1, dtype=np.int64)
+            length, power = 1, base % modulus  # power = base ** length
+            while length <= n:
+                chunk = min(length, n + 1 - length)
+                powers[length:length + chunk] = powers[:chunk] * power % modulus
+                power = power * power % modulus
+                length += chunk
+            # prefix[i] = sum(symbols[k] * base ** k for k < i)
+            prefix = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(symbols % modulus * powers[:n] % modulus, out=prefix[1:])
+            prefix %= modulus
+            self._tables.append((modulus, powers, prefix))
+
+    def equal(self, first: np.ndarray, second: np.ndarray, length: np.ndarray) -> np.ndarray:
+        """Whether the blocks [first, first + length) and [second, second + length) are equal (first < second)."""
+        same = None
+        for modulus, powers, prefix in self._tables:
+            left = (prefix[first + length] - prefix[first]) % modulus * powers[second - first] % modulus
+            right = (prefix[second + length] - prefix[second]) % modulus
+            same = left == right if same is None else same & (left == right)
+        return same
+
+    def forward_extension(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """Longest common prefix of the suffixes starting at first and second (first < second)."""
+        return self._search(first, second, len(self._tables[0][2]) - 1 - second, backward=False)
+
+    def backward_extension(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """Longest common suffix of the prefixes ending at first and second, excluded (first < second)."""
+        return self._search(first, second, first, backward=True)
+
+    def equal_before(self, first: np.ndarray, second: np.ndarray, length: np.ndarray) -> np.ndarray:
+        """Whether the blocks ending at first and second (excluded) are equal (first < second)."""
+        return self.equal(first - length, second - length, length)
+
+    def _search(self, first, second, limit, backward):
+        """Largest length up to limit with equal blocks: galloping (1, 2, 4, ...), then binary search."""
+        compare = self.equal_before if backward else self.equal
+        low = np.zeros(len(first), dtype=np.int64)
+        high = limit.astype(np.int64)
+
+        # Most extensions are short: double the length while the blocks are equal
+        active = np.flatnonzero(high > 0)
+        length = 1
+        while len(active):
+            size = np.minimum(length, high[active])
+            same = compare(first[active], second[active], size)
+            low[active[same]] = size[same]
+            high[active[~same]] = size[~same] - 1
+            active = active[same & (size < high[active])]
+            length *= 2
+
+        active = np.flatnonzero(low < high)
+        while len(active):
+            middle = (low[active] + high[active] + 1) // 2
+            same = compare(first[active], second[active], middle)
+            low[active] = np.where(same, middle, low[active])
+            high[active] = np.where(same, high[active], middle - 1)
+            active = active[low[active] < high[active]]
+        return low
+
+
+def find_runs(symbols: np.ndarray) -> np.ndarray:
+    """
+    All the runs of a sequence.
+
+    Args:
+        symbols: Positive integer symbols (see fingerprints)
+
+    Returns:
+        np.ndarray of shape (number of runs, 3) with the (start, end, period) of every run,
+        sorted by start and end
+    """
+    n = len(symbols)
+    if n < 2:
+        return np.zeros((0, 3), dtype=np.int64)
+
+    hashes = _BlockHashes(symbols)
+    positions = np.arange(n, dtype=np.int64)
+    runs = []
+    for ordered in (symbols, symbols.max() + 1 - symbols):
+        ends = np.array(lyndon_ends(suffix_ranks(ordered)), dtype=np.int64)
+        periods = ends - positions
+        # The roots followed by the next root of the same run give the same run: keep the last one
+        following = np.flatnonzero(ends + periods <= n)
+        same_run = np.zeros(n, dtype=bool)
+        same_run[following] = ends[ends[following]] == ends[following] + periods[following]
+        following = following[same_run[following]]
+        same_run[following] = hashes.equal(positions[following], ends[following], periods[following])
+        kept = np.flatnonzero(~same_run)
+        positions_kept, ends, periods = positions[kept], ends[kept], periods[kept]
+
+        right = hashes.forward_extension(positions_kept, ends)
+        # A run needs left + right >= period: check the missing part at once before extending to the left
+        missing = periods - right
+        is_run = missing <= 0
+        checked = np.flatnonzero(~is_run & (missing <= positions_kept))
+        is_run[checked] = hashes.equal_before(positions_kept[checked], ends[checked], missing[checked])
+        starts, ends, periods, right = positions_kept[is_run], ends[is_run], periods[is_run], right[is_run]
+        left = hashes.backward_extension(starts, ends)
+        runs.append(np.stack((starts - left, ends + right, periods), axis=1))
+
+    return np.unique(np.concatenate(runs), axis=0)
+
+
+def shortest_squares(symbols: np.ndarray) -> Tuple[List[int], List[int]]:
+    """
+    Shortest block immediately repeated at every position of a sequence.
+
+    Args:
+        symbols: Positive integer symbols (see fingerprints)
+
+    Returns:
+        Tuple of two lists with, for every position, the size of the shortest block repeated from
+        there (0 when there is none) and the end of its run: the block repeats (end - position) // size
+        times in a row from the position
+    """
+    n = len(symbols)
+    if n < SMALL_SEQUENCE:
+        return _shortest_squares_small(symbols.tolist())
+
+    sizes = np.zeros(n, dtype=np.int64)
+    run_ends = np.zeros(n, dtype=np.int64)
+    runs = find_runs(symbols)
+    # Longest periods first, so that the shortest block wins where runs overlap
+    for start, end, period in runs[np.argsort(-runs[:, 2], kind='stable')].tolist():
+        last = end - 2 * period
+        sizes[start:last + 1] = period
+        run_ends[start:last + 1] = end
+    return sizes.tolist(), run_ends.tolist()
+
+
+def _shortest_squares_small(symbols: List[int]) -> Tuple[List[int], List[int]]:
+    """shortest_squares of a short sequence, comparing the blocks of every size at every position."""
+    n = len(symbols)
+    sizes = [0] * n
+    run_ends = [0] * n
+    for i in range(n):
+        for size in range(1, (n - i) // 2 + 1):
+            if symbols[i + size] == symbols[i] and symbols[i:i + size] == symbols[i + size:i + 2 * size]:
+                end = i + 2 * size
+                while end < n and symbols[end] == symbols[end - size]:
+                    end += 1
+                sizes[i] = size
+                run_ends[i] = end
+                break
+    return sizes, run_ends
@@ -5,12 +5,39 @@ import os
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 CONFIG_PATH = os.path.join(PROJECT_ROOT, 'config.json')
 
-with open(CONFIG_PATH, 'r') as f:
-    CONFIG = json.load(f)
+_config = None
+
+def get_config():
+    """Load config.json the first time it is needed."""
+    global _config
+    if _config is None:
+        with open(CONFIG_PATH, 'r') as f:
+            _config = json.load(f)
+    return _config
+
+def __getattr__(name):
+    # CONFIG is loaded on first access instead of at import
+    if name == "CONFIG":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Per-process detector options taking precedence over config.json, e.g. {"IdQ": {"max_distance": 3}}
+_detector_overrides = {}
+
+def set_detector_overrides(overrides):
+    """Replace the detector options overriding config.json (None or {} removes them)."""
+    global _detector_overrides
+    _detector_overrides = dict(overrides or {})
+
+def get_detector_overrides():
+    return _detector_overrides
 
 def get_detector_option(smell_name, option, fallback=None):
+    override = _detector_overrides.get(smell_name, {}).get(option)
+    if override is not None:
+        return override
     try:
-        detector_config = CONFIG["Smells"][smell_name]["Detector"]
+        detector_config = get_config()["Smells"][smell_name]["Detector"]
         return (
             detector_config.get("custom_values", {}).get(option)
             or detector_config.get("default_values", {}).get(option)
@@ -21,24 +48,30 @@ def get_detector_option(smell_name, option, fallback=None):
 
 def get_api_key(fallback=None):
     try:
-        api_key=CONFIG["API_KEY"]
+        api_key=get_config()["API_KEY"]
         return api_key
     except: return fallback
 
 def get_llm_model(fallback=None):
     try:
-        model=CONFIG["LLM_model"]
+        model=get_config()["LLM_model"]
         return model
     except: return fallback
 
+def get_operation_extraction(fallback="regex"):
+    """How the dynamic analysis extracts the circuit operations: "regex" (default) or "runtime"."""
+    try:
+        return get_config()["Operation_extraction"]
+    except: return fallback
+
 def get_smell_name(smell_type, fallback="None"):
     try:
-        name=CONFIG["Smells"][smell_type]["Name"]
+        name=get_config()["Smells"][smell_type]["Name"]
         return name
     except: return fallback
 
 def get_smell_description(smell_type, fallback="None"):
     try:
-        name=CONFIG["Smells"][smell_type]["Description"]
+        name=get_config()["Smells"][smell_type]["Description"]
         return name
     except: return fallback
\ No newline at end of file
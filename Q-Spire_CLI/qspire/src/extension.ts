@@ -2,6 +2,7 @@ import * as vscode from 'vscode';
 import * as fs from 'fs';
 import * as path from 'path';
 import { spawn } from 'child_process';
+import { startLanguageServer } from './languageClient';
 
 
 let panel: vscode.WebviewPanel | undefined;
@@ -28,6 +29,9 @@ export async function activate(context: vscode.ExtensionContext) {
     vscode.window.showWarningMessage("Python extension not found. Using system python.");
   }
 
+  // Smells of the open Python files, as diagnostics updated while typing
+  startLanguageServer(context, pythonPath);
+
 
 
   const statusBarItem = vscode.window.createStatusBarItem(vscode.StatusBarAlignment.Left);
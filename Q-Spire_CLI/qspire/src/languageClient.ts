@@ -0,0 +1,197 @@
+import * as vscode from 'vscode';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+
+/**
+ * Minimal client of the QSpire language server (`python -m qspire lsp`).
+ *
+ * One server process is kept warm per workspace folder: the content of the open Python
+ * buffers is sent to it as the user types, and the smells come back as diagnostics.
+ */
+class QSpireLanguageClient implements vscode.Disposable {
+
+  private process: ChildProcessWithoutNullStreams;
+  private buffer = Buffer.alloc(0);
+  private nextId = 0;
+  private pending = new Map<number, (message: any) => void>();
+  private ready: Promise<void>;
+  private disposed = false;
+
+  constructor(pythonPath: string, cwd: string, private diagnostics: vscode.DiagnosticCollection) {
+    this.process = spawn(pythonPath, ['-m', 'qspire', 'lsp'], { cwd, shell: false });
+
+    this.process.stdout.on('data', (data: Buffer) => this.onData(data));
+    this.process.stderr.on('data', (data: Buffer) => console.log(`[qspire lsp] ${data.toString()}`));
+    this.process.on('error', (error) => {
+      vscode.window.showWarningMessage(`QSpire language server could not start: ${error.message}`);
+    });
+
+    this.ready = this.request('initialize', {
+      processId: process.pid,
+      rootUri: vscode.Uri.file(cwd).toString(),
+      initializationOptions: {}
+    }).then(() => this.write({ jsonrpc: '2.0', method: 'initialized', params: {} }));
+  }
+
+  private write(message: any) {
+    if (this.disposed) {
+      return;
+    }
+    const body = Buffer.from(JSON.stringify(message), 'utf8');
+    this.process.stdin.write(`Content-Length: ${body.length}\r\n\r\n`);
+    this.process.stdin.write(body);
+  }
+
+  private request(method: string, params: any): Promise<any> {
+    const id = ++this.nextId;
+    return new Promise((resolve) => {
+      this.pending.set(id, resolve);
+      this.write({ jsonrpc: '2.0', id, method, params });
+    });
+  }
+
+  async notify(method: string, params: any) {
+    await this.ready;
+    this.write({ jsonrpc: '2.0', method, params });
+  }
+
+  private onData(data: Buffer) {
+    this.buffer = Buffer.concat([this.buffer, data]);
+
+    while (true) {
+      const headerEnd = this.buffer.indexOf('\r\n\r\n');
+      if (headerEnd < 0) {
+        return;
+      }
+      const header = this.buffer.subarray(0, headerEnd).toString('ascii');
+      const match = header.match(/Content-Length:\s*(\d+)/i);
+      if (!match) {
+        // Not a message: skip the broken header
+        this.buffer = this.buffer.subarray(headerEnd + 4);
+        continue;
+      }
+      const length = parseInt(match[1], 10);
+      const bodyStart = headerEnd + 4;
+      if (this.buffer.length < bodyStart + length) {
+        return;
+      }
+      const body = this.buffer.subarray(bodyStart, bodyStart + length).toString('utf8');
+      this.buffer = this.buffer.subarray(bodyStart + length);
+
+      try {
+        this.onMessage(JSON.parse(body));
+      } catch (e) {
+        console.error('Failed to parse QSpire language server message:', e);
+      }
+    }
+  }
+
+  private onMessage(message: any) {
+    if (message.id !== undefined && this.pending.has(message.id)) {
+      const resolve = this.pending.get(message.id)!;
+      this.pending.delete(message.id);
+      resolve(message);
+      return;
+    }
+
+    if (message.method === 'textDocument/publishDiagnostics') {
+      const uri = vscode.Uri.parse(message.params.uri);
+      const diagnostics = message.params.diagnostics.map((d: any) => {
+        const range = new vscode.Range(
+          d.range.start.line, d.range.start.character,
+          d.range.end.line, d.range.end.character
+        );
+        const diagnostic = new vscode.Diagnostic(range, d.message, vscode.DiagnosticSeverity.Warning);
+        diagnostic.source = d.source;
+        diagnostic.code = d.code;
+        return diagnostic;
+      });
+      this.diagnostics.set(uri, diagnostics);
+    }
+  }
+
+  dispose() {
+    if (this.disposed) {
+      return;
+    }
+    this.request('shutdown', null).then(() => {
+      this.write({ jsonrpc: '2.0', method: 'exit', params: null });
+      this.disposed = true;
+      this.process.stdin.end();
+    });
+    // Do not wait forever for a server that does not answer
+    setTimeout(() => this.process.kill(), 5000);
+  }
+}
+
+
+function isAnalyzed(document: vscode.TextDocument): boolean {
+  return document.languageId === 'python' && (document.uri.scheme === 'file' || document.uri.scheme === 'untitled');
+}
+
+
+/**
+ * Start the QSpire language servers: one per workspace folder, created on demand.
+ */
+export function startLanguageServer(context: vscode.ExtensionContext, pythonPath?: string) {
+  const diagnostics = vscode.languages.createDiagnosticCollection('qspire');
+  const clients = new Map<string, QSpireLanguageClient>();
+
+  const clientFor = (document: vscode.TextDocument): QSpireLanguageClient => {
+    const folder = vscode.workspace.getWorkspaceFolder(document.uri);
+    const cwd = folder ? folder.uri.fsPath : (vscode.workspace.workspaceFolders?.[0]?.uri.fsPath ?? process.cwd());
+    let client = clients.get(cwd);
+    if (!client) {
+      client = new QSpireLanguageClient(pythonPath || 'python', cwd, diagnostics);
+      clients.set(cwd, client);
+    }
+    return client;
+  };
+
+  const didOpen = (document: vscode.TextDocument) => {
+    if (!isAnalyzed(document)) {
+      return;
+    }
+    clientFor(document).notify('textDocument/didOpen', {
+      textDocument: {
+        uri: document.uri.toString(),
+        languageId: document.languageId,
+        version: document.version,
+        text: document.getText()
+      }
+    });
+  };
+
+  context.subscriptions.push(
+    diagnostics,
+    vscode.workspace.onDidOpenTextDocument(didOpen),
+    vscode.workspace.onDidChangeTextDocument((event) => {
+      if (!isAnalyzed(event.document) || event.contentChanges.length === 0) {
+        return;
+      }
+      clientFor(event.document).notify('textDocument/didChange', {
+        textDocument: { uri: event.document.uri.toString(), version: event.document.version },
+        contentChanges: [{ text: event.document.getText() }]
+      });
+    }),
+    vscode.workspace.onDidSaveTextDocument((document) => {
+      if (!isAnalyzed(document)) {
+        return;
+      }
+      clientFor(document).notify('textDocument/didSave', {
+        textDocument: { uri: document.uri.toString() }
+      });
+    }),
+    vscode.workspace.onDidCloseTextDocument((document) => {
+      if (!isAnalyzed(document)) {
+        return;
+      }
+      clientFor(document).notify('textDocument/didClose', {
+        textDocument: { uri: document.uri.toString() }
+      });
+      diagnostics.delete(document.uri);
+    }),
+    { dispose: () => clients.forEach((client) => client.dispose()) }
+  );
+
+  vscode.workspace.textDocuments.forEach(didOpen);
+}
@@ -0,0 +1,144 @@
+import os
+import tempfile
+
+import numpy as np
+from qiskit_ibm_runtime.fake_provider import FakeManilaV2
+
+import smells.LC.LCDetector as LCDetector
+import smells.utils.BackendErrorCache as BackendErrorCache
+from smells.Detector import Detector
+from smells.LC.LC import LC
+from smells.LC.LCDetector import reduce_backend_errors
+from smells.utils.BackendErrorCache import backend_key, get_backend_error_cache, set_snapshot_directory
+from smells.utils.MyFakeBackend import MyFakeBackend
+
+
+NOISE_SETTINGS = {'h': (500e-9, None, 1e-1), 'x': (35.5e-9, None, 1e-2), 'cx': (500e-9, None, 5e-2)}
+
+LC_CODE = """from qiskit import QuantumCircuit
+from smells.utils.MyFakeBackend import MyFakeBackend
+
+backend = MyFakeBackend(num_qubits=3, coupling_map=[[0, 1], [1, 2]], noise_settings={
+    'h': (500e-9, None, 1e-1), 'x': (35.5e-9, None, 1e-2), 'cx': (500e-9, None, 5e-2)})
+
+qc = QuantumCircuit(3)
+qc.h(0)
+qc.cx(0, 1)
+qc.h(1)
+qc.h(1)
+qc.cx(1, 2)
+qc.h(2)
+backend.run(qc)
+"""
+
+
+class UndatedBackend:
+    """Backend whose properties give no last update date."""
+
+    name = "undated"
+
+    def properties(self):
+        return None
+
+
+def counting_reduction():
+    """Reduction counting its calls, with the errors of reduce_backend_errors."""
+    calls = []
+
+    def reduce(backend):
+        calls.append(backend)
+        return reduce_backend_errors(backend)
+    return reduce, calls
+
+
+def test_backend_error_cache():
+    """
+        Test the process-wide cache of the backend error tables, and its snapshots on disk.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.BackendErrorCache.BackendErrorCacheTest
+
+    """
+    line = [[0, 1], [1, 2]]
+
+    # Instances with the same noise model share their key, without building their properties
+    first = MyFakeBackend(num_qubits=3, coupling_map=line, noise_settings=dict(NOISE_SETTINGS))
+    second = MyFakeBackend(num_qubits=3, coupling_map=line, noise_settings=dict(NOISE_SETTINGS))
+    assert backend_key(first) == backend_key(second)
+    assert first._properties is None and first._target is None
+    triangle = [[0, 1], [1, 2], [2, 0]]
+    assert backend_key(MyFakeBackend(num_qubits=3, coupling_map=triangle, noise_settings=NOISE_SETTINGS)) != \
+           backend_key(first)
+    assert backend_key(MyFakeBackend(num_qubits=3, coupling_map=line,
+                                     noise_settings={**NOISE_SETTINGS, 'h': (500e-9, None, 2e-1)})) != \
+           backend_key(first)
+
+    # One reduction for all the instances of a backend
+    cache = BackendErrorCache.BackendErrorCache()
+    reduce, calls = counting_reduction()
+    assert cache.get(first, reduce) is cache.get(second, reduce)
+    assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+    max_gate_error, table = cache.get(first, reduce)
+    assert max_gate_error == {'h': 1e-1}
+    assert sorted(table.names) == ['cx', 'h', 'x']
+
+    # Fake provider backends are keyed by their properties snapshot, without parsing it
+    manila = FakeManilaV2()
+    key = backend_key(manila)
+    assert key[:2] == ("fake_manila", manila.backend_version) and key[2].startswith(manila.props_filename)
+    assert getattr(manila, "_props_dict", None) is None
+    manila_errors = cache.get(manila, reduce)
+    assert cache.get(FakeManilaV2(), reduce) is manila_errors
+    assert len(calls) == 2
+    assert manila_errors[0] == LCDetector.get_max_gate_error(manila.properties())
+
+    # Backends without a key are reduced every time
+    undated_reduce, undated_calls = counting_reduction()
+    assert backend_key(UndatedBackend()) is None
+    for _ in range(2):
+        assert cache.get(UndatedBackend(), undated_reduce) == ({}, None)
+    assert len(undated_calls) == 2
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Snapshots: a new process (a new cache) reads the tables from the disk
+        snapshots = os.path.join(folder, "backends")
+        reduce, calls = counting_reduction()
+        BackendErrorCache.BackendErrorCache(snapshots).get(first, reduce)
+        loaded = BackendErrorCache.BackendErrorCache(snapshots)
+        max_gate_error, loaded_table = loaded.get(second, reduce)
+        assert len(calls) == 1 and loaded.hits == 1
+        assert max_gate_error == {'h': 1e-1}
+        assert np.array_equal(loaded_table.keys, table.keys) and np.array_equal(loaded_table.errors, table.errors)
+        assert len(os.listdir(snapshots)) == 1
+
+        # LC reduces the backend once across the files of a run, snapshotting it in the directory set
+        set_snapshot_directory(os.path.join(folder, "lc"))
+        assert os.environ[BackendErrorCache.SNAPSHOT_DIRECTORY_VARIABLE] == os.path.join(folder, "lc")
+        process_cache = get_backend_error_cache()
+        process_cache.clear()
+        hits, misses = process_cache.hits, process_cache.misses
+        options = {"gate_error": 0, "threshold": 0.7}
+        get_detector_option = LCDetector.get_detector_option
+        LCDetector.get_detector_option = lambda smell, name, fallback=None: options.get(name, fallback)
+        try:
+            results = []
+            for name in ("first.py", "second.py"):
+                file = os.path.join(folder, name)
+                with open(file, "w") as f:
+                    f.write(LC_CODE)
+                results.append([smell.as_dict() for smell in Detector(LC).detect(file)])
+        finally:
+            LCDetector.get_detector_option = get_detector_option
+            set_snapshot_directory(None)
+        assert (process_cache.hits - hits, process_cache.misses - misses) == (1, 1)
+        assert len(os.listdir(os.path.join(folder, "lc"))) == 1
+        assert len(results[0]) == 1 and results[0][0]['error'] == {'h': 1e-1}
+        assert results[0] == results[1]
+        assert BackendErrorCache.SNAPSHOT_DIRECTORY_VARIABLE not in os.environ
+    print("Backend error cache test passed")
+
+
+if __name__ == "__main__":
+    test_backend_error_cache()
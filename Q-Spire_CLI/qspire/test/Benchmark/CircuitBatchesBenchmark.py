@@ -0,0 +1,99 @@
+import random
+import time
+
+from smells.utils.CircuitBatches import create_circuit_batches
+
+
+def legacy_create_circuit_batches(operations):
+    """The batching previously copied in the IQ, IdQ, ROC and LC detectors, kept as the reference."""
+    if not operations:
+        return {}
+
+    batches = {}
+    qubit_last_batch = {}
+
+    for operation in operations:
+        operation_qubits = operation['qubits_affected']
+
+        min_batch = 1
+        for qubit in operation_qubits:
+            if qubit in qubit_last_batch:
+                min_batch = max(min_batch, qubit_last_batch[qubit] + 1)
+
+        placed = False
+        current_batch_num = min_batch
+        while not placed:
+            if current_batch_num not in batches:
+                batches[current_batch_num] = []
+
+            conflict = False
+            for existing_op in batches[current_batch_num]:
+                existing_qubits = set(existing_op['qubits_affected'])
+                if set(operation_qubits).intersection(existing_qubits):
+                    conflict = True
+                    break
+
+            if not conflict:
+                batches[current_batch_num].append(operation)
+                for qubit in operation_qubits:
+                    qubit_last_batch[qubit] = current_batch_num
+                placed = True
+            else:
+                current_batch_num += 1
+
+    final_batches = {}
+    batch_counter = 1
+    for batch_num in sorted(batches.keys()):
+        if batches[batch_num]:
+            final_batches[batch_counter] = batches[batch_num]
+            batch_counter += 1
+    return final_batches
+
+
+def random_circuit(num_qubits, num_operations, seed=0):
+    """Operations of a wide random circuit: single-qubit gates, CX gates and a few barriers."""
+    rng = random.Random(seed)
+    operations = []
+    for row in range(num_operations):
+        kind = rng.random()
+        if kind < 0.6:
+            qubits = [rng.randrange(num_qubits)]
+        elif kind < 0.99:
+            qubits = rng.sample(range(num_qubits), 2)
+        else:
+            qubits = list(range(num_qubits))
+        operations.append({'operation_name': 'op', 'qubits_affected': qubits, 'clbits_affected': [], 'row': row})
+    return operations
+
+
+def benchmark(num_qubits=100, num_operations=100_000):
+    """
+        Compare the shared single-pass batching with the previous per-detector implementation.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to run the benchmark execute the following script in the terminal
+
+        python -m qspire.test.Benchmark.CircuitBatchesBenchmark
+    """
+    operations = random_circuit(num_qubits, num_operations)
+
+    start = time.perf_counter()
+    legacy = legacy_create_circuit_batches(operations)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batches = create_circuit_batches(operations)
+    new_time = time.perf_counter() - start
+
+    same = list(legacy) == list(batches) and all(
+        [id(op) for op in legacy[n]] == [id(op) for op in batches[n]] for n in legacy)
+
+    print(f"{num_operations} operations on {num_qubits} qubits, {len(batches)} batches")
+    print(f"  previous batching: {legacy_time:.3f}s")
+    print(f"  shared batching:   {new_time:.3f}s ({legacy_time / new_time:.1f}x)")
+    print("Same batches" if same else "FAILED: the batches differ")
+    return same
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,82 @@
+import math
+import random
+import time
+
+from smells.utils.FidelityEstimator import ErrorTable, estimate_fidelity
+from smells.utils.MyFakeBackend import MyFakeBackend
+from smells.utils.OperationTable import OperationTable
+from smells.utils.QubitTimeline import QubitTimeline
+
+
+NOISE_SETTINGS = {
+    'x': (35.5e-9, None, 1e-4), 'sx': (35.5e-9, None, 2e-4), 'rz': (0.0, None, 0.0),
+    'cx': (500e-9, None, 5e-3), 'measure': (1000e-9, None, 2e-2),
+}
+
+
+def python_success(operations, errors):
+    """Success estimate multiplying the error of every operation, looked up one by one."""
+    success = 1.0
+    for index in range(len(operations)):
+        success *= 1 - errors.get((operations.name(index), tuple(operations.qubits(index))), 0.0)
+    return success
+
+
+def line_circuit(num_qubits, num_operations, seed=0):
+    """Operations of a random circuit on the gates and the edges of a line of qubits."""
+    rng = random.Random(seed)
+    table = OperationTable()
+    for row in range(num_operations):
+        if rng.random() < 0.6:
+            table.append(rng.choice(['x', 'sx', 'rz']), [rng.randrange(num_qubits)], [], row + 1, 0, 2)
+        else:
+            qubit = rng.randrange(num_qubits - 1)
+            table.append('cx', [qubit, qubit + 1], [], row + 1, 0, 2)
+    return table
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark(num_qubits=127, operation_counts=(1_000, 10_000, 200_000), repeat=3):
+    """
+        Time the per-gate success estimate of LC on a 127-qubit line backend, against a Python loop
+        looking up the error of every operation.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to run the benchmark execute the following script in the terminal
+
+        python -m qspire.test.Benchmark.FidelityBenchmark
+    """
+    line = [[q, q + 1] for q in range(num_qubits - 1)]
+    backend = MyFakeBackend(num_qubits=num_qubits, coupling_map=line, noise_settings=NOISE_SETTINGS)
+    table_time, table = best_time(lambda: ErrorTable.from_backend(backend), 1)
+    errors = {(name, tuple(qubits)): properties.error
+              for name in backend.target.operation_names
+              for qubits, properties in backend.target[name].items()}
+    print(f"ErrorTable of {len(table.keys)} instructions in {table_time * 1000:.1f}ms")
+
+    same = True
+    print(f"{'operations':>11} {'layers':>8} {'python':>10} {'numpy':>10} {'speedup':>8}")
+    for num_operations in operation_counts:
+        timeline = QubitTimeline(line_circuit(num_qubits, num_operations))
+        python_time, expected = best_time(lambda: python_success(timeline.operations, errors), repeat)
+        numpy_time, estimate = best_time(lambda: estimate_fidelity(timeline, table), repeat)
+        same = same and math.isclose(estimate.success, expected, rel_tol=1e-9, abs_tol=1e-300)
+
+        print(f"{num_operations:>11} {len(estimate.layer_errors):>8} {python_time * 1000:>8.2f}ms "
+              f"{numpy_time * 1000:>8.2f}ms {python_time / numpy_time:>7.1f}x")
+
+    print("Same estimates" if same else "FAILED: the estimates differ")
+    return same
+
+
+if __name__ == "__main__":
+    benchmark()
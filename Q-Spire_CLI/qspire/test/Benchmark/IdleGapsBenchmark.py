@@ -0,0 +1,77 @@
+import random
+import time
+
+from smells.utils.OperationTable import OperationTable
+from smells.utils.QubitTimeline import QubitTimeline, VECTORIZE_MIN_ENTRIES
+
+
+def python_idle_gaps(timeline, max_distance):
+    """The per-qubit Python loop of QubitTimeline.idle_gaps, kept as the reference."""
+    gaps = []
+    for qubit in timeline.qubits_by_layer():
+        layers = timeline.layers[qubit]
+        op_indices = timeline.op_indices[qubit]
+        for i in range(1, len(layers)):
+            distance = layers[i] - layers[i - 1] - 1
+            if distance > max_distance:
+                gaps.append((qubit, op_indices[i], distance))
+    return gaps
+
+
+def random_table(num_qubits, num_operations, seed=0):
+    """Operations of a wide random circuit: single-qubit gates, CX gates and a few barriers."""
+    rng = random.Random(seed)
+    table = OperationTable()
+    for row in range(num_operations):
+        kind = rng.random()
+        if kind < 0.6:
+            qubits = [rng.randrange(num_qubits)]
+        elif kind < 0.999:
+            qubits = rng.sample(range(num_qubits), 2)
+        else:
+            qubits = list(range(num_qubits))
+        table.append('op', qubits, [], row + 1, 0, 2)
+    return table
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark(qubit_counts=(10, 100, 500), operation_counts=(1_000, 10_000, 200_000), max_distance=2, repeat=5):
+    """
+        Sweep the idle-gap computation of IdQ over qubit count and depth, comparing the Python loop
+        with the NumPy kernel used from VECTORIZE_MIN_ENTRIES qubit operations.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to run the benchmark execute the following script in the terminal
+
+        python -m qspire.test.Benchmark.IdleGapsBenchmark
+    """
+    same = True
+    print(f"NumPy kernel from {VECTORIZE_MIN_ENTRIES} qubit operations")
+    print(f"{'qubits':>7} {'operations':>11} {'layers':>8} {'gaps':>8} {'python':>10} {'numpy':>10} {'speedup':>8}")
+    for num_qubits in qubit_counts:
+        for num_operations in operation_counts:
+            timeline = QubitTimeline(random_table(num_qubits, num_operations))
+            num_layers = max((layers[-1] for layers in timeline.layers.values()), default=0)
+
+            python_time, expected = best_time(lambda: python_idle_gaps(timeline, max_distance), repeat)
+            numpy_time, gaps = best_time(lambda: timeline._idle_gaps_vectorized(max_distance), repeat)
+            same = same and gaps == expected and timeline.idle_gaps(max_distance) == expected
+
+            print(f"{num_qubits:>7} {num_operations:>11} {num_layers:>8} {len(gaps):>8} "
+                  f"{python_time * 1000:>8.2f}ms {numpy_time * 1000:>8.2f}ms {python_time / numpy_time:>7.1f}x")
+
+    print("Same gaps" if same else "FAILED: the gaps differ")
+    return same
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,87 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# Budget for `qspire --help`, interpreter startup included
+HELP_BUDGET_MS = 300
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure_help(repeats):
+    """
+    Run `python -X importtime -m util.CLIModule --help` and collect its timings.
+
+    Returns:
+        Tuple of (median wall time in ms, median cumulative import time in ms,
+        list of (cumulative us, module) of the top-level imports of the last run,
+        set of all the modules imported by the last run)
+    """
+    qspire_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    command = [sys.executable, "-X", "importtime", "-m", "util.CLIModule", "--help"]
+
+    wall_times = []
+    import_times = []
+    top_level = []
+    imported = set()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proc = subprocess.run(command, cwd=qspire_root, capture_output=True, text=True)
+        wall_times.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"qspire --help failed:\n{proc.stderr}")
+
+        top_level = []
+        imported = set()
+        for line in proc.stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if not match:
+                continue
+            imported.add(match.group(4))
+            # Top-level imports are not indented: their cumulative times add up to the total
+            if len(match.group(3)) == 1:
+                top_level.append((int(match.group(2)), match.group(4)))
+        import_times.append(sum(cumulative for cumulative, _ in top_level) / 1000)
+
+    return statistics.median(wall_times), statistics.median(import_times), top_level, imported
+
+
+def benchmark(repeats=5):
+    """
+        Import-time regression guard for the CLI startup.
+
+        Fails when `qspire --help` takes more than HELP_BUDGET_MS: the detection stacks
+        (qiskit, the detectors, openai, config.json) must only be imported by the code paths using them.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to run the benchmark execute the following script in the terminal
+
+        python -m qspire.test.Benchmark.ImportTimeBenchmark
+    """
+
+    wall_ms, import_ms, top_level, imported = measure_help(repeats)
+
+    print("Slowest top-level imports of `qspire --help`:")
+    for cumulative, module in sorted(top_level, reverse=True)[:10]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {module}")
+
+    print(f"\nImports: {import_ms:.1f} ms, total wall time: {wall_ms:.1f} ms (budget {HELP_BUDGET_MS} ms)")
+
+    for heavy_module in ("qiskit", "openai", "smells.utils.config_loader"):
+        if heavy_module in imported:
+            print(f"FAILED: {heavy_module} is imported by `qspire --help`")
+            return False
+
+    if wall_ms > HELP_BUDGET_MS:
+        print("FAILED: `qspire --help` exceeds its budget")
+        return False
+
+    print("OK")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark() else 1)
@@ -0,0 +1,123 @@
+import re
+import time
+import tracemalloc
+
+from smells.utils.OperationCircuitTracker import QuantumCircuitAnalyzer
+
+
+def legacy_expand_nested_loops(analyzer, lines, outer_vars):
+    """The list-based loop expansion previously used by QuantumCircuitAnalyzer, kept as the reference."""
+    expanded_lines = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped_line = line.strip()
+        if not stripped_line or stripped_line.startswith('#'):
+            i += 1
+            continue
+        for_match = re.match(r'for\s+(\w+)\s+in\s+range\s*\(\s*(\d+)\s*\)\s*:', stripped_line)
+        if for_match:
+            loop_var = for_match.group(1)
+            loop_count = int(for_match.group(2))
+            loop_body_start = i + 1
+            loop_body_end = analyzer._find_loop_end(lines, i)
+            loop_body = lines[loop_body_start:loop_body_end]
+            for loop_iteration in range(loop_count):
+                current_vars = outer_vars.copy()
+                current_vars[loop_var] = loop_iteration
+                nested_expanded = legacy_expand_nested_loops(analyzer, loop_body, current_vars)
+                for nested_line_offset, nested_expanded_line, nested_context in nested_expanded:
+                    expanded_lines.append((loop_body_start + nested_line_offset, nested_expanded_line, current_vars))
+            i = loop_body_end
+            continue
+        if outer_vars:
+            expanded_line = line
+            for var_name, var_value in outer_vars.items():
+                expanded_line = analyzer._expand_loop_variables(expanded_line, var_name, var_value)
+            expanded_lines.append((i, expanded_line, outer_vars))
+        else:
+            expanded_lines.append((i, line, {}))
+        i += 1
+    return expanded_lines
+
+
+def legacy_process_lines(analyzer, lines, circuit_vars):
+    operations = []
+    for line_num, expanded_line, _ in legacy_expand_nested_loops(analyzer, lines, {}):
+        op_info = analyzer._parse_operation_line(expanded_line, line_num, circuit_vars)
+        if op_info:
+            operations.append(op_info)
+    return operations
+
+
+def comparable(operations):
+    """
+    The operations without their source text: the templates keep the source line and pattern,
+    the previous expansion the substituted ones.
+    """
+    return [(line_num, op_type, {key: value for key, value in details.items() if key != 'operation_pattern'})
+            for line_num, _, op_type, details in operations]
+
+
+SOURCE = """from qiskit import QuantumCircuit
+qc = QuantumCircuit(4)
+for layer in range({outer}):
+    # entangling layer
+    qc.barrier()
+    for i in range({inner}):
+        angle = 0.1
+        qc.rz(angle, 0)
+        qc.cx(0, 1)
+        qc.h(i % 4)
+        qc.cx(i % 2, 2 + layer % 2)
+        qc.rx(angle*i, 3)
+    qc.measure_all()
+"""
+
+
+def measure(function):
+    """Result, time and peak memory of a function (the memory is traced in a second run, tracing slows it down)."""
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark(outer=20, inner=1000):
+    """
+        Compare the lazy loop expansion with the previous list-based one on a loop-heavy circuit builder.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to run the benchmark execute the following script in the terminal
+
+        python -m qspire.test.Benchmark.LoopExpansionBenchmark
+    """
+    lines = SOURCE.format(outer=outer, inner=inner).split('\n')
+    analyzer = QuantumCircuitAnalyzer()
+
+    legacy, legacy_time, legacy_peak = measure(lambda: legacy_process_lines(analyzer, lines, ['qc']))
+    lazy, lazy_time, lazy_peak = measure(lambda: analyzer._process_lines_with_loops(lines, ['qc']))
+
+    # Every line is parsed once, whatever the number of iterations
+    parsed_lines = []
+    parse_template = analyzer._parse_operation_template
+    analyzer._parse_operation_template = lambda line, line_num, *args: \
+        parsed_lines.append(line_num) or parse_template(line, line_num, *args)
+    analyzer._process_lines_with_loops(lines, ['qc'])
+    del analyzer._parse_operation_template
+
+    same = comparable(legacy) == comparable(lazy) and len(parsed_lines) == len(set(parsed_lines))
+    print(f"{outer} x {inner} loop iterations, {len(lazy)} operations from {len(parsed_lines)} parsed lines")
+    print(f"  previous expansion: {legacy_time:.3f}s, peak {legacy_peak / 2**20:.1f} MiB")
+    print(f"  lazy expansion:     {lazy_time:.3f}s, peak {lazy_peak / 2**20:.1f} MiB "
+          f"({legacy_time / lazy_time:.1f}x)")
+    print("Same operations" if same else "FAILED: the operations differ")
+    return same
+
+
+if __name__ == "__main__":
+    benchmark()
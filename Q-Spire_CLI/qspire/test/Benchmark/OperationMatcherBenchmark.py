@@ -0,0 +1,85 @@
+import random
+import re
+import time
+
+from smells.utils.OperationMatcher import OperationMatcher
+
+
+def legacy_search(line, circuit_vars):
+    """The per-variable matching previously done by _parse_operation_line, kept as the reference."""
+    for circuit_name in circuit_vars:
+        if circuit_name in line:
+            append_pattern = rf'{re.escape(circuit_name)}\.append\s*\(\s*(\w+)\s*,\s*\[([^\]]*)\](?:\s*,\s*\[([^\]]*)\])?\s*\)'
+            append_match = re.search(append_pattern, line)
+            if append_match:
+                return circuit_name, append_match, None
+            op_match = re.search(rf'{re.escape(circuit_name)}\.(\w+)\s*\(([^)]*)\)', line)
+            if op_match:
+                return circuit_name, None, op_match
+    return None
+
+
+def summary(match):
+    if match is None:
+        return None
+    circuit_name, append_match, op_match = match
+    return circuit_name, (append_match or op_match).group(0)
+
+
+def generate_lines(num_lines, num_circuits, seed=0):
+    """Lines of a circuit builder: gates, appends, measurements and lines without circuits."""
+    rng = random.Random(seed)
+    names = [f"qc{i}" for i in range(num_circuits)]
+    lines = []
+    for row in range(num_lines):
+        kind = rng.random()
+        name = rng.choice(names)
+        if kind < 0.55:
+            lines.append(f"{name}.{rng.choice(['h', 'x', 'rz'])}({rng.randrange(8)})")
+        elif kind < 0.7:
+            lines.append(f"{name}.cx({rng.randrange(8)}, {rng.randrange(8)})")
+        elif kind < 0.75:
+            lines.append(f"{name}.append({rng.choice(names)}, [0, 1])")
+        elif kind < 0.8:
+            lines.append(f"{name}.measure({rng.randrange(8)}, {rng.randrange(8)})")
+        elif kind < 0.9:
+            lines.append(f"angle_{row} = {rng.random():.3f} * math.pi")
+        else:
+            lines.append(f"print(len(results), offset.real)")
+    return names, lines
+
+
+def benchmark(num_lines=5000, num_circuits=50, repeat=7):
+    """
+        Compare the per-file OperationMatcher with the previous per-variable regexes on a 5k-line file
+        with 50 circuits.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to run the benchmark execute the following script in the terminal
+
+        python -m qspire.test.Benchmark.OperationMatcherBenchmark
+    """
+    circuit_vars, lines = generate_lines(num_lines, num_circuits)
+
+    legacy_time = matcher_time = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        legacy = [summary(legacy_search(line, circuit_vars)) for line in lines]
+        legacy_time = min(legacy_time, time.perf_counter() - start)
+
+        # The matcher is built once per file: its construction is part of the time
+        start = time.perf_counter()
+        matcher = OperationMatcher(circuit_vars)
+        matched = [summary(matcher.search(line)) for line in lines]
+        matcher_time = min(matcher_time, time.perf_counter() - start)
+
+    same = legacy == matched
+    print(f"{num_lines} lines, {num_circuits} circuits, {sum(m is not None for m in matched)} operations")
+    print(f"  per-variable regexes: {legacy_time * 1000:.1f} ms")
+    print(f"  operation matcher:    {matcher_time * 1000:.1f} ms ({legacy_time / matcher_time:.1f}x)")
+    print("Same operations" if same else "FAILED: the operations differ")
+    return same
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,138 @@
+import random
+import time
+
+from smells.ROC.ROCDetector import batch_signature, roc_smell_present_subsequence
+
+
+def legacy_roc_smell_present_subsequence(circuit_batches, min_sub_len=1, return_matches=False):
+    """
+    The slice comparisons previously done by roc_smell_present_subsequence, kept as the reference.
+
+    Detect repeated *consecutive* subsequences of batches and group repeated occurrences.
+    Returns grouped matches:
+    (start_batch_index, slice_size, repetition_count, last_batch_index)
+    """
+    batch_indices = sorted(circuit_batches.keys())
+    batch_signatures = [batch_signature(circuit_batches[i]) for i in batch_indices]
+    num_batches = len(batch_signatures)
+
+    grouped_matches = []
+    i = 0
+
+    while i < num_batches:
+        max_possible_slice = (num_batches - i) // 2
+        best_slice_size = 0
+        repetition_count = 0
+
+        # Try each slice size starting from 1
+        for slice_size in range(1, max_possible_slice + 1):
+            slice1 = batch_signatures[i : i + slice_size]
+            slice2 = batch_signatures[i + slice_size : i + 2 * slice_size]
+
+            if slice1 != slice2:
+                continue
+
+            # Found a repeating slice — now count how many consecutive repetitions
+            count = 1
+            next_start = i + slice_size * 2
+
+            while next_start + slice_size <= num_batches:
+                next_slice = batch_signatures[next_start : next_start + slice_size]
+                if next_slice != slice1:
+                    break
+                count += 1
+                next_start += slice_size
+
+            # Update best if longer sequence found
+            if count > 0:
+                best_slice_size = slice_size
+                repetition_count = count
+                break   # keep original algorithm: stop at the first valid slice size
+
+        if best_slice_size > 0:
+            # Skip too short subsequences (not enough operations)
+            total_ops_first = sum(len(circuit_batches[batch_indices[i + k]])
+                                  for k in range(best_slice_size))
+            if total_ops_first >= min_sub_len:
+                first_batch = batch_indices[i]
+                last_batch = batch_indices[i + best_slice_size * (repetition_count + 1) - 1]
+                grouped_matches.append(
+                    (first_batch, best_slice_size, repetition_count + 1, last_batch)
+                )
+
+            # skip entire repeated region
+            i += best_slice_size * (repetition_count + 1)
+        else:
+            i += 1
+
+    has_smell = len(grouped_matches) > 0
+    if return_matches:
+        return has_smell, grouped_matches
+    return has_smell
+
+
+
+def variational_batches(num_batches, num_qubits=8, seed=0):
+    """Batches of a long variational circuit: repeated ansatz layers, with a few random layers in between."""
+    rng = random.Random(seed)
+
+    def layer(names):
+        return [{'operation_name': name, 'qubits_affected': [qubit], 'clbits_affected': [], 'row': 0}
+                for qubit, name in enumerate(names)]
+
+    ansatz = [layer(['ry'] * num_qubits), layer(['rz'] * num_qubits),
+              [{'operation_name': 'cx', 'qubits_affected': [q, q + 1], 'clbits_affected': [], 'row': 0}
+               for q in range(0, num_qubits - 1, 2)]]
+    batches = {}
+    while len(batches) < num_batches:
+        if rng.random() < 0.9:
+            for batch in ansatz * rng.randrange(1, 20):
+                batches[len(batches) + 1] = batch
+        else:
+            batches[len(batches) + 1] = layer(rng.choice(['h', 'x', 'rx']) for _ in range(num_qubits))
+    return {number: batches[number] for number in range(1, num_batches + 1)}
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark(sizes=(20, 1_000, 5_000, 100_000, 1_000_000), legacy_max_batches=5_000):
+    """
+        Compare the run-based ROC search with the previous slice comparisons on long variational circuits.
+        The previous search is only timed up to legacy_max_batches batches.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to run the benchmark execute the following script in the terminal
+
+        python -m qspire.test.Benchmark.ROCBenchmark
+    """
+    same = True
+    print(f"{'batches':>9} {'matches':>8} {'slices':>11} {'runs':>10} {'speedup':>8}")
+    for num_batches in sizes:
+        batches = variational_batches(num_batches)
+        repeat = 50 if num_batches <= 100 else 1
+        new_time, (_, matches) = best_time(
+            lambda: roc_smell_present_subsequence(batches, min_sub_len=1, return_matches=True), repeat)
+
+        if num_batches <= legacy_max_batches:
+            legacy_time, (_, expected) = best_time(
+                lambda: legacy_roc_smell_present_subsequence(batches, min_sub_len=1, return_matches=True), repeat)
+            same = same and matches == expected
+            print(f"{num_batches:>9} {len(matches):>8} {legacy_time:>10.4f}s {new_time:>9.4f}s "
+                  f"{legacy_time / new_time:>7.1f}x")
+        else:
+            print(f"{num_batches:>9} {len(matches):>8} {'-':>11} {new_time:>9.4f}s {'-':>8}")
+
+    print("Same matches" if same else "FAILED: the matches differ")
+    return same
+
+
+if __name__ == "__main__":
+    benchmark()
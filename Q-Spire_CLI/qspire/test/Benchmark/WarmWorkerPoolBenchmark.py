@@ -0,0 +1,62 @@
+import glob
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from detection.WarmWorkerPool import run_python_file
+
+
+def measure(run, file, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run(file)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def cold_run(file):
+    return subprocess.run([sys.executable, file], capture_output=True, text=True)
+
+
+def warm_run(file):
+    return run_python_file(file)
+
+
+def benchmark(repeats=3):
+    """
+        Compare the cold and warm per-file latency of running the smell fixtures.
+
+        Cold: a new interpreter per run, as the auto-fix loop did (imports qiskit every time).
+        Warm: a child forked from the fork server, with qiskit already imported.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to run the benchmark execute the following script in the terminal
+
+        python -m qspire.test.Benchmark.WarmWorkerPoolBenchmark
+    """
+
+    test_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    files = sorted(glob.glob(os.path.join(test_folder, "*", "*Code.py")))
+
+    # Start the fork server once, outside of the measurements
+    start = time.perf_counter()
+    warm_run(files[0])
+    print(f"Fork server startup (preloading qiskit): {time.perf_counter() - start:.3f}s\n")
+
+    print(f"{'fixture':<16}{'cold (s)':>10}{'warm (s)':>10}{'speedup':>10}")
+    total_cold = total_warm = 0.0
+    for file in files:
+        cold = measure(cold_run, file, repeats)
+        warm = measure(warm_run, file, repeats)
+        total_cold += cold
+        total_warm += warm
+        print(f"{os.path.basename(file):<16}{cold:>10.3f}{warm:>10.3f}{cold / warm:>9.1f}x")
+
+    print(f"{'total':<16}{total_cold:>10.3f}{total_warm:>10.3f}{total_cold / total_warm:>9.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark()
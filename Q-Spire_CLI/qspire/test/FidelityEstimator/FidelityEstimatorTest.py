@@ -0,0 +1,178 @@
+import math
+import os
+import random
+import tempfile
+
+import numpy as np
+
+import smells.LC.LCDetector as LCDetector
+import smells.utils.FidelityEstimator as FidelityEstimator
+from smells.Detector import Detector
+from smells.LC.LC import LC
+from smells.utils.CircuitBatches import create_circuit_batches
+from smells.utils.FidelityEstimator import ErrorTable, estimate_fidelity, NOISELESS_OPERATIONS
+from smells.utils.MyFakeBackend import MyFakeBackend
+from smells.utils.OperationTable import OperationTable
+from smells.utils.QubitTimeline import QubitTimeline
+
+
+LC_CODE = """from qiskit import QuantumCircuit
+from smells.utils.MyFakeBackend import MyFakeBackend
+
+backend = MyFakeBackend(num_qubits=3, coupling_map=[[0, 1], [1, 2]], noise_settings={
+    'h': (500e-9, None, 1e-1), 'x': (35.5e-9, None, 1e-2), 'cx': (500e-9, None, 5e-2)})
+
+qc = QuantumCircuit(3)
+qc.h(0)
+qc.x(2)
+qc.cx(0, 1)
+qc.cx(1, 2)
+qc.h(1)
+qc.h(1)
+qc.x(0)
+qc.cx(0, 1)
+backend.run(qc)
+"""
+
+
+def reference_errors(entries, operations):
+    """Error of every operation, looked up one by one with the same fallbacks as ErrorTable."""
+    exact, by_name, by_arity = {}, {}, {}
+    for name, qubits, error in entries:
+        exact[(name, tuple(qubits))] = error
+        by_name[name] = max(by_name.get(name, 0.0), error)
+        by_arity[len(qubits)] = max(by_arity.get(len(qubits), 0.0), error)
+    errors = []
+    for index in range(len(operations)):
+        name, qubits = operations.name(index), tuple(operations.qubits(index))
+        if name in NOISELESS_OPERATIONS:
+            errors.append(0.0)
+        elif (name, qubits) in exact:
+            errors.append(exact[(name, qubits)])
+        elif name in by_name:
+            errors.append(by_name[name])
+        elif len(qubits) > max(by_arity):
+            errors.append(max(by_arity.values()))
+        else:
+            errors.append(by_arity.get(len(qubits), 0.0))
+    return errors
+
+
+def random_circuit(num_qubits, num_operations, seed):
+    """Operations of a random circuit, some of them on qubits or with gates missing from the error table."""
+    rng = random.Random(seed)
+    table = OperationTable()
+    for row in range(num_operations):
+        kind = rng.random()
+        if kind < 0.5:
+            table.append(rng.choice(['h', 'x', 'sx', 'unknown1q']), [rng.randrange(num_qubits + 2)], [], row + 1, 0, 2)
+        elif kind < 0.9:
+            table.append(rng.choice(['cx', 'cz']), rng.sample(range(num_qubits), 2), [], row + 1, 0, 2)
+        elif kind < 0.93:
+            table.append(rng.choice(['ccx', 'mcx']), rng.sample(range(num_qubits), 3), [], row + 1, 0, 2)
+        elif kind < 0.95:
+            # Broadcast operations, recorded without their qubits
+            table.append(rng.choice(['measure', 'unknown']), [], [], row + 1, 0, 2)
+        else:
+            table.append('barrier', list(range(num_qubits)), [], row + 1, 0, 2)
+    return table
+
+
+def test_fidelity_estimator():
+    """
+        Test the per-gate success estimate of LC against a plain product over the operations.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.FidelityEstimator.FidelityEstimatorTest
+
+    """
+    rng = random.Random(0)
+    for seed in range(20):
+        num_qubits = rng.randrange(3, 12)
+        entries = [(name, (q,), rng.random() * 0.01) for name in ('h', 'x', 'measure') for q in range(num_qubits)]
+        entries += [(name, (q1, q2), rng.random() * 0.05) for name in ('cx',)
+                    for q1 in range(num_qubits) for q2 in range(num_qubits) if q1 != q2 and rng.random() < 0.5]
+        operations = random_circuit(num_qubits, rng.randrange(0, 400), seed)
+
+        table = ErrorTable(entries, num_qubits)
+        timeline = QubitTimeline(operations)
+        estimate = estimate_fidelity(timeline, table)
+
+        errors = reference_errors(entries, operations)
+        layer_success = [1.0] * len(create_circuit_batches(operations))
+        for index, error in enumerate(errors):
+            layer_success[timeline.operation_layers[index] - 1] *= 1 - error
+        expected_curve = 1 - np.cumprod(layer_success)
+        assert np.allclose(estimate.layer_errors, expected_curve, rtol=1e-9, atol=1e-12)
+        assert math.isclose(estimate.success, math.prod(1 - error for error in errors), rel_tol=1e-9)
+
+        expected_unknown = sum(1 for index in range(len(operations))
+                               if operations.name(index) not in NOISELESS_OPERATIONS
+                               and (operations.name(index), tuple(operations.qubits(index))) not in
+                               {(name, tuple(qubits)) for name, qubits, _ in entries})
+        assert estimate.unknown_operations == expected_unknown
+
+        # Same errors when looked up with np.searchsorted instead of the dense array
+        dense_max_keys = FidelityEstimator.DENSE_MAX_KEYS
+        FidelityEstimator.DENSE_MAX_KEYS = 0
+        try:
+            sparse_errors = ErrorTable(entries, num_qubits).operation_errors(operations)
+        finally:
+            FidelityEstimator.DENSE_MAX_KEYS = dense_max_keys
+        dense_errors = table.operation_errors(operations)
+        assert all(np.array_equal(sparse, dense) for sparse, dense in zip(sparse_errors, dense_errors))
+
+        threshold = 0.7
+        crossing = estimate.crossing_layer(threshold)
+        below = [k + 1 for k, error in enumerate(expected_curve) if 1 - error < threshold]
+        assert crossing == (below[0] if below else None)
+
+    # Target of a fake backend: directed edges, the other direction falling back to the gate's largest error
+    backend = MyFakeBackend(num_qubits=3, coupling_map=[[0, 1], [1, 2]], noise_settings={
+        'x': (35.5e-9, None, 1e-2), 'cx': (500e-9, None, 5e-2), 'measure': (1e-6, None, 2e-2)})
+    table = ErrorTable.from_backend(backend)
+    operations = OperationTable()
+    operations.append('x', [0], [], 1, 0, 2)
+    operations.append('cx', [0, 1], [], 2, 0, 2)
+    operations.append('cx', [2, 1], [], 3, 0, 2)
+    operations.append('h', [2], [], 4, 0, 2)
+    operations.append('barrier', [0, 1, 2], [], 5, 0, 2)
+    operations.append('measure', [2], [2], 6, 0, 2)
+    operations.append('measure', [], [], 7, 0, 2)
+    operations.append('ccx', [0, 1, 2], [], 8, 0, 2)
+    errors, found = table.operation_errors(operations)
+    # Broadcast measurement: largest measure error; ccx, on more qubits than any gate: largest error
+    assert errors.tolist() == [1e-2, 5e-2, 5e-2, 2e-2, 0.0, 2e-2, 2e-2, 5e-2]
+    assert found.tolist() == [True, True, False, False, True, True, False, False]
+
+    # BackendProperties give the same errors as the Target
+    from_properties = ErrorTable.from_properties(backend.properties())
+    assert from_properties.operation_errors(operations)[0].tolist() == errors.tolist()
+
+    # LC reads the errors of the backend of the run, and points at the layer crossing the threshold
+    with tempfile.TemporaryDirectory() as folder:
+        file = os.path.join(folder, "LCBackend.py")
+        with open(file, "w") as f:
+            f.write(LC_CODE)
+        options = {"gate_error": 0, "threshold": 0.7}
+        get_detector_option = LCDetector.get_detector_option
+        LCDetector.get_detector_option = lambda smell, name, fallback=None: options.get(name, fallback)
+        try:
+            smells = Detector(LC).detect(file)
+        finally:
+            LCDetector.get_detector_option = get_detector_option
+
+    # Layers: h0 x2 | cx01 | cx12 x0 | h1 | h1 | cx01
+    assert len(smells) == 1
+    smell = smells[0]
+    expected_success = 0.9 ** 3 * 0.99 ** 2 * 0.95 ** 3
+    assert math.isclose(smell.likelihood, expected_success)
+    assert smell.error == {'h': 1e-1}
+    assert smell.layer == 5 and smell.row == 13  # 0.9 ** 3 * 0.99 ** 2 * 0.95 ** 2 < 0.7 after the layer 5
+    print("Fidelity estimator test passed")
+
+
+if __name__ == "__main__":
+    test_fidelity_estimator()
@@ -0,0 +1,192 @@
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import queue
+
+from detection.WarmWorkerPool import CancellationScope, Cancelled, cancellable, run_python_file
+from util.LanguageServer import read_message, write_message
+
+
+class Client:
+
+    def __init__(self, cwd):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "util.CLIModule", "lsp", "--no-cache"],
+            cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self.messages = queue.Queue()
+        self.next_id = 0
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        while True:
+            message = read_message(self.process.stdout)
+            if message is None:
+                return
+            self.messages.put(message)
+
+    def request(self, method, params):
+        self.next_id += 1
+        write_message(self.process.stdin, {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params})
+        while True:
+            message = self.messages.get(timeout=60)
+            if message.get("id") == self.next_id:
+                return message
+
+    def notify(self, method, params):
+        write_message(self.process.stdin, {"jsonrpc": "2.0", "method": method, "params": params})
+
+    def diagnostics(self, timeout=60):
+        while True:
+            message = self.messages.get(timeout=timeout)
+            if message.get("method") == "textDocument/publishDiagnostics":
+                return message["params"]
+
+
+def test_language_server():
+    """
+        Test the language server with a local client on its stdin/stdout.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.LSP.LanguageServerTest
+
+    """
+
+    qspire_root = os.path.abspath("qspire")
+    source = pathlib.Path("qspire/test/CG/CGCode.py").read_text(encoding="utf-8")
+    root_files = set(os.listdir(qspire_root))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        document = os.path.join(tmp, "circuits.py")
+        pathlib.Path(document).write_text("", encoding="utf-8")
+        uri = pathlib.Path(document).as_uri()
+
+        client = Client(qspire_root)
+        try:
+            result = client.request("initialize", {"processId": os.getpid(), "rootUri": None,
+                                                   "initializationOptions": {"debounce": 0.2}})
+            assert result["result"]["capabilities"]["textDocumentSync"]["change"] == 1
+            client.notify("initialized", {})
+
+            # The buffer is analyzed from memory: the file on disk stays empty
+            client.notify("textDocument/didOpen", {"textDocument": {
+                "uri": uri, "languageId": "python", "version": 1, "text": source}})
+            params = client.diagnostics()
+            assert params["uri"] == uri and params["version"] == 1
+            codes = sorted(d["code"] for d in params["diagnostics"])
+            print(f"Diagnostics of the opened buffer: {codes}")
+            assert codes.count("CG") == 9
+            assert all(d["range"]["start"]["line"] >= 0 for d in params["diagnostics"])
+
+            # Quick edits: only the last version is analyzed and published
+            start = time.perf_counter()
+            lines = source.splitlines(keepends=True)
+            for version in range(2, 7):
+                client.notify("textDocument/didChange", {
+                    "textDocument": {"uri": uri, "version": version},
+                    "contentChanges": [{"text": "".join(lines[:-(version * 3)])}]})
+                time.sleep(0.02)
+            params = client.diagnostics()
+            print(f"Diagnostics after typing: version {params['version']} in {time.perf_counter() - start:.2f}s")
+            assert params["version"] == 6
+            assert client.messages.empty()
+
+            # Incremental changes are applied to the buffer too
+            client.notify("textDocument/didChange", {
+                "textDocument": {"uri": uri, "version": 7},
+                "contentChanges": [{"range": {"start": {"line": 0, "character": 0}, "end": {"line": 0, "character": 0}},
+                                    "text": "# header\n"}]})
+            params = client.diagnostics()
+            assert params["version"] == 7
+            assert all(d["range"]["start"]["line"] >= 1 for d in params["diagnostics"] if d["code"] == "CG")
+
+            client.notify("textDocument/didClose", {"textDocument": {"uri": uri}})
+            assert client.diagnostics()["diagnostics"] == []
+
+            # Neither the buffers nor their executables are written in the workspace or the working directory
+            assert [f for f in os.listdir(tmp)] == ["circuits.py"]
+            assert client.request("shutdown", None)["result"] is None
+            client.notify("exit", None)
+            assert client.process.wait(timeout=30) == 0
+            assert set(os.listdir(qspire_root)) == root_files
+        finally:
+            if client.process.poll() is None:
+                client.process.kill()
+
+    print("Language server test passed")
+
+
+def test_stuck_analysis():
+    """An analysis stuck in the code of a buffer is killed by the next version of the buffer."""
+    qspire_root = os.path.abspath("qspire")
+    source = pathlib.Path("qspire/test/CG/CGCode.py").read_text(encoding="utf-8")
+    looping = ("from qiskit import QuantumCircuit\n\n\n"
+               "def build(n):\n    qc = QuantumCircuit(n)\n    qc.h(0)\n"
+               "    while True:\n        qc.cx(0, 1)\n    return qc\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = pathlib.Path(os.path.join(tmp, "looping.py")).as_uri()
+
+        client = Client(qspire_root)
+        try:
+            client.request("initialize", {"processId": os.getpid(), "rootUri": None,
+                                          "initializationOptions": {"debounce": 0.2}})
+            client.notify("initialized", {})
+
+            # The executed function never returns: only a newer version ends its analysis
+            client.notify("textDocument/didOpen", {"textDocument": {
+                "uri": uri, "languageId": "python", "version": 1, "text": looping}})
+            time.sleep(5)
+            assert client.messages.empty()
+
+            start = time.perf_counter()
+            client.notify("textDocument/didChange", {
+                "textDocument": {"uri": uri, "version": 2}, "contentChanges": [{"text": source}]})
+            params = client.diagnostics()
+            print(f"Diagnostics after the stuck analysis: version {params['version']} in {time.perf_counter() - start:.2f}s")
+            assert params["version"] == 2
+            assert sorted(d["code"] for d in params["diagnostics"]).count("CG") == 9
+
+            assert client.request("shutdown", None)["result"] is None
+            client.notify("exit", None)
+            assert client.process.wait(timeout=30) == 0
+        finally:
+            if client.process.poll() is None:
+                client.process.kill()
+
+    print("Stuck analysis test passed")
+
+
+def test_cancelled_analysis():
+    """The runs of a cancelled scope are killed, and the next ones do not start."""
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "sleeping.py")
+        pathlib.Path(script).write_text("import time\ntime.sleep(60)\n", encoding="utf-8")
+
+        scope = CancellationScope()
+        threading.Timer(0.5, scope.cancel).start()
+        start = time.perf_counter()
+        for _ in range(2):
+            try:
+                with cancellable(scope):
+                    run_python_file(script)
+                raise AssertionError("The run of a cancelled scope completed")
+            except Cancelled:
+                pass
+        elapsed = time.perf_counter() - start
+        print(f"Cancelled run after {elapsed:.2f}s")
+        assert elapsed < 10
+
+    print("Cancelled analysis test passed")
+
+
+if __name__ == "__main__":
+    test_language_server()
+    test_stuck_analysis()
+    test_cancelled_analysis()
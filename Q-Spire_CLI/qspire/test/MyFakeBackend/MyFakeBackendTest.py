@@ -0,0 +1,116 @@
+import time
+
+from qiskit_ibm_runtime.models import BackendProperties
+
+from smells.utils.MyFakeBackend import MyFakeBackend, SINGLE_QUBIT_GATES, TWO_QUBIT_GATES, THREE_QUBIT_GATES, \
+    SPECIAL_OPERATIONS
+from smells.LC.LCDetector import get_max_gate_error, get_backend_max_gate_error
+
+
+NOISE_SETTINGS = {
+    'x': (35.5e-9, None, 1e-4),
+    'cz': (500e-9, None, 5e-3),
+    'h': (500e-9, None, 5e-1),
+    'measure': (1000e-9, None, 2e-1),
+    'rz': (0.0, None, None),
+}
+
+
+def eager_gates(num_qubits, noise_settings, now):
+    """Gate entries of every ordered pair and triple of qubits, as the backend properties were built before."""
+    gates = []
+    for gate_name, params in noise_settings.items():
+        if len(params) < 3 or params[2] is None:
+            continue
+        parameters = [{"name": "gate_error", "date": now, "unit": "", "value": params[2]},
+                      {"name": "gate_length", "date": now, "unit": "ns", "value": params[0]}]
+        if gate_name in SINGLE_QUBIT_GATES:
+            qubit_lists = [[q] for q in range(num_qubits)]
+        elif gate_name in TWO_QUBIT_GATES:
+            qubit_lists = [[q1, q2] for q1 in range(num_qubits) for q2 in range(num_qubits) if q1 != q2]
+        elif gate_name in THREE_QUBIT_GATES:
+            # Only neighbouring qubits had to differ: (q1, q2, q1) was listed too
+            qubit_lists = [[q1, q2, q3] for q1 in range(num_qubits) for q2 in range(num_qubits)
+                           for q3 in range(num_qubits) if q1 != q2 and q2 != q3]
+        elif gate_name in SPECIAL_OPERATIONS:
+            qubit_lists = [[]]
+        else:
+            qubit_lists = []
+        gates.extend({"gate": gate_name, "name": gate_name, "qubits": qubits, "parameters": parameters}
+                     for qubits in qubit_lists)
+    return gates
+
+
+def test_fake_backend():
+    """
+        Test the lazy, coupling-map-aware properties of MyFakeBackend.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.MyFakeBackend.MyFakeBackendTest
+
+    """
+    # Fully connected (default) coupling map: the properties of the eager construction, but for the
+    # three-qubit entries repeating a qubit (e.g. ccx on (1, 2, 1)) that it listed, which are not valid gates
+    settings = {**NOISE_SETTINGS, 'ccx': (1e-6, None, 2e-2)}
+    backend = MyFakeBackend(num_qubits=5, noise_settings=settings)
+    properties = backend.properties()
+    now = properties.last_update_date.isoformat()
+    eager = eager_gates(5, settings, now)
+    repeated = [gate for gate in eager if len(set(gate["qubits"])) < len(gate["qubits"])]
+    assert len(repeated) == 5 * 4 and {gate["gate"] for gate in repeated} == {'ccx'}
+    expected = BackendProperties.from_dict({
+        "backend_name": "fake_backend", "backend_version": "1.0.0", "last_update_date": now,
+        "gates": [gate for gate in eager if gate not in repeated],
+        "qubits": [[{"name": "T1", "date": now, "unit": "µs", "value": 100e-6},
+                    {"name": "T2", "date": now, "unit": "µs", "value": 150e-6},
+                    {"name": "frequency", "date": now, "unit": "GHz", "value": 5.0e9},
+                    {"name": "readout_error", "date": now, "unit": "", "value": 2e-1}]] * 5,
+        "general": [],
+    })
+    def by_gate(properties_dict):
+        return {**properties_dict, "gates": sorted(properties_dict["gates"], key=lambda g: (g["gate"], g["qubits"]))}
+    assert by_gate(properties.to_dict()) == by_gate(expected.to_dict())
+    assert len([gate for gate in properties.gates if gate.gate == 'ccx']) == 5 * 4 * 3
+    assert properties.gate_error('cz', (3, 1)) == expected.gate_error('cz', (3, 1))
+    assert properties.gate_length('x', 2) == expected.gate_length('x', 2)
+    assert properties.qubit_property(4) == expected.qubit_property(4)
+    assert backend.max_gate_error() == get_max_gate_error(properties) == {'h': 5e-1}
+
+    # Only the gates read are built
+    backend = MyFakeBackend(num_qubits=5, noise_settings=NOISE_SETTINGS)
+    properties = backend.properties()
+    assert properties.gate_error('x', 0) == 1e-4
+    assert list(properties._gate_properties) == ['x']
+
+    # Coupling map: entries on its edges, and on the connected triples for the three-qubit gates
+    line = [[0, 1], [1, 2], [2, 3]]
+    backend = MyFakeBackend(num_qubits=4, coupling_map=line, noise_settings={
+        'cz': (500e-9, None, 5e-3), 'ccx': (1e-6, None, 2e-2), 'x': (35.5e-9, None, 1e-4)})
+    properties = backend.properties()
+    assert sorted(tuple(gate.qubits) for gate in properties.gates if gate.gate == 'cz') == [(0, 1), (1, 2), (2, 3)]
+    ccx_qubits = {frozenset(gate.qubits) for gate in properties.gates if gate.gate == 'ccx'}
+    assert ccx_qubits == {frozenset((0, 1, 2)), frozenset((1, 2, 3))}
+    assert len([gate for gate in properties.gates if gate.gate == 'ccx']) == 12
+    assert sorted(backend.target['cz']) == [(0, 1), (1, 2), (2, 3)]
+    assert len(backend.target['ccx']) == 12
+    assert backend.max_gate_error() == get_max_gate_error(properties) == {'ccx': 2e-2}
+
+    # No coupled pairs: the two-qubit gates have no entries
+    backend = MyFakeBackend(num_qubits=1, basis_gates=["id", "rz", "sx", "x"],
+                            noise_settings={'x': (35.5e-9, None, 1e-4), 'cz': (500e-9, None, 5e-3)})
+    assert backend.max_gate_error() == get_max_gate_error(backend.properties()) == {'x': 1e-4}
+    assert get_backend_max_gate_error(backend) == {'x': 1e-4}
+
+    # A large backend gives its maximum gate error without building its target and properties
+    start = time.perf_counter()
+    backend = MyFakeBackend(num_qubits=127, noise_settings={**NOISE_SETTINGS, 'ccx': (1e-6, None, 2e-2)})
+    assert get_backend_max_gate_error(backend) == {'h': 5e-1}
+    assert backend._target is None and backend._properties is None
+    print(f"127-qubit backend and its maximum gate error in {time.perf_counter() - start:.2f}s")
+    print("Fake backend test passed")
+
+
+if __name__ == "__main__":
+    test_fake_backend()
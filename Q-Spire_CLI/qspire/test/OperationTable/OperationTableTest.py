@@ -0,0 +1,117 @@
+import random
+import tracemalloc
+
+from smells.utils.OperationTable import OperationTable, ComposedOperationTable, map_bits
+
+
+def random_operations(lines, count, seed=0):
+    rng = random.Random(seed)
+    operations = []
+    for _ in range(count):
+        row = rng.randrange(1, len(lines) + 1)
+        operation = {
+            'operation_name': rng.choice(['h', 'cx', 'rz', 'measure', 'barrier']),
+            'qubits_affected': rng.sample(range(8), rng.randrange(0, 3)),
+            'clbits_affected': [rng.randrange(8)] if rng.random() < 0.2 else [],
+            'row': row,
+            'column_start': 4,
+            'column_end': 20,
+            'source_line': lines[row - 1].strip(),
+        }
+        if operation['operation_name'] == 'rz':
+            operation['params'] = ['theta']
+        operations.append(operation)
+    return operations
+
+
+def traced_size(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def test_operation_table():
+    """
+        Test that an OperationTable gives back the operation dictionaries it stores, in less memory.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.OperationTable.OperationTableTest
+
+    """
+    lines = [f"    qc.gate_{i}(0, 1)" for i in range(200)]
+    operations = random_operations(lines, 1000)
+    table = OperationTable.from_operations(operations, lines)
+
+    # Same operations through the dictionary-compatible interface
+    assert len(table) == len(operations)
+    assert list(table) == operations
+    assert table == operations
+    assert table[-1] == operations[-1]
+    assert table[10:20] == operations[10:20]
+    assert table.as_dicts() == operations
+
+    # Column accessors
+    assert [table.name(i) for i in range(len(table))] == [op['operation_name'] for op in operations]
+    assert [table.qubits(i) for i in range(len(table))] == [op['qubits_affected'] for op in operations]
+    assert list(table.rows) == [op['row'] for op in operations]
+
+    # Concatenation and copies keep every field
+    doubled = table.copy()
+    doubled.extend(table)
+    assert list(doubled) == operations + operations
+    assert len(table) == len(operations)
+
+    # The columns take a fraction of the memory of the dictionaries
+    many = random_operations(lines, 20000, seed=1)
+    dicts, dicts_size = traced_size(lambda: random_operations(lines, 20000, seed=1))
+    table, table_size = traced_size(lambda: OperationTable.from_operations(many, lines))
+    print(f"20000 operations: {dicts_size / 2**20:.1f} MiB as dictionaries, {table_size / 2**20:.2f} MiB as a table")
+    assert table == dicts
+    assert table_size * 4 < dicts_size
+    print("Operation table test passed")
+
+
+def test_composed_operation_table():
+    """
+        Test that appended subcircuits are kept as references, expanded once read like eager copies.
+
+        python -m qspire.test.OperationTable.OperationTableTest
+
+    """
+    lines = [f"    ansatz.append(layer_{i}, [0, 1, 2])" for i in range(200)]
+    layer = ComposedOperationTable(lines)
+    for operation in random_operations(lines, 30, seed=2):
+        layer.append_operation(operation)
+
+    ansatz = ComposedOperationTable(lines)
+    expected = []
+    ansatz.append('h', [0], [], 1, 0, 5)
+    expected.append(('h', [0], [], 1))
+    for repetition in range(500):
+        targets = [[0, 1, 2, 3, 4, 5, 6, 7], [7, 6, 5, 4, 3, 2, 1, 0]][repetition % 2]
+        ansatz.append_table(layer.own, targets, [1, 0], 2 + repetition % 100, 4, 30)
+        expected.extend((layer.own.name(i), map_bits(layer.own.qubits(i), targets),
+                         map_bits(layer.own.clbits(i), [1, 0]), 2 + repetition % 100) for i in range(len(layer.own)))
+
+    # Nothing is copied before the table is read
+    assert 'rows' not in ansatz.__dict__ and len(ansatz.own) == 1
+
+    summary = [(op['operation_name'], op['qubits_affected'], op['clbits_affected'], op['row']) for op in ansatz]
+    assert summary == expected
+    assert len(ansatz) == 1 + 500 * 30
+    # One mapped view per distinct bit mapping, reused by the 500 appends
+    assert len(layer.own._mapped_views) == 2
+
+    # Operations added to the subcircuit afterwards are not part of the earlier appends
+    layer.append('x', [0], [], 3, 0, 5)
+    assert len(ansatz) == 1 + 500 * 30
+    print("Composed operation table test passed")
+
+
+if __name__ == "__main__":
+    test_operation_table()
+    test_composed_operation_table()
@@ -0,0 +1,92 @@
+import ast
+import os
+import pathlib
+import tempfile
+import tokenize
+
+from smells.utils.AnalysisSession import AnalysisSession
+from smells.utils.ParsedModule import ParsedModule
+from smells.CG.CGDetector import CGDetector
+from smells.CG.CG import CG
+from smells.LPQ.LPQDetector import LPQDetector
+from smells.LPQ.LPQ import LPQ
+
+SOURCE = """from qiskit import QuantumCircuit, transpile
+from qiskit_aer import AerSimulator
+
+# A small circuit
+qc = QuantumCircuit(2, 2)
+qc.h(0)
+qc.cx(0, 1)  # entangle
+qc.measure([0, 1], [0, 1])
+backend = AerSimulator()
+job = backend.run(transpile(qc, backend))
+"""
+
+
+def count_parses(source, action):
+    """Run an action and count the ast.parse calls on the given source."""
+    original_parse = ast.parse
+    calls = []
+
+    def counting_parse(code, *args, **kwargs):
+        if code == source:
+            calls.append(code)
+        return original_parse(code, *args, **kwargs)
+
+    ast.parse = counting_parse
+    try:
+        action()
+    finally:
+        ast.parse = original_parse
+    return len(calls)
+
+
+def test_parsed_module():
+    """
+        Test that the passes of an analysis share one ParsedModule of the file, released at the end.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.ParsedModule.ParsedModuleTest
+
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "circuit.py")
+        pathlib.Path(path).write_text(SOURCE, encoding="utf-8")
+
+        # Outside of an analysis, every call builds its own module
+        assert ParsedModule.for_file(path) is not ParsedModule.for_file(path)
+
+        def analysis():
+            with AnalysisSession(path) as session:
+                module = ParsedModule.for_file(path)
+                assert ParsedModule.for_file(path) is module
+                session.operations
+                session.backend_analysis
+                CGDetector(CG).detect(path)
+                LPQDetector(LPQ).detect(path)
+                assert module.comment_lines == {4, 7}
+                comments = [token.string for token in module.tokens if token.type == tokenize.COMMENT]
+                assert comments == ['# A small circuit', '# entangle']
+
+        # One shared AST, plus the tree instrumented by RunExecuteParametersCalls
+        assert count_parses(SOURCE, analysis) == 2
+
+        # Released with the session
+        with AnalysisSession(path):
+            module = ParsedModule.for_file(path)
+        assert ParsedModule.for_file(path) is not module
+
+        # A modified file gets a new module
+        with AnalysisSession(path):
+            module = ParsedModule.for_file(path)
+            pathlib.Path(path).write_text(SOURCE + "qc.x(0)\n", encoding="utf-8")
+            changed = ParsedModule.for_file(path)
+            assert changed is not module and changed.lines[-2] == "qc.x(0)"
+    print("Parsed module test passed")
+
+
+if __name__ == "__main__":
+    test_parsed_module()
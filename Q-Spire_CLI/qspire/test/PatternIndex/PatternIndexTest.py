@@ -0,0 +1,164 @@
+import os
+import tempfile
+
+from smells.utils.PatternIndex import PatternIndex, circuit_pattern, recording_patterns
+from smells.utils.CircuitBatches import create_circuit_batches
+import smells.ROC.ROCDetector as ROCDetector
+from smells.utils.config_loader import get_config, get_operation_extraction
+from smells.ROC.ROCDetector import roc_smell_present_subsequence
+from smells.Explainer import Explainer
+from smells.QuantumSmell import QuantumSmell
+from detection.DynamicDetection.GeneralFileTest import iter_dynamic_folder_detect
+from detection.ResultCache import ResultCache
+
+
+ANSATZ = """
+qc.ry(0.1, 0)
+qc.ry(0.2, 1)
+qc.cx(0, 1)
+qc.rz(0.3, 1)
+qc.cx(1, 2)
+qc.h(2)
+qc.cx(0, 2)
+"""
+
+FILE_TEMPLATE = """from qiskit import QuantumCircuit
+
+qc = QuantumCircuit(3, 3)
+{before}
+{ansatz}
+{after}
+qc.measure([0, 1, 2], [0, 1, 2])
+"""
+
+
+def batches_of(names):
+    """One single-qubit operation per batch, named after the batch."""
+    return create_circuit_batches([
+        {'operation_name': name, 'qubits_affected': [0], 'clbits_affected': [], 'row': row}
+        for row, name in enumerate(names, 1)
+    ])
+
+
+class RepeatedBlockSmell(QuantumSmell):
+    def __init__(self, block):
+        super().__init__("Block")
+        self.block = block
+
+
+@Explainer.register(RepeatedBlockSmell)
+class RepeatedBlockExplainer(Explainer):
+    calls = 0
+
+    def reuse_key(self, code, smell, method):
+        return smell.block
+
+    def _explain(self, code, smell, method):
+        RepeatedBlockExplainer.calls += 1
+        yield "Explanation of "
+        yield smell.block
+
+
+def test_pattern_index():
+    """
+        Test the index of the circuit patterns of a folder run, and the reuse of the results of identical blocks.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.PatternIndex.PatternIndexTest
+
+    """
+    block = ['ry', 'rz', 'rx', 'sx', 'h', 't']
+
+    # A block pasted in two circuits of two files, between different operations
+    index = PatternIndex()
+    index.add_file("a.py", [circuit_pattern("qc", batches_of(['x', 'y'] + block + ['z'])),
+                            circuit_pattern("short", batches_of(['x']))])
+    index.add_file("b.py", [circuit_pattern("ansatz", batches_of(block + ['u', 'v', 'w']))])
+    index.add_file("c.py", [circuit_pattern("other", batches_of(['p', 'q', 'r', 's', 'u', 'v']))])
+
+    assert [(file, pattern.circuit_name) for file, pattern in index.circuits] == \
+           [("a.py", "qc"), ("b.py", "ansatz"), ("c.py", "other")]
+    blocks = index.repeated_blocks()
+    assert len(blocks) == 1
+    assert blocks[0].batches == len(block)
+    assert [(o.file, o.circuit_name, o.first_batch, o.last_batch, o.first_row, o.last_row)
+            for o in blocks[0].occurrences] == [("a.py", "qc", 3, 8, 3, 8), ("b.py", "ansatz", 1, 6, 1, 6)]
+
+    # A copy of a long circuit with one batch changed is found through the LSH buckets
+    long_circuit = [f"g{i}" for i in range(60)]
+    changed = list(long_circuit)
+    changed[30] = 'changed'
+    index.add_file("d.py", [circuit_pattern("original", batches_of(long_circuit))])
+    index.add_file("e.py", [circuit_pattern("copy", batches_of(changed))])
+    similar = index.similar_circuits()
+    assert [(pair.first, pair.second) for pair in similar] == [(("d.py", "original"), ("e.py", "copy"))]
+    assert 0.7 < similar[0].similarity < 1
+
+    # Folder run: the patterns come from the analysis sessions, and from the cache for unchanged files.
+    # The operations around the ansatz are layers of their own, so that its batches are the same in both files
+    with tempfile.TemporaryDirectory() as folder:
+        sources = {
+            "first.py": FILE_TEMPLATE.format(before="qc.x([0, 1, 2])", ansatz=ANSATZ, after=""),
+            "second.py": FILE_TEMPLATE.format(before="", ansatz=ANSATZ, after="qc.barrier()\nqc.y([0, 1, 2])"),
+        }
+        for name, source in sources.items():
+            with open(os.path.join(folder, name), "w") as f:
+                f.write(source)
+
+        cache = ResultCache(os.path.join(folder, ".cache"), track_dependencies=False)
+        reports = []
+        for run in range(2):
+            index = PatternIndex()
+            results = dict(iter_dynamic_folder_detect(folder, cache=cache, pattern_index=index))
+            assert sorted(os.path.basename(file) for file in results) == ["first.py", "second.py"]
+            blocks = index.repeated_blocks()
+            assert blocks and {os.path.basename(o.file) for o in blocks[0].occurrences} == {"first.py", "second.py"}
+            reports.append([(block.batches, [(os.path.basename(o.file),) + tuple(o[1:]) for o in block.occurrences])
+                            for block in blocks])
+        assert cache.hits == 4  # Smells and patterns of the two files in the second run
+        assert reports[0] == reports[1]
+
+        # Results extracted with the other operation extraction are not reused
+        config = get_config()
+        extraction = config.get("Operation_extraction")
+        config["Operation_extraction"] = "runtime" if get_operation_extraction() == "regex" else "regex"
+        try:
+            other = ResultCache(os.path.join(folder, ".cache"), track_dependencies=False)
+            assert other.fingerprint != cache.fingerprint
+            assert other.get(os.path.join(folder, "first.py"), "dynamic") is None
+        finally:
+            if extraction is None:
+                del config["Operation_extraction"]
+            else:
+                config["Operation_extraction"] = extraction
+
+        # Nothing is recorded outside recording_patterns()
+        with recording_patterns() as patterns:
+            pass
+        assert patterns == []
+
+    # ROC reuses the matches of identical circuits, keeping the matches of the last circuits only
+    cache = ROCDetector._grouped_matches_cache
+    batches = batches_of(['h', 'x'] * 10)
+    hits = cache.hits
+    first = roc_smell_present_subsequence(batches, 1, True)
+    second = roc_smell_present_subsequence(batches_of(['h', 'x'] * 10), 1, True)
+    assert first == second == (True, [(1, 2, 10, 20)])
+    assert cache.hits == hits + 1
+    for size in range(1, cache.maxsize + 2):
+        roc_smell_present_subsequence(batches_of(['h'] * size), 1, True)
+    assert len(cache._entries) == cache.maxsize
+    assert all(isinstance(key, bytes) and len(key) == 16 for key in cache._entries)
+
+    # Explainers reuse the explanation of identical blocks
+    texts = ["".join(Explainer.explain("", RepeatedBlockSmell(block), "dynamic"))
+             for block in ("ry rz", "ry rz", "h t")]
+    assert texts == ["Explanation of ry rz", "Explanation of ry rz", "Explanation of h t"]
+    assert RepeatedBlockExplainer.calls == 2
+    print("Pattern index test passed")
+
+
+if __name__ == "__main__":
+    test_pattern_index()
@@ -0,0 +1,110 @@
+import random
+
+from smells.utils.CircuitBatches import create_circuit_batches
+from smells.utils.OperationTable import OperationTable
+from smells.utils.QubitTimeline import QubitTimeline, VECTORIZE_MIN_ENTRIES
+from smells.IdQ.IdQDetector import detect_idq_smell_from_timeline
+from smells.IQ.IQDetector import detect_iq_smell_from_timeline
+
+
+def legacy_batch_histories(batches):
+    """Per-qubit (batch, operation) histories, as the IdQ and IQ detectors built them from the batches."""
+    history = {}
+    for batch_num in sorted(batches):
+        for operation in batches[batch_num]:
+            for qubit in operation['qubits_affected']:
+                history.setdefault(qubit, []).append((batch_num, operation))
+    return history
+
+
+def legacy_idq(batches, max_distance):
+    return [(qubit, history[i][1]['row'], history[i][0] - history[i - 1][0] - 1)
+            for qubit, history in legacy_batch_histories(batches).items()
+            for i in range(1, len(history))
+            if history[i][0] - history[i - 1][0] - 1 > max_distance]
+
+
+def legacy_iq(batches, max_distance):
+    return [(qubit, history[1][1]['row'], history[1][0] - history[0][0] - 1)
+            for qubit, history in legacy_batch_histories(batches).items()
+            if len(history) >= 2 and history[1][0] - history[0][0] - 1 > max_distance]
+
+
+def legacy_im(operations):
+    qubit_ops = {}
+    for idx, operation in enumerate(operations):
+        for qubit in operation['qubits_affected']:
+            qubit_ops.setdefault(qubit, []).append(idx)
+    return [(qubit, op_idx) for qubit, op_list in qubit_ops.items()
+            for i, op_idx in enumerate(op_list)
+            if operations[op_idx]['operation_name'] == 'measure' and i < len(op_list) - 1]
+
+
+def random_table(num_qubits, num_operations, seed):
+    rng = random.Random(seed)
+    table = OperationTable()
+    for row in range(num_operations):
+        kind = rng.random()
+        if kind < 0.5:
+            name, qubits = rng.choice(['h', 'x', 'measure']), [rng.randrange(num_qubits)]
+        elif kind < 0.95 and num_qubits > 1:
+            name, qubits = 'cx', rng.sample(range(num_qubits), 2)
+        else:
+            name, qubits = 'barrier', list(range(num_qubits))
+        # Every operation gets its own row, so that rows identify operations
+        table.append(name, qubits, [], row + 1, 0, 5)
+    return table
+
+
+def test_qubit_timeline():
+    """
+        Test that the shared qubit timelines give the IdQ, IQ and IM results of the previous
+        per-detector histories, in the same order.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.QubitTimeline.QubitTimelineTest
+
+    """
+    for seed in range(30):
+        table = random_table(num_qubits=1 + seed % 7, num_operations=200, seed=seed)
+        operations = list(table)
+        batches = create_circuit_batches(operations)
+        timeline = QubitTimeline(table)
+
+        # Layers are the batch numbers
+        batch_of_row = {op['row']: batch_num for batch_num, batch in batches.items() for op in batch}
+        for qubit, layers in timeline.layers.items():
+            assert list(layers) == [batch_of_row[table.rows[i]] for i in timeline.op_indices[qubit]]
+
+        for max_distance in (0, 1, 2, 5):
+            idq = [(smell.qubit, smell.row, smell.operation_distance)
+                   for smell in detect_idq_smell_from_timeline(timeline, max_distance, "qc")]
+            assert idq == legacy_idq(batches, max_distance)
+            iq = [(smell.qubit, smell.row, smell.operation_distance)
+                  for smell in detect_iq_smell_from_timeline(timeline, max_distance, "qc")]
+            assert iq == legacy_iq(batches, max_distance)
+            # The NumPy kernel gives the same gaps, whatever the size of the circuit
+            assert timeline._idle_gaps_vectorized(max_distance) == [
+                (qubit, table.rows.index(row), distance) for qubit, row, distance in idq]
+
+        assert timeline.non_terminal_measures() == legacy_im(operations)
+
+    # A circuit without measurements
+    table = OperationTable()
+    table.append('h', [0], [], 1, 0, 5)
+    assert QubitTimeline(table).non_terminal_measures() == []
+    assert QubitTimeline(OperationTable())._idle_gaps_vectorized(0) == []
+
+    # A circuit large enough for idle_gaps to use the NumPy kernel
+    table = random_table(num_qubits=50, num_operations=4000, seed=0)
+    timeline = QubitTimeline(table)
+    assert timeline.num_entries >= VECTORIZE_MIN_ENTRIES
+    assert timeline.idle_gaps(2) == [(qubit, table.rows.index(row), distance)
+                                     for qubit, row, distance in legacy_idq(create_circuit_batches(list(table)), 2)]
+    print("Qubit timeline test passed")
+
+
+if __name__ == "__main__":
+    test_qubit_timeline()
@@ -0,0 +1,125 @@
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+
+from util.AnalysisServer import AnalysisServer, send_request, token_file_path
+from detection.DynamicDetection.GeneralFileTest import dynamic_file_detect
+
+
+MARKER_CODE = """open(__file__ + ".ran", "w").close()
+"""
+
+
+def raw_exchange(path, data):
+    """Send raw bytes on the Unix socket of the server, and read its answer until it closes the connection."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(10)
+        client.connect(path)
+        client.sendall(data)
+        answer = b""
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                return answer
+            answer += chunk
+
+
+def test_server():
+    """
+        Test the analysis server with a local client over a Unix socket.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.Server.AnalysisServerTest
+
+    """
+
+    file = os.path.abspath("qspire/test/IdQ/IdQCode.py")
+    folder = os.path.abspath("qspire/test/IQ")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        address = f"unix:{os.path.join(tmp, 'qspire.sock')}"
+        server = AnalysisServer(address, jobs=2, cache_directory=os.path.join(tmp, "cache")).start()
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        try:
+            assert [e["event"] for e in send_request(address, {"id": "p", "command": "ping"})] == ["pong"]
+
+            # Same smells as a one-shot dynamic analysis
+            expected = sorted(json.dumps(s.as_dict(), sort_keys=True, default=str) for s in dynamic_file_detect(file))
+            events = list(send_request(address, {"id": "1", "method": "dynamic", "resource": file}))
+            print([e["event"] for e in events])
+            assert [e["event"] for e in events] == ["queued", "started", "file", "done"]
+            smells = sorted(json.dumps(s, sort_keys=True) for s in events[2]["smells"])
+            assert smells == expected
+            assert events[2]["cached"] is False
+
+            # The second request is served by the cache
+            events = list(send_request(address, {"id": "2", "method": "dynamic", "resource": file}))
+            assert events[2]["cached"] is True
+            assert sorted(json.dumps(s, sort_keys=True) for s in events[2]["smells"]) == expected
+
+            # Option overrides get their own cache entries
+            events = list(send_request(address, {"id": "3", "method": "dynamic", "resource": file,
+                                                 "options": {"IdQ": {"max_distance": 100}}}))
+            assert events[2]["cached"] is False
+            print(f"IdQ smells with max_distance=100: {len(events[2]['smells'])}, default: {len(expected)}")
+
+            # Folders stream one event per file
+            events = list(send_request(address, {"id": "4", "method": "static", "resource": folder}))
+            print([(e["event"], os.path.basename(e.get("file", ""))) for e in events])
+            assert events[-1]["event"] == "done"
+            assert sum(1 for e in events if e["event"] == "file") == events[-1]["files"]
+
+            events = list(send_request(address, {"id": "5", "method": "dynamic", "resource": "missing.py"}))
+            assert events[-1]["event"] == "error"
+
+            print(list(send_request(address, {"command": "stats"})))
+
+            # The token is readable by the user of the server only
+            assert stat.S_IMODE(os.stat(token_file_path(address)).st_mode) == 0o600
+
+            # A request wrapped in HTTP (a web page posting to the server) closes the connection unanswered
+            marker = os.path.join(tmp, "marker.py")
+            with open(marker, "w") as f:
+                f.write(MARKER_CODE)
+            body = json.dumps({"method": "dynamic", "resource": marker})
+            http = (f"POST / HTTP/1.1\r\nHost: 127.0.0.1:8765\r\nOrigin: http://evil.example\r\n"
+                    f"Content-Type: text/plain\r\nContent-Length: {len(body)}\r\n\r\n{body}\n").encode("utf-8")
+            answer = raw_exchange(address[len("unix:"):], http)
+            assert [json.loads(line)["event"] for line in answer.splitlines()] == ["error"]
+
+            # So does a JSON request without the token of the server, or with a wrong one
+            for token in (None, "0" * 64):
+                request = {"method": "dynamic", "resource": marker, **({"token": token} if token else {})}
+                answer = raw_exchange(address[len("unix:"):], (json.dumps(request) + "\n" + body + "\n").encode())
+                assert [json.loads(line)["message"] for line in answer.splitlines()] == ["Invalid token"]
+            assert not os.path.exists(marker + ".ran")
+            assert list(send_request(address, {"command": "stats"}))[0]["completed_jobs"] == 5
+        finally:
+            list(send_request(address, {"command": "shutdown"}))
+            thread.join()
+        assert not os.path.exists(token_file_path(address))
+
+        # Only a stale socket is replaced: a regular file at the address is kept
+        taken = os.path.join(tmp, "taken.sock")
+        with open(taken, "w") as f:
+            f.write("data")
+        try:
+            AnalysisServer(f"unix:{taken}", jobs=1, use_cache=False).start()
+            assert False, "The server replaced a regular file"
+        except OSError as e:
+            print(f"Refused: {e}")
+        with open(taken) as f:
+            assert f.read() == "data"
+
+    print("Analysis server test passed")
+
+
+if __name__ == "__main__":
+    test_server()
@@ -0,0 +1,73 @@
+import time
+
+from smells.utils.SourceCleaner import clean_source, CleanedSource
+
+
+SOURCE = '''"""
+Module docstring with a # hash and qc.h(0)
+"""
+from qiskit import QuantumCircuit
+
+qc = QuantumCircuit(2)  # two qubits
+qc.h(0)
+label = "not # a comment"
+qc.cx(0, 1)  # entangle
+text = """a
+b""" + str(1)  # tail
+qc.measure_all()
+'''
+
+
+def test_source_cleaner():
+    """
+        Test that comments and triple-quoted strings are removed, lines are kept and columns map back.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.SourceCleaner.SourceCleanerTest
+
+    """
+    cleaned = clean_source(SOURCE)
+    assert cleaned.tokenized
+    assert len(cleaned.lines) == len(SOURCE.split('\n'))
+    assert cleaned.lines[:3] == ('', '', '')
+    assert cleaned.lines[5] == 'qc = QuantumCircuit(2)  '
+    assert cleaned.lines[6] == 'qc.h(0)'
+    assert cleaned.lines[7] == 'label = "not # a comment"'
+    assert cleaned.lines[9] == 'text = '
+    assert cleaned.lines[10] == ' + str(1)  '
+    assert 'qc.h(0)' not in cleaned.text.split('\n')[1]
+
+    # Columns of the cleaned lines in the original lines
+    assert cleaned.original_column(11, 3) == SOURCE.split('\n')[10].index('str')
+    assert cleaned.original_column(7, 3) == 3
+
+    # Tokens shared with the Mapping helpers
+    assert [token.start[0] for token in cleaned.comments] == [6, 9, 11]
+
+    # Computed once per source text
+    assert clean_source(SOURCE) is cleaned
+    assert clean_source(SOURCE.encode().decode()) is cleaned
+
+    # A source that cannot be tokenized is cleaned line by line
+    broken = clean_source('x = 1  # c\ny = """open\nstill open\n')
+    assert not broken.tokenized
+    assert broken.lines == ('x = 1  ', 'y = ', '', '')
+    print("Source cleaner test passed")
+
+
+def test_source_cleaner_is_linear():
+    """Long lines full of # in strings: the previous cleaner rescanned the line prefix for every #."""
+    line = 'qc.h(0); s = "' + '#' * 2000 + '"  # end'
+    source = '\n'.join([line] * 200)
+    start = time.perf_counter()
+    cleaned = CleanedSource(source)
+    elapsed = time.perf_counter() - start
+    assert all(cleaned_line == line[:line.index('  # end') + 2] for cleaned_line in cleaned.lines)
+    print(f"Cleaned {len(source)} characters in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    test_source_cleaner()
+    test_source_cleaner_is_linear()
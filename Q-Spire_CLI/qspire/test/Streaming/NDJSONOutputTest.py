@@ -0,0 +1,115 @@
+import builtins
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from util.StreamingOutput import smell_to_json
+from detection.StaticDetection.StaticMappedFolderDetection import static_folder_detect
+from detection.ParallelDetection import iter_detect_in_parallel, iter_detect_with_executor
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Executor recording how many submitted files were not consumed yet."""
+
+    def __init__(self, max_workers):
+        super().__init__(max_workers=max_workers)
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.lock = threading.Lock()
+
+    def submit(self, *args, **kwargs):
+        with self.lock:
+            self.outstanding += 1
+            self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        return super().submit(*args, **kwargs)
+
+
+def patching_detect(file):
+    """Patch builtins like the analyzed code may do, returning what the previous file left there."""
+    leaked = getattr(builtins, "qspire_previous_file", None)
+    builtins.qspire_previous_file = file
+    return [(leaked, os.getpid())]
+
+
+def slow_detect(file):
+    time.sleep(0.002)
+    return [file]
+
+
+def test_ndjson_output():
+    """
+        Test that `--format ndjson` streams the same smells as a regular folder analysis, as JSON lines only.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.Streaming.NDJSONOutputTest
+
+    """
+
+    qspire_root = os.path.abspath("qspire")
+    folder = "test/CG"
+
+    command = [sys.executable, "-m", "util.CLIModule", "-static", "--no-cache", "--format", "ndjson", folder]
+    proc = subprocess.run(command, cwd=qspire_root, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+    # Every stdout line is a smell: the progress messages went to stderr
+    streamed = sorted(json.dumps(json.loads(line), sort_keys=True) for line in proc.stdout.splitlines())
+
+    def as_lines(results):
+        return sorted(json.dumps({"file": file, **smell_to_json(smell)}, sort_keys=True)
+                      for file, smells in results.items() for smell in smells)
+
+    cwd = os.getcwd()
+    os.chdir(qspire_root)
+    try:
+        expected = as_lines(static_folder_detect(folder))
+
+        # Parallel runs in the same working directory each keep their executables to themselves
+        concurrent = [None, None]
+        def parallel_run(position):
+            concurrent[position] = as_lines(static_folder_detect(folder, jobs=2))
+        runs = [threading.Thread(target=parallel_run, args=(position,)) for position in range(2)]
+        for run in runs:
+            run.start()
+        for run in runs:
+            run.join()
+        assert concurrent == [expected, expected]
+        assert not os.path.exists(os.path.join(qspire_root, "generated_executables", "workers"))
+    finally:
+        os.chdir(cwd)
+
+    print(f"{len(streamed)} smells streamed")
+    assert streamed == expected
+
+    command[command.index("ndjson")] = "ndjson-files"
+    proc = subprocess.run(command, cwd=qspire_root, capture_output=True, text=True)
+    files = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert sum(len(f["smells"]) for f in files) == len(expected)
+
+    # Files are submitted as the previous ones complete: at most 2 per worker in flight
+    with CountingExecutor(max_workers=2) as executor:
+        results = []
+        for file, smells in iter_detect_with_executor(executor, slow_detect, (f"file{i}.py" for i in range(50))):
+            executor.outstanding -= 1
+            results.append((file, smells))
+    assert sorted(results) == sorted((f"file{i}.py", [f"file{i}.py"]) for i in range(50))
+    assert executor.max_outstanding <= 4
+
+    # Every file runs in a fresh worker: nothing patched by a file is seen by the next one
+    module = importlib.import_module("qspire.test.Streaming.NDJSONOutputTest")
+    results = dict(iter_detect_in_parallel(module.patching_detect, [f"file{i}.py" for i in range(6)], 2))
+    assert [leaked for (leaked, _), in results.values()] == [None] * 6
+    assert len({pid for (_, pid), in results.values()}) == 6
+
+    print("NDJSON output test passed")
+
+
+if __name__ == "__main__":
+    test_ndjson_output()
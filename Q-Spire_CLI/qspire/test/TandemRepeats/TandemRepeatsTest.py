@@ -0,0 +1,152 @@
+import random
+
+import numpy as np
+
+from smells.ROC.ROCDetector import batch_signature, roc_smell_present_subsequence
+from smells.utils.TandemRepeats import SMALL_SEQUENCE, find_runs, fingerprints, shortest_squares, _shortest_squares_small
+
+
+def legacy_roc_smell_present_subsequence(circuit_batches, min_sub_len=1, return_matches=False):
+    """
+    The slice comparisons previously done by roc_smell_present_subsequence, kept as the reference.
+
+    Detect repeated *consecutive* subsequences of batches and group repeated occurrences.
+    Returns grouped matches:
+    (start_batch_index, slice_size, repetition_count, last_batch_index)
+    """
+    batch_indices = sorted(circuit_batches.keys())
+    batch_signatures = [batch_signature(circuit_batches[i]) for i in batch_indices]
+    num_batches = len(batch_signatures)
+
+    grouped_matches = []
+    i = 0
+
+    while i < num_batches:
+        max_possible_slice = (num_batches - i) // 2
+        best_slice_size = 0
+        repetition_count = 0
+
+        # Try each slice size starting from 1
+        for slice_size in range(1, max_possible_slice + 1):
+            slice1 = batch_signatures[i : i + slice_size]
+            slice2 = batch_signatures[i + slice_size : i + 2 * slice_size]
+
+            if slice1 != slice2:
+                continue
+
+            # Found a repeating slice — now count how many consecutive repetitions
+            count = 1
+            next_start = i + slice_size * 2
+
+            while next_start + slice_size <= num_batches:
+                next_slice = batch_signatures[next_start : next_start + slice_size]
+                if next_slice != slice1:
+                    break
+                count += 1
+                next_start += slice_size
+
+            # Update best if longer sequence found
+            if count > 0:
+                best_slice_size = slice_size
+                repetition_count = count
+                break   # keep original algorithm: stop at the first valid slice size
+
+        if best_slice_size > 0:
+            # Skip too short subsequences (not enough operations)
+            total_ops_first = sum(len(circuit_batches[batch_indices[i + k]])
+                                  for k in range(best_slice_size))
+            if total_ops_first >= min_sub_len:
+                first_batch = batch_indices[i]
+                last_batch = batch_indices[i + best_slice_size * (repetition_count + 1) - 1]
+                grouped_matches.append(
+                    (first_batch, best_slice_size, repetition_count + 1, last_batch)
+                )
+
+            # skip entire repeated region
+            i += best_slice_size * (repetition_count + 1)
+        else:
+            i += 1
+
+    has_smell = len(grouped_matches) > 0
+    if return_matches:
+        return has_smell, grouped_matches
+    return has_smell
+
+
+
+def random_batches(num_batches, num_kinds, rng):
+    """Batches drawn from a few kinds, so that many slices repeat."""
+    kinds = [[{'operation_name': name, 'qubits_affected': [qubit], 'clbits_affected': [], 'row': 0}
+              for qubit, name in enumerate(rng.choice(['h', 'x', 'rz']) for _ in range(rng.randrange(1, 4)))]
+             for _ in range(num_kinds)]
+    return {i + 1: rng.choice(kinds) for i in range(num_batches)}
+
+
+def naive_runs(symbols):
+    """Maximal intervals of smallest period p and length >= 2p, by brute force."""
+    n = len(symbols)
+    runs = set()
+    for start in range(n):
+        for end in range(start + 2, n + 1):
+            block = symbols[start:end]
+            period = next(p for p in range(1, len(block) + 1)
+                          if all(block[k] == block[k + p] for k in range(len(block) - p)))
+            if len(block) < 2 * period:
+                continue
+            extends_left = start > 0 and symbols[start - 1] == symbols[start - 1 + period]
+            extends_right = end < n and symbols[end] == symbols[end - period]
+            if not extends_left and not extends_right:
+                runs.add((start, end, period))
+    return sorted(runs)
+
+
+def test_tandem_repeats():
+    """
+        Test that ROC groups the repeated slices of batches as the previous slice comparisons did.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.TandemRepeats.TandemRepeatsTest
+
+    """
+    rng = random.Random(0)
+
+    # Runs of small sequences against brute force
+    for _ in range(300):
+        symbols = [rng.randrange(1, rng.choice([2, 3, 4]) + 1) for _ in range(rng.randrange(0, 25))]
+        runs = [tuple(run) for run in find_runs(np.array(symbols, dtype=np.int64)).tolist()]
+        assert runs == naive_runs(symbols), symbols
+
+    # Shortest repeated slice at every position
+    symbols = fingerprints(list("aaaababab"))
+    assert list(symbols) == [1, 1, 1, 1, 2, 1, 2, 1, 2]
+    sizes, run_ends = shortest_squares(symbols)
+    assert sizes == [1, 1, 1, 2, 2, 2, 0, 0, 0]
+    assert [(end - i) // size if size else 0 for i, (size, end) in enumerate(zip(sizes, run_ends))] == \
+           [4, 3, 2, 3, 2, 2, 0, 0, 0]
+
+    # Runs and direct comparisons agree on the sequences long enough for the runs
+    for _ in range(50):
+        symbols = np.array([rng.randrange(1, rng.choice([2, 3, 4]) + 1)
+                            for _ in range(rng.randrange(SMALL_SEQUENCE, 3 * SMALL_SEQUENCE))], dtype=np.int64)
+        assert shortest_squares(symbols) == _shortest_squares_small(symbols.tolist())
+
+    # Grouped matches of ROC, on short and long circuits
+    for _ in range(300):
+        batches = random_batches(rng.choice([rng.randrange(0, 80), rng.randrange(SMALL_SEQUENCE, 2 * SMALL_SEQUENCE)]),
+                                 rng.choice([1, 2, 3, 5]), rng)
+        for min_sub_len in (1, 2, 4):
+            expected = legacy_roc_smell_present_subsequence(batches, min_sub_len, return_matches=True)
+            assert roc_smell_present_subsequence(batches, min_sub_len, return_matches=True) == expected
+            assert roc_smell_present_subsequence(batches, min_sub_len) == expected[0]
+
+    # Batch numbers do not need to be contiguous
+    batches = random_batches(SMALL_SEQUENCE + 40, 2, rng)
+    batches = {2 * number + 5: batch for number, batch in batches.items()}
+    assert roc_smell_present_subsequence(batches, 1, True) == legacy_roc_smell_present_subsequence(batches, 1, True)
+    print("Tandem repeats test passed")
+
+
+if __name__ == "__main__":
+    test_tandem_repeats()
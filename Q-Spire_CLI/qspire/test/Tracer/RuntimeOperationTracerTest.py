@@ -0,0 +1,74 @@
+import os
+import pathlib
+import tempfile
+
+from qiskit import QuantumCircuit
+from smells.utils.AnalysisSession import AnalysisSession
+
+SOURCE = """from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+theta = Parameter('theta')
+
+def layer(circuit, n):
+    for i in range(n - 1):
+        circuit.cx(i, i + 1)
+
+sub = QuantumCircuit(2)
+sub.h(0)
+sub.rx(theta, 1)
+qc = QuantumCircuit(3, 3)
+for i in range(3):
+    qc.h(i)
+layer(qc, 3)
+qc.append(sub, [1, 2])
+qc.compose(sub, [0, 1], inplace=True)
+qc.measure(0, 0)
+"""
+
+
+def summary(operations):
+    return [(op['operation_name'], op['qubits_affected'], op['clbits_affected'], op['row']) for op in operations]
+
+
+def test_runtime_operation_tracer():
+    """
+        Test the runtime extraction of the operations: loops, helper functions, appended and
+        composed subcircuits are recorded as executed, at the line of the call.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.Tracer.RuntimeOperationTracerTest
+
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        file = os.path.join(tmp, "circuits.py")
+        pathlib.Path(file).write_text(SOURCE)
+        operations = AnalysisSession(file, operation_extraction="runtime").operations
+
+    print(operations)
+    assert summary(operations['sub']) == [('h', [0], [], 10), ('rx', [1], [], 11)]
+    assert summary(operations['qc']) == [
+        ('h', [0], [], 14), ('h', [1], [], 14), ('h', [2], [], 14),
+        ('cx', [0, 1], [], 7), ('cx', [1, 2], [], 7),
+        ('h', [1], [], 16), ('rx', [2], [], 16),
+        ('h', [0], [], 17), ('rx', [1], [], 17),
+        ('measure', [0], [0], 18),
+    ]
+    assert operations['qc'][6]['params'] == ['theta']
+    first = operations['qc'][0]
+    assert (first['column_start'], first['column_end'], first['source_line']) == (4, 11, 'qc.h(i)')
+
+    # The circuit methods are restored once the execution is over
+    assert QuantumCircuit._append.__module__.startswith('qiskit')
+
+    # Same operations as the textual extraction on a file it fully understands
+    iq_file = os.path.abspath("qspire/test/IQ/IQCode.py")
+    runtime = AnalysisSession(iq_file, operation_extraction="runtime").operations
+    textual = AnalysisSession(iq_file, operation_extraction="regex").operations
+    assert summary(runtime['qc'][:12]) == summary(textual['qc'][:12])
+    print("Runtime operation tracer test passed")
+
+
+if __name__ == "__main__":
+    test_runtime_operation_tracer()
@@ -0,0 +1,78 @@
+import os
+import pathlib
+import subprocess
+import tempfile
+import threading
+import time
+
+from detection.WarmWorkerPool import ForkServer, run_python_file
+
+
+SLOW_SCRIPT = """import os
+import time
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "pid"), "w") as f:
+    f.write(str(os.getpid()))
+while True:
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "ticks"), "a") as f:
+        f.write(".")
+    time.sleep(0.05)
+"""
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_warm_worker_pool():
+    """
+        Test the runs of the warm fork server: outputs, exit codes, and scripts killed at their timeout.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.WarmWorkerPool.WarmWorkerPoolTest
+
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "hello.py")
+        pathlib.Path(script).write_text("import sys\nprint('hello')\nsys.exit(3)\n", encoding="utf-8")
+        result = run_python_file(script)
+        assert (result.returncode, result.stdout) == (3, "hello\n")
+
+        # As subprocess.run, a script still running at its timeout is killed
+        script = os.path.join(tmp, "slow.py")
+        pathlib.Path(script).write_text(SLOW_SCRIPT, encoding="utf-8")
+        start = time.perf_counter()
+        try:
+            run_python_file(script, timeout=0.5)
+            raise AssertionError("The slow script did not time out")
+        except subprocess.TimeoutExpired:
+            pass
+        print(f"Timed out after {time.perf_counter() - start:.2f}s")
+
+        pid = int(pathlib.Path(tmp, "pid").read_text())
+        assert not process_exists(pid)
+        ticks = pathlib.Path(tmp, "ticks").read_text()
+        time.sleep(0.3)
+        assert pathlib.Path(tmp, "ticks").read_text() == ticks
+
+        # The children still running when the caller goes away are killed with the server
+        os.remove(os.path.join(tmp, "pid"))
+        server = ForkServer()
+        threading.Thread(target=server.run, args=(script, tmp, os.devnull, os.devnull), daemon=True).start()
+        while not os.path.exists(os.path.join(tmp, "pid")) or not pathlib.Path(tmp, "pid").read_text():
+            time.sleep(0.05)
+        server.close()
+        pid = int(pathlib.Path(tmp, "pid").read_text())
+        assert not process_exists(pid)
+
+    print("Warm worker pool test passed")
+
+
+if __name__ == "__main__":
+    test_warm_worker_pool()
@@ -0,0 +1,84 @@
+import contextlib
+import io
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import time
+
+from util.WatchMode import watch_folder
+
+
+class Output(io.StringIO):
+    """Captured stdout that can be polled while the watcher prints to it."""
+
+    def wait_for(self, text, count=1, timeout=120):
+        deadline = time.monotonic() + timeout
+        while self.getvalue().count(text) < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"'{text}' not printed {count} times:\n{self.getvalue()}")
+            time.sleep(0.05)
+
+
+def run_watch(polling):
+    test_folder = os.path.abspath("qspire/test")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = os.path.join(tmp, "project")
+        results_folder = os.path.join(tmp, "results")
+        os.makedirs(project)
+        shutil.copy(os.path.join(test_folder, "CG", "CGCode.py"), os.path.join(project, "circuits.py"))
+        pathlib.Path(project, "helper.py").write_text("SHOTS = 1024\n")
+        pathlib.Path(project, "runner.py").write_text("from helper import SHOTS\nprint(SHOTS)\n")
+
+        output = Output()
+        returned = {}
+
+        def watch():
+            returned.update(watch_folder(project, "static", results_folder, jobs=1,
+                                         debounce=0.3, polling=polling, max_bursts=2))
+
+        with contextlib.redirect_stdout(output):
+            thread = threading.Thread(target=watch)
+            thread.start()
+            output.wait_for("watching for changes")
+
+            # A burst: circuits.py is saved three times and a new file appears, the other files do not change
+            source = pathlib.Path(test_folder, "CG", "CGCode.py").read_text()
+            for end in (40, 30, 20):
+                pathlib.Path(project, "circuits.py").write_text("\n".join(source.splitlines()[:end]) + "\n")
+                time.sleep(0.05)
+            shutil.copy(os.path.join(test_folder, "LPQ", "LPQCode.py"), os.path.join(project, "lpq.py"))
+            output.wait_for("watching for changes", 2)
+
+            # A change of an imported module analyzes its importers again
+            pathlib.Path(project, "helper.py").write_text("SHOTS = 2048\n")
+            thread.join(timeout=120)
+
+    log = output.getvalue()
+    print(log)
+    assert not thread.is_alive()
+    assert "2 changed files, analyzing 2 affected files" in log
+    assert "1 changed files, analyzing 2 affected files" in log
+    assert len(returned[os.path.join(project, "circuits.py")]) < 9
+    assert len(returned[os.path.join(project, "lpq.py")]) > 0
+
+
+def test_watch_mode():
+    """
+        Test the watch mode, with inotify and with polling, on a temporary project.
+
+        Make sure to be inside the folder QSmell_Tool/qspire
+        Since imports are relative, in order to test the code below execute the following script in the terminal
+
+        python -m qspire.test.Watch.WatchModeTest
+
+    """
+    run_watch(polling=False)
+    run_watch(polling=True)
+    print("Watch mode test passed")
+
+
+if __name__ == "__main__":
+    test_watch_mode()
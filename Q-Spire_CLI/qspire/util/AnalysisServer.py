@@ -0,0 +1,503 @@
+import functools
+import hmac
+import json
+import os
+import queue
+import secrets
+import shutil
+import socket
+import socketserver
+import stat
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from util.StreamingOutput import smell_to_json
+
+"""
+Long-lived local analysis server (`qspire serve`).
+
+Clients connect on a Unix socket (unix:/path, by default in the private runtime folder of the
+user) or, when a host:port address is given explicitly, on TCP, and exchange JSON lines. An
+analyze request:
+
+    {"id": "1", "command": "analyze", "method": "static", "resource": "/abs/path/file_or_folder",
+     "options": {"IdQ": {"max_distance": 3}}, "cache": true, "token": "..."}
+
+is queued (the queue is bounded) and answered with a stream of events, one JSON line each:
+
+    {"id": "1", "event": "queued"}
+    {"id": "1", "event": "file", "file": "...", "smells": [...], "cached": false}
+    {"id": "1", "event": "done", "files": 3, "smells": 7, "elapsed": 1.2}
+
+or {"id": "1", "event": "error", "message": "..."}. Other commands: ping, stats, shutdown.
+
+Analyzing a file executes it, so every request carries the token the server generates at startup
+and writes, readable by its user only, in its token file (token_file_path, read by send_request).
+A connection is closed on the first line that is not a JSON request with the right token: a web
+page posting to the TCP port can neither authenticate nor smuggle a JSON line after its headers.
+
+The detection stacks are imported once by the fork server of the pool; every file is analyzed
+in a fresh worker process forked from it (warm, and isolated from the other files), and results
+are cached in the same ResultCache used by the CLI.
+"""
+
+DEFAULT_TCP_ADDRESS = "127.0.0.1:8765"
+SOCKET_FILE = "server.sock"
+TOKEN_SUFFIX = ".token"
+DEFAULT_MAX_QUEUED_JOBS = 16
+DEFAULT_CONCURRENT_JOBS = 2
+
+# Events closing the stream of a request
+FINAL_EVENTS = {"done", "error", "pong", "stats", "shutdown"}
+
+
+def runtime_directory():
+    """Private folder (0700) of the socket and token files of the servers of the user."""
+    directory = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or os.path.expanduser("~"), ".qspire")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return directory
+
+
+def default_address():
+    """Unix socket in the runtime folder, or localhost TCP where Unix sockets are not available."""
+    if hasattr(socket, "AF_UNIX"):
+        return f"unix:{os.path.join(runtime_directory(), SOCKET_FILE)}"
+    return DEFAULT_TCP_ADDRESS
+
+
+def token_file_path(address):
+    """
+    File holding the token of the server listening on an address.
+
+    Args:
+        address: "unix:/path/to/socket" or "host:port"
+
+    Returns:
+        Path of the socket followed by .token, or a file of the runtime folder for TCP addresses
+    """
+    family, bind_address = parse_address(address)
+    if family != socket.AF_INET:
+        return os.path.abspath(bind_address) + TOKEN_SUFFIX
+    host, port = bind_address
+    return os.path.join(runtime_directory(), f"server-{host}-{port}{TOKEN_SUFFIX}")
+
+
+def read_token(address):
+    """Token of the server listening on an address, from its token file."""
+    with open(token_file_path(address), "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def _write_private_file(path, content):
+    """Write a file readable and writable by its owner only (0600), replacing any previous one."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _remove_stale_socket(path):
+    """
+    Remove the socket left at path by a server that is gone.
+
+    Raises:
+        OSError: When path is not a socket, or a server still listens on it
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)  # Nobody listens: stale
+            return
+    raise OSError(f"A server is already listening on {path}")
+
+
+def parse_address(address):
+    """
+    Parse a server address.
+
+    Args:
+        address: "unix:/path/to/socket", "host:port" or ":port" (localhost)
+
+    Returns:
+        Tuple of (socket family, address usable by bind/connect)
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def analyze_file(method, detector_overrides, output_root, file):
+    """
+    Analyze one file inside a worker process of the server.
+
+    Args:
+        method: "static" or "dynamic"
+        detector_overrides: Detector options overriding config.json for this job
+        output_root: Folder of the executables of the job (static method)
+        file: Path to the Python file to analyze
+
+    Returns:
+        List of smells
+    """
+    from smells.utils.config_loader import set_detector_overrides
+
+    set_detector_overrides(detector_overrides)
+    try:
+        if method == "static":
+            from detection.StaticDetection.StaticMappedFolderDetection import static_worker_detect
+            return static_worker_detect(file, output_root)
+        from detection.DynamicDetection.GeneralFileTest import detect_smells_from_file
+        return detect_smells_from_file(file)
+    finally:
+        set_detector_overrides(None)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socket, "AF_UNIX"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class AnalysisJob:
+
+    def __init__(self, request, reply):
+        self.id = request.get("id")
+        self.method = request.get("method")
+        self.resource = request.get("resource")
+        self.detector_overrides = request.get("options") or {}
+        self.use_cache = request.get("cache", True)
+        self.reply = reply  # Callable sending an event dictionary to the client
+        self.done = threading.Event()
+
+    def send(self, event, **fields):
+        self.reply({"id": self.id, "event": event, **fields})
+
+
+class AnalysisServer:
+
+    def __init__(self, address: str = None, jobs: int = None,
+                 max_queued_jobs: int = DEFAULT_MAX_QUEUED_JOBS, concurrent_jobs: int = DEFAULT_CONCURRENT_JOBS,
+                 use_cache: bool = True, cache_directory: str = None):
+        """
+        Args:
+            address: Address to listen on ("unix:/path", or "host:port" to listen on TCP; default: default_address())
+            jobs: Number of worker processes analyzing files (default: CPU cores)
+            max_queued_jobs: Analyze requests waiting beyond this number are refused
+            concurrent_jobs: Number of requests whose files are analyzed at the same time
+            use_cache: Reuse and store results in the ResultCache
+            cache_directory: Folder of the ResultCache (default: .qspire_cache)
+        """
+        from detection.ParallelDetection import default_jobs
+        from detection.ResultCache import DEFAULT_CACHE_DIRECTORY
+
+        self.address = address or default_address()
+        self.token = secrets.token_hex(32)
+        self.token_file = None
+        self.jobs = jobs if jobs and jobs > 0 else default_jobs()
+        self.concurrent_jobs = concurrent_jobs
+        self.use_cache = use_cache
+        self.cache_directory = cache_directory or DEFAULT_CACHE_DIRECTORY
+        self.job_queue = queue.Queue(maxsize=max_queued_jobs)
+        self._submit_lock = threading.Lock()
+        self.dependency_graph = None
+        self.executor = None
+        self._executor_lock = threading.Lock()
+        self._server = None
+        self._runners = []
+        self._running_jobs = 0
+        self._completed_jobs = 0
+        self._stats_lock = threading.Lock()
+
+    # ---------------------------------------------------------------- lifecycle
+
+    def start(self):
+        """Import the detection stacks, start the worker pool and listen on the address."""
+        import detection.DynamicDetection.GeneralFileTest  # noqa: F401
+        import detection.StaticDetection.StaticMappedFolderDetection  # noqa: F401
+        from detection.DependencyGraph import DependencyGraph
+        from detection.ResultCache import DEPENDENCY_GRAPH_FILE
+
+        if self.use_cache:
+            self.dependency_graph = DependencyGraph(os.path.join(self.cache_directory, DEPENDENCY_GRAPH_FILE))
+        self.executor = self._create_executor()
+
+        for _ in range(self.concurrent_jobs):
+            runner = threading.Thread(target=self._run_jobs, daemon=True)
+            runner.start()
+            self._runners.append(runner)
+
+        family, bind_address = parse_address(self.address)
+        handler = self._make_handler()
+        if family != socket.AF_INET:
+            _remove_stale_socket(bind_address)
+            self._server = _UnixServer(bind_address, handler)
+        else:
+            self._server = _TCPServer(bind_address, handler)
+            # With port 0 the system picks a free port
+            self.address = f"{bind_address[0]}:{self._server.server_address[1]}"
+        self.token_file = token_file_path(self.address)
+        _write_private_file(self.token_file, self.token)
+        return self
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        """Stop accepting requests; serve_forever returns."""
+        threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def close(self):
+        # Refuse the jobs still waiting, then stop the runners
+        with self._submit_lock:
+            while True:
+                try:
+                    job = self.job_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job.send("error", message="The server is shutting down")
+                    job.done.set()
+            for _ in self._runners:
+                self.job_queue.put(None)
+        if self._server is not None:
+            self._server.server_close()
+            family, bind_address = parse_address(self.address)
+            if family != socket.AF_INET and os.path.exists(bind_address) and \
+                    stat.S_ISSOCK(os.lstat(bind_address).st_mode):
+                os.remove(bind_address)
+        if self.token_file is not None:
+            try:
+                os.remove(self.token_file)
+            except OSError:
+                pass
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.dependency_graph is not None:
+            self.dependency_graph.save()
+
+    # ---------------------------------------------------------------- jobs
+
+    def submit(self, job: AnalysisJob):
+        """Queue a job and notify the client; returns False when the queue is full."""
+        # Only submit adds jobs, so the queue cannot fill up between the check and the put
+        with self._submit_lock:
+            if self.job_queue.full():
+                return False
+            job.send("queued")
+            self.job_queue.put_nowait(job)
+        return True
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "workers": self.jobs,
+                "queued_jobs": self.job_queue.qsize(),
+                "running_jobs": self._running_jobs,
+                "completed_jobs": self._completed_jobs,
+            }
+
+    def _run_jobs(self):
+        while True:
+            job = self.job_queue.get()
+            if job is None:
+                return
+            with self._stats_lock:
+                self._running_jobs += 1
+            try:
+                self._run_job(job)
+            except Exception as e:
+                job.send("error", message=str(e))
+            finally:
+                with self._stats_lock:
+                    self._running_jobs -= 1
+                    self._completed_jobs += 1
+                job.done.set()
+
+    def _create_executor(self):
+        from detection.ParallelDetection import create_executor
+
+        # The fork server imports the detection stacks once, so that the workers start warm
+        return create_executor(self.jobs, [__name__, "detection.DynamicDetection.GeneralFileTest",
+                                           "detection.StaticDetection.StaticMappedFolderDetection"])
+
+    def _reset_executor(self, broken_executor):
+        with self._executor_lock:
+            if self.executor is broken_executor:
+                self.executor = self._create_executor()
+
+    def _run_job(self, job: AnalysisJob):
+        from detection.DynamicDetection.GeneralFileTest import get_all_python_files
+        from detection.ParallelDetection import iter_detect_with_executor
+        from detection.ResultCache import ResultCache
+        from detection.StaticDetection.StaticMappedFolderDetection import create_run_output_directory
+
+        if job.method not in ("static", "dynamic"):
+            job.send("error", message=f"Method '{job.method}' is not available")
+            return
+        if not job.resource or not os.path.exists(job.resource):
+            job.send("error", message=f"Resource path '{job.resource}' does not exist")
+            return
+
+        start = time.perf_counter()
+        resource = os.path.abspath(job.resource)
+        files = [resource] if os.path.isfile(resource) else get_all_python_files(resource)
+
+        cache = None
+        if self.use_cache and job.use_cache:
+            # Files may have changed since the previous job
+            self.dependency_graph.refresh()
+            cache = ResultCache(self.cache_directory, detector_overrides=job.detector_overrides,
+                                dependency_graph=self.dependency_graph)
+
+        job.send("started", files=len(files))
+        total_smells = 0
+
+        pending = files
+        if cache is not None:
+            cached, pending = cache.lookup(files, job.method)
+            for file, smells in cached.items():
+                total_smells += len(smells)
+                job.send("file", file=file, smells=[smell_to_json(s) for s in smells], cached=True)
+
+        # Every job generates its executables in a folder of its own, removed when it ends
+        output_root = create_run_output_directory() if job.method == "static" else None
+        detect_function = functools.partial(analyze_file, job.method, job.detector_overrides, output_root)
+        executor = self.executor
+        try:
+            for file, smells in iter_detect_with_executor(executor, detect_function, pending):
+                if cache is not None:
+                    cache.put(file, job.method, smells)
+                total_smells += len(smells)
+                job.send("file", file=file, smells=[smell_to_json(s) for s in smells], cached=False)
+        except BrokenProcessPool as e:
+            # A worker died badly: the next jobs get a new pool
+            self._reset_executor(executor)
+            job.send("error", message=f"Worker pool failure: {e}")
+            return
+        finally:
+            if output_root is not None:
+                shutil.rmtree(output_root, ignore_errors=True)
+
+        if cache is not None:
+            cache.flush()
+        job.send("done", files=len(files), smells=total_smells, elapsed=round(time.perf_counter() - start, 3))
+
+    # ---------------------------------------------------------------- protocol
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def handle(self):
+                write_lock = threading.Lock()
+                jobs = []
+
+                def reply(event):
+                    data = (json.dumps(event, default=str) + "\n").encode("utf-8")
+                    with write_lock:
+                        try:
+                            self.wfile.write(data)
+                            self.wfile.flush()
+                        except OSError:
+                            pass  # The client went away
+
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    # Anything else than an authenticated JSON request (e.g. HTTP headers) closes the connection
+                    try:
+                        request = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                        reply({"id": None, "event": "error", "message": f"Invalid JSON: {e}"})
+                        break
+                    if not isinstance(request, dict):
+                        reply({"id": None, "event": "error", "message": "Requests are JSON objects"})
+                        break
+                    token = request.get("token")
+                    if not isinstance(token, str) or not hmac.compare_digest(token, server.token):
+                        reply({"id": request.get("id"), "event": "error", "message": "Invalid token"})
+                        break
+
+                    command = request.get("command", "analyze")
+                    request_id = request.get("id")
+                    if command == "ping":
+                        reply({"id": request_id, "event": "pong"})
+                    elif command == "stats":
+                        reply({"id": request_id, "event": "stats", **server.stats()})
+                    elif command == "shutdown":
+                        reply({"id": request_id, "event": "shutdown"})
+                        server.shutdown()
+                        break
+                    elif command == "analyze":
+                        job = AnalysisJob(request, reply)
+                        if server.submit(job):
+                            jobs.append(job)
+                        else:
+                            job.send("error", message="The server queue is full, retry later")
+                    else:
+                        reply({"id": request_id, "event": "error", "message": f"Unknown command '{command}'"})
+
+                # The client closed its side: finish streaming the results of its jobs
+                for job in jobs:
+                    job.done.wait()
+
+        return Handler
+
+
+def send_request(address, request, timeout=None, token=None):
+    """
+    Send a request to a running server and yield its events until the final one.
+
+    Args:
+        address: Address of the server ("unix:/path" or "host:port")
+        request: Request dictionary (see the module docstring)
+        timeout: Socket timeout in seconds (optional)
+        token: Token of the server (default: read from its token file)
+
+    Yields:
+        Event dictionaries
+    """
+    if token is None:
+        token = read_token(address)
+    family, connect_address = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(connect_address)
+        client.sendall((json.dumps({**request, "token": token}) + "\n").encode("utf-8"))
+        with client.makefile("rb") as stream:
+            for line in stream:
+                event = json.loads(line)
+                yield event
+                if event.get("event") in FINAL_EVENTS:
+                    return
+
+
+def serve(address: str = None, jobs: int = None, use_cache: bool = True):
+    """Run the analysis server until a shutdown request (or Ctrl+C)."""
+    server = AnalysisServer(address, jobs=jobs, use_cache=use_cache).start()
+    print(f"QSpire analysis server listening on {server.address} with {server.jobs} workers")
+    print(f"Requests must carry the token stored in {server.token_file}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("QSpire analysis server stopped")
@@ -3,14 +3,22 @@ import click
 import os
 import sys
 
-from detection.DynamicDetection.GeneralFileTest import dynamic_file_detect, dynamic_folder_detect
-from detection.StaticDetection.StaticMappedFolderDetection import static_file_detect, static_folder_detect
+from util.StreamingOutput import OUTPUT_FORMATS, TEXT_FORMAT, NDJSON_FILES_FORMAT
+
+# The detection stacks (qiskit, the detectors, config.json) are imported by the code paths
+# that use them, so that `qspire --help` and argument errors answer immediately
 
 
 
 def is_file(resource:str):
     return True if resource.endswith(".py") else False
 
+def folder_output_path(output_saving_folder, file_path, folder="SmellResults"):
+    """Path of the CSV file holding the smells of a file of an analyzed folder."""
+    # Encode full path into a valid filename
+    safe_name = file_path.replace(folder,"").replace(":", "_").replace("\\", "_").replace("/", "_")
+    return os.path.join(output_saving_folder, folder, f"{safe_name}.csv")
+
 def save_output_for_folders(output_saving_folder, smells, folder="SmellResults"):
     os.makedirs(output_saving_folder, exist_ok=True)
 
@@ -23,9 +31,7 @@ def save_output_for_folders(output_saving_folder, smells, folder="SmellResults")
         if not smell_list:
             continue
 
-        # Encode full path into a valid filename
-        safe_name = file_path.replace(folder,"").replace(":", "_").replace("\\", "_").replace("/", "_")
-        output_file_path = os.path.join(subfolder_path, f"{safe_name}.csv")
+        output_file_path = folder_output_path(output_saving_folder, file_path, folder)
 
         # Convert all smells to dict form
         smells_dicts = [s.as_dict() for s in smell_list]
@@ -85,12 +91,49 @@ def save_output_for_files(resource, output_saving_folder, smells, folder="SmellR
 
 
 
-def static_method(resource, result_folder=None):
+def report_patterns(pattern_index, output_saving_folder=None, folder="SmellResults"):
+    """
+    Print the blocks of batches repeated across the circuits of an analyzed folder, and the circuits
+    sharing most of their blocks; save the blocks in RepeatedBlocks.csv when an output folder is given.
+    """
+    blocks = pattern_index.repeated_blocks()
+    similar = pattern_index.similar_circuits()
+
+    print(f"🔁 {len(blocks)} repeated block(s) across the {len(pattern_index.circuits)} indexed circuits")
+    for block in blocks:
+        circuits = len({(occurrence.file, occurrence.circuit_name) for occurrence in block.occurrences})
+        print(f"  Block of {block.batches} batches in {circuits} circuits:")
+        for occurrence in block.occurrences:
+            print(f"    - {occurrence.file} ({occurrence.circuit_name}): batches "
+                  f"{occurrence.first_batch}-{occurrence.last_batch}, rows {occurrence.first_row}-{occurrence.last_row}")
+    for pair in similar:
+        print(f"  {pair.first[0]} ({pair.first[1]}) and {pair.second[0]} ({pair.second[1]}) "
+              f"share {pair.similarity:.0%} of their blocks")
+
+    if output_saving_folder and blocks:
+        subfolder_path = os.path.join(output_saving_folder, folder)
+        os.makedirs(subfolder_path, exist_ok=True)
+        fieldnames = ["block", "batches", "file", "circuit_name", "first_batch", "last_batch", "first_row", "last_row"]
+        with open(os.path.join(subfolder_path, "RepeatedBlocks.csv"), mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for number, block in enumerate(blocks, 1):
+                for occurrence in block.occurrences:
+                    writer.writerow({"block": number, "batches": block.batches, **occurrence._asdict()})
+
+
+
+
+
+
+def static_method(resource, result_folder=None, jobs=1, cache=None, pattern_index=None):
+    from detection.StaticDetection.StaticMappedFolderDetection import static_file_detect, static_folder_detect
+
     print(f"🔧 Running STATIC method...")
     print(f"📁 Resource: {resource}")
 
     if is_file(resource):
-        result=static_file_detect(resource)
+        result=static_file_detect(resource, cache=cache)
 
         if result_folder: 
             subfolder=resource.split("\\")[-1].replace(".py","")
@@ -100,7 +143,7 @@ def static_method(resource, result_folder=None):
     
 
     else:
-        result=static_folder_detect(resource)
+        result=static_folder_detect(resource, jobs=jobs, cache=cache, pattern_index=pattern_index)
 
         if result_folder: 
             subfolder=resource.split("\\")[-1].replace(".py","")
@@ -114,12 +157,14 @@ def static_method(resource, result_folder=None):
 
 
 
-def dynamic_method(resource, result_folder=None):
+def dynamic_method(resource, result_folder=None, jobs=1, cache=None, pattern_index=None):
+    from detection.DynamicDetection.GeneralFileTest import dynamic_file_detect, dynamic_folder_detect
+
     print(f"🔧 Running DYNAMIC method...")
     print(f"📁 Resource: {resource}")
 
     if is_file(resource):
-        result=dynamic_file_detect(resource)
+        result=dynamic_file_detect(resource, cache=cache)
 
         if result_folder: 
             subfolder=resource.split("\\")[-1].replace(".py","")
@@ -129,7 +174,7 @@ def dynamic_method(resource, result_folder=None):
     
 
     else:
-        result=dynamic_folder_detect(resource)
+        result=dynamic_folder_detect(resource, jobs=jobs, cache=cache, pattern_index=pattern_index)
 
         if result_folder: 
             subfolder=resource.split("\\")[-1].replace(".py","")
@@ -144,12 +189,76 @@ def dynamic_method(resource, result_folder=None):
 
 
 
+def stream_method(method, resource, result_folder=None, jobs=1, cache=None, per_file=False, pattern_index=None):
+    """
+    Analyze a file or a folder and write the results as JSON lines on stdout, file by file.
+
+    Every file is written (and saved in result_folder) as soon as it is analyzed, so only
+    the files in flight are held in memory.
+
+    Args:
+        method: "static" or "dynamic"
+        resource: Path to the file or folder to analyze
+        result_folder: Folder where the CSV results are saved (optional)
+        jobs: Number of worker processes analyzing the files of a folder in parallel
+        cache: ResultCache storing the results across runs (optional)
+        per_file: One line per file instead of one line per smell
+        pattern_index: PatternIndex receiving the circuit patterns of the files of a folder (optional)
+    """
+    from util.StreamingOutput import NDJSONWriter, reserve_stdout
+
+    if method == 'static':
+        from detection.StaticDetection.StaticMappedFolderDetection import static_file_detect as file_detect
+        from detection.StaticDetection.StaticMappedFolderDetection import iter_static_folder_detect as iter_folder_detect
+    elif method == 'dynamic':
+        from detection.DynamicDetection.GeneralFileTest import dynamic_file_detect as file_detect
+        from detection.DynamicDetection.GeneralFileTest import iter_dynamic_folder_detect as iter_folder_detect
+    else:
+        click.echo(f"❌ Error: Method '{method}' is not available.", err=True)
+        sys.exit(1)
+
+    # stdout carries only the JSON lines from here on
+    writer = NDJSONWriter(reserve_stdout(), per_file=per_file)
+    subfolder=resource.split("\\")[-1].replace(".py","")
+
+    if is_file(resource):
+        results = [(resource, file_detect(resource, cache=cache))]
+    else:
+        results = iter_folder_detect(resource, jobs=jobs, cache=cache, pattern_index=pattern_index)
+
+    for file, smells in results:
+        writer.write(file, smells)
+        if result_folder:
+            if is_file(resource): save_output_for_files(resource, result_folder, smells, subfolder)
+            else: save_output_for_folders(result_folder, {file: smells}, subfolder)
+
+    print(f"✅ {writer.smells} smells in {writer.files} files")
+
+
+
+
 @click.command(context_settings=dict(help_option_names=['-h', '--help']))
 @click.option('-static', 'method', flag_value='static', help='Use static analysis method')
 @click.option('-dynamic', 'method', flag_value='dynamic', help='Use dynamic analysis method')
-@click.argument('resource', type=click.Path(), required=True)
+@click.option('-serve', 'method', flag_value='serve',
+              help='Start the local analysis server, listening on the address given as resource '
+                   '(default: a private Unix socket; unix:/path, or host:port to listen on TCP)')
+@click.option('-lsp', 'method', flag_value='lsp', help='Start the language server of the editor extensions on stdin/stdout')
+@click.option('--jobs', '-j', type=int, default=1, show_default=True,
+              help='Number of worker processes analyzing the files of a folder in parallel (0 uses all the CPU cores)')
+@click.option('--no-cache', 'no_cache', is_flag=True, default=False,
+              help='Analyze every file again instead of reusing the results cached in .qspire_cache')
+@click.option('--format', 'output_format', type=click.Choice(OUTPUT_FORMATS), default=TEXT_FORMAT, show_default=True,
+              help='ndjson streams one JSON line per smell on stdout as soon as each file is analyzed '
+                   '(ndjson-files: one line per file); progress messages go to stderr')
+@click.option('--patterns', 'patterns', is_flag=True, default=False,
+              help='Index the circuits of the analyzed folder and report the blocks of batches repeated '
+                   'across circuits and files')
+@click.option('--watch', 'watch', is_flag=True, default=False,
+              help='Keep watching the folder and analyze the changed files again after every save (Ctrl+C to stop)')
+@click.argument('resource', type=click.Path(), required=False, default=None)
 @click.argument('outputfolder', type=click.Path(), required=False, default=None)
-def qspire(method, resource, outputfolder):
+def qspire(method, jobs, no_cache, output_format, patterns, watch, resource, outputfolder):
     """
     QSpire - Quantum Code Analysis Tool
     
@@ -157,34 +266,111 @@ def qspire(method, resource, outputfolder):
     
     \b
     Arguments:
-      resource       Path to the file or directory to analyze (required)
+      resource       Path to the file or directory to analyze (required), or the server address with -serve
       outputfolder   Path where results will be saved (optional, if not expliceted prints results in the terminal)
     
     \b
     Examples:
       qspire -static "myfile.py"
       qspire -dynamic "myfile.py" "../output"
+      qspire -dynamic --jobs 4 "myfolder" "../output"
+      qspire -static --no-cache "myfolder"
+      qspire -static --watch "myfolder" "../output"
+      qspire -static --format ndjson --jobs 4 "myfolder" > smells.ndjson
+      qspire -dynamic --patterns --jobs 4 "myfolder" "../output"
+      qspire serve "unix:/tmp/qspire.sock"
+      qspire lsp
     """
     
     try:
+        # `qspire serve [address]` is the same as `qspire -serve [address]`
+        if method is None and resource == "serve":
+            method, resource, outputfolder = "serve", outputfolder, None
+        # `qspire lsp` is the same as `qspire -lsp`
+        if method is None and resource == "lsp":
+            method, resource = "lsp", None
+
+        if method == "lsp":
+            from util.LanguageServer import serve_stdio
+            sys.exit(serve_stdio(use_cache=not no_cache))
+
+        if method == "serve":
+            from util.AnalysisServer import serve
+
+            # The server uses every core unless --jobs is given explicitly
+            jobs_source = click.get_current_context().get_parameter_source("jobs")
+            server_jobs = jobs if jobs_source == click.core.ParameterSource.COMMANDLINE else 0
+            serve(resource, jobs=server_jobs, use_cache=not no_cache)
+            return
+
         # Your existing validation is correct
         if method is None:
             click.echo("Error: You must specify either -static or -dynamic", err=True)
-            click.echo("\nUsage: qspire (-static | -dynamic) resource [outputfolder]")
+            click.echo("\nUsage: qspire (-static | -dynamic) [--jobs N] [--no-cache] resource [outputfolder]")
             click.echo("Try 'qspire --help' for more information.")
             sys.exit(1)
+
+        if resource is None:
+            click.echo("Error: Missing argument 'RESOURCE'.", err=True)
+            click.echo("Try 'qspire --help' for more information.")
+            sys.exit(2)
         
         
         
+        if jobs <= 0:
+            from detection.ParallelDetection import default_jobs
+            jobs = default_jobs()
+
+        # Unchanged files are read from the results of the previous runs
+        cache = None
+        if not no_cache:
+            from detection.ResultCache import ResultCache
+            from smells.utils.BackendErrorCache import set_snapshot_directory, SNAPSHOT_FOLDER
+            cache = ResultCache()
+            # The error tables of the backends are parsed once, and shared with the worker processes
+            set_snapshot_directory(os.path.join(cache.directory, SNAPSHOT_FOLDER))
+
+        if watch:
+            if method not in ('static', 'dynamic'):
+                click.echo(f"❌ Error: Method '{method}' is not available.", err=True)
+                sys.exit(1)
+            if is_file(resource) or not os.path.isdir(resource):
+                click.echo(f"❌ Error: --watch needs an existing folder, got '{resource}'", err=True)
+                sys.exit(1)
+            from util.WatchMode import watch_folder
+            watch_folder(resource, method, outputfolder, jobs, cache)
+            return
+
+        # Circuits of the files of a folder, to report the blocks copy-pasted across them
+        pattern_index = None
+        if patterns and not is_file(resource):
+            from smells.utils.PatternIndex import PatternIndex
+            pattern_index = PatternIndex()
+
+        if output_format != TEXT_FORMAT:
+            if not os.path.exists(resource):
+                click.echo(f"❌ Error: Resource path '{resource}' does not exist!", err=True)
+                sys.exit(1)
+            stream_method(method, resource, outputfolder, jobs, cache, per_file=output_format == NDJSON_FILES_FORMAT,
+                          pattern_index=pattern_index)
+            if cache is not None:
+                cache.flush()
+            if pattern_index is not None:
+                report_patterns(pattern_index, outputfolder, resource.split("\\")[-1])
+            return
+
         # Execute the appropriate method
         if method == 'static': 
-            result = static_method(resource, outputfolder)
+            result = static_method(resource, outputfolder, jobs, cache, pattern_index)
         elif method == 'dynamic': 
-            result = dynamic_method(resource, outputfolder)
+            result = dynamic_method(resource, outputfolder, jobs, cache, pattern_index)
         else:
             click.echo(f"❌ Error: Method '{method}' is not available.", err=True)
             sys.exit(1)
 
+        if cache is not None:
+            cache.flush()
+
         # Rest of your code remains the same...
         if not os.path.exists(resource):
             click.echo(f"❌ Error: Resource path '{resource}' does not exist!", err=True)
@@ -208,6 +394,9 @@ def qspire(method, resource, outputfolder):
                 print()
 
         click.echo("="*50 + "\n")
+
+        if pattern_index is not None:
+            report_patterns(pattern_index, outputfolder, resource.split("\\")[-1])
         
     except Exception as e:
         click.echo(f"❌ Error occurred: {str(e)}", err=True)
@@ -0,0 +1,621 @@
+import ast
+import functools
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+from util.StreamingOutput import reserve_stdout
+from detection.WarmWorkerPool import CancellationScope, Cancelled
+
+"""
+Language Server Protocol backend of the editor extensions (`qspire lsp`).
+
+The editor starts one server per workspace and talks JSON-RPC on its stdin/stdout. The server
+keeps a fork server with the detection stack imported (see ParallelDetection.create_executor),
+analyzes the content of the open buffers, saved or not, with the static method and publishes the
+smells as diagnostics:
+
+    didOpen / didSave    -> analysis right away
+    didChange            -> analysis once the user stops typing for `debounce` seconds
+    didClose             -> diagnostics cleared
+
+Analyses run one at a time, each in a disposable worker process: the buffer code executed by the
+static method, and the builtins it patches, never reach the server. A document changing while it
+waits is analyzed once, at its latest version. A document changing while it is analyzed cancels
+the analysis: its worker is killed, with the executions it started, and its results dropped.
+
+Buffers never touch the workspace: each one is copied in a private temporary folder of the
+server and analyzed as the document it comes from (ParsedModule.stand_in), so that the local
+modules it imports resolve from the folder of the document.
+
+initializationOptions (all optional):
+
+    {"debounce": 0.3, "cache": true, "cacheDirectory": ".qspire_cache",
+     "options": {"IdQ": {"max_distance": 3}}}
+"""
+
+DEFAULT_DEBOUNCE = 0.3
+
+# LSP constants
+TEXT_DOCUMENT_SYNC_FULL = 1
+SEVERITY_WARNING = 2
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+SERVER_NOT_INITIALIZED = -32002
+
+SMELL_NAMES = {
+    "CG": "Use of Customized Gates",
+    "LPQ": "No-alignment between the Logical and Physical Qubits",
+    "IM": "Intermediate Measurements",
+    "IQ": "Initialization of Qubits differently from |0>",
+    "IdQ": "Idle Qubit",
+    "NC": "Non-parameterized Circuit",
+    "ROC": "Repeated set of Operations on Circuit",
+    "LC": "Long Circuit",
+}
+
+
+def read_message(stream):
+    """
+    Read one JSON-RPC message framed with a Content-Length header.
+
+    Args:
+        stream: Binary input stream
+
+    Returns:
+        The decoded message, or None at the end of the stream
+    """
+    content_length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            if content_length is None:
+                continue
+            break
+        name, _, value = line.decode("ascii").partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value.strip())
+
+    body = stream.read(content_length)
+    if len(body) < content_length:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def write_message(stream, message):
+    """Write one JSON-RPC message framed with a Content-Length header."""
+    body = json.dumps(message, default=str).encode("utf-8")
+    stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+    stream.flush()
+
+
+def analyze_buffer(detector_overrides, document_path, output_directory, buffer_path):
+    """
+    Static analysis of a buffer copy inside a worker process of the server.
+
+    Args:
+        detector_overrides: Detector options overriding config.json
+        document_path: Path of the document the buffer comes from (see ParsedModule.stand_in)
+        output_directory: Folder of the executables generated from the buffer
+        buffer_path: Path of the buffer copy
+
+    Returns:
+        List of smells
+    """
+    from detection.StaticDetection.StaticMappedDetection import autofix_map_detect
+    from smells.utils.config_loader import set_detector_overrides
+    from smells.utils.ParsedModule import ParsedModule
+
+    set_detector_overrides(detector_overrides)
+    try:
+        with ParsedModule.stand_in(buffer_path, document_path):
+            return autofix_map_detect(buffer_path, output_directory)
+    finally:
+        set_detector_overrides(None)
+
+
+def uri_to_path(uri):
+    """Local path of a file:// URI, or None for other schemes (untitled buffers, ...)."""
+    parsed = urlparse(uri)
+    if parsed.scheme != "file":
+        return None
+    return os.path.abspath(url2pathname(unquote(parsed.path)))
+
+
+def _smell_location(smell_dict):
+    """
+    Row and columns locating a smell in its file (1-based, as reported by the detectors).
+
+    Smells reporting a sequence of operations (ROC) are located on their first operation;
+    smells without any location are placed on the first line.
+    """
+    row = smell_dict.get("row")
+    column_start = smell_dict.get("column_start")
+    column_end = smell_dict.get("column_end")
+    if row is None:
+        for operation in smell_dict.get("operations") or []:
+            if isinstance(operation, dict) and operation.get("row") is not None:
+                return operation["row"], operation.get("column_start"), operation.get("column_end")
+        rows = smell_dict.get("rows")
+        if rows:
+            row = min(rows)
+    return row, column_start, column_end
+
+
+def smell_to_diagnostic(smell, lines):
+    """
+    Convert a smell into an LSP diagnostic.
+
+    Args:
+        smell: QuantumSmell found in the document
+        lines: Lines of the analyzed document
+
+    Returns:
+        Diagnostic dictionary
+    """
+    smell_dict = smell.as_dict()
+    row, column_start, column_end = _smell_location(smell_dict)
+
+    line = max(int(row) - 1, 0) if row is not None else 0
+    line_text = lines[line] if line < len(lines) else ""
+    if column_start is None or column_end is None:
+        # Underline the statement of the line, without its indentation
+        start = len(line_text) - len(line_text.lstrip())
+        end = len(line_text.rstrip())
+    else:
+        start = max(int(column_start) - 1, 0)
+        end = max(int(column_end) - 1, start)
+
+    smell_type = smell_dict.get("type")
+    message = f"{smell_type} - {SMELL_NAMES.get(smell_type, 'Quantum code smell')}"
+    if smell_dict.get("circuit_name"):
+        message += f" in circuit '{smell_dict['circuit_name']}'"
+    if smell_dict.get("explanation"):
+        message += f"\n{smell_dict['explanation']}"
+    if smell_dict.get("suggestion"):
+        message += f"\nSuggestion: {smell_dict['suggestion']}"
+
+    return {
+        "range": {"start": {"line": line, "character": start}, "end": {"line": line, "character": end}},
+        "severity": SEVERITY_WARNING,
+        "source": "qspire",
+        "code": smell_type,
+        "message": message,
+    }
+
+
+class TextDocument:
+
+    def __init__(self, uri, text, version):
+        self.uri = uri
+        self.path = uri_to_path(uri)
+        self.text = text
+        self.version = version
+
+
+class LanguageServer:
+
+    def __init__(self, reader, writer, debounce: float = DEFAULT_DEBOUNCE, use_cache: bool = True):
+        """
+        Args:
+            reader: Binary stream the client messages are read from
+            writer: Binary stream the server messages are written to
+            debounce: Seconds without changes after which an edited document is analyzed
+            use_cache: Reuse and store results in the ResultCache
+        """
+        self.reader = reader
+        self.writer = writer
+        self.debounce = debounce
+        self.detector_overrides = {}
+        self.use_cache = use_cache
+        self.cache_directory = None
+        self.cache = None
+
+        self.documents = {}  # uri -> TextDocument
+        self._documents_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timers = {}  # uri -> debounce Timer
+        self._pending = {}  # uri -> None, documents waiting for an analysis, in order
+        self._pending_condition = threading.Condition()
+        self._analysis_thread = None
+        self._running = None  # (uri, CancellationScope) of the analysis in progress
+        self._buffer_directory = None  # Private folder of the buffer copies
+        self._initialized = False
+        self._shutdown_requested = False
+        self._stopped = False
+
+        self.analyses = 0
+        self.stale_analyses = 0
+        self.cancelled_analyses = 0
+
+    # ---------------------------------------------------------------- protocol
+
+    def send(self, message):
+        message["jsonrpc"] = "2.0"
+        with self._write_lock:
+            write_message(self.writer, message)
+
+    def notify(self, method, params):
+        self.send({"method": method, "params": params})
+
+    def log(self, message):
+        print(message, file=sys.stderr, flush=True)
+
+    def serve_forever(self):
+        """
+        Handle the client messages until the exit notification or the end of the input.
+
+        Returns:
+            The exit code of the server: 0 if shutdown was requested before exit, 1 otherwise
+        """
+        try:
+            while True:
+                try:
+                    message = read_message(self.reader)
+                except (ValueError, UnicodeDecodeError) as e:
+                    self.send({"id": None, "error": {"code": PARSE_ERROR, "message": str(e)}})
+                    continue
+                if message is None or message.get("method") == "exit":
+                    break
+                self.handle(message)
+        finally:
+            self.stop()
+        return 0 if self._shutdown_requested else 1
+
+    def handle(self, message):
+        method = message.get("method")
+        request_id = message.get("id")
+        params = message.get("params") or {}
+
+        handler = getattr(self, "_on_" + (method or "").replace("/", "_").replace("$", "dollar"), None)
+        if request_id is None:
+            # Notification: unknown ones are ignored, as the protocol requires
+            if handler is not None and (self._initialized or method == "initialized"):
+                try:
+                    handler(params)
+                except Exception:
+                    self.log(traceback.format_exc())
+            return
+
+        if method is None:
+            self.send({"id": request_id, "error": {"code": INVALID_REQUEST, "message": "Missing method"}})
+        elif not self._initialized and method != "initialize":
+            self.send({"id": request_id, "error": {"code": SERVER_NOT_INITIALIZED, "message": "Server not initialized"}})
+        elif handler is None:
+            self.send({"id": request_id, "error": {"code": METHOD_NOT_FOUND, "message": f"Unknown method '{method}'"}})
+        else:
+            try:
+                self.send({"id": request_id, "result": handler(params)})
+            except Exception as e:
+                self.log(traceback.format_exc())
+                self.send({"id": request_id, "error": {"code": INVALID_REQUEST, "message": str(e)}})
+
+    # ---------------------------------------------------------------- lifecycle
+
+    def _on_initialize(self, params):
+        options = params.get("initializationOptions") or {}
+        self.debounce = float(options.get("debounce", self.debounce))
+        self.detector_overrides = options.get("options") or {}
+        self.use_cache = self.use_cache and options.get("cache", True)
+        self.cache_directory = options.get("cacheDirectory")
+        self._initialized = True
+
+        self._analysis_thread = threading.Thread(target=self._run_analyses, daemon=True)
+        self._analysis_thread.start()
+
+        return {
+            "capabilities": {
+                "textDocumentSync": {
+                    "openClose": True,
+                    "change": TEXT_DOCUMENT_SYNC_FULL,
+                    "save": {"includeText": False},
+                },
+            },
+            "serverInfo": {"name": "qspire"},
+        }
+
+    def _on_initialized(self, params):
+        pass
+
+    def _on_shutdown(self, params):
+        self._shutdown_requested = True
+        return None
+
+    def _on_dollar_cancelRequest(self, params):
+        # Analyses are not requests: they are cancelled by the changes of their documents
+        pass
+
+    def stop(self):
+        for timer in list(self._timers.values()):
+            timer.cancel()
+        with self._pending_condition:
+            self._stopped = True
+            self._pending.clear()
+            self._pending_condition.notify_all()
+            running = self._running
+        if running is not None:
+            running[1].cancel()
+        if self._analysis_thread is not None:
+            self._analysis_thread.join()
+            self._analysis_thread = None
+
+    # ---------------------------------------------------------------- documents
+
+    def _on_textDocument_didOpen(self, params):
+        item = params["textDocument"]
+        with self._documents_lock:
+            self.documents[item["uri"]] = TextDocument(item["uri"], item["text"], item.get("version"))
+        self.schedule(item["uri"], 0)
+
+    def _on_textDocument_didChange(self, params):
+        uri = params["textDocument"]["uri"]
+        with self._documents_lock:
+            document = self.documents.get(uri)
+            if document is None:
+                return
+            for change in params.get("contentChanges", []):
+                if "range" in change:
+                    document.text = self._apply_range_change(document.text, change)
+                else:
+                    document.text = change["text"]
+            document.version = params["textDocument"].get("version")
+        self.cancel_analysis(uri)
+        self.schedule(uri, self.debounce)
+
+    def _on_textDocument_didSave(self, params):
+        uri = params["textDocument"]["uri"]
+        if "text" in params:
+            with self._documents_lock:
+                if uri in self.documents:
+                    self.documents[uri].text = params["text"]
+        self.schedule(uri, 0)
+
+    def _on_textDocument_didClose(self, params):
+        uri = params["textDocument"]["uri"]
+        timer = self._timers.pop(uri, None)
+        if timer is not None:
+            timer.cancel()
+        with self._pending_condition:
+            self._pending.pop(uri, None)
+        with self._documents_lock:
+            self.documents.pop(uri, None)
+        self.cancel_analysis(uri)
+        self.notify("textDocument/publishDiagnostics", {"uri": uri, "diagnostics": []})
+
+    @staticmethod
+    def _apply_range_change(text, change):
+        """Apply an incremental change (positions in UTF-16 code units, as the protocol defines them)."""
+        lines = text.splitlines(keepends=True)
+
+        def offset(position):
+            line = position["line"]
+            if line >= len(lines):
+                return len(text)
+            prefix = sum(len(l) for l in lines[:line])
+            encoded = lines[line].encode("utf-16-le")[:position["character"] * 2]
+            return prefix + len(encoded.decode("utf-16-le", errors="ignore"))
+
+        start = offset(change["range"]["start"])
+        end = offset(change["range"]["end"])
+        return text[:start] + change["text"] + text[end:]
+
+    # ---------------------------------------------------------------- analyses
+
+    def schedule(self, uri, delay):
+        """
+        Analyze a document after `delay` seconds, unless it changes again in the meantime.
+        """
+        timer = self._timers.pop(uri, None)
+        if timer is not None:
+            timer.cancel()
+        if delay <= 0:
+            self._enqueue(uri)
+            return
+        timer = threading.Timer(delay, self._enqueue, args=(uri,))
+        timer.daemon = True
+        self._timers[uri] = timer
+        timer.start()
+
+    def cancel_analysis(self, uri):
+        """Abort the analysis of a document in progress, whose version is outdated."""
+        with self._pending_condition:
+            running = self._running
+        if running is not None and running[0] == uri:
+            running[1].cancel()
+
+    def _enqueue(self, uri):
+        with self._pending_condition:
+            # A document already waiting keeps its place: it is analyzed at its latest version
+            self._pending.setdefault(uri, None)
+            self._pending_condition.notify()
+
+    def _run_analyses(self):
+        self._warm_up()
+        while True:
+            with self._pending_condition:
+                while not self._pending and not self._stopped:
+                    self._pending_condition.wait()
+                if self._stopped:
+                    break
+                uri = next(iter(self._pending))
+                del self._pending[uri]
+
+            with self._documents_lock:
+                document = self.documents.get(uri)
+                if document is None:
+                    continue
+                text, version = document.text, document.version
+
+            scope = CancellationScope()
+            with self._pending_condition:
+                self._running = (uri, scope)
+            try:
+                smells = self.analyze(document.path, text, scope)
+            except Exception:
+                if not scope.cancelled.is_set():
+                    self.log(traceback.format_exc())
+                smells = None
+            finally:
+                with self._pending_condition:
+                    self._running = None
+            if scope.cancelled.is_set():
+                self.cancelled_analyses += 1
+                continue
+            if smells is None:
+                continue
+            self.analyses += 1
+
+            with self._documents_lock:
+                current = self.documents.get(uri)
+                stale = current is None or current.version != version or current.text != text
+            if stale:
+                self.stale_analyses += 1
+                continue
+
+            lines = text.splitlines()
+            self.notify("textDocument/publishDiagnostics", {
+                "uri": uri,
+                "version": version,
+                "diagnostics": [smell_to_diagnostic(smell, lines) for smell in smells],
+            })
+
+        if self.cache is not None:
+            self.cache.flush()
+        if self._buffer_directory is not None:
+            shutil.rmtree(self._buffer_directory, ignore_errors=True)
+
+    def _create_executor(self):
+        from detection.ParallelDetection import create_executor
+
+        # The fork server imports the detection stack once, so that the workers start warm
+        return create_executor(1, [__name__, "detection.StaticDetection.StaticMappedFolderDetection"])
+
+    def _warm_up(self):
+        """Start the fork server of the analysis workers before the first analysis."""
+        start = time.perf_counter()
+        self._buffer_directory = tempfile.mkdtemp(prefix="qspire_lsp_")
+
+        if self.use_cache:
+            from detection.ResultCache import ResultCache, DEFAULT_CACHE_DIRECTORY
+            self.cache = ResultCache(self.cache_directory or DEFAULT_CACHE_DIRECTORY,
+                                     detector_overrides=self.detector_overrides)
+
+        try:
+            with self._create_executor() as executor:
+                executor.submit(os.getpid).result()
+        except Exception:
+            self.log(traceback.format_exc())
+        self.log(f"QSpire language server ready in {time.perf_counter() - start:.2f}s")
+
+    def buffer_hash(self, path, text):
+        """
+        Hash of the content of a buffer and of the local modules it imports from the folder of its document.
+
+        Args:
+            path: Path of the document, or None for buffers never saved
+            text: Current content of the buffer
+
+        Returns:
+            Hex digest identifying the results of the buffer in the ResultCache
+        """
+        from detection.DependencyGraph import get_local_imports
+
+        digest = hashlib.sha256(text.encode("utf-8"))
+        if path and self.cache.dependency_graph is not None:
+            try:
+                imports = get_local_imports(os.path.abspath(path), ast.parse(text))
+            except (SyntaxError, ValueError):
+                imports = []
+            for dependency in imports:
+                try:
+                    dependency_hash = self.cache.dependency_graph.dependency_hash(dependency)
+                except FileNotFoundError:
+                    continue
+                digest.update(f"\0{dependency}\0{dependency_hash}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def analyze(self, path, text, scope: CancellationScope = None):
+        """
+        Static analysis of the content of a buffer.
+
+        The content is copied in the private folder of the server and analyzed as the document
+        (see analyze_buffer) in a worker process of its own; the executables generated from it
+        go to the same folder.
+
+        Args:
+            path: Path of the document, or None for buffers never saved
+            text: Current content of the buffer
+            scope: CancellationScope killing the worker when cancelled (optional)
+
+        Returns:
+            List of smells
+
+        Raises:
+            Cancelled: When the scope is cancelled before the analysis completes
+        """
+        from detection.ParallelDetection import iter_detect_with_executor, kill_workers
+
+        scope = scope or CancellationScope()
+        name = os.path.basename(path) if path else "untitled.py"
+        buffer_path = os.path.join(self._buffer_directory, name)
+        content_hash = None
+
+        try:
+            with open(buffer_path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+            if self.cache is not None:
+                # Same content and same local dependencies: same smells
+                self.cache.dependency_graph.refresh()
+                content_hash = self.buffer_hash(path, text)
+                smells = self.cache.get(buffer_path, "static", content_hash)
+                if smells is not None:
+                    return smells
+
+            detect_function = functools.partial(analyze_buffer, self.detector_overrides, path or buffer_path,
+                                                os.path.join(self._buffer_directory, "executables"))
+            smells = []
+            with self._create_executor() as executor, scope.on_cancel(lambda: kill_workers(executor)):
+                for _, smells in iter_detect_with_executor(executor, detect_function, [buffer_path]):
+                    pass
+            if scope.cancelled.is_set():
+                # The worker was killed: whatever it returned is not the analysis of the buffer
+                raise Cancelled(buffer_path)
+
+            if self.cache is not None:
+                self.cache.put(buffer_path, "static", smells, content_hash)
+            return smells
+        finally:
+            try:
+                os.remove(buffer_path)
+            except OSError:
+                pass
+
+
+def serve_stdio(use_cache: bool = True):
+    """
+    Run the language server on stdin/stdout until the client exits.
+
+    Args:
+        use_cache: Reuse and store results in the ResultCache
+
+    Returns:
+        The exit code of the server
+    """
+    # The protocol owns stdout: whatever the detectors print goes to stderr instead
+    protocol_out = reserve_stdout()
+
+    server = LanguageServer(sys.stdin.buffer, protocol_out, use_cache=use_cache)
+    return server.serve_forever()
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+
+"""
+Machine-readable output streams of the CLI (`--format ndjson`) and of the servers.
+
+The detectors print their progress on stdout, and so do the worker processes sharing its file
+descriptor; reserve_stdout keeps the real stdout for the results and sends everything else to stderr.
+"""
+
+# Values of --format
+TEXT_FORMAT = "text"
+NDJSON_FORMAT = "ndjson"
+NDJSON_FILES_FORMAT = "ndjson-files"
+OUTPUT_FORMATS = [TEXT_FORMAT, NDJSON_FORMAT, NDJSON_FILES_FORMAT]
+
+
+def smell_to_json(smell):
+    """JSON-compatible dictionary of a smell (values JSON cannot represent become strings)."""
+    return json.loads(json.dumps(smell.as_dict(), default=str))
+
+
+def reserve_stdout():
+    """
+    Keep stdout for the caller: from now on anything else printed, by this process or by the
+    processes it starts, goes to stderr.
+
+    Returns:
+        Binary stream writing to the original stdout
+    """
+    sys.stdout.flush()
+    reserved = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    return reserved
+
+
+class NDJSONWriter:
+
+    def __init__(self, stream, per_file: bool = False):
+        """
+        Args:
+            stream: Binary stream receiving the JSON lines
+            per_file: One line per file with all its smells, instead of one line per smell
+        """
+        self.stream = stream
+        self.per_file = per_file
+        self.files = 0
+        self.smells = 0
+
+    def _write(self, record):
+        self.stream.write((json.dumps(record, default=str) + "\n").encode("utf-8"))
+
+    def write(self, file, smells):
+        """
+        Write the results of a file and flush them, so that readers see them right away.
+
+        Args:
+            file: Path to the analyzed file
+            smells: Smells found in the file
+        """
+        self.files += 1
+        self.smells += len(smells)
+        if self.per_file:
+            self._write({"file": file, "smells": [smell_to_json(smell) for smell in smells]})
+        else:
+            for smell in smells:
+                self._write({"file": file, **smell_to_json(smell)})
+        self.stream.flush()
@@ -0,0 +1,341 @@
+import ctypes
+import ctypes.util
+import functools
+import os
+import select
+import shutil
+import struct
+import sys
+import time
+
+"""
+Watch mode (`qspire -static --watch <folder>`, or -dynamic).
+
+The folder is analyzed once, then watched: after every burst of saves (once no file changed for
+`debounce` seconds) the changed files, and the files importing them, are analyzed again. Saving
+the same file several times within a burst analyzes it once.
+
+Changes are reported by inotify on Linux; elsewhere (or when inotify is unavailable) the tree is
+polled. The fork server of the worker processes is kept warm between the bursts.
+"""
+
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Folders whose files are never watched: the executables generated by the static analysis and
+# the results cache would otherwise trigger new analyses forever
+IGNORED_DIRECTORIES = {"generated_executables", "__pycache__", "node_modules"}
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_ignored(path):
+    """Whether a path is outside of the watched sources (hidden, cache or generated folders)."""
+    return any(part.startswith(".") or part in IGNORED_DIRECTORIES for part in path.split(os.sep) if part)
+
+
+def is_watched_file(path):
+    return path.endswith(".py") and not is_ignored(path)
+
+
+class PollingWatcher:
+    """Find the changed Python files by comparing the modification times of the tree."""
+
+    def __init__(self, folder, interval: float = DEFAULT_POLL_INTERVAL):
+        self.folder = folder
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for root, dirs, files in os.walk(self.folder):
+            dirs[:] = [d for d in dirs if not is_ignored(d)]
+            for name in files:
+                path = os.path.join(root, name)
+                if not is_watched_file(os.path.relpath(path, self.folder)):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        """
+        Wait for changes.
+
+        Args:
+            timeout: Seconds to wait at most (None waits until something changes)
+
+        Returns:
+            Set of the paths of the created, modified or deleted Python files (empty on timeout)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else max(0.0, min(self.interval, deadline - time.monotonic()))
+            time.sleep(remaining)
+            snapshot = self._scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Find the changed Python files through inotify, watching every folder of the tree."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories = {}  # watch descriptor -> folder
+        try:
+            self._add_tree(self.folder)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, folder):
+        """Watch a folder and its subfolders; returns the Python files already inside them."""
+        found = set()
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [d for d in dirs if not is_ignored(d)]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, f"Cannot watch {root}: {os.strerror(errno)}")
+            self._directories[wd] = root
+            found.update(os.path.join(root, name) for name in files if name.endswith(".py"))
+        return found
+
+    def _read_events(self):
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size: offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: every file may have changed
+                changed.update(PollingWatcher(self.folder).snapshot)
+                continue
+            if mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+
+            folder = self._directories.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if is_ignored(os.path.relpath(path, self.folder)):
+                continue
+            if mask & IN_ISDIR:
+                # A new (or moved in) folder: watch it, its files are new too
+                if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                    try:
+                        changed.update(self._add_tree(path))
+                    except OSError as e:
+                        print(e)
+                continue
+            if path.endswith(".py"):
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        """
+        Wait for changes.
+
+        Args:
+            timeout: Seconds to wait at most (None waits until something changes)
+
+        Returns:
+            Set of the paths of the created, modified or deleted Python files (empty on timeout)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            changed = self._read_events() if readable else set()
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(folder, polling: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL):
+    """
+    Watcher of the Python files of a folder: inotify where available, polling otherwise.
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as e:
+            # No inotify in the C library, or too many watches (fs.inotify.max_user_watches)
+            print(f"inotify is not available ({e}), polling the folder every {poll_interval}s")
+    return PollingWatcher(folder, poll_interval)
+
+
+def wait_for_burst(watcher, debounce: float = DEFAULT_DEBOUNCE):
+    """
+    Wait for a burst of changes to end.
+
+    Returns:
+        Set of the paths of the files changed during the burst, each reported once
+    """
+    changed = watcher.wait()
+    while True:
+        more = watcher.wait(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def _worker_detect_function(method, output_root=None):
+    if method == "static":
+        from detection.StaticDetection.StaticMappedFolderDetection import static_worker_detect
+        return functools.partial(static_worker_detect, output_root=output_root)
+    from detection.DynamicDetection.GeneralFileTest import detect_smells_from_file
+    return detect_smells_from_file
+
+
+def _write_results(result_folder, subfolder, file, smells):
+    """Update the CSV of a file in the save_output_for_folders layout, removing it when the file has no smells anymore."""
+    from util.CLIModule import folder_output_path, save_output_for_folders
+
+    output_file_path = folder_output_path(result_folder, file, subfolder)
+    if smells:
+        save_output_for_folders(result_folder, {file: smells}, subfolder)
+    elif os.path.exists(output_file_path):
+        os.remove(output_file_path)
+
+
+def watch_folder(folder, method, result_folder=None, jobs=1, cache=None,
+                 debounce: float = DEFAULT_DEBOUNCE, polling: bool = False, max_bursts: int = None):
+    """
+    Analyze a folder, then analyze its changed files again until interrupted (Ctrl+C).
+
+    Args:
+        folder: Path to the folder to watch
+        method: "static" or "dynamic"
+        result_folder: Folder of the CSV results, updated after every burst (optional, printed otherwise)
+        jobs: Number of worker processes, forked from a fork server kept warm between the bursts
+        cache: ResultCache storing the results across runs (optional)
+        debounce: Seconds without changes ending a burst of saves
+        polling: Poll the folder instead of using inotify
+        max_bursts: Return after this number of bursts (optional, used by the tests)
+
+    Returns:
+        Dictionary mapping each file of the folder to its latest smells
+    """
+    from detection.DependencyGraph import DependencyGraph
+    from detection.DynamicDetection.GeneralFileTest import get_all_python_files
+    from detection.ParallelDetection import create_executor, iter_detect_with_executor
+    from detection.StaticDetection.StaticMappedFolderDetection import create_run_output_directory
+
+    # Same paths and output layout as a one-shot run of the folder
+    subfolder = folder.split("\\")[-1].replace(".py","")
+    graph = cache.dependency_graph if cache is not None and cache.dependency_graph is not None else DependencyGraph()
+    # The executables of the watch session go to a folder of its own, removed when it stops
+    output_root = create_run_output_directory() if method == "static" else None
+    detect_function = _worker_detect_function(method, output_root)
+    results = {}
+
+    def source_files():
+        return [f for f in get_all_python_files(folder) if is_watched_file(os.path.relpath(f, folder))]
+
+    def analyze(files):
+        pending = files
+        if cache is not None:
+            cached, pending = cache.lookup(files, method)
+            for file, smells in cached.items():
+                yield file, smells
+        for file, smells in iter_detect_with_executor(executor, detect_function, pending):
+            if cache is not None:
+                cache.put(file, method, smells)
+            yield file, smells
+
+    def report(file, smells):
+        results[file] = smells
+        if result_folder:
+            _write_results(result_folder, subfolder, file, smells)
+        elif smells:
+            print(f"Smells in {file}:")
+            for smell in smells:
+                print(smell.as_dict())
+            print()
+        else:
+            print(f"No Smells in {file}\n")
+
+    # The watcher starts first, so that no save made during the first analysis is missed
+    watcher = create_watcher(folder, polling)
+    executor = create_executor(jobs, [getattr(detect_function, "func", detect_function).__module__])
+    bursts = 0
+    try:
+        files = source_files()
+        print(f"👀 Analyzing {len(files)} files, then watching {folder} ({type(watcher).__name__})")
+        for file, smells in analyze(files):
+            report(file, smells)
+        if cache is not None:
+            cache.flush()
+        print(f"✅ {len(files)} files analyzed, watching for changes...")
+
+        while max_bursts is None or bursts < max_bursts:
+            changed = wait_for_burst(watcher, debounce)
+            bursts += 1
+            start = time.perf_counter()
+
+            graph.refresh()
+            files = source_files()
+            for file in changed:
+                if not os.path.exists(file) and file in results:
+                    # Deleted: its results go away with it
+                    del results[file]
+                    if result_folder:
+                        _write_results(result_folder, subfolder, file, [])
+                    print(f"🗑️  {file} was removed")
+
+            affected = graph.dependents(changed, files)
+            if not affected:
+                continue
+            print(f"🔄 {len(changed)} changed files, analyzing {len(affected)} affected files")
+            for file, smells in analyze(affected):
+                report(file, smells)
+            if cache is not None:
+                cache.flush()
+            print(f"✅ Up to date in {time.perf_counter() - start:.2f}s, watching for changes...")
+    except KeyboardInterrupt:
+        print("Watch mode stopped")
+    finally:
+        watcher.close()
+        executor.shutdown(wait=True, cancel_futures=True)
+        if output_root is not None:
+            shutil.rmtree(output_root, ignore_errors=True)
+
+    return results